@@ -0,0 +1,9 @@
+from rest_framework.permissions import BasePermission
+
+from .models import User
+
+
+class IsSuperAdmin(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and user.role == User.Role.SUPER_ADMIN)
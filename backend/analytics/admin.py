@@ -0,0 +1,2 @@
+from django.contrib import admin
+# ...register models later...
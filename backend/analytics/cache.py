@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Callable, Hashable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU with a per-entry TTL.
+
+    Per worker process only; entries simply age out, there is no cross-process
+    invalidation.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl_s: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_s: float | None = None) -> None:
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any], ttl_s: float | None = None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl_s)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+# --- stale-while-revalidate ---------------------------------------------------
+#
+# Entries live in a Django cache (SWR_CACHE_ALIAS) as
+#   {"value": ..., "fresh_until": epoch, "stale_until": epoch}
+# - fresh            -> served as-is
+# - stale (<= stale) -> served as-is, one background refresh is started
+# - missing/expired  -> computed once; concurrent callers in this process wait
+#                       for that computation, other processes wait on a cache
+#                       lease ("<key>:lease", cache.add) and then read the result.
+# Cross-process coalescing needs a shared cache backend (database/redis/memcached);
+# with the default local-memory cache it is per process only.
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = _MISSING
+        self.error = None
+
+
+def _cache():
+    return caches[getattr(settings, "SWR_CACHE_ALIAS", "default")]
+
+
+def _count(name: str, stat: str) -> None:
+    with _stats_lock:
+        _stats[name][stat] += 1
+
+
+def swr_stats() -> dict:
+    with _stats_lock:
+        return {name: dict(counter) for name, counter in sorted(_stats.items())}
+
+
+def reset_swr_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _store(key, value, ttl_s, stale_s) -> None:
+    now = time.time()
+    _cache().set(
+        key,
+        {"value": value, "fresh_until": now + ttl_s, "stale_until": now + ttl_s + stale_s},
+        timeout=ttl_s + stale_s,
+    )
+
+
+def _compute_with_lease(name, key, compute, ttl_s, stale_s, lease_s, wait_s, *, wait_for_other=True):
+    """Compute under a cross-process lease. Returns _MISSING if another process
+    holds the lease and wait_for_other is False."""
+    cache = _cache()
+    lease_key = f"{key}:lease"
+    owner = uuid.uuid4().hex
+    if cache.add(lease_key, owner, timeout=lease_s):
+        try:
+            value = compute()
+            _store(key, value, ttl_s, stale_s)
+            return value
+        finally:
+            if cache.get(lease_key) == owner:
+                cache.delete(lease_key)
+
+    if not wait_for_other:
+        return _MISSING
+    _count(name, "lease_waits")
+    deadline = time.monotonic() + wait_s
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["value"]
+    # lease holder is slow or died; don't leave the caller empty-handed
+    value = compute()
+    _store(key, value, ttl_s, stale_s)
+    return value
+
+
+def _single_flight(name, key, compute, ttl_s, stale_s, lease_s, wait_s):
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+
+    if not leader:
+        _count(name, "coalesced")
+        if flight.event.wait(wait_s) and flight.error is None and flight.value is not _MISSING:
+            return flight.value
+        return compute()
+
+    try:
+        flight.value = _compute_with_lease(name, key, compute, ttl_s, stale_s, lease_s, wait_s)
+        return flight.value
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.event.set()
+
+
+def _refresh(name, key, compute, ttl_s, stale_s, lease_s, flight):
+    try:
+        value = _compute_with_lease(name, key, compute, ttl_s, stale_s, lease_s, 0, wait_for_other=False)
+        if value is not _MISSING:
+            _count(name, "refreshes")
+    except Exception:
+        _count(name, "refresh_errors")
+        logger.exception("stale-while-revalidate refresh failed for %s", name)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.event.set()
+
+
+def _schedule_refresh(name, key, compute, ttl_s, stale_s, lease_s) -> None:
+    with _inflight_lock:
+        if key in _inflight:
+            return
+        flight = _inflight[key] = _Flight()
+
+    if not getattr(settings, "SWR_BACKGROUND_REFRESH", True):
+        _refresh(name, key, compute, ttl_s, stale_s, lease_s, flight)
+        return
+
+    def _run():
+        try:
+            _refresh(name, key, compute, ttl_s, stale_s, lease_s, flight)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=_run, name=f"swr-refresh-{name}", daemon=True).start()
+
+
+def swr_cached(name: str, *, ttl_s: float, stale_s: float, lease_s: float = 30, wait_s: float = 10):
+    """Cache an expensive, picklable result with stale-while-revalidate.
+
+    Arguments of the decorated function form the cache key, so it must be
+    callable again later from a background thread with the same arguments
+    (pass ids/dates, not request objects).
+    """
+    def decorator(fn):
+        def _key(args, kwargs):
+            raw = repr((args, sorted(kwargs.items())))
+            return f"swr:{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _key(args, kwargs)
+            compute = functools.partial(fn, *args, **kwargs)
+            entry = _cache().get(key)
+            now = time.time()
+            if entry is not None and now < entry["fresh_until"]:
+                _count(name, "hits")
+                return entry["value"]
+            if entry is not None and now < entry["stale_until"]:
+                _count(name, "stale_hits")
+                _schedule_refresh(name, key, compute, ttl_s, stale_s, lease_s)
+                return entry["value"]
+            _count(name, "misses")
+            return _single_flight(name, key, compute, ttl_s, stale_s, lease_s, wait_s)
+
+        wrapper.invalidate = lambda *args, **kwargs: _cache().delete(_key(args, kwargs))
+        return wrapper
+
+    return decorator
@@ -0,0 +1,250 @@
+"""Streaming exports (CSV / NDJSON) shared by the admin export endpoints and
+the export_data management command.
+
+Rows are read with keyset pagination on the primary key (``id > last``,
+``LIMIT chunk_size``), so memory stays flat regardless of table size and no
+backend-specific server-side cursor support is needed.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .services import _local_bounds
+
+
+EXPORT_FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class ExportError(ValueError):
+    """Bad dataset / filter values (surfaced as 400 by the view, CommandError by the command)."""
+
+
+@dataclass(frozen=True)
+class ExportFilters:
+    start: Optional[date] = None
+    end: Optional[date] = None
+    branch_id: Optional[int] = None
+    status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    # (column header, values_list lookup)
+    columns: Sequence[tuple]
+    queryset: Callable[[ExportFilters], object]
+    statuses: Sequence[str]
+
+
+def _orders(f: ExportFilters):
+    from orders.models import Order
+
+    qs = Order.objects.all()
+    lo, hi = _local_bounds(f.start, f.end)
+    if lo:
+        qs = qs.filter(created_at__gte=lo)
+    if hi:
+        qs = qs.filter(created_at__lt=hi)
+    if f.branch_id is not None:
+        qs = qs.filter(branch_id=f.branch_id)
+    if f.status:
+        qs = qs.filter(status=f.status)
+    return qs
+
+
+def _payments(f: ExportFilters):
+    from payments.models import Payment
+
+    qs = Payment.objects.all()
+    if f.start:
+        qs = qs.filter(due_date__gte=f.start)
+    if f.end:
+        qs = qs.filter(due_date__lte=f.end)
+    if f.branch_id is not None:
+        qs = qs.filter(branch_id=f.branch_id)
+    if f.status:
+        qs = qs.filter(payment_status=f.status)
+    return qs
+
+
+def _users(f: ExportFilters):
+    from accounts.models import User
+    from locations.models import CustomerBranchAffinity
+
+    qs = User.objects.all()
+    lo, hi = _local_bounds(f.start, f.end)
+    if lo:
+        qs = qs.filter(created_at__gte=lo)
+    if hi:
+        qs = qs.filter(created_at__lt=hi)
+    if f.branch_id is not None:
+        qs = qs.filter(id__in=CustomerBranchAffinity.objects.filter(branch_id=f.branch_id).values("user_id"))
+    if f.status == "active":
+        qs = qs.filter(is_active=True)
+    elif f.status == "inactive":
+        qs = qs.filter(is_active=False)
+    elif f.status == "unapproved":
+        qs = qs.filter(is_approved=False)
+    return qs
+
+
+def _subscriptions(f: ExportFilters):
+    from subscriptions.models import CustomerSubscription
+
+    qs = CustomerSubscription.objects.all()
+    if f.start:
+        qs = qs.filter(start_date__gte=f.start)
+    if f.end:
+        qs = qs.filter(start_date__lte=f.end)
+    if f.branch_id is not None:
+        qs = qs.filter(branch_id=f.branch_id)
+    if f.status:
+        qs = qs.filter(is_active=(f.status == "active"))
+    return qs
+
+
+DATASETS = {
+    d.name: d
+    for d in (
+        Dataset(
+            name="orders",
+            columns=(
+                ("id", "id"),
+                ("created_at", "created_at"),
+                ("pickup_date", "pickup_date"),
+                ("pickup_shift", "pickup_shift"),
+                ("order_type", "order_type"),
+                ("status", "status"),
+                ("user_id", "user_id"),
+                ("user_email", "user__email"),
+                ("branch_id", "branch_id"),
+                ("branch_name", "branch__branch_name"),
+                ("weight_kg", "orderweight__weight_kg"),
+            ),
+            queryset=_orders,
+            statuses=("scheduled", "picked_up", "reached_branch", "washing", "ready_for_delivery", "delivered", "cancelled"),
+        ),
+        Dataset(
+            name="payments",
+            columns=(
+                ("id", "id"),
+                ("user_id", "user_id"),
+                ("user_email", "user__email"),
+                ("order_id", "order_id"),
+                ("subscription_id", "subscription_id"),
+                ("branch_id", "branch_id"),
+                ("payment_type", "payment_type"),
+                ("payment_status", "payment_status"),
+                ("amount", "amount"),
+                ("due_date", "due_date"),
+                ("payment_date", "payment_date"),
+                ("fine_amount", "fine__fine_amount"),
+                ("fine_days", "fine__fine_days"),
+            ),
+            queryset=_payments,
+            statuses=("pending", "paid", "failed"),
+        ),
+        Dataset(
+            name="users",
+            columns=(
+                ("id", "id"),
+                ("email", "email"),
+                ("full_name", "full_name"),
+                ("phone", "phone"),
+                ("role", "role"),
+                ("is_active", "is_active"),
+                ("is_approved", "is_approved"),
+                ("created_at", "created_at"),
+            ),
+            queryset=_users,
+            statuses=("active", "inactive", "unapproved"),
+        ),
+        Dataset(
+            name="subscriptions",
+            columns=(
+                ("id", "id"),
+                ("user_id", "user_id"),
+                ("user_email", "user__email"),
+                ("plan", "plan__name"),
+                ("monthly_price", "plan__monthly_price"),
+                ("branch_id", "branch_id"),
+                ("preferred_pickup_shift", "preferred_pickup_shift"),
+                ("is_active", "is_active"),
+                ("start_date", "start_date"),
+                ("end_date", "end_date"),
+            ),
+            queryset=_subscriptions,
+            statuses=("active", "inactive"),
+        ),
+    )
+}
+
+
+def get_dataset(name: str, filters: ExportFilters) -> Dataset:
+    dataset = DATASETS.get(name)
+    if dataset is None:
+        raise ExportError(f"unknown dataset '{name}' (expected one of {', '.join(DATASETS)})")
+    if filters.status and filters.status not in dataset.statuses:
+        raise ExportError(f"status must be one of {', '.join(dataset.statuses)}")
+    return dataset
+
+
+def iter_rows(dataset: Dataset, filters: ExportFilters, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple]:
+    """Yield value tuples in id order, one keyset-paged query per chunk."""
+    qs = dataset.queryset(filters).order_by("id")
+    lookups = [lookup for _, lookup in dataset.columns]
+    last_id = None
+    while True:
+        page = qs if last_id is None else qs.filter(id__gt=last_id)
+        rows = list(page.values_list(*lookups)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Echo:
+    """File-like object whose write() just returns the line (Django's streaming CSV recipe)."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(dataset: Dataset, rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in dataset.columns])
+    for row in rows:
+        yield writer.writerow([_csv_cell(v) for v in row])
+
+
+def render_ndjson(dataset: Dataset, rows: Iterable[tuple]) -> Iterator[str]:
+    headers = [header for header, _ in dataset.columns]
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def render(dataset: Dataset, filters: ExportFilters, fmt: str, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    rows = iter_rows(dataset, filters, chunk_size=chunk_size)
+    return render_csv(dataset, rows) if fmt == "csv" else render_ndjson(dataset, rows)
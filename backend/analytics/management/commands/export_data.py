@@ -0,0 +1,62 @@
+"""
+Stream a full export of orders, payments (with fines), users or subscriptions.
+
+Same datasets and filters as GET /api/admin/exports/<dataset>.<csv|ndjson>:
+    python manage.py export_data payments --format csv --start 2026-01-01 --end 2026-01-31 > jan.csv
+    python manage.py export_data orders --format ndjson --branch 3 --status delivered --output orders.ndjson
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.exports import DATASETS, DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, ExportFilters, get_dataset, render
+
+
+def _parse_date(raw, flag):
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise CommandError(f"Invalid {flag}. Use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV/NDJSON export of orders, payments, users or subscriptions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--start", type=str, default="", help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--end", type=str, default="", help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--branch", type=int, default=None, help="Branch id")
+        parser.add_argument("--status", type=str, default="")
+        parser.add_argument("--output", type=str, default="", help="File path. Default: stdout")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        filters = ExportFilters(
+            start=_parse_date(options.get("start"), "--start"),
+            end=_parse_date(options.get("end"), "--end"),
+            branch_id=options.get("branch"),
+            status=(options.get("status") or "").strip() or None,
+        )
+        try:
+            dataset = get_dataset(options["dataset"], filters)
+            chunks = render(dataset, filters, options["fmt"], chunk_size=max(1, options["chunk_size"]))
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        path = (options.get("output") or "").strip()
+        if not path:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        written = 0
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                written += 1
+        self.stderr.write(self.style.SUCCESS(f"Wrote {written} line(s) to {path}"))
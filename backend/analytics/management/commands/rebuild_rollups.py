@@ -0,0 +1,45 @@
+"""
+Recompute the daily rollups (payments, orders, subscriptions, fines) behind the
+admin and manager dashboards.
+
+Rollups are normally kept current by signals on Payment / Order /
+CustomerSubscription / PaymentFine. Run this after bulk imports, raw SQL fixes
+or anything else that bypasses signals:
+    python manage.py rebuild_rollups
+    python manage.py rebuild_rollups --start 2026-01-01 --end 2026-01-31
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.services import rebuild_all_rollups
+from jobs.runs import record_run
+
+
+def _parse_date(raw, flag):
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise CommandError(f"Invalid {flag}. Use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Recompute daily rollups (dashboard analytics)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=str, default="", help="First day to rebuild (YYYY-MM-DD). Default: all")
+        parser.add_argument("--end", type=str, default="", help="Last day to rebuild (YYYY-MM-DD). Default: all")
+
+    def handle(self, *args, **options):
+        start = _parse_date(options.get("start"), "--start")
+        end = _parse_date(options.get("end"), "--end")
+
+        with record_run("rollups", trigger="command") as run:
+            written = rebuild_all_rollups(start=start, end=end)
+            run.add(updated=sum(written.values()))
+            run.details.update(written)
+        summary = ", ".join(f"{n} {name}" for name, n in written.items())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollup rows: {summary}"))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    from analytics.services import rebuild_order_rollups, rebuild_payment_rollups
+
+    rebuild_payment_rollups(apps=apps)
+    rebuild_order_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('locations', '0003_branch_affinity'),
+        ('orders', '0002_customersummary'),
+        ('payments', '0004_payment_branch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('order_type', models.CharField(max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('branch', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='locations.branch')),
+            ],
+            options={
+                'unique_together': {('day', 'branch', 'order_type', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('payment_type', models.CharField(max_length=10)),
+                ('payment_status', models.CharField(max_length=10)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('amount_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('branch', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='locations.branch')),
+            ],
+            options={
+                'unique_together': {('day', 'branch', 'payment_type', 'payment_status')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
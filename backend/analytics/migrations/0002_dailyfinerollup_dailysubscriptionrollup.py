@@ -0,0 +1,50 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    from analytics.services import rebuild_fine_rollups, rebuild_subscription_rollups
+
+    rebuild_subscription_rollups(apps=apps)
+    rebuild_fine_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('locations', '0003_branch_affinity'),
+        ('subscriptions', '0004_customersubscription_branch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFineRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('fine_count', models.IntegerField(default=0)),
+                ('fine_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('branch', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='locations.branch')),
+            ],
+            options={
+                'unique_together': {('day', 'branch')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySubscriptionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('started_count', models.IntegerField(default=0)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('branch', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='locations.branch')),
+            ],
+            options={
+                'unique_together': {('day', 'branch')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,169 @@
+from django.db import models
+from locations.models import Branch
+
+
+# Rollup rows reference branches without a DB constraint: they are history and
+# must survive (and be decremented during) branch cascades.
+
+class DailyPaymentRollup(models.Model):
+    """Payments bucketed by day (payment_date when paid, else due_date)."""
+    day = models.DateField()
+    branch = models.ForeignKey(
+        Branch, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    payment_type = models.CharField(max_length=10)
+    payment_status = models.CharField(max_length=10)
+    payment_count = models.IntegerField(default=0)
+    amount_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("day", "branch", "payment_type", "payment_status")
+
+    def __str__(self):
+        return f"{self.day} {self.branch_id} {self.payment_type}/{self.payment_status}"
+
+
+class DailyOrderRollup(models.Model):
+    """Orders bucketed by local creation day."""
+    day = models.DateField()
+    branch = models.ForeignKey(
+        Branch, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    order_type = models.CharField(max_length=10)
+    status = models.CharField(max_length=20)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("day", "branch", "order_type", "status")
+
+    def __str__(self):
+        return f"{self.day} {self.branch_id} {self.order_type}/{self.status}"
+
+
+class DailySubscriptionRollup(models.Model):
+    """Subscriptions started (start_date) and cancelled (end_date of inactive ones) per day."""
+    day = models.DateField()
+    branch = models.ForeignKey(
+        Branch, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    started_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("day", "branch")
+
+    def __str__(self):
+        return f"{self.day} {self.branch_id} +{self.started_count}/-{self.cancelled_count}"
+
+
+class DailyFineRollup(models.Model):
+    """Late-payment fines by the local day they were first raised (current amounts)."""
+    day = models.DateField()
+    branch = models.ForeignKey(
+        Branch, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    fine_count = models.IntegerField(default=0)
+    fine_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("day", "branch")
+
+    def __str__(self):
+        return f"{self.day} {self.branch_id} fines={self.fine_count}"
+
+
+# --- rollup maintenance -------------------------------------------------------
+# pre_save remembers the row as stored, post_save/post_delete move it between
+# buckets. Payment/Order are only ever written through save()/delete() in this
+# codebase; bulk writes must call rebuild_*_rollups afterwards.
+
+from django.db.models.signals import pre_save, post_save, post_delete  # noqa: E402
+from django.dispatch import receiver  # noqa: E402
+from orders.models import Order  # noqa: E402
+from payments.models import Payment, PaymentFine  # noqa: E402
+from subscriptions.models import CustomerSubscription  # noqa: E402
+
+
+def _stored_state(model, instance, fields):
+    if instance._state.adding or instance.pk is None:
+        return None
+    return model.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=Payment)
+def _remember_payment_bucket(sender, instance, **kwargs):
+    from .services import PAYMENT_ROLLUP_FIELDS
+    instance._rollup_before = _stored_state(Payment, instance, PAYMENT_ROLLUP_FIELDS)
+
+
+@receiver(post_save, sender=Payment)
+def _rollup_payment_save(sender, instance, update_fields=None, **kwargs):
+    from .services import PAYMENT_ROLLUP_FIELDS, apply_payment_change, merge_update_fields
+    before = getattr(instance, "_rollup_before", None)
+    apply_payment_change(before, merge_update_fields(before, instance, PAYMENT_ROLLUP_FIELDS, update_fields))
+    instance._rollup_before = None
+
+
+@receiver(post_delete, sender=Payment)
+def _rollup_payment_delete(sender, instance, **kwargs):
+    from .services import PAYMENT_ROLLUP_FIELDS, apply_payment_change, snapshot
+    apply_payment_change(snapshot(instance, PAYMENT_ROLLUP_FIELDS), None)
+
+
+@receiver(pre_save, sender=Order)
+def _remember_order_bucket(sender, instance, **kwargs):
+    from .services import ORDER_ROLLUP_FIELDS
+    instance._rollup_before = _stored_state(Order, instance, ORDER_ROLLUP_FIELDS)
+
+
+@receiver(post_save, sender=Order)
+def _rollup_order_save(sender, instance, update_fields=None, **kwargs):
+    from .services import ORDER_ROLLUP_FIELDS, apply_order_change, merge_update_fields
+    before = getattr(instance, "_rollup_before", None)
+    apply_order_change(before, merge_update_fields(before, instance, ORDER_ROLLUP_FIELDS, update_fields))
+    instance._rollup_before = None
+
+
+@receiver(post_delete, sender=Order)
+def _rollup_order_delete(sender, instance, **kwargs):
+    from .services import ORDER_ROLLUP_FIELDS, apply_order_change, snapshot
+    apply_order_change(snapshot(instance, ORDER_ROLLUP_FIELDS), None)
+
+
+@receiver(pre_save, sender=CustomerSubscription)
+def _remember_subscription_bucket(sender, instance, **kwargs):
+    from .services import SUBSCRIPTION_ROLLUP_FIELDS
+    instance._rollup_before = _stored_state(CustomerSubscription, instance, SUBSCRIPTION_ROLLUP_FIELDS)
+
+
+@receiver(post_save, sender=CustomerSubscription)
+def _rollup_subscription_save(sender, instance, update_fields=None, **kwargs):
+    from .services import SUBSCRIPTION_ROLLUP_FIELDS, apply_subscription_change, merge_update_fields
+    before = getattr(instance, "_rollup_before", None)
+    apply_subscription_change(before, merge_update_fields(before, instance, SUBSCRIPTION_ROLLUP_FIELDS, update_fields))
+    instance._rollup_before = None
+
+
+@receiver(post_delete, sender=CustomerSubscription)
+def _rollup_subscription_delete(sender, instance, **kwargs):
+    from .services import SUBSCRIPTION_ROLLUP_FIELDS, apply_subscription_change, snapshot
+    apply_subscription_change(snapshot(instance, SUBSCRIPTION_ROLLUP_FIELDS), None)
+
+
+@receiver(pre_save, sender=PaymentFine)
+def _remember_fine_bucket(sender, instance, **kwargs):
+    from .services import fine_state
+    instance._rollup_before = None if instance._state.adding else fine_state(pk=instance.pk)
+
+
+@receiver(post_save, sender=PaymentFine)
+def _rollup_fine_save(sender, instance, **kwargs):
+    from .services import apply_fine_change, fine_state
+    apply_fine_change(getattr(instance, "_rollup_before", None), fine_state(instance=instance))
+    instance._rollup_before = None
+
+
+@receiver(post_delete, sender=PaymentFine)
+def _rollup_fine_delete(sender, instance, **kwargs):
+    from .services import apply_fine_change, fine_state
+    apply_fine_change(fine_state(instance=instance), None)
@@ -0,0 +1,327 @@
+import csv
+import io
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from analytics.cache import reset_swr_stats, swr_cached, swr_stats
+from analytics.exports import DATASETS, ExportFilters, iter_rows
+from analytics.models import DailyOrderRollup, DailyPaymentRollup, DailySubscriptionRollup, DailyFineRollup
+from analytics.services import (
+    rebuild_all_rollups,
+    rebuild_order_rollups,
+    rebuild_payment_rollups,
+    revenue_total,
+)
+from analytics.views import timeseries_cache
+from branch_management.models import BranchManager
+from locations.models import City, Branch, ServiceZone, CustomerAddress
+from orders.models import Order
+from payments.models import Payment
+from payments.services import ensure_fine_for_payment
+from subscriptions.models import SubscriptionPlan, CustomerSubscription
+
+
+def _rollup_snapshot():
+    payments = sorted(
+        DailyPaymentRollup.objects.exclude(payment_count=0).values_list(
+            "day", "branch_id", "payment_type", "payment_status", "payment_count", "amount_total"
+        )
+    )
+    orders = sorted(
+        DailyOrderRollup.objects.exclude(order_count=0).values_list(
+            "day", "branch_id", "order_type", "status", "order_count"
+        )
+    )
+    subscriptions = sorted(
+        DailySubscriptionRollup.objects.exclude(started_count=0, cancelled_count=0).values_list(
+            "day", "branch_id", "started_count", "cancelled_count"
+        )
+    )
+    fines = sorted(
+        DailyFineRollup.objects.exclude(fine_count=0).values_list("day", "branch_id", "fine_count", "fine_total")
+    )
+    return payments, orders, subscriptions, fines
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()  # dashboard payloads are cached (swr_cached)
+        self.client = APIClient()
+        city = City.objects.create(name="RollupCity", state="RC")
+        self.branch = self._branch(city, "North", ["682001"])
+        self.other = self._branch(city, "South", ["690001"])
+        self.manager = User.objects.create_user(
+            email="mgr@example.com", password="pass12345", full_name="Manager", phone="9100000000",
+            role=User.Role.BRANCH_MANAGER, is_active=True, is_approved=True,
+        )
+        BranchManager.objects.create(user=self.manager, branch=self.branch)
+        self.customer = User.objects.create_user(
+            email="cust@example.com", password="pass12345", full_name="Customer", phone="9200000000",
+            role=User.Role.CUSTOMER, is_active=True, is_approved=True,
+        )
+        self.address = CustomerAddress.objects.create(
+            user=self.customer, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        self.today = timezone.localdate()
+
+    def _branch(self, city, name, pincodes):
+        branch = Branch.objects.create(
+            city=city, branch_name=name, address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        ServiceZone.objects.create(branch=branch, zone_name=f"{name} zone", pincodes=pincodes)
+        return branch
+
+    def _order(self, branch, **kwargs):
+        return Order.objects.create(
+            user=self.customer, branch=branch, address=self.address, order_type=kwargs.pop("order_type", "demand"),
+            pickup_shift="morning", pickup_date=self.today, **kwargs,
+        )
+
+    def test_signals_track_payment_lifecycle_and_match_rebuild(self):
+        order = self._order(self.branch)
+        other_order = self._order(self.other, status="delivered")
+        pay = Payment.objects.create(
+            user=self.customer, order=order, amount=Decimal("120.00"), payment_type="demand",
+            payment_status="pending", due_date=self.today + timedelta(days=2),
+        )
+        self.assertEqual(pay.branch_id, self.branch.id)
+        Payment.objects.create(
+            user=self.customer, order=other_order, amount=Decimal("80.00"), payment_type="demand",
+            payment_status="paid", payment_date=self.today, due_date=self.today,
+        )
+
+        # amount change stays in its bucket, status change moves it
+        pay.amount = Decimal("150.00")
+        pay.save(update_fields=["amount"])
+        pay.payment_status = "paid"
+        pay.payment_date = self.today
+        pay.save(update_fields=["payment_status", "payment_date"])
+        order.status = "delivered"
+        order.save(update_fields=["status"])
+        other_order.delete()
+
+        self.assertEqual(revenue_total(), Decimal("150.00"))
+        self.assertEqual(revenue_total(branch_id=self.branch.id), Decimal("150.00"))
+        self.assertEqual(revenue_total(branch_id=self.other.id), Decimal("0"))
+
+        incremental = _rollup_snapshot()
+        rebuild_payment_rollups()
+        rebuild_order_rollups()
+        self.assertEqual(_rollup_snapshot(), incremental)
+
+    def test_manager_overview_counts_monthly_revenue_for_branch(self):
+        self._order(self.branch)
+        sub = CustomerSubscription.objects.create(
+            user=self.customer, plan=self.plan, preferred_pickup_shift="morning",
+            start_date=self.today, end_date=self.today + timedelta(days=30),
+        )
+        Payment.objects.create(
+            user=self.customer, subscription=sub, amount=Decimal("199.00"), payment_type="monthly",
+            payment_status="paid", payment_date=self.today, due_date=self.today,
+        )
+
+        self.client.force_authenticate(user=self.manager)
+        res = self.client.get("/api/manager/overview/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["revenue"], 199.0)
+        self.assertEqual(res.data["ordersTotal"], 1)
+
+        res = self.client.get("/api/admin/analytics/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["monthlyRevenue"], 199.0)
+        self.assertEqual(res.data["totalOrders"], 1)
+
+    def test_timeseries_buckets_filters_and_cache(self):
+        timeseries_cache.clear()
+        monday = self.today - timedelta(days=self.today.weekday())
+        last_week = monday - timedelta(days=7)
+        south_order = self._order(self.other)
+        north_order = self._order(self.branch)  # latest order -> subscription branch
+        for order, amount, paid_on in (
+            (north_order, "100.00", last_week),
+            (north_order, "40.00", monday),
+            (south_order, "7.00", monday),
+        ):
+            Payment.objects.create(
+                user=self.customer, order=order, amount=Decimal(amount), payment_type="demand",
+                payment_status="paid", payment_date=paid_on, due_date=paid_on,
+            )
+        sub = CustomerSubscription.objects.create(
+            user=self.customer, plan=self.plan, preferred_pickup_shift="morning",
+            start_date=last_week, end_date=last_week + timedelta(days=30),
+        )
+        self.assertEqual(sub.branch_id, self.branch.id)
+        sub.is_active = False
+        sub.end_date = monday
+        sub.save(update_fields=["is_active", "end_date"])
+        overdue = Payment.objects.create(
+            user=self.customer, order=north_order, amount=Decimal("50.00"), payment_type="demand",
+            payment_status="pending", due_date=self.today - timedelta(days=3),
+        )
+        ensure_fine_for_payment(overdue, today=self.today)
+        ensure_fine_for_payment(overdue, today=self.today + timedelta(days=1))  # amount grows in place
+
+        url = "/api/admin/analytics/timeseries/"
+        params = {"start": last_week.isoformat(), "end": self.today.isoformat(), "granularity": "week",
+                  "branch_id": self.branch.id}
+        for user in (None, self.customer, self.manager):
+            self.client.force_authenticate(user=user)
+            self.assertEqual(self.client.get(url, params).status_code, 403)
+            self.assertEqual(self.client.get("/api/admin/analytics/cache-stats/").status_code, 403)
+        self.client.force_authenticate(user=User.objects.create(
+            email="root@example.com", phone="9400000000", role=User.Role.SUPER_ADMIN,
+        ))
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([row["period"] for row in res.data["series"]], [last_week.isoformat(), monday.isoformat()])
+        first, second = res.data["series"]
+        self.assertEqual((first["revenue"], second["revenue"]), (100.0, 40.0))
+        self.assertEqual((first["newSubscriptions"], second["cancellations"]), (1, 1))
+        self.assertEqual(second["orders"]["byType"], {"demand": 1})
+        self.assertEqual(second["fines"], 1)
+        self.assertEqual(res.data["totals"]["fineAmount"], 40.0)
+
+        res = self.client.get(url, {**params, "branch_id": "", "city_id": self.branch.city_id, "metrics": "revenue"})
+        self.assertEqual(res.data["totals"], {"revenue": 147.0, "paidPayments": 3})
+
+        hits = timeseries_cache.hits
+        self.client.get(url, params)
+        self.assertEqual(timeseries_cache.hits, hits + 1)
+        self.assertEqual(self.client.get("/api/admin/analytics/cache-stats/").data["timeseries"]["hits"], hits + 1)
+        self.assertEqual(self.client.get(url, {"granularity": "year"}).status_code, 400)
+
+        incremental = _rollup_snapshot()
+        rebuild_all_rollups()
+        self.assertEqual(_rollup_snapshot(), incremental)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        city = City.objects.create(name="ExportCity", state="EC")
+        self.branch = Branch.objects.create(
+            city=city, branch_name="North", address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.customer = User.objects.create_user(
+            email="exp@example.com", password="pass12345", full_name="Export, Customer", phone="9300000000",
+            role=User.Role.CUSTOMER, is_active=True, is_approved=True,
+        )
+        self.admin = User.objects.create(email="exp-admin@example.com", phone="9300000001", role=User.Role.SUPER_ADMIN)
+        address = CustomerAddress.objects.create(
+            user=self.customer, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.today = timezone.localdate()
+        self.payments = []
+        for i in range(5):
+            order = Order.objects.create(
+                user=self.customer, branch=self.branch, address=address, order_type="demand",
+                pickup_shift="morning", pickup_date=self.today,
+            )
+            self.payments.append(Payment.objects.create(
+                user=self.customer, order=order, amount=Decimal("10.00") * (i + 1), payment_type="demand",
+                payment_status="paid" if i % 2 else "pending", due_date=self.today - timedelta(days=i),
+            ))
+        ensure_fine_for_payment(self.payments[4], today=self.today)
+
+    def test_keyset_chunks_cover_every_row_once(self):
+        ids = [row[0] for row in iter_rows(DATASETS["payments"], ExportFilters(), chunk_size=2)]
+        self.assertEqual(ids, [p.id for p in self.payments])
+
+    def test_exports_require_a_super_admin(self):
+        for user in (None, self.customer):
+            self.client.force_authenticate(user=user)
+            for url in ("/api/admin/exports/users.csv", "/api/admin/exports/orders.ndjson"):
+                self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_csv_and_ndjson_endpoints_stream_filtered_rows(self):
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.get("/api/admin/exports/payments.csv", {"status": "pending"})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        rows = list(csv.DictReader(io.StringIO(b"".join(res.streaming_content).decode())))
+        self.assertEqual([int(r["id"]) for r in rows], [self.payments[i].id for i in (0, 2, 4)])
+        self.assertEqual(rows[-1]["fine_amount"], "40.00")
+
+        res = self.client.get("/api/admin/exports/users.ndjson", {"branch_id": self.branch.id})
+        users = [json.loads(line) for line in b"".join(res.streaming_content).decode().splitlines()]
+        self.assertEqual([u["full_name"] for u in users], ["Export, Customer"])
+
+        self.assertEqual(self.client.get("/api/admin/exports/orders.csv", {"status": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/admin/exports/secrets.csv").status_code, 400)
+
+    def test_export_command_matches_endpoint(self):
+        out = io.StringIO()
+        call_command("export_data", "orders", "--format", "ndjson", "--chunk-size", "2", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])["branch_name"], "North")
+
+
+@override_settings(SWR_BACKGROUND_REFRESH=False)
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        reset_swr_stats()
+
+    def test_fresh_hit_then_stale_value_served_while_refreshing(self):
+        calls = []
+
+        @swr_cached("test-swr", ttl_s=60, stale_s=60)
+        def payload(n):
+            calls.append(n)
+            return {"n": n, "call": len(calls)}
+
+        self.assertEqual(payload(1), {"n": 1, "call": 1})
+        self.assertEqual(payload(1)["call"], 1)
+
+        with mock.patch("analytics.cache.time.time", return_value=time.time() + 90):
+            self.assertEqual(payload(1)["call"], 1)  # stale value, refresh runs (inline here)
+        self.assertEqual(payload(1)["call"], 2)
+
+        with mock.patch("analytics.cache.time.time", return_value=time.time() + 500):
+            self.assertEqual(payload(1)["call"], 3)  # past the stale window -> recompute
+
+        self.assertEqual(
+            swr_stats()["test-swr"],
+            {"misses": 2, "hits": 2, "stale_hits": 1, "refreshes": 1},
+        )
+
+    def test_concurrent_misses_collapse_into_one_computation(self):
+        calls = []
+
+        @swr_cached("test-flight", ttl_s=60, stale_s=60)
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow())) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [1] * 5)
+        stats = swr_stats()["test-flight"]
+        self.assertEqual(stats["misses"], 5)
+        self.assertEqual(stats["coalesced"], 4)
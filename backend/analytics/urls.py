@@ -0,0 +1,8 @@
+from django.urls import path, re_path
+from .views import AdminCacheStatsView, AdminExportView, AdminTimeseriesView
+
+urlpatterns = [
+    path('analytics/timeseries/', AdminTimeseriesView.as_view(), name='admin-analytics-timeseries'),
+    path('analytics/cache-stats/', AdminCacheStatsView.as_view(), name='admin-analytics-cache-stats'),
+    re_path(r'^exports/(?P<dataset>[a-z_]+)\.(?P<fmt>csv|ndjson)$', AdminExportView.as_view(), name='admin-export'),
+]
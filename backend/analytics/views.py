@@ -0,0 +1,160 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsSuperAdmin
+from core.db_router import ReplicaReadMixin, replica_reads
+
+from .cache import LRUCache, swr_stats
+from .exports import ExportError, ExportFilters, get_dataset, render
+from .services import GRANULARITIES, METRICS, iter_periods, timeseries
+
+
+MAX_PERIODS = 1000
+
+# Recent ranges are requested over and over by the dashboard; keep them per process.
+timeseries_cache = LRUCache(
+    maxsize=getattr(settings, "ANALYTICS_CACHE_SIZE", 128),
+    ttl_s=getattr(settings, "ANALYTICS_CACHE_TTL_S", 60),
+)
+
+
+class CsrfExemptSessionAuthentication(SessionAuthentication):
+    def enforce_csrf(self, request):
+        return
+
+
+def _parse_int(raw):
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    return int(raw)
+
+
+class AdminTimeseriesView(ReplicaReadMixin, APIView):
+    """GET /api/admin/analytics/timeseries/
+
+    Query params: start, end (YYYY-MM-DD, default last 30 days), granularity
+    (day|week|month), branch_id, city_id, metrics (comma list of
+    revenue,orders,subscriptions,fines; default all).
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication]
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request):
+        params = request.query_params
+        today = timezone.localdate()
+        try:
+            end = date.fromisoformat(params["end"]) if params.get("end") else today
+            start = date.fromisoformat(params["start"]) if params.get("start") else end - timedelta(days=29)
+        except ValueError:
+            return Response({"detail": "start/end must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"detail": "start must be on or before end"}, status=status.HTTP_400_BAD_REQUEST)
+
+        granularity = (params.get("granularity") or "day").strip().lower()
+        if granularity not in GRANULARITIES:
+            return Response(
+                {"detail": f"granularity must be one of {', '.join(GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        raw_metrics = params.get("metrics")
+        metrics = tuple(m.strip() for m in raw_metrics.split(",") if m.strip()) if raw_metrics else METRICS
+        unknown = sorted(set(metrics) - set(METRICS))
+        if unknown:
+            return Response({"detail": f"unknown metrics: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            branch_id = _parse_int(params.get("branch_id"))
+            city_id = _parse_int(params.get("city_id"))
+        except ValueError:
+            return Response({"detail": "branch_id/city_id must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if sum(1 for _ in iter_periods(start, end, granularity)) > MAX_PERIODS:
+            return Response(
+                {"detail": f"range too large for {granularity} granularity (max {MAX_PERIODS} periods)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        metrics = tuple(m for m in METRICS if m in metrics)
+        key = (start, end, granularity, branch_id, city_id, metrics)
+        data = timeseries_cache.get_or_set(
+            key,
+            lambda: timeseries(
+                start=start, end=end, granularity=granularity,
+                branch_id=branch_id, city_id=city_id, metrics=metrics,
+            ),
+        )
+        return Response(
+            {**data, "filters": {"branch_id": branch_id, "city_id": city_id}, "metrics": list(metrics)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class AdminCacheStatsView(APIView):
+    """Per-process hit/miss/refresh counters for the dashboard caches."""
+    authentication_classes = [CsrfExemptSessionAuthentication]
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request):
+        return Response(
+            {
+                "swr": swr_stats(),
+                "timeseries": {
+                    "hits": timeseries_cache.hits,
+                    "misses": timeseries_cache.misses,
+                    "size": len(timeseries_cache),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+EXPORT_CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _read_from_replica(chunks):
+    # the body is produced after the view returned, outside ReplicaReadMixin's scope
+    with replica_reads():
+        yield from chunks
+
+
+class AdminExportView(ReplicaReadMixin, APIView):
+    """GET /api/admin/exports/<dataset>.<csv|ndjson>
+
+    Streams every matching row. Query params: start, end (YYYY-MM-DD),
+    branch_id, status.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication]
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request, dataset=None, fmt=None):
+        params = request.query_params
+        try:
+            filters = ExportFilters(
+                start=date.fromisoformat(params["start"]) if params.get("start") else None,
+                end=date.fromisoformat(params["end"]) if params.get("end") else None,
+                branch_id=_parse_int(params.get("branch_id")),
+                status=(params.get("status") or "").strip() or None,
+            )
+            ds = get_dataset(dataset, filters)
+            chunks = render(ds, filters, fmt)
+        except ExportError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response(
+                {"detail": "start/end must be YYYY-MM-DD and branch_id an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(_read_from_replica(chunks), content_type=EXPORT_CONTENT_TYPES[fmt])
+        stamp = timezone.localdate().isoformat()
+        response["Content-Disposition"] = f'attachment; filename="{ds.name}-{stamp}.{fmt}"'
+        return response
@@ -2,10 +2,10 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum
 from locations.models import Branch, ServiceZone
 from orders.models import Order
-from payments.models import Payment
+from analytics.services import order_total, revenue_total
+from core.db_router import ReplicaReadMixin
 from .models import BranchManager, DeliveryStaff
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
@@ -30,7 +30,7 @@ class CsrfExemptSessionAuthentication(SessionAuthentication):
     def enforce_csrf(self, request):
         return
 
-class ManagerOverviewView(APIView):
+class ManagerOverviewView(ReplicaReadMixin, APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -39,12 +39,10 @@ class ManagerOverviewView(APIView):
         if not branch:
             return Response({"detail": "branch not found"}, status=status.HTTP_400_BAD_REQUEST)
 
-        revenue = Payment.objects.filter(
-            order__branch=branch,
-            payment_status="paid",
-        ).aggregate(total=Sum("amount"))["total"] or 0
+        # rollups attribute monthly payments to the branch too (Payment.branch)
+        revenue = revenue_total(branch_id=branch.id)
 
-        orders_total = Order.objects.filter(branch=branch).count()
+        orders_total = order_total(branch_id=branch.id)
         active_staff = DeliveryStaff.objects.filter(branch=branch).count()
 
         return Response(
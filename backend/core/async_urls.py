@@ -0,0 +1,15 @@
+"""Async (ASGI) read endpoints, mounted at /api/async/ with the same sub-paths
+as their sync counterparts under /api/."""
+from django.urls import path
+
+from orders.async_views import AsyncCustomerOrdersView, AsyncCustomerOverviewView, AsyncDeliveryOrdersView
+from payments.async_views import AsyncCustomerPaymentsView
+from subscriptions.async_views import AsyncCustomerPlansListView
+
+urlpatterns = [
+    path("delivery/orders/", AsyncDeliveryOrdersView.as_view()),
+    path("customer/overview/", AsyncCustomerOverviewView.as_view()),
+    path("customer/orders/", AsyncCustomerOrdersView.as_view()),
+    path("customer/payments/", AsyncCustomerPaymentsView.as_view()),
+    path("subscriptions/plans/", AsyncCustomerPlansListView.as_view()),
+]
@@ -0,0 +1,35 @@
+"""Base class for the async (ASGI) read endpoints.
+
+The hot customer/delivery reads have async twins (<app>/async_views.py) mounted
+under /api/async/ by core/async_urls.py. They return the same JSON as their
+DRF counterparts, but use Django's async ORM under an ASGI server
+(`uvicorn core.asgi:application`). The async ORM runs every query through
+sync_to_async(thread_sensitive=True), so a process's queries still execute one
+at a time on a single thread, asyncio.gather() included: what the event loop
+gains is serving the non-database parts of other requests meanwhile. Query
+throughput scales with worker processes, as under WSGI (bench_asgi measures
+both). Under WSGI the views still work (Django adapts them).
+
+Only session authentication is supported, like the DRF views they mirror.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views import View
+
+
+def json_response(data, status=200, **kwargs):
+    return JsonResponse(data, status=status, safe=False, encoder=DjangoJSONEncoder, **kwargs)
+
+
+class AsyncSessionView(View):
+    """Async GET-only view for logged-in users (DRF SessionAuthentication + IsAuthenticated)."""
+
+    http_method_names = ["get", "head", "options"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            # same status and body DRF returns for an anonymous session request
+            return json_response({"detail": "Authentication credentials were not provided."}, status=403)
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,163 @@
+"""Read-replica routing for dashboard, analytics and export reads.
+
+Reads go to the replica alias (settings.REPLICA_DATABASE_ALIAS, "replica") only
+inside an opted-in scope, and only if the alias is configured:
+
+    class AdminOverviewView(ReplicaReadMixin, APIView): ...   # GET/HEAD only
+
+    @replica_reads()                                          # any function / block
+    def _admin_overview_payload(): ...
+
+Everything else, and every write, stays on "default". So does Django's
+DatabaseCache table: cache lookups read the primary and cache writes (swr
+leases, stored payloads) do not count as writes of the scope.
+
+Read-your-writes:
+- Once anything is written in a scope (db_for_write was asked), later reads
+  in that scope go to the primary.
+- ReplicaStickinessMiddleware sets a short-lived cookie on responses to
+  requests that wrote; while it is present (REPLICA_STICKY_SECONDS) that
+  client's reads go to the primary. This covers replication lag right after
+  a save.
+
+Routing state lives in a ContextVar, so it follows the request through
+sync_to_async. Plain threads start without a scope.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+PIN_COOKIE = "db_pin"
+
+
+@dataclass
+class _RoutingState:
+    use_replica: bool = False
+    pinned: bool = False  # client wrote recently (pin cookie)
+    wrote: bool = False  # something was written in this scope
+
+
+_state: ContextVar[Optional[_RoutingState]] = ContextVar("db_routing_state", default=None)
+
+
+def replica_alias() -> Optional[str]:
+    """The configured replica alias, or None when reads have nowhere else to go."""
+    alias = getattr(settings, "REPLICA_DATABASE_ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+def sticky_seconds() -> int:
+    return int(getattr(settings, "REPLICA_STICKY_SECONDS", 10))
+
+
+@contextmanager
+def replica_reads():
+    """Send reads in this block (or decorated function) to the replica."""
+    state = _state.get()
+    created = state is None
+    if created:
+        state = _RoutingState()
+        _state.set(state)
+    previous = state.use_replica
+    state.use_replica = True
+    try:
+        yield state
+    finally:
+        state.use_replica = previous
+        if created:
+            _state.set(None)
+
+
+def _is_cache_table(model) -> bool:
+    # DatabaseCache routes its stand-in CacheEntry model through the routers
+    return model._meta.app_label == "django_cache"
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _is_cache_table(model):
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is None or not state.use_replica or state.pinned or state.wrote:
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and not _is_cache_table(model):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """For read-only DRF views: GET/HEAD requests read from the replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            with replica_reads():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+    """Opens a routing scope per request and pins recent writers to the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        state = _RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        return state, _state.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote:
+            # same attributes as the session cookie: the frontend calls the API cross-site,
+            # so a SameSite=Lax pin would never come back with its XHRs
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=sticky_seconds(), httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE, secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if replica_alias() is None:
+            return self.get_response(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        if replica_alias() is None:
+            return await self.get_response(request)
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
@@ -0,0 +1,13 @@
+"""Helpers shared by the request metrics (core/metrics.py) and perf's query capture."""
+from django.conf import settings
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def install_execute_wrapper(connection, fn) -> None:
+    """Run fn around every statement on connection (once, however often called)."""
+    # first, so execute_wrapper() blocks (which pop the last wrapper) stay balanced
+    if fn not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, fn)
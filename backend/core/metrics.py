@@ -0,0 +1,439 @@
+"""Per-request timing: Server-Timing header and Prometheus histograms at /metrics.
+
+RequestMetricsMiddleware (first in MIDDLEWARE) measures each sampled request:
+
+    total   wall time from the outermost middleware in and out
+    db      time in cursor.execute, and the number of statements (all aliases)
+    render  time rendering DRF/template responses, i.e. JSON serialization
+    app     the rest: view logic, permissions, other middleware
+
+and answers with `Server-Timing: total;dur=12.1, app;dur=4.0, db;dur=6.3;desc="7 queries", render;dur=1.8`
+(PERF_SERVER_TIMING), which browser devtools show per request.
+
+Requests are labelled with the URL pattern they resolved to, as written in
+core/urls.py plus the app urls.py ("api/admin/branches/<int:pk>/"), so ids do
+not explode the number of series; unresolved paths are "unmatched". Sampling
+follows the same patterns: PERF_METRICS_ROUTE_SAMPLE_RATES maps route prefixes
+("api/admin/", "api/customer/orders/") to a rate, the longest matching prefix
+wins, PERF_METRICS_SAMPLE_RATE covers the rest. washmate_http_requests_total
+counts every request; the histograms and the header only sampled ones.
+
+Histograms live in this process. Under gunicorn every worker has its own, so
+with PERF_METRICS_DIR set each worker also writes a snapshot to
+<dir>/<worker>.json (at most every PERF_METRICS_FLUSH_S seconds while serving,
+and at exit), and /metrics sums the snapshots of all workers in the directory,
+whichever worker answers the scrape. Empty the directory when the service
+(re)starts, as with prometheus_client's multiprocess mode. Without it
+/metrics shows the answering worker only. /metrics also carries the job
+ledger's staleness gauges (jobs/runs.py), read from the database at most every
+METRICS_JOB_LAG_TTL_S seconds per process.
+
+/metrics is only served to scrapers sending METRICS_TOKEN as a bearer token or
+connecting from METRICS_ALLOWED_IPS; with neither configured it answers 404.
+
+DB statements are counted by an execute wrapper installed on every connection
+(connection_created); it does nothing outside a sampled request. Query and
+render tallies live in a ContextVar, so async views and sync_to_async work.
+"""
+from __future__ import annotations
+
+import atexit
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+from .instrumentation import install_execute_wrapper, setting
+
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "washmate_http_"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    "request_duration_seconds": ("Request wall time, outermost middleware in to out", DURATION_BUCKETS),
+    "app_duration_seconds": ("Request time outside the database and response rendering (view logic)", DURATION_BUCKETS),
+    "db_duration_seconds": ("Time in cursor.execute per request", DURATION_BUCKETS),
+    "render_duration_seconds": ("Time rendering (serializing) the response", DURATION_BUCKETS),
+    "db_queries": ("SQL statements per request", QUERY_BUCKETS),
+}
+
+UNMATCHED = "unmatched"
+
+
+# --- per-request tallies -----------------------------------------------------
+
+
+@dataclass
+class _RequestStats:
+    queries: int = 0
+    db_s: float = 0.0
+    render_s: float = 0.0
+
+
+_current: ContextVar[Optional[_RequestStats]] = ContextVar("request_metrics", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_s += time.perf_counter() - started
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install_execute_wrapper(connection, _record_query)
+
+
+connection_created.connect(_on_connection_created, dispatch_uid="core.metrics.instrument")
+
+
+# --- registry ----------------------------------------------------------------
+
+
+class MetricsRegistry:
+    """Thread-safe histograms per (route, method) and request counts per status.
+
+    A histogram series is [count per bucket..., count above the last, sum].
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, list]] = {name: {} for name in HISTOGRAMS}
+        self._requests: Counter = Counter()
+
+    def count(self, route: str, method: str, status: int) -> None:
+        with self._lock:
+            self._requests[f"{route}\t{method}\t{status}"] += 1
+
+    def observe(self, route: str, method: str, values: Dict[str, float]) -> None:
+        key = f"{route}\t{method}"
+        with self._lock:
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                series = self._histograms[name].get(key)
+                if series is None:
+                    series = self._histograms[name][key] = [0] * (len(buckets) + 1) + [0.0]
+                series[bisect_left(buckets, value)] += 1
+                series[-1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": {
+                    name: {key: list(series) for key, series in by_key.items()}
+                    for name, by_key in self._histograms.items()
+                },
+                "requests": dict(self._requests),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            for by_key in self._histograms.values():
+                by_key.clear()
+            self._requests.clear()
+
+
+registry = MetricsRegistry()
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    merged = {"histograms": {name: {} for name in HISTOGRAMS}, "requests": Counter()}
+    for snap in snapshots:
+        for name, by_key in snap.get("histograms", {}).items():
+            target = merged["histograms"].get(name)
+            if target is None:
+                continue  # histogram no longer exported
+            for key, series in by_key.items():
+                if key not in target:
+                    target[key] = list(series)
+                elif len(target[key]) == len(series):
+                    target[key] = [a + b for a, b in zip(target[key], series)]
+        merged["requests"].update(snap.get("requests", {}))
+    merged["requests"] = dict(merged["requests"])
+    return merged
+
+
+# --- per-worker snapshots ----------------------------------------------------
+
+_worker = {"pid": None, "id": None, "flushed": 0.0}
+_worker_lock = threading.Lock()
+
+
+def _worker_id() -> str:
+    # recomputed after fork (gunicorn --preload imports this module in the master)
+    if _worker["pid"] != os.getpid():
+        _worker.update(pid=os.getpid(), id=f"{os.getpid()}-{uuid.uuid4().hex[:8]}", flushed=0.0)
+    return _worker["id"]
+
+
+def write_worker_snapshot(*, force: bool = False) -> None:
+    """Write this worker's snapshot to PERF_METRICS_DIR (throttled unless force)."""
+    directory = setting("PERF_METRICS_DIR", "")
+    if not directory:
+        return
+    with _worker_lock:
+        worker = _worker_id()
+        now = time.monotonic()
+        if not force and now - _worker["flushed"] < setting("PERF_METRICS_FLUSH_S", 5):
+            return
+        _worker["flushed"] = now
+        path = Path(directory) / f"{worker}.json"
+        tmp = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(registry.snapshot()), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Could not write request metrics to %s", path, exc_info=True)
+
+
+atexit.register(lambda: write_worker_snapshot(force=True))
+
+
+def collect() -> tuple:
+    """(merged snapshot, number of workers in it)."""
+    directory = setting("PERF_METRICS_DIR", "")
+    if not directory:
+        return merge_snapshots([registry.snapshot()]), 1
+    write_worker_snapshot(force=True)
+    snapshots = []
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable request metrics file %s", path)
+    return merge_snapshots(snapshots), len(snapshots)
+
+
+# --- Prometheus text format --------------------------------------------------
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot: dict, *, workers: int = 1) -> str:
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        series_by_key = snapshot["histograms"].get(name, {})
+        metric = PREFIX + name
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for key in sorted(series_by_key):
+            route, method = key.split("\t")
+            series = series_by_key[key]
+            cumulative = 0
+            for bound, n in zip(buckets + ("+Inf",), series[:-1]):
+                cumulative += n
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{metric}_bucket{_labels(route=route, method=method, le=le)} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(route=route, method=method)} {_number(float(series[-1]))}")
+            lines.append(f"{metric}_count{_labels(route=route, method=method)} {cumulative}")
+
+    metric = PREFIX + "requests_total"
+    lines += [f"# HELP {metric} Requests by route, method and status (sampled or not)", f"# TYPE {metric} counter"]
+    for key in sorted(snapshot["requests"]):
+        route, method, status = key.split("\t")
+        lines.append(f"{metric}{_labels(route=route, method=method, status=status)} {snapshot['requests'][key]}")
+
+    metric = PREFIX + "metrics_workers"
+    lines += [f"# HELP {metric} Worker processes summed into this scrape", f"# TYPE {metric} gauge", f"{metric} {workers}"]
+    return "\n".join(lines) + "\n"
+
+
+def address_allowed(address: str, allowed: Iterable[str]) -> bool:
+    """Whether an IP is one of the allowed addresses or networks ("10.0.0.0/8")."""
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    for entry in allowed:
+        try:
+            if ip in ipaddress.ip_network(entry, strict=False):
+                return True
+        except ValueError:
+            logger.warning("Ignoring invalid METRICS_ALLOWED_IPS entry %r", entry)
+    return False
+
+
+# lines -> the job gauges, at -> time.monotonic() they were read; per process
+_job_gauges: dict = {}
+_job_gauges_lock = threading.Lock()
+
+
+def job_gauge_lines() -> list:
+    """jobs/runs.py's staleness gauges, cached for METRICS_JOB_LAG_TTL_S (job_lag runs queries per job)."""
+    with _job_gauges_lock:
+        if _job_gauges and time.monotonic() - _job_gauges["at"] < setting("METRICS_JOB_LAG_TTL_S", 30):
+            return _job_gauges["lines"]
+    from jobs.runs import job_lag, prometheus_lines
+
+    lines = prometheus_lines(job_lag())
+    with _job_gauges_lock:
+        _job_gauges.update(lines=lines, at=time.monotonic())
+    return lines
+
+
+def metrics_view(request):
+    """GET /metrics for `Authorization: Bearer <METRICS_TOKEN>` or a METRICS_ALLOWED_IPS address.
+
+    Anyone else gets 401 when a token is configured and 404 otherwise, so an
+    unconfigured deployment does not publish its routes and traffic.
+    """
+    token = setting("METRICS_TOKEN", "")
+    authorized = bool(token) and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not authorized and not address_allowed(request.META.get("REMOTE_ADDR", ""), setting("METRICS_ALLOWED_IPS", ())):
+        if token:
+            return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+        return HttpResponse("Not Found\n", status=404, content_type="text/plain")
+    snapshot, workers = collect()
+    body = render_prometheus(snapshot, workers=workers)
+    try:
+        body += "\n".join(job_gauge_lines()) + "\n"
+    except DatabaseError:
+        logger.warning("Could not read the job run ledger for /metrics", exc_info=True)
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# --- middleware --------------------------------------------------------------
+
+
+def sample_rate(path: str) -> float:
+    """Rate for a request path; prefixes are route strings as in core/urls.py ("api/admin/")."""
+    path = path.lstrip("/")
+    rates = setting("PERF_METRICS_ROUTE_SAMPLE_RATES", {})
+    matches = [prefix for prefix in rates if path.startswith(prefix.lstrip("/"))]
+    if matches:
+        return rates[max(matches, key=len)]
+    return setting("PERF_METRICS_SAMPLE_RATE", 1.0)
+
+
+def route_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return match.route if match is not None and match.route else UNMATCHED
+
+
+def server_timing(total_s: float, app_s: float, stats: _RequestStats) -> str:
+    return (
+        f"total;dur={total_s * 1000:.1f}, app;dur={app_s * 1000:.1f}, "
+        f'db;dur={stats.db_s * 1000:.1f};desc="{stats.queries} queries", render;dur={stats.render_s * 1000:.1f}'
+    )
+
+
+class RequestMetricsMiddleware:
+    """Times requests (see module docstring); goes first in MIDDLEWARE."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not setting("PERF_METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django would otherwise run the sync hook through sync_to_async
+            self.process_template_response = self._aprocess_template_response
+
+    def _start(self, request):
+        rate = sample_rate(request.path_info)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None, None
+        for connection in connections.all(initialized_only=True):
+            install_execute_wrapper(connection, _record_query)  # opened before this module was imported
+        stats = _RequestStats()
+        return stats, _current.set(stats)
+
+    def _finish(self, request, response, stats, started):
+        total_s = time.perf_counter() - started
+        route = route_label(request)
+        registry.count(route, request.method, response.status_code)
+        if stats is None:
+            return response
+        app_s = max(0.0, total_s - stats.db_s - stats.render_s)
+        registry.observe(route, request.method, {
+            "request_duration_seconds": total_s,
+            "app_duration_seconds": app_s,
+            "db_duration_seconds": stats.db_s,
+            "render_duration_seconds": stats.render_s,
+            "db_queries": stats.queries,
+        })
+        if setting("PERF_SERVER_TIMING", True):
+            response["Server-Timing"] = server_timing(total_s, app_s, stats)
+        write_worker_snapshot()
+        return response
+
+    @staticmethod
+    def _watch_render(response):
+        # DRF Responses render (serialize) right after process_template_response
+        stats = _current.get()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.render_s += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def process_template_response(self, request, response):
+        return self._watch_render(response)
+
+    async def _aprocess_template_response(self, request, response):
+        return self._watch_render(response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        stats, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        return self._finish(request, response, stats, started)
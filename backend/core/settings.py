@@ -68,17 +68,24 @@ INSTALLED_APPS = [
     'subscriptions',
     'orders.apps.OrdersConfig',  # CHANGED: ensure OrdersConfig.ready() runs
     'payments.apps.PaymentsConfig',  # CHANGED: ensure PaymentsConfig.ready() runs
+    'analytics',
+    'jobs',
+    'perf',
 ]
 
 AUTH_USER_MODEL = 'accounts.User'
 
 MIDDLEWARE = [
+    'core.metrics.RequestMetricsMiddleware',  # NEW: first, so its timing covers all middleware
+    'perf.slowqueries.SlowQueryMiddleware',  # NEW: names the request as origin of its slow queries
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db_router.ReplicaStickinessMiddleware',  # NEW: before sessions, so session writes count
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'perf.profiling.ProfilingMiddleware',  # NEW: after auth, it checks for a super admin
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -128,6 +135,30 @@ DATABASES = {
     }
 }
 
+# NEW: optional read replica for dashboards/analytics/exports (see core/db_router.py).
+# Unset fields fall back to the primary's; tests read the primary through it.
+if os.environ.get('MYSQL_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('MYSQL_REPLICA_HOST'),
+        'PORT': os.environ.get('MYSQL_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('MYSQL_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('MYSQL_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# NEW: local stand-in for primary + replica: two SQLite files
+# (e.g. SQLITE_PATH=db.sqlite3 SQLITE_REPLICA_PATH=replica.sqlite3, copy one to the other)
+if os.environ.get('SQLITE_PATH'):
+    DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.environ['SQLITE_PATH']}}
+    if os.environ.get('SQLITE_REPLICA_PATH'):
+        DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.environ['SQLITE_REPLICA_PATH']}
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+# how long a client that just wrote keeps reading from the primary
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -174,6 +205,9 @@ CORS_ALLOWED_ORIGINS = [
 # Allow cookies to be sent with cross-origin requests
 CORS_ALLOW_CREDENTIALS = True
 
+# Let the frontend read paging cursors (e.g. customer payments)
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor"]
+
 # IMPORTANT: For development, use Lax instead of None to avoid issues
 # None requires HTTPS in modern browsers
 SESSION_COOKIE_SAMESITE = "None"
@@ -213,3 +247,64 @@ ENABLE_DAILY_MONTHLY_ORDER_JOB = os.getenv("ENABLE_DAILY_MONTHLY_ORDER_JOB", "Tr
 ENABLE_FINE_STARTUP_CATCHUP = os.getenv("ENABLE_FINE_STARTUP_CATCHUP", "True") == "True"
 ENABLE_DAILY_FINE_JOB = os.getenv("ENABLE_DAILY_FINE_JOB", "True") == "True"
 
+# NEW: periodic jobs run in `manage.py run_scheduler` and queued jobs in `manage.py run_workers`
+# (both next to the web server, see README 14.3). Set True only for a single-process setup
+# without them: each web process then starts the job threads (the ENABLE_* flags above only
+# apply when this is True) and drains the job queue in one thread.
+RUN_JOBS_IN_WEB_WORKERS = os.getenv("RUN_JOBS_IN_WEB_WORKERS", "False") == "True"
+# cron overrides for run_scheduler jobs, e.g. {"fines": "5 0 * * *"}
+SCHEDULER_SCHEDULES = {}
+# NEW: /health/jobs/ reports a scheduled job stale this long after a slot without a successful run
+JOB_LAG_GRACE_S = int(os.getenv("JOB_LAG_GRACE_S", "3600"))
+# the scheduler's prune_job_runs deletes JobRun rows older than this (each job's latest run stays)
+JOB_RUN_KEEP_DAYS = int(os.getenv("JOB_RUN_KEEP_DAYS", "90"))
+
+
+# NEW: per-request timing, Server-Timing header and /metrics (see core/metrics.py)
+PERF_METRICS_ENABLED = os.getenv("PERF_METRICS_ENABLED", "True") == "True"
+PERF_METRICS_SAMPLE_RATE = float(os.getenv("PERF_METRICS_SAMPLE_RATE", "1.0"))
+# route prefix (as in core/urls.py) -> sample rate, e.g. {"api/admin/": 1.0, "api/customer/": 0.1}
+PERF_METRICS_ROUTE_SAMPLE_RATES = {}
+PERF_SERVER_TIMING = os.getenv("PERF_SERVER_TIMING", "True") == "True"
+# directory shared by the workers of one host; unset = /metrics shows the answering worker only
+PERF_METRICS_DIR = os.getenv("PERF_METRICS_DIR", "")
+PERF_METRICS_FLUSH_S = float(os.getenv("PERF_METRICS_FLUSH_S", "5"))
+# /metrics answers scrapers sending "Authorization: Bearer <METRICS_TOKEN>" or connecting from
+# METRICS_ALLOWED_IPS (comma list of addresses/networks, e.g. "10.0.0.0/8", matched against
+# REMOTE_ADDR: behind a proxy that is the proxy); with neither set it answers 404
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [a.strip() for a in os.getenv("METRICS_ALLOWED_IPS", "").split(",") if a.strip()]
+# the job staleness gauges on /metrics are re-read from the ledger at most this often
+METRICS_JOB_LAG_TTL_S = float(os.getenv("METRICS_JOB_LAG_TTL_S", "30"))
+
+# NEW: on-demand request profiling via X-Profile headers (see perf/profiling.py)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "True") == "True"
+PROFILE_TOKEN_MAX_AGE_S = int(os.getenv("PROFILE_TOKEN_MAX_AGE_S", "3600"))
+PROFILE_SAMPLE_INTERVAL_S = float(os.getenv("PROFILE_SAMPLE_INTERVAL_S", "0.005"))
+PROFILE_MAX_QUERIES = 500
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+# NEW: slow-query capture with EXPLAIN, by SQL fingerprint (see perf/slowqueries.py)
+SLOW_QUERY_ENABLED = os.getenv("SLOW_QUERY_ENABLED", "True") == "True"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "True") == "True"
+# re-EXPLAIN a fingerprint at most this often (plans change as tables grow)
+SLOW_QUERY_EXPLAIN_EVERY_S = int(os.getenv("SLOW_QUERY_EXPLAIN_EVERY_S", "86400"))
+SLOW_QUERY_STACK_DEPTH = 8
+
+# NEW: admin dashboard aggregates (stale-while-revalidate, see analytics/cache.py)
+DASHBOARD_CACHE_TTL_S = int(os.getenv("DASHBOARD_CACHE_TTL_S", "30"))
+DASHBOARD_CACHE_STALE_S = int(os.getenv("DASHBOARD_CACHE_STALE_S", "300"))
+SWR_CACHE_ALIAS = "default"
+SWR_BACKGROUND_REFRESH = True
+
+# Shared cache so gunicorn workers coalesce dashboard refreshes. Set
+# DJANGO_CACHE_TABLE and run `python manage.py createcachetable`; unset keeps
+# Django's per-process local-memory cache.
+if os.getenv("DJANGO_CACHE_TABLE"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": os.getenv("DJANGO_CACHE_TABLE"),
+        }
+    }
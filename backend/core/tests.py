@@ -0,0 +1,200 @@
+import json
+import tempfile
+import unittest
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from analytics.models import DailyPaymentRollup
+from analytics.views import timeseries_cache
+from core import metrics
+from core.db_router import PIN_COOKIE, ReplicaRouter, ReplicaStickinessMiddleware, _state, replica_reads
+from orders.models import Order
+
+
+@mock.patch("core.db_router.replica_alias", return_value="replica")
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_replica_only_inside_scope_and_before_writes(self, _alias):
+        self.assertIsNone(self.router.db_for_read(Order))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Order), "replica")
+            self.assertEqual(self.router.db_for_write(Order), "default")
+            self.assertIsNone(self.router.db_for_read(Order))  # read-your-writes within the scope
+        self.assertIsNone(_state.get())
+
+    def test_database_cache_stays_on_primary_and_is_not_a_write(self, _alias):
+        entry = DatabaseCache("cache_table", {}).cache_model_class
+        with replica_reads() as state:
+            self.assertEqual(self.router.db_for_write(entry), "default")
+            self.assertEqual(self.router.db_for_read(entry), "default")
+            self.assertFalse(state.wrote)
+            self.assertEqual(self.router.db_for_read(Order), "replica")
+
+    def test_unconfigured_replica_means_primary(self, _alias):
+        _alias.return_value = None
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(Order))
+
+    def test_middleware_pins_recent_writers(self, _alias):
+        seen = []
+
+        def writes(request):
+            self.router.db_for_write(Order)
+            return HttpResponse()
+
+        def reads(request):
+            with replica_reads():
+                seen.append(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        factory = RequestFactory()
+        response = ReplicaStickinessMiddleware(writes)(factory.post("/"))
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_STICKY_SECONDS)
+        # sent back on the frontend's cross-site requests, like the session cookie
+        self.assertEqual((cookie["samesite"], cookie["secure"]), ("None", True))
+        with override_settings(SESSION_COOKIE_SAMESITE="Lax", SESSION_COOKIE_SECURE=False):
+            cookie = ReplicaStickinessMiddleware(writes)(factory.post("/")).cookies[PIN_COOKIE]
+        self.assertEqual((cookie["samesite"], cookie["secure"]), ("Lax", ""))
+
+        response = ReplicaStickinessMiddleware(reads)(factory.get("/"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        pinned = factory.get("/")
+        pinned.COOKIES[PIN_COOKIE] = "1"
+        ReplicaStickinessMiddleware(reads)(pinned)
+        self.assertEqual(seen, ["replica", None])
+
+
+@unittest.skipUnless(
+    "replica" in settings.DATABASES,
+    "needs a replica alias, e.g. SQLITE_PATH=a.sqlite3 SQLITE_REPLICA_PATH=b.sqlite3 manage.py test core",
+)
+class ReplicaRoutingIntegrationTests(TestCase):
+    """Two separate databases: a row that only exists on the replica shows which one was read."""
+
+    databases = {"default", "replica"} & set(settings.DATABASES)  # the runner collects these even when skipped
+
+    def setUp(self):
+        timeseries_cache.clear()
+        DailyPaymentRollup.objects.using("replica").create(
+            day=timezone.localdate(), branch=None, payment_type="demand", payment_status="paid",
+            payment_count=1, amount_total=Decimal("25.00"),
+        )
+        self.url = "/api/admin/analytics/timeseries/"
+
+    def test_dashboard_reads_replica_unless_client_wrote_recently(self):
+        client = APIClient()
+        # not force_login: the session and user would be read from the replica, which lacks them
+        client.force_authenticate(user=User(id=1, email="root@example.com", role=User.Role.SUPER_ADMIN))
+        res = client.get(self.url, {"metrics": "revenue"})
+        self.assertEqual(res.data["totals"]["revenue"], 25.0)
+
+        timeseries_cache.clear()
+        client.cookies[PIN_COOKIE] = "1"
+        res = client.get(self.url, {"metrics": "revenue"})
+        self.assertEqual(res.data["totals"]["revenue"], 0.0)
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "test_swr_cache",
+    }})
+    def test_swr_with_database_cache_still_reads_replica(self):
+        for alias in self.databases:
+            call_command("createcachetable", database=alias, verbosity=0)
+        # a miss takes the swr lease (cache.add) before computing the payload
+        res = APIClient().get("/api/admin/overview/")
+        self.assertEqual(res.data["weeklyRevenue"], 25.0)
+        self.assertNotIn(PIN_COOKIE, res.cookies)
+
+
+@override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])  # the test client's REMOTE_ADDR
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        metrics._job_gauges.clear()
+        self.client = APIClient()
+        self.client.force_login(User.objects.create(email="metrics@example.com", role=User.Role.CUSTOMER))
+
+    def test_server_timing_and_histograms_labelled_by_route(self):
+        response = self.client.get("/api/subscriptions/plans/")
+        self.assertEqual(response.status_code, 200)
+        timing = dict(
+            part.strip().split(";", 1) for part in response["Server-Timing"].split(",")
+        )
+        self.assertEqual(set(timing), {"total", "app", "db", "render"})
+        self.assertNotIn('desc="0 queries"', timing["db"])  # session + user + plans
+
+        self.client.get("/api/admin/plans/7/")  # GET not allowed, still labelled by pattern
+        self.client.get("/no/such/path/")
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn(
+            'washmate_http_request_duration_seconds_count{route="api/subscriptions/plans/",method="GET"} 1', body
+        )
+        self.assertIn('washmate_http_requests_total{route="api/admin/plans/<int:pk>/",method="GET",status="405"} 1', body)
+        self.assertIn('washmate_http_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn('washmate_http_db_queries_bucket{route="api/subscriptions/plans/",method="GET",le="+Inf"} 1', body)
+        self.assertIn("washmate_http_metrics_workers 1", body)
+
+    @override_settings(PERF_METRICS_ROUTE_SAMPLE_RATES={"api/": 0.0, "api/subscriptions/plans/": 1.0})
+    def test_sampling_by_route_prefix(self):
+        self.assertEqual(metrics.sample_rate("/api/customer/orders/"), 0.0)
+        self.assertIn("Server-Timing", self.client.get("/api/subscriptions/plans/"))
+        response = self.client.get("/api/subscriptions/me/")
+        self.assertNotIn("Server-Timing", response)
+
+        snapshot = metrics.registry.snapshot()
+        self.assertEqual(list(snapshot["histograms"]["request_duration_seconds"]), ["api/subscriptions/plans/\tGET"])
+        self.assertEqual(snapshot["requests"][f"api/subscriptions/me/\tGET\t{response.status_code}"], 1)
+
+    @override_settings(METRICS_TOKEN="s3cret", METRICS_ALLOWED_IPS=["10.0.0.0/8"])
+    def test_metrics_token_or_allowed_address(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.1.2.3").status_code, 200)
+
+    @override_settings(METRICS_TOKEN="", METRICS_ALLOWED_IPS=[])
+    def test_metrics_are_not_served_unless_configured(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        self.assertFalse(metrics.address_allowed("not-an-ip", ["0.0.0.0/0"]))
+
+    def test_job_gauges_are_cached_between_scrapes(self):
+        self.client.get("/metrics")
+        with self.assertNumQueries(0):
+            body = self.client.get("/metrics").content.decode()
+        self.assertIn("washmate_job_stale", body)
+        with self.settings(METRICS_JOB_LAG_TTL_S=0), CaptureQueriesContext(connection) as ctx:
+            self.client.get("/metrics")
+        self.assertTrue(any("jobs_jobrun" in q["sql"] for q in ctx.captured_queries))
+
+    def test_workers_are_summed_from_the_metrics_dir(self):
+        self.client.get("/api/subscriptions/plans/")
+        with tempfile.TemporaryDirectory() as directory, override_settings(PERF_METRICS_DIR=directory):
+            other = metrics.MetricsRegistry()
+            other.observe("api/subscriptions/plans/", "GET", {"request_duration_seconds": 0.2})
+            other.count("api/subscriptions/plans/", "GET", 200)
+            Path(directory, "other-worker.json").write_text(json.dumps(other.snapshot()))
+
+            body = self.client.get("/metrics").content.decode()
+            self.assertEqual(len(list(Path(directory).glob("*.json"))), 2)
+
+        self.assertIn("washmate_http_metrics_workers 2", body)
+        self.assertIn(
+            'washmate_http_requests_total{route="api/subscriptions/plans/",method="GET",status="200"} 2', body
+        )
+        self.assertIn(
+            'washmate_http_request_duration_seconds_count{route="api/subscriptions/plans/",method="GET"} 2', body
+        )
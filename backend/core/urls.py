@@ -17,16 +17,29 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.metrics import metrics_view
+from core.views import health, job_lag_health
+
 # NEW: wire no-pickup endpoint
 from orders.views import CustomerNoPickupTodayView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # NEW: Prometheus scrape endpoint (core/metrics.py)
+    path("metrics", metrics_view),
+    # NEW: liveness and job staleness checks
+    path("health/", health),
+    path("health/jobs/", job_lag_health),
     path('api/accounts/', include('accounts.urls')),
     path('api/admin/', include('locations.urls')),
     path('api/admin/', include('payments.urls')),
     path('api/admin/', include('accounts.admin_urls')),
+    path('api/admin/', include('analytics.urls')),
+    path('api/admin/', include('perf.urls')),  # NEW: request profiles and slow queries (perf/)
+    path('api/admin/', include('jobs.urls')),  # NEW: JobRun ledger
     path('api/manager/', include('branch_management.urls')),
+    # NEW: async twins of the hot read endpoints (serve with an ASGI server)
+    path("api/async/", include("core.async_urls")),
     path("api/", include("orders.urls")),
     path("api/", include("subscriptions.urls")),
     path("api/", include("locations.urls")),
@@ -10,6 +10,14 @@ def health(request):
     return JsonResponse({"status": "ok"})
 
 
+# NEW: job_lag health check; 503 when a scheduled job missed its latest slot (see jobs/runs.py)
+def job_lag_health(request):
+    from jobs.runs import job_lag
+
+    report = job_lag()
+    return JsonResponse(report, status=200 if report["status"] == "ok" else 503)
+
+
 # Note: Authentication endpoints are implemented in backend/accounts/views.py.
 # This core CustomerLoginView is only a placeholder; use /api/accounts/customer/login/.
 
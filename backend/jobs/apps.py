@@ -0,0 +1,27 @@
+import os
+import sys
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+
+    def ready(self):
+        # register @task functions from every app's tasks.py
+        autodiscover_modules("tasks")
+
+        # Only where `manage.py run_workers` is not deployed (RUN_JOBS_IN_WEB_WORKERS=True)
+        # do web workers drain the queue themselves
+        argv = " ".join(sys.argv).lower()
+        is_server = ("runserver" in sys.argv) or any(k in argv for k in ("gunicorn", "uwsgi", "daphne", "uvicorn", "hypercorn", "waitress"))
+        if not is_server or not getattr(settings, "RUN_JOBS_IN_WEB_WORKERS", False):
+            return
+        if settings.DEBUG and os.environ.get("RUN_MAIN") != "true":
+            return
+
+        from .queue import Worker
+        Worker(threads=1, poll_s=5).start()
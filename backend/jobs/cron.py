@@ -0,0 +1,112 @@
+"""Minimal 5-field cron expressions: "minute hour day-of-month month day-of-week".
+
+Supports "*", "*/n", "a-b", "a-b/n" and comma lists. Day-of-week is 0-6 with
+0 = Sunday (7 is accepted as Sunday too). As in Vixie cron, when both
+day-of-month and day-of-week are restricted a day matches if either does.
+Times are evaluated in the active Django time zone.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+
+MAX_SCAN_DAYS = 366 * 5
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_field(raw: str, lo: int, hi: int) -> frozenset:
+    values = set()
+    for part in raw.split(","):
+        part = part.strip()
+        step = 1
+        if "/" in part:
+            part, step_s = part.split("/", 1)
+            step = int(step_s)
+            if step <= 0:
+                raise CronError(f"bad step in '{raw}'")
+        if part in ("*", ""):
+            start, end = lo, hi
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = hi
+        if start < lo or end > hi or start > end:
+            raise CronError(f"'{raw}' out of range {lo}-{hi}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise CronError(f"expected 5 fields, got '{expr}'")
+        self.expr = expr
+        try:
+            self.minutes = _parse_field(fields[0], 0, 59)
+            self.hours = _parse_field(fields[1], 0, 23)
+            self.days = _parse_field(fields[2], 1, 31)
+            self.months = _parse_field(fields[3], 1, 12)
+            dow = _parse_field(fields[4], 0, 7)
+        except ValueError as e:
+            raise CronError(f"invalid cron expression '{expr}': {e}")
+        self.weekdays = frozenset(d % 7 for d in dow)
+        self._dom_any = fields[2] == "*"
+        self._dow_any = fields[4] == "*"
+        self._times = sorted((h, m) for h in self.hours for m in self.minutes)
+
+    def __repr__(self):
+        return f"CronSchedule({self.expr!r})"
+
+    def _day_matches(self, d: date) -> bool:
+        if d.month not in self.months:
+            return False
+        dom = d.day in self.days
+        dow = ((d.weekday() + 1) % 7) in self.weekdays  # python Monday=0 -> cron Sunday=0
+        if self._dom_any and self._dow_any:
+            return True
+        if self._dom_any:
+            return dow
+        if self._dow_any:
+            return dom
+        return dom or dow
+
+    def _at(self, d: date, hm) -> datetime:
+        return timezone.make_aware(datetime.combine(d, time(hm[0], hm[1])), timezone.get_current_timezone())
+
+    def previous(self, now: datetime) -> datetime | None:
+        """Latest fire time <= now."""
+        local = timezone.localtime(now)
+        d = local.date()
+        bound = (local.hour, local.minute)
+        for _ in range(MAX_SCAN_DAYS):
+            if self._day_matches(d):
+                candidates = [hm for hm in self._times if hm <= bound]
+                if candidates:
+                    return self._at(d, candidates[-1])
+            d -= timedelta(days=1)
+            bound = (23, 59)
+        return None
+
+    def next(self, now: datetime) -> datetime | None:
+        """Earliest fire time > now."""
+        local = timezone.localtime(now)
+        d = local.date()
+        bound = (local.hour, local.minute)
+        strict = True
+        for _ in range(MAX_SCAN_DAYS):
+            if self._day_matches(d):
+                for hm in self._times:
+                    if hm > bound or not strict:
+                        return self._at(d, hm)
+            d += timedelta(days=1)
+            strict = False
+        return None
@@ -0,0 +1,194 @@
+"""Portable named leases (cross-process locks) on the jobs_lease table.
+
+    with lease("washmate:monthly_orders", ttl_s=60, timeout_s=5) as got:
+        if not got:
+            return  # someone else is doing it
+        ...           # got.token is the fencing token
+
+- Ownership is decided by one conditional UPDATE (free, expired or already
+  ours), so it behaves the same on MySQL, PostgreSQL and SQLite.
+- A lease expires unless renewed; lease() renews it from a heartbeat thread
+  while the block runs, so a crashed holder blocks others for at most ttl_s.
+- The token increases whenever ownership changes hands. Writers that must
+  not act on a lost lease can check is_current(name, token) before writing.
+- Take leases outside transaction.atomic(): inside a transaction the lease
+  row is not visible to (or blocks) other processes until commit.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Optional
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from .models import Lease
+
+
+logger = logging.getLogger(__name__)
+
+
+def make_owner(prefix: str = "") -> str:
+    """Unique owner id for this process: host:pid:random."""
+    base = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    return f"{prefix}:{base}" if prefix else base
+
+
+def _ensure_row(name: str) -> None:
+    if Lease.objects.filter(name=name).exists():
+        return
+    try:
+        with transaction.atomic():
+            Lease.objects.create(name=name, owner="", token=0, expires_at=timezone.now())
+    except IntegrityError:
+        pass  # created concurrently
+
+
+def try_acquire(name: str, owner: str, ttl_s: float) -> Optional[int]:
+    """Take (or extend) the lease if it is free, expired or already ours.
+
+    Non-blocking. Returns the fencing token on success, None otherwise.
+    """
+    _ensure_row(name)
+    now = timezone.now()
+    # owner must be assigned last: MySQL evaluates SET left to right with new values
+    taken = Lease.objects.filter(name=name).filter(Q(owner=owner) | Q(expires_at__lte=now)).update(
+        token=Case(When(owner=owner, then=F("token")), default=F("token") + 1),
+        acquired_at=Case(When(owner=owner, then=F("acquired_at")), default=now),
+        owner=owner,
+        expires_at=now + timedelta(seconds=ttl_s),
+    )
+    if not taken:
+        return None
+    return Lease.objects.filter(name=name, owner=owner).values_list("token", flat=True).first()
+
+
+def acquire(name: str, owner: str, ttl_s: float, *, timeout_s: float = 0, poll_s: float = 0.1) -> Optional[int]:
+    """try_acquire, retried until timeout_s has passed."""
+    deadline = time.monotonic() + max(0.0, timeout_s)
+    while True:
+        token = try_acquire(name, owner, ttl_s)
+        if token is not None or time.monotonic() >= deadline:
+            return token
+        time.sleep(poll_s)
+
+
+def renew(name: str, owner: str, token: int, ttl_s: float) -> bool:
+    """Extend a lease we still hold (same owner and token, not yet expired)."""
+    now = timezone.now()
+    return bool(
+        Lease.objects.filter(name=name, owner=owner, token=token, expires_at__gt=now).update(
+            expires_at=now + timedelta(seconds=ttl_s)
+        )
+    )
+
+
+def release(name: str, owner: str) -> bool:
+    return bool(
+        Lease.objects.filter(name=name, owner=owner).update(owner="", expires_at=timezone.now())
+    )
+
+
+def is_current(name: str, token: int) -> bool:
+    """Fencing check: True while `token` is still the live lease on `name`."""
+    return Lease.objects.filter(name=name, token=token, expires_at__gt=timezone.now()).exists()
+
+
+class Heartbeat:
+    """Renews a held lease every ttl_s / 3 from a daemon thread.
+
+    `lost` becomes True (and renewal stops) once a renewal fails.
+    """
+
+    def __init__(self, name: str, owner: str, token: int, ttl_s: float):
+        self.name, self.owner, self.token, self.ttl_s = name, owner, token, ttl_s
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def beat(self) -> bool:
+        try:
+            ok = renew(self.name, self.owner, self.token, self.ttl_s)
+        except Exception:
+            logger.exception("lease heartbeat failed for %s", self.name)
+            ok = False
+        if not ok:
+            self.lost = True
+            logger.warning("lease %s lost by %s (token %s)", self.name, self.owner, self.token)
+        return ok
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.ttl_s / 3.0):
+                if not self.beat():
+                    return
+        finally:
+            connections.close_all()
+
+    def start(self) -> "Heartbeat":
+        self._thread = threading.Thread(target=self._run, name=f"lease-heartbeat-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+class LeaseHandle:
+    """Yielded by lease(); truthy when the lease was acquired."""
+
+    def __init__(self, name: str, owner: str, token: Optional[int], heartbeat: Optional[Heartbeat] = None):
+        self.name, self.owner, self.token = name, owner, token
+        self._heartbeat = heartbeat
+
+    def __bool__(self):
+        return self.token is not None
+
+    @property
+    def lost(self) -> bool:
+        return bool(self._heartbeat and self._heartbeat.lost)
+
+    def is_current(self) -> bool:
+        return self.token is not None and is_current(self.name, self.token)
+
+
+@contextmanager
+def lease(
+    name: str,
+    *,
+    ttl_s: float = 60,
+    timeout_s: float = 0,
+    owner: Optional[str] = None,
+    heartbeat: bool = True,
+):
+    """Hold `name` for the duration of the block (see module docstring).
+
+    Yields a LeaseHandle that is falsy if the lease could not be acquired
+    within timeout_s, matching the `with lock(...) as got: if not got:` style.
+    """
+    owner = owner or make_owner()
+    token = acquire(name, owner, ttl_s, timeout_s=timeout_s)
+    if token is None:
+        yield LeaseHandle(name, owner, None)
+        return
+
+    beat = Heartbeat(name, owner, token, ttl_s).start() if heartbeat else None
+    try:
+        yield LeaseHandle(name, owner, token, beat)
+    finally:
+        if beat is not None:
+            beat.stop()
+        try:
+            release(name, owner)
+        except Exception:
+            logger.exception("failed to release lease %s", name)
@@ -0,0 +1,59 @@
+"""
+Run periodic jobs (monthly order generation, overdue fines, renewal payments,
+pruning old JobRun rows).
+
+Run exactly this one process per deployment (more are harmless: a DB lease lets
+only one of them work, the rest stand by):
+    python manage.py run_scheduler
+    python manage.py run_scheduler --once     # single pass, e.g. from cron
+    python manage.py run_scheduler --list
+
+Web workers only start their own job threads with RUN_JOBS_IN_WEB_WORKERS=True,
+which is off by default, so deploy this next to the web server.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.models import ScheduledJobState
+from jobs.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    help = "Run the periodic job scheduler (leader-elected via a DB lease)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run one scheduling pass and exit")
+        parser.add_argument("--list", action="store_true", help="Show jobs, schedules and next run times")
+        parser.add_argument("--tick-seconds", type=float, default=15)
+        parser.add_argument("--lease-ttl", type=float, default=60, help="Leader lease length in seconds")
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler(lease_ttl_s=options["lease_ttl"])
+
+        if options["list"]:
+            now = timezone.now()
+            states = {s.name: s for s in ScheduledJobState.objects.all()}
+            for job in scheduler.jobs:
+                state = states.get(job.name)
+                last = f"{state.last_slot} ({state.last_status})" if state and state.last_slot else "never"
+                self.stdout.write(
+                    f"{job.name:<18} {job.schedule.expr:<14} next={timezone.localtime(job.schedule.next(now))} last={last}"
+                )
+            return
+
+        if options["once"]:
+            ran = scheduler.tick()
+            leader = scheduler.is_leader
+            scheduler.shutdown()
+            if not leader:
+                self.stdout.write("Another scheduler holds the lease; nothing run")
+                return
+            summary = ", ".join(f"{name}={status}" for name, status in ran) or "nothing due"
+            self.stdout.write(self.style.SUCCESS(f"Scheduler pass done: {summary}"))
+            return
+
+        self.stdout.write(f"Scheduler {scheduler.owner} started (tick={options['tick_seconds']}s)")
+        try:
+            scheduler.run_forever(tick_s=options["tick_seconds"])
+        except KeyboardInterrupt:
+            self.stdout.write("Scheduler stopped")
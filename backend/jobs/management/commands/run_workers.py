@@ -0,0 +1,88 @@
+"""
+Work the durable job queue (jobs/queue.py): monthly order generation after
+payments/signups, fine writes deferred from read endpoints, ...
+
+    python manage.py run_workers                         # 1 process x 4 threads
+    python manage.py run_workers --threads 8 --processes 2
+    python manage.py run_workers --once                  # drain ready jobs and exit
+    python manage.py run_workers --list                  # queue depth per task/status
+
+Any number of worker processes may run; jobs are claimed with a conditional
+UPDATE so each runs once. Deploy at least one: web workers only drain the
+queue themselves with RUN_JOBS_IN_WEB_WORKERS=True, which is off by default.
+"""
+import signal
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from jobs.models import QueuedJob
+from jobs.queue import Worker, registered_tasks
+
+
+class Command(BaseCommand):
+    help = "Run job queue workers (thread pool per process, optional process pool)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4, help="Worker threads per process")
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes (each with --threads threads)")
+        parser.add_argument("--poll-seconds", type=float, default=1.0, help="Idle wait between queue polls")
+        parser.add_argument("--lock-seconds", type=float, default=300, help="How long a claimed job stays locked")
+        parser.add_argument("--once", action="store_true", help="Run until no job is ready, then exit")
+        parser.add_argument("--list", action="store_true", help="Show queue depth and registered tasks")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            rows = QueuedJob.objects.values("task", "status").annotate(n=Count("id")).order_by("task", "status")
+            for row in rows:
+                self.stdout.write(f"{row['task']:<40} {row['status']:<8} {row['n']}")
+            self.stdout.write("registered: " + (", ".join(registered_tasks()) or "none"))
+            return
+
+        if options["threads"] < 1 or options["processes"] < 1:
+            raise CommandError("--threads and --processes must be >= 1")
+
+        if options["processes"] > 1:
+            self._run_processes(options)
+            return
+
+        worker = Worker(
+            threads=options["threads"],
+            poll_s=options["poll_seconds"],
+            lock_s=options["lock_seconds"],
+        )
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        if not options["once"]:
+            self.stdout.write(f"Worker {worker.owner} started ({worker.threads} thread(s))")
+        counts = worker.run(burst=options["once"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Workers stopped: done={counts['done']} retry={counts['retry']} failed={counts['failed']}"
+        ))
+
+    def _run_processes(self, options):
+        """Supervise N single-process children; SIGTERM/Ctrl-C is forwarded to all of them."""
+        cmd = [
+            sys.executable, sys.argv[0], "run_workers",
+            "--threads", str(options["threads"]),
+            "--poll-seconds", str(options["poll_seconds"]),
+            "--lock-seconds", str(options["lock_seconds"]),
+        ]
+        if options["once"]:
+            cmd.append("--once")
+        children = [subprocess.Popen(cmd) for _ in range(options["processes"])]
+
+        def _stop(*_):
+            for child in children:
+                if child.poll() is None:
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, _stop)
+        try:
+            codes = [child.wait() for child in children]
+        except KeyboardInterrupt:
+            _stop()
+            codes = [child.wait() for child in children]
+        if any(codes):
+            raise CommandError(f"worker process exit codes: {codes}")
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.11 on 2026-10-19 12:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_queuedjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('trigger', models.CharField(blank=True, default='', max_length=20)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('ok', 'OK'), ('error', 'Error'), ('locked', 'Locked out')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_ms', models.FloatField(blank=True, null=True)),
+                ('rows_scanned', models.PositiveIntegerField(default=0)),
+                ('rows_created', models.PositiveIntegerField(default=0)),
+                ('rows_updated', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('lock', models.CharField(blank=True, default='', max_length=10)),
+                ('dry_run', models.BooleanField(default=False)),
+                ('host', models.CharField(blank=True, default='', max_length=255)),
+                ('pid', models.PositiveIntegerField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', '-started_at'], name='jobs_run_name_started_idx')],
+            },
+        ),
+    ]
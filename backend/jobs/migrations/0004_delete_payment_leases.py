@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def delete_payment_leases(apps, schema_editor):
+    # pay-now / subscription-pay took one lease per payment; they lock the Payment row now
+    Lease = apps.get_model("jobs", "Lease")
+    Lease.objects.filter(name__startswith="washmate:payment:").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_jobrun'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_payment_leases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,114 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Lease(models.Model):
+    """A named, expiring ownership record (see jobs/leases.py).
+
+    token increases every time ownership changes hands, so work done under an
+    old lease can be told apart from work done under the current one.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    owner = models.CharField(max_length=200, blank=True, default="")
+    token = models.BigIntegerField(default=0)
+    expires_at = models.DateTimeField()
+    acquired_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.owner or 'free'})"
+
+
+class ScheduledJobState(models.Model):
+    """Last handled schedule slot per run_scheduler job (drives missed-run catch-up)."""
+    name = models.CharField(max_length=100, primary_key=True)
+    last_slot = models.DateTimeField(null=True, blank=True)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=10, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_slot}"
+
+
+class QueuedJob(models.Model):
+    """A unit of deferred work for `manage.py run_workers` (see jobs/queue.py).
+
+    Rows are inserted in the caller's transaction, so a job exists only if the
+    write that produced it committed. dedupe_key is unique among *queued* jobs
+    and cleared when a worker claims the job.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)  # higher runs first
+    run_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    locked_by = models.CharField(max_length=200, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="jobs_queue_ready_idx"),
+            models.Index(fields=["status", "locked_until"], name="jobs_queue_locked_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.task}#{self.pk} ({self.status})"
+
+
+class JobRun(models.Model):
+    """One run of a batch job or maintenance command (see jobs/runs.py)."""
+    RUNNING = "running"
+    OK = "ok"
+    ERROR = "error"
+    LOCKED = "locked"  # the job's lease was held elsewhere, nothing done
+    STATUS_CHOICES = [
+        (RUNNING, "Running"),
+        (OK, "OK"),
+        (ERROR, "Error"),
+        (LOCKED, "Locked out"),
+    ]
+    LOCK_ACQUIRED = "acquired"
+    LOCK_BUSY = "busy"
+
+    name = models.CharField(max_length=100)
+    trigger = models.CharField(max_length=20, blank=True, default="")  # scheduler, command, web_thread, queue, call
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=RUNNING)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+    rows_scanned = models.PositiveIntegerField(default=0)
+    rows_created = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)  # rows that failed; the run carried on
+    error = models.TextField(blank=True, default="")  # traceback when the run itself failed
+    lock = models.CharField(max_length=10, blank=True, default="")  # "", acquired, busy
+    dry_run = models.BooleanField(default=False)
+    host = models.CharField(max_length=255, blank=True, default="")
+    pid = models.PositiveIntegerField(null=True, blank=True)
+    details = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "-started_at"], name="jobs_run_name_started_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name}#{self.pk} ({self.status})"
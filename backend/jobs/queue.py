@@ -0,0 +1,265 @@
+"""Durable job queue on the jobs_queuedjob table, worked by `manage.py run_workers`.
+
+    # in a view, inside its transaction (transactional outbox):
+    enqueue("orders.ensure_monthly_orders", {"subscription_id": sub.id, "date": "2026-03-10"},
+            dedupe_key=f"monthly-order:{sub.id}:2026-03-10")
+
+    # in <app>/tasks.py (autodiscovered by JobsConfig.ready):
+    @task("orders.ensure_monthly_orders")
+    def ensure_monthly_orders(*, subscription_id, date): ...
+
+- enqueue() is a plain INSERT on the caller's connection: if the request's
+  transaction rolls back, the job is gone too; if it commits, the job is there.
+- Workers claim with a conditional UPDATE (status queued -> running), so two
+  workers never run the same job, on MySQL, PostgreSQL and SQLite alike.
+- Failures are recorded in last_error and retried with exponential backoff up
+  to max_attempts, then the job is left as "failed".
+- A worker that dies mid-job leaves it "running" until locked_until passes;
+  it is then requeued. Tasks must therefore be idempotent.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .leases import make_owner
+from .models import QueuedJob
+
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_DEFAULT = 0
+PRIORITY_LOW = -10
+
+RETRY_BASE_S = 10
+RETRY_MAX_S = 3600
+DEFAULT_LOCK_S = 300
+
+
+class _Task:
+    def __init__(self, name: str, func: Callable, atomic: bool):
+        self.name, self.func, self.atomic = name, func, atomic
+
+    def __call__(self, **kwargs):
+        if self.atomic:
+            with transaction.atomic():
+                return self.func(**kwargs)
+        return self.func(**kwargs)
+
+
+_registry: Dict[str, _Task] = {}
+
+
+def task(name: str, *, atomic: bool = True):
+    """Register a job function under `name`.
+
+    Called with the job's args as keyword arguments. atomic=False for tasks
+    that take leases themselves (leases must not be taken inside a transaction).
+    """
+    def decorator(func):
+        _registry[name] = _Task(name, func, atomic)
+        return func
+
+    return decorator
+
+
+def get_task(name: str) -> Optional[_Task]:
+    return _registry.get(name)
+
+
+def registered_tasks() -> List[str]:
+    return sorted(_registry)
+
+
+def enqueue(
+    name: str,
+    args: Optional[dict] = None,
+    *,
+    priority: int = PRIORITY_DEFAULT,
+    run_at: Optional[datetime] = None,
+    dedupe_key: Optional[str] = None,
+    max_attempts: int = 5,
+) -> QueuedJob:
+    """Insert a job; with dedupe_key, an already queued job with that key is returned instead."""
+    job = QueuedJob(
+        task=name,
+        args=args or {},
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts,
+    )
+    if dedupe_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        existing = QueuedJob.objects.filter(dedupe_key=dedupe_key).first()
+        if existing is None:  # claimed between our insert and this read
+            return enqueue(name, args, priority=priority, run_at=run_at, dedupe_key=dedupe_key, max_attempts=max_attempts)
+        return existing
+
+
+def retry_delay_s(attempts: int) -> int:
+    return min(RETRY_MAX_S, RETRY_BASE_S * 2 ** max(0, attempts - 1))
+
+
+def requeue_expired(*, now: Optional[datetime] = None) -> int:
+    """Give jobs of dead workers (running past locked_until) back to the queue."""
+    now = now or timezone.now()
+    expired = QueuedJob.objects.filter(status=QueuedJob.RUNNING, locked_until__lt=now)
+    failed = expired.filter(attempts__gte=F("max_attempts")).update(
+        status=QueuedJob.FAILED, finished_at=now, locked_by="", locked_until=None,
+        last_error="worker lock expired",
+    )
+    requeued = expired.update(status=QueuedJob.QUEUED, locked_by="", locked_until=None)
+    if failed or requeued:
+        logger.warning("job queue: requeued %s and failed %s expired job(s)", requeued, failed)
+    return requeued + failed
+
+
+def claim(worker: str, *, limit: int = 1, lock_s: float = DEFAULT_LOCK_S, now: Optional[datetime] = None) -> List[QueuedJob]:
+    """Take up to `limit` ready jobs (highest priority, then oldest run_at)."""
+    now = now or timezone.now()
+    candidates = list(
+        QueuedJob.objects.filter(status=QueuedJob.QUEUED, run_at__lte=now)
+        .order_by("-priority", "run_at", "id")
+        .values_list("id", flat=True)[: limit * 4]
+    )
+    claimed = []
+    for job_id in candidates:
+        # losing this race to another worker just means trying the next candidate
+        if QueuedJob.objects.filter(id=job_id, status=QueuedJob.QUEUED).update(
+            status=QueuedJob.RUNNING,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=lock_s),
+            attempts=F("attempts") + 1,
+            dedupe_key=None,
+        ):
+            claimed.append(job_id)
+            if len(claimed) >= limit:
+                break
+    if not claimed:
+        return []
+    return list(QueuedJob.objects.filter(id__in=claimed, locked_by=worker).order_by("-priority", "run_at", "id"))
+
+
+def execute(job: QueuedJob, worker: str) -> str:
+    """Run a claimed job and record the outcome: "done", "retry" or "failed"."""
+    ours = QueuedJob.objects.filter(id=job.id, status=QueuedJob.RUNNING, locked_by=worker)
+    try:
+        func = get_task(job.task)
+        if func is None:
+            raise LookupError(f"no task registered as '{job.task}'")
+        result = func(**job.args)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            ours.update(status=QueuedJob.FAILED, finished_at=now, locked_by="", locked_until=None, last_error=error)
+            logger.exception("job %s#%s failed permanently after %s attempt(s)", job.task, job.id, job.attempts)
+            return "failed"
+        ours.update(
+            status=QueuedJob.QUEUED,
+            run_at=now + timedelta(seconds=retry_delay_s(job.attempts)),
+            locked_by="",
+            locked_until=None,
+            last_error=error,
+        )
+        logger.warning("job %s#%s attempt %s failed, will retry", job.task, job.id, job.attempts, exc_info=True)
+        return "retry"
+
+    ours.update(status=QueuedJob.DONE, finished_at=timezone.now(), locked_by="", locked_until=None, last_error="")
+    logger.info("job %s#%s done: %s", job.task, job.id, result)
+    return "done"
+
+
+def run_pending(*, worker: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, int]:
+    """Work the queue in this thread until no job is ready (or `limit` jobs ran)."""
+    worker = worker or make_owner("worker")
+    counts = {"done": 0, "retry": 0, "failed": 0}
+    while limit is None or sum(counts.values()) < limit:
+        jobs = claim(worker)
+        if not jobs:
+            break
+        counts[execute(jobs[0], worker)] += 1
+    return counts
+
+
+class Worker:
+    """A pool of `threads` threads claiming and running jobs from the queue."""
+
+    def __init__(
+        self,
+        *,
+        threads: int = 1,
+        poll_s: float = 1.0,
+        lock_s: float = DEFAULT_LOCK_S,
+        owner: Optional[str] = None,
+    ):
+        self.threads = max(1, int(threads))
+        self.poll_s = poll_s
+        self.lock_s = lock_s
+        self.owner = owner or make_owner("worker")
+        self.stop_event = threading.Event()
+        self.counts = {"done": 0, "retry": 0, "failed": 0}
+        self._counts_lock = threading.Lock()
+
+    def _loop(self, index: int, burst: bool) -> None:
+        worker = f"{self.owner}:{index}"
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    if index == 0:
+                        requeue_expired()
+                    jobs = claim(worker, lock_s=self.lock_s)
+                except Exception:
+                    logger.exception("job queue: claim failed")
+                    jobs = []
+                if not jobs:
+                    if burst:
+                        return
+                    self.stop_event.wait(self.poll_s)
+                    continue
+                outcome = execute(jobs[0], worker)
+                with self._counts_lock:
+                    self.counts[outcome] += 1
+        finally:
+            connections.close_all()
+
+    def run(self, *, burst: bool = False) -> Dict[str, int]:
+        """Block until stop() (or, with burst=True, until the queue has no ready jobs)."""
+        pool = [
+            threading.Thread(target=self._loop, args=(i, burst), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.threads)
+        ]
+        for t in pool:
+            t.start()
+        try:
+            for t in pool:
+                while t.is_alive():
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for t in pool:
+                t.join(timeout=30)
+        return dict(self.counts)
+
+    def start(self) -> "Worker":
+        """Run in a background daemon thread (used by web workers without run_workers)."""
+        threading.Thread(target=self.run, name="job-worker-pool", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.stop_event.set()
@@ -0,0 +1,223 @@
+"""Ledger of batch job runs (JobRun) and how stale each job is.
+
+    with record_run("fines", trigger="scheduler") as run:
+        run.lock_outcome(bool(got))
+        run.add(scanned=1, created=1)
+
+A run writes its row when it starts (status "running") and completes it when
+the block ends: "ok", "error" (with the traceback; the exception still
+propagates) or "locked" when the job's lease was held elsewhere and it did
+nothing. Rows record host/pid, start/end, rows scanned/created/updated,
+per-row failures the job survived, and the lock outcome.
+
+Runs nest: inside an active run record_run() joins it, so the caller that
+knows why a job runs (scheduler, command, web-worker thread, queue) names it
+and sets the trigger, and the service underneath just counts into it. The
+batch services are decorated with record_run themselves, so a bare call is
+recorded too (trigger "call"). Counting code uses current_run(), which
+outside any run returns a recorder nobody saves.
+
+Open runs outside transaction.atomic(), like leases: the ledger row would
+otherwise roll back with a failing job. A ledger write that fails is logged
+and never fails the job.
+
+The scheduler's daily "prune_job_runs" job deletes runs older than
+JOB_RUN_KEEP_DAYS, keeping each job's latest run and latest success, which
+job_lag reports.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import JobRun
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_CHARS = 10000
+MAX_ROW_ERRORS = 20  # messages kept in details["errors"]
+
+
+class RunRecorder:
+    def __init__(self, name: str, trigger: str, *, dry_run: bool = False):
+        self.name = name
+        self.trigger = trigger
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = 0
+        self.lock = ""
+        self.details = {}
+        self.row_id: Optional[int] = None
+
+    def add(self, *, scanned: int = 0, created: int = 0, updated: int = 0) -> None:
+        self.scanned += scanned
+        self.created += created
+        self.updated += updated
+
+    def row_failed(self, message: str) -> None:
+        self.errors += 1
+        messages = self.details.setdefault("errors", [])
+        if len(messages) < MAX_ROW_ERRORS:
+            messages.append(message[:500])
+
+    def lock_outcome(self, acquired: bool) -> None:
+        self.lock = JobRun.LOCK_ACQUIRED if acquired else JobRun.LOCK_BUSY
+
+
+_current: ContextVar[Optional[RunRecorder]] = ContextVar("job_run", default=None)
+
+
+def current_run() -> RunRecorder:
+    """The active run, or a detached recorder when the caller is not inside one."""
+    run = _current.get()
+    return run if run is not None else RunRecorder("", "")
+
+
+def _start(run: RunRecorder) -> None:
+    try:
+        run.row_id = JobRun.objects.create(
+            name=run.name, trigger=run.trigger, dry_run=run.dry_run,
+            host=socket.gethostname()[:255], pid=os.getpid(),
+        ).pk
+    except DatabaseError:
+        logger.exception("Could not record the start of job run %s", run.name)
+
+
+def _finish(run: RunRecorder, *, status: str, duration_s: float, error: str = "") -> None:
+    if run.row_id is None:
+        return
+    try:
+        JobRun.objects.filter(pk=run.row_id).update(
+            status=status,
+            finished_at=timezone.now(),
+            duration_ms=round(duration_s * 1000.0, 1),
+            rows_scanned=run.scanned,
+            rows_created=run.created,
+            rows_updated=run.updated,
+            error_count=run.errors,
+            error=error[-MAX_ERROR_CHARS:],
+            lock=run.lock,
+            dry_run=run.dry_run,
+            details=run.details,
+        )
+    except DatabaseError:
+        logger.exception("Could not record the end of job run %s", run.name)
+
+
+@contextmanager
+def record_run(name: str, *, trigger: str = "call", dry_run: bool = False):
+    """Record the block as one run of `name` (joins the active run if there is one)."""
+    active = _current.get()
+    if active is not None:
+        yield active
+        return
+
+    run = RunRecorder(name, trigger, dry_run=dry_run)
+    _start(run)
+    token = _current.set(run)
+    started = time.perf_counter()
+    try:
+        yield run
+    except BaseException:
+        _finish(run, status=JobRun.ERROR, duration_s=time.perf_counter() - started, error=traceback.format_exc())
+        raise
+    else:
+        status = JobRun.LOCKED if run.lock == JobRun.LOCK_BUSY else JobRun.OK
+        _finish(run, status=status, duration_s=time.perf_counter() - started)
+    finally:
+        _current.reset(token)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def job_lag(*, now: Optional[datetime] = None) -> dict:
+    """How stale each job is: the scheduler's jobs plus anything else in the ledger.
+
+    A scheduled job is stale when its latest cron slot is more than
+    JOB_LAG_GRACE_S old and no successful (non-dry) run started after it.
+    lag_s is the time since the last successful run finished.
+    """
+    from .scheduler import default_jobs
+
+    now = now or timezone.now()
+    grace_s = getattr(settings, "JOB_LAG_GRACE_S", 3600)
+    schedules = {job.name: job.schedule for job in default_jobs()}
+    names = sorted(set(schedules) | set(JobRun.objects.values_list("name", flat=True).distinct()))
+
+    jobs = {}
+    for name in names:
+        runs = JobRun.objects.filter(name=name).order_by("-started_at", "-id")
+        last = runs.values("status", "started_at", "trigger").first()
+        last_ok = runs.filter(status=JobRun.OK, dry_run=False).values("started_at", "finished_at").first()
+        entry = {
+            "last_status": last and last["status"],
+            "last_started_at": _iso(last and last["started_at"]),
+            "last_trigger": last and last["trigger"],
+            "last_success_at": _iso(last_ok and last_ok["finished_at"]),
+            "lag_s": round((now - last_ok["finished_at"]).total_seconds()) if last_ok else None,
+            "stale": False,
+        }
+        schedule = schedules.get(name)
+        if schedule is not None:
+            slot = schedule.previous(now)
+            entry["due_slot"] = _iso(slot)
+            entry["stale"] = bool(
+                slot is not None
+                and (now - slot).total_seconds() > grace_s
+                and (last_ok is None or last_ok["started_at"] < slot)
+            )
+        jobs[name] = entry
+    return {"status": "stale" if any(e["stale"] for e in jobs.values()) else "ok", "jobs": jobs}
+
+
+def prune_runs(*, now: Optional[datetime] = None) -> int:
+    """Delete runs started more than JOB_RUN_KEEP_DAYS ago; returns rows deleted.
+
+    Each job's latest run and latest successful run are kept whatever their
+    age, so job_lag still knows a rarely run job.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=getattr(settings, "JOB_RUN_KEEP_DAYS", 90))
+    with record_run("prune_job_runs") as run:
+        keep = set()
+        for name in JobRun.objects.filter(started_at__lt=cutoff).values_list("name", flat=True).distinct():
+            runs = JobRun.objects.filter(name=name).order_by("-started_at", "-id").values_list("id", flat=True)
+            keep.update(runs[:1])
+            keep.update(runs.filter(status=JobRun.OK, dry_run=False)[:1])
+        deleted, _ = JobRun.objects.filter(started_at__lt=cutoff).exclude(id__in=keep).delete()
+        run.details["deleted"] = deleted
+    return deleted
+
+
+def prometheus_lines(report: dict) -> list:
+    """Gauges for core/metrics.py's /metrics from a job_lag() report."""
+    lines = [
+        "# HELP washmate_job_last_success_seconds Seconds since the job last finished successfully",
+        "# TYPE washmate_job_last_success_seconds gauge",
+    ]
+    lines += [
+        f'washmate_job_last_success_seconds{{job="{name}"}} {entry["lag_s"]}'
+        for name, entry in report["jobs"].items() if entry["lag_s"] is not None
+    ]
+    lines += [
+        "# HELP washmate_job_stale 1 when a scheduled job missed its latest slot (see job_lag)",
+        "# TYPE washmate_job_stale gauge",
+    ]
+    lines += [f'washmate_job_stale{{job="{name}"}} {int(entry["stale"])}' for name, entry in report["jobs"].items()]
+    return lines
@@ -0,0 +1,174 @@
+"""Periodic jobs owned by `manage.py run_scheduler`.
+
+Only the process holding the "scheduler" lease runs jobs; others idle and take
+over when the lease expires. Each job's last handled slot is stored in
+ScheduledJobState, so a scheduler that was down over a slot runs the job once
+on start (missed runs are coalesced, not replayed one by one).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cron import CronSchedule
+from .leases import Heartbeat, make_owner, release, try_acquire
+from .models import ScheduledJobState
+from .runs import record_run
+
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LEASE = "scheduler"
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    schedule: CronSchedule
+    func: Callable[[], object]
+    catch_up: bool = True
+
+
+def _monthly_orders():
+    from orders.views import _ensure_monthly_orders_for_all
+    # catch-up runs generate for *today*, never back-fill past pickup days
+    return _ensure_monthly_orders_for_all(for_date=timezone.localdate(), lock_timeout_s=10)
+
+
+def _fines():
+    from payments.services import ensure_fines_for_all_overdue
+    return {"processed": ensure_fines_for_all_overdue(today=timezone.localdate(), lock_timeout_s=10)}
+
+
+def _monthly_payments():
+    from payments.services import generate_monthly_payments
+    return generate_monthly_payments(today=timezone.localdate(), lock_timeout_s=10)
+
+
+def _prune_job_runs():
+    from .runs import prune_runs
+    return {"deleted": prune_runs()}
+
+
+DEFAULT_SCHEDULES = {
+    "monthly_orders": ("0 0 * * *", _monthly_orders),
+    "fines": ("5 0 * * *", _fines),
+    "monthly_payments": ("10 0 * * *", _monthly_payments),
+    "prune_job_runs": ("30 3 * * *", _prune_job_runs),
+}
+
+
+def default_jobs() -> List[Job]:
+    """DEFAULT_SCHEDULES with cron overrides from settings.SCHEDULER_SCHEDULES."""
+    overrides = getattr(settings, "SCHEDULER_SCHEDULES", {}) or {}
+    return [
+        Job(name=name, schedule=CronSchedule(overrides.get(name, expr)), func=func)
+        for name, (expr, func) in DEFAULT_SCHEDULES.items()
+    ]
+
+
+class Scheduler:
+    def __init__(
+        self,
+        jobs: Optional[Iterable[Job]] = None,
+        *,
+        owner: Optional[str] = None,
+        lease_ttl_s: float = 60,
+        misfire_grace_s: float = 300,
+        clock: Callable[[], datetime] = timezone.now,
+    ):
+        self.jobs = list(jobs) if jobs is not None else default_jobs()
+        self.owner = owner or make_owner("scheduler")
+        self.lease_ttl_s = lease_ttl_s
+        self.misfire_grace_s = misfire_grace_s
+        self.clock = clock
+        self.token = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None
+
+    def _acquire(self) -> bool:
+        self.token = try_acquire(SCHEDULER_LEASE, self.owner, self.lease_ttl_s)
+        return self.token is not None
+
+    def due(self, now: datetime):
+        """[(job, slot)] whose latest slot <= now has not been handled yet."""
+        states = {s.name: s for s in ScheduledJobState.objects.filter(name__in=[j.name for j in self.jobs])}
+        out = []
+        for job in self.jobs:
+            slot = job.schedule.previous(now)
+            if slot is None:
+                continue
+            state = states.get(job.name)
+            if state is None or state.last_slot is None or state.last_slot < slot:
+                out.append((job, slot))
+        return out
+
+    def run_job(self, job: Job, slot: datetime) -> str:
+        now = self.clock()
+        state, _ = ScheduledJobState.objects.get_or_create(name=job.name)
+        if not job.catch_up and (now - slot) > timedelta(seconds=self.misfire_grace_s):
+            status, error = "skipped", ""
+            logger.info("scheduler: %s missed slot %s, catch-up disabled", job.name, slot)
+        else:
+            state.last_started_at = now
+            state.save(update_fields=["last_started_at"])
+            try:
+                with record_run(job.name, trigger="scheduler") as run:
+                    run.details["slot"] = slot.isoformat()
+                    result = job.func()
+                status, error = "ok", ""
+                logger.info("scheduler: %s slot=%s result=%s", job.name, slot, result)
+            except Exception:
+                status, error = "error", traceback.format_exc()
+                logger.exception("scheduler: %s failed for slot %s", job.name, slot)
+
+        # the slot is consumed either way; a failing job is retried at its next slot
+        state.last_slot = slot
+        state.last_finished_at = self.clock()
+        state.last_status = status
+        state.last_error = error
+        state.save(update_fields=["last_slot", "last_finished_at", "last_status", "last_error"])
+        return status
+
+    def tick(self) -> list:
+        """One scheduling pass. Returns [(job name, status)] for jobs run."""
+        if not self._acquire():
+            return []
+        ran = []
+        for job, slot in self.due(self.clock()):
+            # re-check ownership between jobs; another scheduler may have taken over
+            if not self._acquire():
+                break
+            # keep the leader lease alive while a long job runs
+            beat = Heartbeat(SCHEDULER_LEASE, self.owner, self.token, self.lease_ttl_s).start()
+            try:
+                ran.append((job.name, self.run_job(job, slot)))
+            finally:
+                beat.stop()
+        return ran
+
+    def run_forever(self, *, tick_s: float = 15, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                try:
+                    self.tick()
+                except Exception:
+                    logger.exception("scheduler tick failed")
+                stop.wait(tick_s)
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        if self.token is not None:
+            release(SCHEDULER_LEASE, self.owner)
+            self.token = None
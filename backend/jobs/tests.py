@@ -0,0 +1,278 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, SimpleTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from jobs.cron import CronError, CronSchedule
+from jobs.leases import Heartbeat, is_current, lease, release, try_acquire
+from jobs.models import JobRun, Lease, QueuedJob, ScheduledJobState
+from jobs.queue import claim, enqueue, requeue_expired, retry_delay_s, run_pending, task
+from jobs.runs import current_run, job_lag, prune_runs, record_run
+from jobs.scheduler import Job, Scheduler
+from payments.services import ensure_fines_for_all_overdue
+
+
+def _local(*args):
+    return timezone.make_aware(datetime(*args), timezone.get_current_timezone())
+
+
+class CronScheduleTests(SimpleTestCase):
+    def test_previous_and_next_fire_times(self):
+        daily = CronSchedule("5 0 * * *")
+        self.assertEqual(daily.previous(_local(2026, 3, 10, 0, 4)), _local(2026, 3, 9, 0, 5))
+        self.assertEqual(daily.previous(_local(2026, 3, 10, 0, 5)), _local(2026, 3, 10, 0, 5))
+        self.assertEqual(daily.next(_local(2026, 3, 10, 0, 5)), _local(2026, 3, 11, 0, 5))
+
+        quarter = CronSchedule("*/15 9-10 * * 1-5")  # weekdays 09:00-10:45
+        self.assertEqual(quarter.next(_local(2026, 3, 13, 10, 50)), _local(2026, 3, 16, 9, 0))  # Fri -> Mon
+        self.assertEqual(quarter.previous(_local(2026, 3, 14, 12, 0)), _local(2026, 3, 13, 10, 45))
+
+    def test_invalid_expressions(self):
+        for expr in ("* * * *", "61 * * * *", "*/0 * * * *", "a b c d e"):
+            with self.assertRaises(CronError):
+                CronSchedule(expr)
+
+
+class LeaseTests(TestCase):
+    def test_single_owner_until_expiry_and_token_increments(self):
+        t1 = try_acquire("job", "a", ttl_s=30)
+        self.assertIsNotNone(t1)
+        self.assertIsNone(try_acquire("job", "b", ttl_s=30))
+        self.assertEqual(try_acquire("job", "a", ttl_s=30), t1)  # renewal keeps the token
+
+        Lease.objects.filter(name="job").update(expires_at=timezone.now() - timedelta(seconds=1))
+        t2 = try_acquire("job", "b", ttl_s=30)
+        self.assertEqual(t2, t1 + 1)
+        self.assertFalse(release("job", "a"))
+        self.assertTrue(release("job", "b"))
+        self.assertEqual(try_acquire("job", "a", ttl_s=30), t2 + 1)
+
+    def test_context_manager_heartbeat_and_fencing(self):
+        with lease("gen", ttl_s=30, owner="a", heartbeat=False) as got:
+            self.assertTrue(got)
+            with lease("gen", ttl_s=30, owner="b") as other:
+                self.assertFalse(other)
+            self.assertTrue(got.is_current())
+
+            beat = Heartbeat("gen", "a", got.token, ttl_s=300)
+            before = Lease.objects.get(name="gen").expires_at
+            self.assertTrue(beat.beat())
+            self.assertGreater(Lease.objects.get(name="gen").expires_at, before)
+
+            # holder stalls past expiry and b takes over: a's token is fenced off
+            Lease.objects.filter(name="gen").update(expires_at=timezone.now() - timedelta(seconds=1))
+            self.assertIsNotNone(try_acquire("gen", "b", ttl_s=30))
+            self.assertFalse(beat.beat())
+            self.assertTrue(beat.lost)
+            self.assertFalse(is_current("gen", got.token))
+
+        # a's exit must not release b's lease
+        self.assertEqual(Lease.objects.get(name="gen").owner, "b")
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.now = _local(2026, 3, 10, 12, 0)
+        self.calls = []
+
+    def _scheduler(self, owner, jobs=None):
+        jobs = jobs or [Job(name="daily", schedule=CronSchedule("5 0 * * *"), func=lambda: self.calls.append(owner))]
+        return Scheduler(jobs, owner=owner, clock=lambda: self.now)
+
+    def test_only_leader_runs_and_missed_slots_are_coalesced(self):
+        ScheduledJobState.objects.create(name="daily", last_slot=_local(2026, 3, 7, 0, 5))
+        leader, standby = self._scheduler("a"), self._scheduler("b")
+
+        self.assertEqual(leader.tick(), [("daily", "ok")])
+        self.assertEqual(standby.tick(), [])
+        self.assertFalse(standby.is_leader)
+        self.assertEqual(self.calls, ["a"])  # three missed days -> one run
+        self.assertEqual(ScheduledJobState.objects.get(name="daily").last_slot, _local(2026, 3, 10, 0, 5))
+
+        self.assertEqual(leader.tick(), [])  # nothing due until tomorrow 00:05
+        self.now += timedelta(days=1)
+        leader.shutdown()
+        self.assertEqual(standby.tick(), [("daily", "ok")])  # standby takes over
+        self.assertEqual(self.calls, ["a", "b"])
+
+    def test_failures_are_recorded_not_swallowed(self):
+        def boom():
+            raise RuntimeError("generation failed")
+
+        scheduler = self._scheduler("a", [Job(name="boom", schedule=CronSchedule("0 * * * *"), func=boom)])
+        with mock.patch("jobs.scheduler.logger") as log:
+            self.assertEqual(scheduler.tick(), [("boom", "error")])
+        log.exception.assert_called_once()
+        state = ScheduledJobState.objects.get(name="boom")
+        self.assertEqual(state.last_status, "error")
+        self.assertIn("generation failed", state.last_error)
+
+
+class JobRunTests(TestCase):
+    def test_runs_record_outcome_and_nested_services_join(self):
+        with record_run("fines", trigger="scheduler") as run:
+            ensure_fines_for_all_overdue(lock_timeout_s=0)  # joins the scheduler's run
+            run.add(scanned=2, updated=1)
+            run.row_failed("payment 7: boom")
+        self.assertIsNone(current_run().row_id)  # outside any run
+
+        with self.assertRaises(RuntimeError), record_run("fines", trigger="command"):
+            raise RuntimeError("db gone")
+
+        try_acquire("washmate:fines", "other-process", ttl_s=60)
+        ensure_fines_for_all_overdue(lock_timeout_s=0)
+
+        ok, failed, locked = JobRun.objects.order_by("id")
+        self.assertEqual(
+            (ok.name, ok.trigger, ok.status, ok.lock, ok.rows_scanned, ok.rows_updated, ok.error_count),
+            ("fines", "scheduler", "ok", "acquired", 2, 1, 1),
+        )
+        self.assertEqual(ok.details["errors"], ["payment 7: boom"])
+        self.assertIsNotNone(ok.finished_at)
+        self.assertEqual((failed.status, failed.trigger), ("error", "command"))
+        self.assertIn("db gone", failed.error)
+        self.assertEqual((locked.status, locked.lock, locked.trigger), ("locked", "busy", "call"))
+
+    def test_dry_runs_are_recorded_but_do_not_count_as_success(self):
+        call_command("calculate_fines", "--dry-run", stdout=StringIO())
+        run = JobRun.objects.get()
+        self.assertEqual((run.name, run.trigger, run.dry_run, run.status), ("fines", "command", True, "ok"))
+        self.assertIsNone(job_lag()["jobs"]["fines"]["last_success_at"])
+
+    def test_job_lag_flags_jobs_without_a_success_since_their_slot(self):
+        now = _local(2026, 3, 10, 12, 0)
+        JobRun.objects.create(  # yesterday's run only
+            name="fines", status="ok", started_at=_local(2026, 3, 9, 0, 5), finished_at=_local(2026, 3, 9, 0, 6),
+        )
+        JobRun.objects.create(
+            name="monthly_orders", status="ok", started_at=_local(2026, 3, 10, 0, 0), finished_at=_local(2026, 3, 10, 0, 2),
+        )
+        JobRun.objects.create(name="monthly_payments", status="error", started_at=_local(2026, 3, 10, 0, 10))
+        JobRun.objects.create(name="rollups", status="ok", started_at=_local(2026, 1, 1), finished_at=_local(2026, 1, 1))
+        JobRun.objects.create(
+            name="prune_job_runs", status="ok", started_at=_local(2026, 3, 10, 3, 30), finished_at=_local(2026, 3, 10, 3, 30),
+        )
+
+        report = job_lag(now=now)
+        jobs = report["jobs"]
+        self.assertEqual(report["status"], "stale")
+        self.assertEqual({name for name, entry in jobs.items() if entry["stale"]}, {"fines", "monthly_payments"})
+        self.assertEqual(jobs["monthly_orders"]["lag_s"], 12 * 3600 - 120)
+        self.assertEqual(jobs["monthly_payments"]["last_status"], "error")
+        self.assertFalse(jobs["rollups"]["stale"])  # not scheduled, reported only
+
+        with self.settings(JOB_LAG_GRACE_S=13 * 3600):
+            self.assertEqual(job_lag(now=now)["status"], "ok")
+
+    def test_prune_keeps_recent_runs_and_each_jobs_latest(self):
+        now = timezone.now()
+        old = now - timedelta(days=200)
+        last_ok = JobRun.objects.create(name="rollups", status="ok", started_at=old, finished_at=old)
+        last = JobRun.objects.create(name="rollups", status="error", started_at=old + timedelta(days=1))
+        gone = [
+            JobRun.objects.create(name="rollups", status="ok", started_at=old - timedelta(days=1)),
+            JobRun.objects.create(name="fines", status="ok", started_at=old),
+        ]
+        recent = JobRun.objects.create(name="fines", status="ok", started_at=now - timedelta(days=1))
+
+        with self.settings(JOB_RUN_KEEP_DAYS=90):
+            self.assertEqual(prune_runs(now=now), 2)
+        self.assertFalse(JobRun.objects.filter(id__in=[r.id for r in gone]).exists())
+        kept = set(JobRun.objects.exclude(name="prune_job_runs").values_list("id", flat=True))
+        self.assertEqual(kept, {last_ok.id, last.id, recent.id})
+        self.assertEqual(JobRun.objects.get(name="prune_job_runs").details, {"deleted": 2})
+
+    def test_endpoints(self):
+        self.assertEqual(self.client.get("/health/jobs/").status_code, 503)  # nothing has ever run
+        ensure_fines_for_all_overdue()
+
+        client = APIClient()
+        for user in (None, User.objects.create(email="c@example.com", phone="9000000401", role=User.Role.CUSTOMER)):
+            client.force_authenticate(user=user)
+            self.assertEqual(client.get("/api/admin/job-runs/", {"full": "1"}).status_code, 403)
+        client.force_authenticate(User.objects.create(email="a@example.com", phone="9000000402", role=User.Role.SUPER_ADMIN))
+        body = client.get("/api/admin/job-runs/", {"name": "fines"}).json()
+        self.assertEqual([(r["name"], r["status"]) for r in body["results"]], [("fines", "ok")])
+        self.assertNotIn("error", body["results"][0])
+        self.assertIsNotNone(body["jobs"]["fines"]["last_success_at"])
+        with self.settings(METRICS_ALLOWED_IPS=["127.0.0.1"], METRICS_JOB_LAG_TTL_S=0):
+            self.assertIn('washmate_job_stale{job="fines"} 0', self.client.get("/metrics").content.decode())
+
+
+_calls = []
+
+
+@task("tests.record")
+def _record(*, value):
+    _calls.append(value)
+
+
+@task("tests.flaky")
+def _flaky(*, fail_times):
+    _calls.append("try")
+    if _calls.count("try") <= fail_times:
+        raise RuntimeError("temporary outage")
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        _calls.clear()
+
+    def test_enqueue_is_part_of_the_callers_transaction(self):
+        try:
+            with transaction.atomic():
+                enqueue("tests.record", {"value": "rolled back"})
+                raise RuntimeError("request failed")
+        except RuntimeError:
+            pass
+        with transaction.atomic():
+            enqueue("tests.record", {"value": "committed"})
+        run_pending()
+        self.assertEqual(_calls, ["committed"])
+
+    def test_dedupe_priority_and_run_at(self):
+        first = enqueue("tests.record", {"value": "a"}, dedupe_key="k")
+        self.assertEqual(enqueue("tests.record", {"value": "dup"}, dedupe_key="k").id, first.id)
+        enqueue("tests.record", {"value": "urgent"}, priority=10)
+        enqueue("tests.record", {"value": "later"}, run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(run_pending(), {"done": 2, "retry": 0, "failed": 0})
+        self.assertEqual(_calls, ["urgent", "a"])
+        # once claimed, the key is free again: new work is queued, not dropped
+        self.assertNotEqual(enqueue("tests.record", {"value": "b"}, dedupe_key="k").id, first.id)
+
+    def test_each_job_is_claimed_once(self):
+        job = enqueue("tests.record", {"value": 1})
+        self.assertEqual([j.id for j in claim("w1")], [job.id])
+        self.assertEqual(claim("w2"), [])
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        job = enqueue("tests.flaky", {"fail_times": 1})
+        with mock.patch("jobs.queue.logger"):
+            self.assertEqual(run_pending(), {"done": 0, "retry": 1, "failed": 0})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (QueuedJob.QUEUED, 1))
+        self.assertIn("temporary outage", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=retry_delay_s(1) - 5))
+
+        QueuedJob.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(run_pending(), {"done": 1, "retry": 0, "failed": 0})
+
+        doomed = enqueue("tests.flaky", {"fail_times": 99}, max_attempts=1)
+        with mock.patch("jobs.queue.logger"):
+            self.assertEqual(run_pending(), {"done": 0, "retry": 0, "failed": 1})
+        self.assertEqual(QueuedJob.objects.get(id=doomed.id).status, QueuedJob.FAILED)
+
+    def test_jobs_of_dead_workers_are_requeued(self):
+        job = enqueue("tests.record", {"value": "x"})
+        claim("dead-worker", lock_s=1)
+        self.assertEqual(requeue_expired(now=timezone.now() + timedelta(seconds=5)), 1)
+        run_pending()
+        self.assertEqual(_calls, ["x"])
+        self.assertEqual(QueuedJob.objects.get(id=job.id).attempts, 2)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import AdminJobRunsView
+
+urlpatterns = [
+    path('job-runs/', AdminJobRunsView.as_view(), name='admin-job-runs'),
+]
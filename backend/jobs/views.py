@@ -0,0 +1,40 @@
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsSuperAdmin
+
+from .models import JobRun
+from .runs import job_lag
+
+
+RUN_FIELDS = (
+    "id", "name", "trigger", "status", "started_at", "finished_at", "duration_ms",
+    "rows_scanned", "rows_created", "rows_updated", "error_count", "lock", "dry_run", "host", "pid",
+)
+
+
+class AdminJobRunsView(APIView):
+    """GET /api/admin/job-runs/?name=fines&status=error&limit=50
+
+    Newest runs first (the traceback and details only with ?full=1), plus
+    job_lag's per-job staleness summary. Tracebacks expose code paths, so
+    this needs a super admin.
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = max(1, min(int(params.get("limit", 50)), 500))
+        except ValueError:
+            return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        qs = JobRun.objects.order_by("-started_at", "-id")
+        if params.get("name"):
+            qs = qs.filter(name=params["name"])
+        if params.get("status"):
+            qs = qs.filter(status=params["status"])
+        fields = RUN_FIELDS + (("error", "details") if params.get("full") in ("1", "true") else ())
+        return Response({"jobs": job_lag()["jobs"], "results": list(qs.values(*fields)[:limit])}, status=status.HTTP_200_OK)
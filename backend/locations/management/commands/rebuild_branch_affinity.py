@@ -0,0 +1,21 @@
+"""
+Recompute the pincode lookup (ZonePincode) and customer->branch affinity rows.
+
+Both are normally kept current by signals on ServiceZone / CustomerAddress / Order.
+Run this after bulk imports or raw SQL changes:
+    python manage.py rebuild_branch_affinity
+"""
+from django.core.management.base import BaseCommand
+
+from jobs.runs import record_run
+from locations.services import rebuild_branch_affinity
+
+
+class Command(BaseCommand):
+    help = "Rebuild zone pincode rows and customer->branch affinity"
+
+    def handle(self, *args, **options):
+        with record_run("branch_affinity", trigger="command") as run:
+            written = rebuild_branch_affinity()
+            run.add(updated=written)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} customer->branch affinity row(s)"))
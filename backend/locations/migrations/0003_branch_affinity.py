@@ -0,0 +1,79 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_affinity(apps, schema_editor):
+    ServiceZone = apps.get_model("locations", "ServiceZone")
+    ZonePincode = apps.get_model("locations", "ZonePincode")
+    CustomerAddress = apps.get_model("locations", "CustomerAddress")
+    CustomerBranchAffinity = apps.get_model("locations", "CustomerBranchAffinity")
+    Order = apps.get_model("orders", "Order")
+
+    branches_by_pin = {}
+    pin_rows = []
+    for z in ServiceZone.objects.all():
+        raw = z.pincodes or []
+        if isinstance(raw, str):
+            raw = [p.strip() for p in raw.replace(";", ",").split(",") if p.strip()]
+        for p in {str(p).strip() for p in raw if str(p).strip()}:
+            pin_rows.append(ZonePincode(zone_id=z.id, branch_id=z.branch_id, pincode=p))
+            branches_by_pin.setdefault(p, set()).add(z.branch_id)
+    ZonePincode.objects.bulk_create(pin_rows, batch_size=1000)
+
+    flags = {}
+    latest_pin = {}
+    for uid, pin in CustomerAddress.objects.order_by("user_id", "id").values_list("user_id", "pincode"):
+        latest_pin[uid] = str(pin or "").strip()
+    for uid, pin in latest_pin.items():
+        for bid in branches_by_pin.get(pin, ()):
+            flags.setdefault((uid, bid), {"via_address": False, "via_orders": False})["via_address"] = True
+    for uid, bid in Order.objects.values_list("user_id", "branch_id").distinct():
+        flags.setdefault((uid, bid), {"via_address": False, "via_orders": False})["via_orders"] = True
+
+    CustomerBranchAffinity.objects.bulk_create(
+        [CustomerBranchAffinity(user_id=uid, branch_id=bid, **f) for (uid, bid), f in flags.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0002_remove_servicezone_pincode_customeraddress_pincode_and_more'),
+        ('orders', '0002_customersummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerBranchAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('via_address', models.BooleanField(default=False)),
+                ('via_orders', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_affinities', to='locations.branch')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_affinities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['branch', 'user'], name='affinity_branch_user_idx')],
+                'unique_together': {('user', 'branch')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ZonePincode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pincode', models.CharField(db_index=True, max_length=10)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='locations.branch')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pincode_rows', to='locations.servicezone')),
+            ],
+            options={
+                'unique_together': {('zone', 'pincode')},
+            },
+        ),
+        migrations.RunPython(backfill_affinity, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from accounts.models import User
 
 
@@ -51,3 +53,52 @@ class CustomerAddress(models.Model):
 
     def __str__(self):
         return f"{self.address_label} - {self.pincode}"
+
+
+class ZonePincode(models.Model):
+    """Indexed pincode -> zone/branch rows mirrored from ServiceZone.pincodes."""
+    zone = models.ForeignKey(ServiceZone, on_delete=models.CASCADE, related_name="pincode_rows")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="+")
+    pincode = models.CharField(max_length=10, db_index=True)
+
+    class Meta:
+        unique_together = ("zone", "pincode")
+
+    def __str__(self):
+        return f"{self.pincode} -> zone {self.zone_id}"
+
+
+class CustomerBranchAffinity(models.Model):
+    """Which branches serve a customer: via their latest address pincode and/or
+    because they already have orders there (see locations/services.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="branch_affinities")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="customer_affinities")
+    via_address = models.BooleanField(default=False)
+    via_orders = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "branch")
+        indexes = [models.Index(fields=["branch", "user"], name="affinity_branch_user_idx")]
+
+    def __str__(self):
+        return f"user {self.user_id} -> branch {self.branch_id}"
+
+
+@receiver(post_save, sender=ServiceZone)
+def _sync_pincodes_on_zone_save(sender, instance, **kwargs):
+    from .services import sync_zone_pincodes
+    sync_zone_pincodes(instance)
+
+
+@receiver(post_delete, sender=ServiceZone)
+def _refresh_affinity_on_zone_delete(sender, instance, **kwargs):
+    from .services import normalize_pincodes, refresh_address_affinity_for_pincodes
+    refresh_address_affinity_for_pincodes(normalize_pincodes(instance.pincodes))
+
+
+@receiver(post_save, sender=CustomerAddress)
+@receiver(post_delete, sender=CustomerAddress)
+def _refresh_affinity_on_address_change(sender, instance, **kwargs):
+    from .services import refresh_address_affinity
+    refresh_address_affinity([instance.user_id])
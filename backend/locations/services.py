@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable, Set
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+
+from .models import Branch, CustomerAddress, CustomerBranchAffinity, ServiceZone, ZonePincode
+
+
+AFFINITY_BATCH_SIZE = 500
+
+
+def normalize_pincodes(raw) -> Set[str]:
+    """ServiceZone.pincodes -> set of clean pincode strings.
+
+    Tolerates legacy/incorrect storage like "682001,682002".
+    """
+    raw = raw or []
+    if isinstance(raw, str):
+        raw = [p.strip() for p in raw.replace(";", ",").split(",") if p.strip()]
+    pincodes = set()
+    if isinstance(raw, (list, tuple)):
+        for p in raw:
+            s = str(p).strip()
+            if s:
+                pincodes.add(s)
+    return pincodes
+
+
+def zones_for_pincode(pincode: str):
+    """Zones of active branches serving pincode, through the indexed ZonePincode rows."""
+    return ServiceZone.objects.filter(
+        id__in=ZonePincode.objects.filter(pincode=pincode, branch__is_active=True).values("zone_id")
+    )
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def sync_zone_pincodes(zone: ServiceZone) -> None:
+    """Mirror zone.pincodes into ZonePincode and refresh affected customers."""
+    new_pins = normalize_pincodes(zone.pincodes)
+    old_rows = list(ZonePincode.objects.filter(zone=zone).values_list("pincode", "branch_id"))
+    old_pins = {p for p, _ in old_rows}
+    branch_moved = any(bid != zone.branch_id for _, bid in old_rows)
+
+    if new_pins == old_pins and not branch_moved:
+        return
+
+    with transaction.atomic():
+        ZonePincode.objects.filter(zone=zone).delete()
+        ZonePincode.objects.bulk_create(
+            [ZonePincode(zone=zone, branch_id=zone.branch_id, pincode=p) for p in sorted(new_pins)]
+        )
+        changed = (old_pins | new_pins) if branch_moved else (old_pins ^ new_pins)
+        refresh_address_affinity_for_pincodes(changed)
+
+
+def refresh_address_affinity_for_pincodes(pincodes: Iterable[str]) -> None:
+    pincodes = list(pincodes)
+    if not pincodes:
+        return
+    user_ids = set(
+        CustomerAddress.objects.filter(pincode__in=pincodes).values_list("user_id", flat=True).distinct()
+    )
+    # customers that currently map to a branch through one of these pincodes
+    user_ids |= set(
+        CustomerBranchAffinity.objects.filter(
+            via_address=True,
+            branch_id__in=ZonePincode.objects.filter(pincode__in=pincodes).values("branch_id"),
+        ).values_list("user_id", flat=True)
+    )
+    refresh_address_affinity(user_ids)
+
+
+def _address_branch_pairs(user_ids) -> Set[tuple]:
+    """(user_id, branch_id) for each user's latest address pincode."""
+    latest_ids = (
+        CustomerAddress.objects.filter(user_id__in=user_ids)
+        .values("user_id")
+        .annotate(latest_id=Max("id"))
+        .values_list("latest_id", flat=True)
+    )
+    latest_pin = {
+        uid: str(pin or "").strip()
+        for uid, pin in CustomerAddress.objects.filter(id__in=list(latest_ids)).values_list("user_id", "pincode")
+    }
+
+    branches_by_pin = defaultdict(set)
+    for pin, bid in ZonePincode.objects.filter(pincode__in=set(latest_pin.values())).values_list("pincode", "branch_id"):
+        branches_by_pin[pin].add(bid)
+
+    return {(uid, bid) for uid, pin in latest_pin.items() for bid in branches_by_pin.get(pin, ())}
+
+
+def refresh_address_affinity(user_ids: Iterable[int]) -> None:
+    """Recompute the address-based affinity rows for the given customers."""
+    user_ids = {uid for uid in user_ids if uid}
+    for chunk in _chunks(sorted(user_ids), AFFINITY_BATCH_SIZE):
+        wanted = _address_branch_pairs(chunk)
+        rows = {
+            (a.user_id, a.branch_id): a
+            for a in CustomerBranchAffinity.objects.filter(user_id__in=chunk)
+        }
+
+        for pair, row in rows.items():
+            if row.via_address and pair not in wanted:
+                if row.via_orders:
+                    CustomerBranchAffinity.objects.filter(id=row.id).update(via_address=False)
+                else:
+                    CustomerBranchAffinity.objects.filter(id=row.id).delete()
+            elif not row.via_address and pair in wanted:
+                CustomerBranchAffinity.objects.filter(id=row.id).update(via_address=True)
+
+        CustomerBranchAffinity.objects.bulk_create(
+            [
+                CustomerBranchAffinity(user_id=uid, branch_id=bid, via_address=True)
+                for uid, bid in sorted(wanted - set(rows))
+            ]
+        )
+
+
+def mark_order_affinity(user_id, branch_id) -> None:
+    """Customer has (at least) one order in branch."""
+    if not user_id or not branch_id:
+        return
+    row, created = CustomerBranchAffinity.objects.get_or_create(
+        user_id=user_id, branch_id=branch_id, defaults={"via_orders": True}
+    )
+    if not created and not row.via_orders:
+        CustomerBranchAffinity.objects.filter(id=row.id).update(via_orders=True)
+
+
+def unmark_order_affinity(user_id, branch_id) -> None:
+    """Called after an order is deleted; drops via_orders if it was the last one."""
+    from orders.models import ArchivedOrder, Order  # orders.models imports this app
+
+    if Order.objects.filter(user_id=user_id, branch_id=branch_id).exists():
+        return
+    if ArchivedOrder.objects.filter(user_id=user_id, branch_id=branch_id).exists():
+        return
+    CustomerBranchAffinity.objects.filter(
+        user_id=user_id, branch_id=branch_id, via_orders=True, via_address=False
+    ).delete()
+    CustomerBranchAffinity.objects.filter(user_id=user_id, branch_id=branch_id, via_orders=True).update(
+        via_orders=False
+    )
+
+
+def drop_stale_order_affinity(user_ids: Iterable[int]) -> None:
+    """unmark_order_affinity for many customers after a bulk order delete."""
+    from orders.models import ArchivedOrder, Order
+
+    user_ids = {uid for uid in user_ids if uid}
+    for chunk in _chunks(sorted(user_ids), AFFINITY_BATCH_SIZE):
+        stale = CustomerBranchAffinity.objects.filter(user_id__in=chunk, via_orders=True).filter(
+            ~Exists(Order.objects.filter(user_id=OuterRef("user_id"), branch_id=OuterRef("branch_id"))),
+            ~Exists(ArchivedOrder.objects.filter(user_id=OuterRef("user_id"), branch_id=OuterRef("branch_id"))),
+        )
+        stale.filter(via_address=False).delete()
+        stale.update(via_orders=False)
+
+
+def customer_branch_id(user_id):
+    """Reporting branch for a customer: branch of their latest order, else the
+    branch serving their latest address."""
+    from orders.models import Order
+
+    if not user_id:
+        return None
+    return (
+        Order.objects.filter(user_id=user_id).order_by("-id").values_list("branch_id", flat=True).first()
+        or CustomerBranchAffinity.objects.filter(user_id=user_id, via_address=True)
+        .order_by("id")
+        .values_list("branch_id", flat=True)
+        .first()
+    )
+
+
+def rebuild_branch_affinity() -> int:
+    """Recompute ZonePincode and CustomerBranchAffinity from scratch.
+
+    Returns number of affinity rows written.
+    """
+    from orders.models import ArchivedOrder, Order
+
+    with transaction.atomic():
+        ZonePincode.objects.all().delete()
+        ZonePincode.objects.bulk_create(
+            [
+                ZonePincode(zone_id=z.id, branch_id=z.branch_id, pincode=p)
+                for z in ServiceZone.objects.only("id", "branch_id", "pincodes")
+                for p in sorted(normalize_pincodes(z.pincodes))
+            ],
+            batch_size=1000,
+        )
+
+        flags = defaultdict(lambda: {"via_address": False, "via_orders": False})
+        customer_ids = CustomerAddress.objects.values_list("user_id", flat=True).distinct()
+        for chunk in _chunks(customer_ids, AFFINITY_BATCH_SIZE):
+            for pair in _address_branch_pairs(chunk):
+                flags[pair]["via_address"] = True
+        for pair in Order.objects.values_list("user_id", "branch_id").distinct():
+            flags[pair]["via_orders"] = True
+        # archived orders count too, unless their branch has been deleted since
+        for pair in (
+            ArchivedOrder.objects.filter(branch_id__in=Branch.objects.values("id"))
+            .values_list("user_id", "branch_id")
+            .distinct()
+        ):
+            flags[pair]["via_orders"] = True
+
+        CustomerBranchAffinity.objects.all().delete()
+        CustomerBranchAffinity.objects.bulk_create(
+            [CustomerBranchAffinity(user_id=uid, branch_id=bid, **f) for (uid, bid), f in sorted(flags.items())],
+            batch_size=1000,
+        )
+    return len(flags)
@@ -1,2 +1,107 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
-# ...add tests later...
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from branch_management.models import BranchManager
+from locations.models import City, Branch, ServiceZone, CustomerAddress, CustomerBranchAffinity
+from locations.services import rebuild_branch_affinity
+from orders.models import Order
+from payments.models import Payment
+from subscriptions.models import SubscriptionPlan, CustomerSubscription
+
+
+class CustomerBranchAffinityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        city = City.objects.create(name="AffinityCity", state="AC")
+        self.branch = self._branch(city, "North", ["682001", "682002"])
+        self.other = self._branch(city, "South", ["690001"])
+        self.manager = User.objects.create_user(
+            email="mgr@example.com", password="pass12345", full_name="Manager", phone="9100000000",
+            role=User.Role.BRANCH_MANAGER, is_active=True, is_approved=True,
+        )
+        BranchManager.objects.create(user=self.manager, branch=self.branch)
+        self.plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        self.today = timezone.localdate()
+
+    def _branch(self, city, name, pincodes):
+        branch = Branch.objects.create(
+            city=city, branch_name=name, address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        ServiceZone.objects.create(branch=branch, zone_name=f"{name} zone", pincodes=pincodes)
+        return branch
+
+    def _subscriber(self, n, pincode):
+        user = User.objects.create_user(
+            email=f"sub{n}@example.com", password="pass12345", full_name=f"Sub {n}", phone=f"92000000{n:02d}",
+            role=User.Role.CUSTOMER, is_active=True, is_approved=True,
+        )
+        address = CustomerAddress.objects.create(
+            user=user, address_label="Home", full_address="Home", pincode=pincode,
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        sub = CustomerSubscription.objects.create(
+            user=user, plan=self.plan, preferred_pickup_shift="morning",
+            start_date=self.today, end_date=self.today + timedelta(days=30),
+        )
+        Payment.objects.create(
+            user=user, subscription=sub, amount=Decimal("199.00"), payment_type="monthly",
+            payment_status="pending", due_date=self.today + timedelta(days=4),
+        )
+        return user, address
+
+    def _branch_user_ids(self):
+        return set(
+            CustomerBranchAffinity.objects.filter(branch=self.branch).values_list("user_id", flat=True)
+        )
+
+    def test_address_zone_and_order_writes_maintain_affinity(self):
+        local, _ = self._subscriber(1, "682001")
+        moved, moved_addr = self._subscriber(2, "690001")
+        self.assertEqual(self._branch_user_ids(), {local.id})
+
+        # latest address wins
+        CustomerAddress.objects.create(
+            user=moved, address_label="New", full_address="New", pincode="682002",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.assertEqual(self._branch_user_ids(), {local.id, moved.id})
+
+        # zone edits re-evaluate customers on the changed pincodes
+        zone = ServiceZone.objects.get(branch=self.branch)
+        zone.pincodes = ["682001"]
+        zone.save(update_fields=["pincodes"])
+        self.assertEqual(self._branch_user_ids(), {local.id})
+
+        # an order in the branch keeps the customer attached regardless of address
+        Order.objects.create(
+            user=moved, branch=self.branch, address=moved_addr, order_type="monthly",
+            pickup_shift="morning", pickup_date=self.today,
+        )
+        self.assertEqual(self._branch_user_ids(), {local.id, moved.id})
+
+        expected = set(CustomerBranchAffinity.objects.values_list("user_id", "branch_id", "via_address", "via_orders"))
+        rebuild_branch_affinity()
+        self.assertEqual(
+            set(CustomerBranchAffinity.objects.values_list("user_id", "branch_id", "via_address", "via_orders")),
+            expected,
+        )
+
+    def test_manager_views_use_affinity(self):
+        local, _ = self._subscriber(1, "682001")
+        self._subscriber(2, "690001")
+
+        self.client.force_authenticate(user=self.manager)
+        res = self.client.get("/api/manager/monthly-payments/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([r["user"] for r in res.data], [local.full_name])
+
+        res = self.client.get("/api/manager/subscriptions/")
+        self.assertEqual([c["user_id"] for c in res.data["customers"]], [local.id])
@@ -1,12 +1,14 @@
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework import status
-from .models import City, Branch, ServiceZone, CustomerAddress
+from .models import City, Branch, CustomerAddress
 from .serializers import CitySerializer, BranchSerializer, ServiceZoneSerializer, CustomerAddressSerializer
+from .services import zones_for_pincode
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from accounts.models import User
+from orders.deletion import delete_branch, delete_city
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
     def enforce_csrf(self, request):
@@ -43,7 +45,7 @@ class AdminCityViewSet(viewsets.ViewSet):
             city = City.objects.get(id=pk)
         except City.DoesNotExist:
             return Response({"detail": "City not found"}, status=status.HTTP_404_NOT_FOUND)
-        city.delete()
+        delete_city(city)  # CHANGED: set-based cascade (orders/deletion.py)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 class AdminBranchViewSet(viewsets.ViewSet):
@@ -139,7 +141,7 @@ class AdminBranchViewSet(viewsets.ViewSet):
             branch = Branch.objects.get(id=pk)
         except Branch.DoesNotExist:
             return Response({"detail": "Branch not found"}, status=status.HTTP_404_NOT_FOUND)
-        branch.delete()
+        delete_branch(branch)  # CHANGED: set-based cascade (orders/deletion.py)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 class CustomerProfileView(APIView):
@@ -337,10 +339,7 @@ class CustomerAvailableBranchesView(APIView):
         if not pincode:
             return Response({"detail": "pincode not found"}, status=status.HTTP_400_BAD_REQUEST)
 
-        zones = ServiceZone.objects.select_related("branch", "branch__city").filter(
-            pincodes__contains=[pincode],
-            branch__is_active=True,
-        )
+        zones = zones_for_pincode(pincode).select_related("branch", "branch__city")
         seen = set()
         data = []
         for z in zones:
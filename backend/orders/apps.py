@@ -4,12 +4,16 @@ from django.apps import AppConfig
 import os
 import sys
 import threading
+import logging
 import time as _time
 from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
 
 
+logger = logging.getLogger(__name__)
+
+
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
@@ -25,17 +29,25 @@ class OrdersConfig(AppConfig):
         if settings.DEBUG and os.environ.get("RUN_MAIN") != "true":
             return
 
+        # NEW: jobs owned by `manage.py run_scheduler` instead
+        if not getattr(settings, "RUN_JOBS_IN_WEB_WORKERS", False):
+            return
+
         # NEW: on-startup catch-up (covers "server was down at 12 AM" case)
         if getattr(settings, "ENABLE_MONTHLY_ORDER_STARTUP_CATCHUP", True):
             def _startup_catchup():
                 try:
                     # Import lazily to avoid circular import at startup
+                    from jobs.runs import record_run
                     from . import views as order_views
                     fn = getattr(order_views, "_ensure_monthly_orders_for_all", None)
                     if callable(fn):
                         # CHANGED: only ensure TODAY (avoid generating tomorrow)
-                        fn(for_date=timezone.localdate(), lock_timeout_s=1)
+                        with record_run("monthly_orders", trigger="web_thread"):
+                            fn(for_date=timezone.localdate(), lock_timeout_s=1)
                 except Exception:
+                    # CHANGED: logged (and recorded as a failed JobRun) instead of swallowed
+                    logger.exception("monthly order startup catch-up failed")
                     _time.sleep(1)
 
             threading.Thread(target=_startup_catchup, name="monthly-order-startup-catchup", daemon=True).start()
@@ -54,12 +66,15 @@ class OrdersConfig(AppConfig):
                     sleep_s = max(1, int((next_midnight - now_local).total_seconds()))
                     _time.sleep(sleep_s)
 
+                    from jobs.runs import record_run
                     from . import views as order_views
                     fn = getattr(order_views, "_ensure_monthly_orders_for_all", None)
                     if callable(fn):
                         # CHANGED: only generate for the new day (today at runtime)
-                        fn(for_date=timezone.localdate(), lock_timeout_s=5)
+                        with record_run("monthly_orders", trigger="web_thread"):
+                            fn(for_date=timezone.localdate(), lock_timeout_s=5)
                 except Exception:
+                    logger.exception("monthly order midnight job failed")
                     _time.sleep(60)
 
         threading.Thread(target=_job_loop, name="monthly-order-midnight-job", daemon=True).start()
@@ -0,0 +1,135 @@
+"""Cold storage for finished orders (`manage.py archive_orders`).
+
+Delivered/cancelled orders picked up before a cutoff, and with no unpaid
+payment, are moved with their status logs, weight, payments and fines into
+the Archived* tables (orders/models.py, payments/models.py), keeping their ids:
+
+    archive_orders(before=date(2026, 1, 1), batch_size=500)
+
+- Each batch is copied and deleted in one transaction, so a row is always in
+  exactly one of the two tables.
+- Progress is kept in ArchiveCheckpoint. An interrupted pass resumes after the
+  last archived id with its original cutoff; the checkpoint is removed when
+  the pass completes.
+- Rows are moved without signals: rollups keep counting archived rows (they
+  are history; rebuild_*_rollups read both tables), and CustomerSummary is
+  unaffected because archived orders are finished and their payments paid.
+- Customer history endpoints read both tables (see orders/views.py and
+  payments/views.py).
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Callable, Optional
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from payments.models import ArchivedPayment, ArchivedPaymentFine, Payment, PaymentFine
+
+from .deletion import _raw_delete
+from .models import (
+    ArchiveCheckpoint,
+    ArchivedOrder,
+    ArchivedOrderStatusLog,
+    ArchivedOrderWeight,
+    CustomerSummary,
+    Order,
+    OrderStatusLog,
+    OrderWeight,
+)
+
+
+ARCHIVABLE_STATUSES = ("delivered", "cancelled")
+ARCHIVE_LEASE = "washmate:archive_orders"
+CHECKPOINT_NAME = "orders"
+DEFAULT_BATCH_SIZE = 500
+
+
+def archivable_orders(*, before: date):
+    """Finished orders picked up before `before` whose payments (if any) are all paid."""
+    unpaid = Payment.objects.filter(order_id=OuterRef("id")).exclude(payment_status="paid")
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, pickup_date__lt=before).filter(~Exists(unpaid))
+
+
+def _copy(qs, archive_model) -> int:
+    """INSERT the rows of qs into archive_model (same column names, same ids)."""
+    fields = [f.attname for f in qs.model._meta.concrete_fields]
+    rows = [archive_model(**values) for values in qs.values(*fields)]
+    archive_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _archive_batch(order_ids, *, before: date) -> tuple:
+    """Move one batch; call inside transaction.atomic(). Returns (orders, payments) moved."""
+    # re-check under row locks: an order may have changed since it was listed
+    ids = list(
+        archivable_orders(before=before).select_for_update().filter(id__in=order_ids).values_list("id", flat=True)
+    )
+    if not ids:
+        return 0, 0
+    payment_ids = list(Payment.objects.filter(order_id__in=ids).values_list("id", flat=True))
+
+    moved = _copy(Order.objects.filter(id__in=ids), ArchivedOrder)
+    _copy(OrderWeight.objects.filter(order_id__in=ids), ArchivedOrderWeight)
+    _copy(OrderStatusLog.objects.filter(order_id__in=ids), ArchivedOrderStatusLog)
+    payments = _copy(Payment.objects.filter(id__in=payment_ids), ArchivedPayment)
+    _copy(PaymentFine.objects.filter(payment_id__in=payment_ids), ArchivedPaymentFine)
+
+    _raw_delete(PaymentFine.objects.filter(payment_id__in=payment_ids))
+    _raw_delete(Payment.objects.filter(id__in=payment_ids))
+    _raw_delete(OrderWeight.objects.filter(order_id__in=ids))
+    _raw_delete(OrderStatusLog.objects.filter(order_id__in=ids))
+    CustomerSummary.objects.filter(today_order_id__in=ids).update(today_order=None)
+    _raw_delete(Order.objects.filter(id__in=ids))
+    return moved, payments
+
+
+def archive_orders(
+    *,
+    before: date,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    restart: bool = False,
+    on_batch: Optional[Callable[[ArchiveCheckpoint], None]] = None,
+) -> Optional[dict]:
+    """Run (or resume) an archive pass; see the module docstring.
+
+    Returns {"cutoff", "orders", "payments", "batches", "done"} for this run,
+    or None if another process is archiving (ARCHIVE_LEASE is held).
+    """
+    from jobs.leases import lease
+
+    with lease(ARCHIVE_LEASE, ttl_s=120) as got:
+        if not got:
+            return None
+
+        if restart:
+            ArchiveCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+        checkpoint, _ = ArchiveCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME, defaults={"cutoff": before})
+        stats = {"cutoff": checkpoint.cutoff, "orders": 0, "payments": 0, "batches": 0, "done": False}
+
+        while max_batches is None or stats["batches"] < max_batches:
+            if got.lost:
+                break
+            ids = list(
+                archivable_orders(before=checkpoint.cutoff)
+                .filter(id__gt=checkpoint.last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                checkpoint.delete()
+                stats["done"] = True
+                break
+            with transaction.atomic():
+                orders, payments = _archive_batch(ids, before=checkpoint.cutoff)
+                checkpoint.last_id = ids[-1]
+                checkpoint.moved += orders
+                checkpoint.save(update_fields=["last_id", "moved", "updated_at"])
+            stats["orders"] += orders
+            stats["payments"] += payments
+            stats["batches"] += 1
+            if on_batch:
+                on_batch(checkpoint)
+        return stats
@@ -0,0 +1,105 @@
+"""Async twins of the hot order read endpoints (see core/async_views.py)."""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from branch_management.models import DeliveryStaff
+from core.async_views import AsyncSessionView, json_response
+from payments.models import ArchivedPayment, Payment
+from subscriptions.models import CustomerSubscription
+
+from .models import CustomerSummary, Order
+from .services import refresh_customer_summary
+from .views import (
+    _archived_customer_orders,
+    _customer_order_row,
+    _customer_overview_payload,
+    _delivery_order_row,
+    _ensure_monthly_orders_once_per_process_per_day,
+    _newest_first,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDeliveryOrdersView(AsyncSessionView):
+    async def get(self, request):
+        user = request.user
+        if user.role != "delivery_staff":
+            return json_response(
+                {"detail": f"Access denied. Your role is '{user.role}', not 'delivery_staff'."}, status=403
+            )
+        staff = await DeliveryStaff.objects.filter(user=user).afirst()
+        if staff is None:
+            return json_response(
+                {"detail": "No delivery staff profile found. Please contact your branch manager."}, status=403
+            )
+
+        try:
+            await sync_to_async(_ensure_monthly_orders_once_per_process_per_day)()
+        except Exception:
+            logger.exception("could not enqueue today's monthly order generation")
+
+        qs = (
+            Order.objects.select_related("user", "address", "branch")
+            .filter(delivery_staff=staff)
+            .order_by("pickup_date")
+        )
+        status_filter = request.GET.get("status")
+        if status_filter:
+            qs = qs.filter(status=status_filter)
+        order_type = request.GET.get("order_type")
+        if order_type in {"demand", "monthly"}:
+            qs = qs.filter(order_type=order_type)
+
+        return json_response([_delivery_order_row(o) async for o in qs])
+
+
+class AsyncCustomerOverviewView(AsyncSessionView):
+    async def get(self, request):
+        today = timezone.localdate()
+        summary = await CustomerSummary.objects.select_related("today_order").filter(user=request.user).afirst()
+        if summary is None or summary.today_order_date != today:
+            summary = await sync_to_async(refresh_customer_summary)(request.user.id, today=today)
+        return json_response(_customer_overview_payload(summary))
+
+
+class AsyncCustomerOrdersView(AsyncSessionView):
+    async def get(self, request):
+        from .tasks import enqueue_todays_order
+
+        user = request.user
+        status_filter = request.GET.get("status")
+
+        orders = (
+            Order.objects.select_related("branch", "address")
+            .filter(user=user, order_type="demand")
+            .order_by("-created_at")
+        )
+        # filtered the same way as the orders, so payments need not wait for the order ids
+        payments = Payment.objects.filter(order__user=user, order__order_type="demand")
+        archived = _archived_customer_orders(user, status_filter)
+        archived_payments = ArchivedPayment.objects.filter(order__user=user, order__order_type="demand")
+        if status_filter:
+            orders = orders.filter(status=status_filter)
+            payments = payments.filter(order__status=status_filter)
+            archived_payments = archived_payments.filter(order__status=status_filter)
+
+        async def _ensure_todays_order():
+            sub = await CustomerSubscription.objects.filter(user=user, is_active=True).afirst()
+            await sync_to_async(enqueue_todays_order)(sub)
+
+        async def _rows(qs):
+            return [o async for o in qs]
+
+        # gather() does not overlap the queries: each async ORM call runs through
+        # sync_to_async(thread_sensitive=True), i.e. one at a time on the same thread
+        _, live, archived_rows, payment_rows, archived_payment_rows = await asyncio.gather(
+            _ensure_todays_order(), _rows(orders), _rows(archived), _rows(payments), _rows(archived_payments)
+        )
+        payment_map = {p.order_id: p for p in [*payment_rows, *archived_payment_rows]}
+        return json_response(
+            [_customer_order_row(o, payment_map.get(o.id)) for o in _newest_first(live, archived_rows)]
+        )
@@ -0,0 +1,151 @@
+"""Set-based deletes for parents with many orders (branches, cities, customers).
+
+Deleting a Branch/City/User through the ORM cascades into its orders, and the
+collector then runs every per-order signal (Payment delete, summary refresh,
+affinity, rollups): several queries per order. These helpers first remove the
+dependent rows with a handful of DELETE/UPDATE statements and fix the derived
+tables (rollups, CustomerSummary, CustomerBranchAffinity) in bulk, so the
+parent's own delete() finds no orders left to cascade into:
+
+    delete_branch(branch)     # AdminBranchViewSet.destroy
+    delete_city(city)         # AdminCityViewSet.destroy
+    delete_user(user)         # shell / scripts (also drops the user's archived history)
+
+Payments and subscriptions attributed to a deleted branch without going
+through its orders (monthly payments, Payment.branch / CustomerSubscription.branch)
+are kept with branch NULL, and their rollups move to the branch-less buckets.
+
+Single-order deletes (order.delete()) still go through the signals.
+"""
+from __future__ import annotations
+
+from django.db import transaction
+
+from analytics.services import (
+    ORDER_ROLLUP_FIELDS,
+    PAYMENT_ROLLUP_FIELDS,
+    SUBSCRIPTION_ROLLUP_FIELDS,
+    order_day,
+    remove_from_rollups,
+    unassign_branch_in_rollups,
+)
+from locations.services import drop_stale_order_affinity
+from payments.models import ArchivedPayment, ArchivedPaymentFine, Payment, PaymentFine
+from subscriptions.models import CustomerSubscription
+
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderStatusLog,
+    ArchivedOrderWeight,
+    CustomerSummary,
+    Order,
+    OrderStatusLog,
+    OrderWeight,
+)
+from .services import refresh_customer_summaries
+
+
+def _raw_delete(qs) -> int:
+    """One DELETE statement; no rows are loaded and no signals are sent.
+
+    qs must filter its own table directly (MySQL rejects DELETE ... WHERE id IN
+    (SELECT ... FROM the same table)).
+    """
+    return qs._raw_delete(qs.db)
+
+
+def _fine_states(fines):
+    return (
+        {"day": order_day(row["calculated_at"]), "branch_id": row["payment__branch_id"],
+         "fine_amount": row["fine_amount"]}
+        for row in fines.values("calculated_at", "payment__branch_id", "fine_amount").order_by().iterator()
+    )
+
+
+def delete_payments(payments, *, refresh: bool = True) -> int:
+    """Delete a Payment queryset and its fines; returns number of payments deleted."""
+    payment_ids = payments.values("id")
+    fines = PaymentFine.objects.filter(payment_id__in=payment_ids)
+    remove_from_rollups(
+        payments=payments.values(*PAYMENT_ROLLUP_FIELDS).order_by().iterator(),
+        fines=_fine_states(fines),
+    )
+    user_ids = set(payments.values_list("user_id", flat=True).distinct()) if refresh else ()
+
+    _raw_delete(fines)
+    deleted = _raw_delete(payments)
+
+    if refresh:
+        refresh_customer_summaries(user_ids)
+    return deleted
+
+
+def delete_orders(orders, *, refresh: bool = True) -> int:
+    """Delete an Order queryset with its payments, fines, weights and status logs.
+
+    refresh=False skips the CustomerSummary/affinity updates (the customers
+    themselves are being deleted). Returns number of orders deleted.
+    """
+    order_ids = orders.values("id")
+    user_ids = set(orders.values_list("user_id", flat=True).distinct()) if refresh else ()
+
+    # what the per-order pre_delete signal does, for all orders at once
+    delete_payments(Payment.objects.filter(order_id__in=order_ids), refresh=False)
+    remove_from_rollups(orders=orders.values(*ORDER_ROLLUP_FIELDS).order_by().iterator())
+
+    OrderWeight.objects.filter(order_id__in=order_ids).delete()
+    OrderStatusLog.objects.filter(order_id__in=order_ids).delete()
+    CustomerSummary.objects.filter(today_order_id__in=order_ids).update(today_order=None)
+    deleted = _raw_delete(orders)
+
+    if refresh:
+        refresh_customer_summaries(user_ids)
+        drop_stale_order_affinity(user_ids)
+    return deleted
+
+
+def _unassign_branches(branch_ids) -> None:
+    """What the SET_NULL cascades on Payment.branch / CustomerSubscription.branch
+    do, plus the rollup moves their missing signals would have made."""
+    payments = Payment.objects.filter(branch_id__in=branch_ids)
+    subscriptions = CustomerSubscription.objects.filter(branch_id__in=branch_ids)
+    unassign_branch_in_rollups(
+        payments=payments.values(*PAYMENT_ROLLUP_FIELDS).order_by().iterator(),
+        subscriptions=subscriptions.values(*SUBSCRIPTION_ROLLUP_FIELDS).order_by().iterator(),
+        fines=_fine_states(PaymentFine.objects.filter(payment__branch_id__in=branch_ids)),
+    )
+    payments.update(branch=None)
+    subscriptions.update(branch=None)
+
+
+def delete_branch(branch):
+    with transaction.atomic():
+        delete_orders(Order.objects.filter(branch=branch))
+        _unassign_branches([branch.id])
+        return branch.delete()
+
+
+def delete_city(city):
+    with transaction.atomic():
+        delete_orders(Order.objects.filter(branch__city=city))
+        _unassign_branches(list(city.branch_set.values_list("id", flat=True)))
+        return city.delete()
+
+
+def delete_user(user):
+    with transaction.atomic():
+        delete_orders(Order.objects.filter(user=user), refresh=False)
+        delete_payments(Payment.objects.filter(user=user), refresh=False)
+        _delete_archived_history(user)
+        return user.delete()
+
+
+def _delete_archived_history(user):
+    """Archive rows (orders/archive.py) have no FK constraints, so nothing cascades to them."""
+    order_ids = ArchivedOrder.objects.filter(user=user).values("id")
+    payment_ids = ArchivedPayment.objects.filter(user=user).values("id")
+    _raw_delete(ArchivedPaymentFine.objects.filter(payment_id__in=payment_ids))
+    _raw_delete(ArchivedPayment.objects.filter(user=user))
+    _raw_delete(ArchivedOrderWeight.objects.filter(order_id__in=order_ids))
+    _raw_delete(ArchivedOrderStatusLog.objects.filter(order_id__in=order_ids))
+    _raw_delete(ArchivedOrder.objects.filter(user=user))
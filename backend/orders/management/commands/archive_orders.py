@@ -0,0 +1,73 @@
+"""
+Move finished orders out of the hot tables (see orders/archive.py).
+
+Delivered/cancelled orders picked up more than --older-than days ago, with
+their status logs, weights, paid payments and fines, go to the archive tables
+in batches of --batch-size, one transaction per batch:
+
+    python manage.py archive_orders --older-than 180
+    python manage.py archive_orders --older-than 180 --max-batches 20   # stop early; rerun resumes
+    python manage.py archive_orders --older-than 180 --dry-run          # count only
+
+An interrupted run resumes from its checkpoint (with the cutoff it started
+with); --restart discards the checkpoint and starts a new pass.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from jobs.runs import record_run
+from orders.archive import CHECKPOINT_NAME, DEFAULT_BATCH_SIZE, archivable_orders, archive_orders
+from orders.models import ArchiveCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Archive delivered/cancelled orders older than N days (batched, resumable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, required=True, help="Archive orders picked up more than N days ago")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after N batches (resume later)")
+        parser.add_argument("--restart", action="store_true", help="Ignore an unfinished pass and start over")
+        parser.add_argument("--dry-run", action="store_true", help="Only count archivable orders")
+
+    def handle(self, *args, **options):
+        if options["older_than"] < 1:
+            raise CommandError("--older-than must be >= 1")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be >= 1")
+        before = timezone.localdate() - timedelta(days=options["older_than"])
+
+        if options["dry_run"]:
+            n = archivable_orders(before=before).count()
+            self.stdout.write(self.style.SUCCESS(f"Would archive {n} order(s) picked up before {before}"))
+            return
+
+        pending = ArchiveCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+        if pending and not options["restart"]:
+            self.stdout.write(
+                f"Resuming pass for orders before {pending.cutoff} after id {pending.last_id} "
+                f"({pending.moved} archived so far)"
+            )
+
+        with record_run("archive_orders", trigger="command") as run:
+            stats = archive_orders(
+                before=before,
+                batch_size=options["batch_size"],
+                max_batches=options["max_batches"],
+                restart=options["restart"],
+                on_batch=lambda cp: self.stdout.write(f"  ... up to id {cp.last_id}, {cp.moved} archived"),
+            )
+            run.lock_outcome(stats is not None)
+            if stats is not None:
+                run.add(created=stats["orders"] + stats["payments"])
+                run.details.update(batches=stats["batches"], done=stats["done"], cutoff=str(stats["cutoff"]))
+        if stats is None:
+            raise CommandError("another archive_orders run holds the lease")
+
+        state = "complete" if stats["done"] else "paused (rerun to resume)"
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {stats['orders']} order(s) and {stats['payments']} payment(s) picked up before "
+            f"{stats['cutoff']} in {stats['batches']} batch(es); pass {state}"
+        ))
@@ -24,11 +24,13 @@ from django.utils import timezone
 
 from subscriptions.models import CustomerSubscription, SubscriptionSkipDay
 from orders.models import Order
-from locations.models import CustomerAddress, ServiceZone
+from locations.models import CustomerAddress
+from locations.services import zones_for_pincode
 from branch_management.models import DeliveryStaff
 
 # CHANGED: import the shared generator used by server startup/midnight jobs
 from orders.views import _ensure_monthly_orders_for_all
+from jobs.runs import record_run
 
 
 def _resolve_branch_and_staff_for_user(user):
@@ -37,10 +39,7 @@ def _resolve_branch_and_staff_for_user(user):
         return None, None, None
 
     pincode = str(addr.pincode).strip()
-    zone = ServiceZone.objects.select_related("branch").filter(
-        pincodes__contains=[pincode],
-        branch__is_active=True,
-    ).first()
+    zone = zones_for_pincode(pincode).select_related("branch").first()
     branch = zone.branch if zone else None
     if not branch:
         return None, None, None
@@ -75,6 +74,11 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        # NEW: recorded in the JobRun ledger as a monthly_orders run
+        with record_run("monthly_orders", trigger="command"):
+            self._handle(options)
+
+    def _handle(self, options):
         raw_date = (options.get("date") or "").strip()
         days_ahead_opt = options.get("days_ahead")
 
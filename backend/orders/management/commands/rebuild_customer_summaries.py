@@ -0,0 +1,43 @@
+"""
+Recompute CustomerSummary rows (customer dashboard counters) from source tables.
+
+Summaries are normally kept current by signals on Order / Payment / CustomerSubscription.
+Run this after bulk imports, raw SQL fixes or anything else that bypasses signals:
+    python manage.py rebuild_customer_summaries
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.runs import record_run
+from orders.services import rebuild_customer_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute all customer summary rows (overview counters)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=str,
+            default="",
+            help="Local date used for today's monthly order (YYYY-MM-DD). Default: today",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        raw_date = (options.get("date") or "").strip()
+        if raw_date:
+            try:
+                today = date.fromisoformat(raw_date)
+            except Exception:
+                self.stderr.write("Invalid --date. Use YYYY-MM-DD.")
+                return
+        else:
+            today = timezone.localdate()
+
+        with record_run("customer_summaries", trigger="command") as run:
+            written = rebuild_customer_summaries(today=today, batch_size=options["batch_size"])
+            run.add(updated=written)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} customer summary row(s) for {today}"))
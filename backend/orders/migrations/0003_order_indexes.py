@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branch_management', '0001_initial'),
+        ('locations', '0003_branch_affinity'),
+        ('orders', '0002_customersummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'order_type', 'pickup_date'], name='order_user_type_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['delivery_staff', 'pickup_date'], name='order_staff_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['branch', 'created_at'], name='order_branch_created_idx'),
+        ),
+    ]
@@ -2,8 +2,9 @@ from django.db import models
 from accounts.models import User
 from locations.models import Branch, CustomerAddress
 from branch_management.models import DeliveryStaff
+from subscriptions.models import CustomerSubscription
 
-from django.db.models.signals import pre_delete  # NEW
+from django.db.models.signals import pre_delete, post_save, post_delete  # NEW
 from django.dispatch import receiver  # NEW
 
 
@@ -35,6 +36,16 @@ class Order(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # customer order lists, today's-order checks and monthly generation
+            models.Index(fields=["user", "order_type", "pickup_date"], name="order_user_type_pickup_idx"),
+            # delivery staff order list (ordered by pickup_date)
+            models.Index(fields=["delivery_staff", "pickup_date"], name="order_staff_pickup_idx"),
+            # manager order list and per-branch reporting
+            models.Index(fields=["branch", "created_at"], name="order_branch_created_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.id}"
 
@@ -46,6 +57,33 @@ def _delete_payments_for_deleted_order(sender, instance, using, **kwargs):
     Payment.objects.using(using).filter(order=instance).delete()
 
 
+@receiver(post_save, sender=Order)
+def _refresh_summary_on_order_save(sender, instance, **kwargs):
+    from .services import refresh_customer_summary
+    refresh_customer_summary(instance.user_id)
+
+
+@receiver(post_save, sender=Order)
+def _mark_branch_affinity_on_order_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and "branch" not in update_fields:
+        return
+    from locations.services import mark_order_affinity
+    mark_order_affinity(instance.user_id, instance.branch_id)
+
+
+@receiver(post_delete, sender=Order)
+def _refresh_summary_on_order_delete(sender, instance, **kwargs):
+    from .services import refresh_customer_summary
+    # update-only: the user itself may be part of the same cascade
+    refresh_customer_summary(instance.user_id, create=False)
+
+
+@receiver(post_delete, sender=Order)
+def _unmark_branch_affinity_on_order_delete(sender, instance, **kwargs):
+    from locations.services import unmark_order_affinity
+    unmark_order_affinity(instance.user_id, instance.branch_id)
+
+
 class OrderWeight(models.Model):
     order = models.OneToOneField(Order, on_delete=models.CASCADE)
     weight_kg = models.DecimalField(max_digits=6, decimal_places=2)
@@ -58,3 +96,87 @@ class OrderStatusLog(models.Model):
     status = models.CharField(max_length=20)
     changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     changed_at = models.DateTimeField(auto_now_add=True)
+
+
+class CustomerSummary(models.Model):
+    """Per-customer dashboard counters, kept current by signals in
+    orders/payments/subscriptions (see orders/services.py)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    active_orders = models.PositiveIntegerField(default=0)
+    pending_payments = models.PositiveIntegerField(default=0)
+    outstanding_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    active_subscription = models.ForeignKey(
+        CustomerSubscription, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    # today's monthly order; only valid while today_order_date is the current local date
+    today_order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    today_order_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary for user {self.user_id}"
+
+
+# --- cold storage (orders/archive.py, `manage.py archive_orders`) ---------------
+# Delivered/cancelled orders past the retention window are moved here with their
+# logs, weights and (paid) payments. Rows keep their original ids; references
+# are plain columns without DB constraints so archived history survives deletes
+# of addresses, staff and branches.
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    branch = models.ForeignKey(
+        Branch, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    address = models.ForeignKey(
+        CustomerAddress, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    delivery_staff = models.ForeignKey(
+        DeliveryStaff, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    order_type = models.CharField(max_length=10, choices=Order.ORDER_TYPE_CHOICES)
+    pickup_shift = models.CharField(max_length=10)
+    pickup_date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "order_type", "created_at"], name="arch_order_user_type_idx")]
+
+    def __str__(self):
+        return f"Archived order #{self.id}"
+
+
+class ArchivedOrderWeight(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.OneToOneField(
+        ArchivedOrder, on_delete=models.DO_NOTHING, db_constraint=False, related_name="weight"
+    )
+    weight_kg = models.DecimalField(max_digits=6, decimal_places=2)
+    recorded_by_id = models.BigIntegerField(null=True, blank=True)
+    recorded_at = models.DateTimeField()
+
+
+class ArchivedOrderStatusLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.DO_NOTHING, db_constraint=False, related_name="status_logs"
+    )
+    status = models.CharField(max_length=20)
+    changed_by_id = models.BigIntegerField(null=True, blank=True)
+    changed_at = models.DateTimeField()
+
+
+class ArchiveCheckpoint(models.Model):
+    """Progress of an unfinished archive_orders pass, so an interrupted run resumes."""
+    name = models.CharField(max_length=50, unique=True)
+    cutoff = models.DateField()
+    last_id = models.BigIntegerField(default=0)
+    moved = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} < {self.cutoff} @ {self.last_id}"
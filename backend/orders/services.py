@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from accounts.models import User
+from subscriptions.models import CustomerSubscription
+
+from .models import CustomerSummary, Order
+
+
+ACTIVE_ORDER_STATUSES = ("scheduled", "picked_up", "reached_branch", "washing", "ready_for_delivery")
+
+
+def _local_today(today: Optional[date] = None) -> date:
+    return today or timezone.localdate()
+
+
+def refresh_customer_summary(user_id, *, create: bool = True, today: Optional[date] = None) -> Optional[CustomerSummary]:
+    """Recompute the CustomerSummary row for one customer.
+
+    - create=True  -> insert the row if missing (normal writes / first read).
+    - create=False -> only update an existing row (used from delete signals, where
+      the user itself may be deleted in the same cascade).
+    """
+    if not user_id:
+        return None
+
+    # Lazy import: payments.models imports orders.models
+    from payments.models import Payment
+
+    today_d = _local_today(today)
+
+    active_orders = Order.objects.filter(user_id=user_id, status__in=ACTIVE_ORDER_STATUSES).count()
+    pending = Payment.objects.filter(user_id=user_id, payment_status="pending").aggregate(
+        n=Count("id"), total=Sum("amount")
+    )
+    active_subscription_id = (
+        CustomerSubscription.objects.filter(user_id=user_id, is_active=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    today_order_id = (
+        Order.objects.filter(user_id=user_id, order_type="monthly", pickup_date=today_d)
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+    )
+
+    values = {
+        "active_orders": active_orders,
+        "pending_payments": pending["n"] or 0,
+        "outstanding_amount": pending["total"] or Decimal("0"),
+        "active_subscription_id": active_subscription_id,
+        "today_order_id": today_order_id,
+        "today_order_date": today_d,
+    }
+
+    if not create:
+        CustomerSummary.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **values)
+        return None
+
+    summary, _ = CustomerSummary.objects.update_or_create(user_id=user_id, defaults=values)
+    return summary
+
+
+def _grouped_summary_values(today_d: date, user_ids=None):
+    """Summary inputs for many customers at once: one grouped query per counter."""
+    from payments.models import Payment
+
+    orders = Order.objects.all()
+    payments = Payment.objects.all()
+    subs = CustomerSubscription.objects.all()
+    if user_ids is not None:
+        orders = orders.filter(user_id__in=user_ids)
+        payments = payments.filter(user_id__in=user_ids)
+        subs = subs.filter(user_id__in=user_ids)
+
+    active_orders = dict(
+        orders.filter(status__in=ACTIVE_ORDER_STATUSES)
+        .values("user_id")
+        .annotate(n=Count("id"))
+        .values_list("user_id", "n")
+    )
+    pending = {
+        row["user_id"]: row
+        for row in payments.filter(payment_status="pending")
+        .values("user_id")
+        .annotate(n=Count("id"), total=Sum("amount"))
+    }
+    active_subs = dict(
+        subs.filter(is_active=True)
+        .values("user_id")
+        .annotate(sub_id=Min("id"))
+        .values_list("user_id", "sub_id")
+    )
+    today_orders = dict(
+        orders.filter(order_type="monthly", pickup_date=today_d)
+        .values("user_id")
+        .annotate(order_id=Max("id"))
+        .values_list("user_id", "order_id")
+    )
+    return active_orders, pending, active_subs, today_orders
+
+
+def refresh_customer_summaries(user_ids, *, today: Optional[date] = None, batch_size: int = 500) -> int:
+    """refresh_customer_summary(create=False) for many customers, set-based.
+
+    Used after bulk deletes (orders/deletion.py), where per-customer refreshes
+    would cost several queries each. Returns number of rows updated.
+    """
+    today_d = _local_today(today)
+    user_ids = sorted({uid for uid in user_ids if uid})
+    updated = 0
+    for i in range(0, len(user_ids), batch_size):
+        chunk = user_ids[i:i + batch_size]
+        active_orders, pending, active_subs, today_orders = _grouped_summary_values(today_d, chunk)
+        now = timezone.now()
+        rows = list(CustomerSummary.objects.filter(user_id__in=chunk))
+        for row in rows:
+            p = pending.get(row.user_id) or {}
+            row.active_orders = active_orders.get(row.user_id, 0)
+            row.pending_payments = p.get("n") or 0
+            row.outstanding_amount = p.get("total") or Decimal("0")
+            row.active_subscription_id = active_subs.get(row.user_id)
+            row.today_order_id = today_orders.get(row.user_id)
+            row.today_order_date = today_d
+            row.updated_at = now
+        CustomerSummary.objects.bulk_update(
+            rows,
+            ["active_orders", "pending_payments", "outstanding_amount", "active_subscription",
+             "today_order", "today_order_date", "updated_at"],
+        )
+        updated += len(rows)
+    return updated
+
+
+def rebuild_customer_summaries(*, today: Optional[date] = None, batch_size: int = 1000) -> int:
+    """Recompute every CustomerSummary row with a handful of grouped queries.
+
+    Returns number of rows written.
+    """
+    today_d = _local_today(today)
+    active_orders, pending, active_subs, today_orders = _grouped_summary_values(today_d)
+
+    user_ids = set(
+        User.objects.filter(role=User.Role.CUSTOMER).values_list("id", flat=True)
+    ) | set(active_orders) | set(pending) | set(active_subs) | set(today_orders)
+
+    rows = []
+    for uid in sorted(user_ids):
+        p = pending.get(uid) or {}
+        rows.append(
+            CustomerSummary(
+                user_id=uid,
+                active_orders=active_orders.get(uid, 0),
+                pending_payments=p.get("n") or 0,
+                outstanding_amount=p.get("total") or Decimal("0"),
+                active_subscription_id=active_subs.get(uid),
+                today_order_id=today_orders.get(uid),
+                today_order_date=today_d,
+            )
+        )
+
+    with transaction.atomic():
+        CustomerSummary.objects.all().delete()
+        CustomerSummary.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
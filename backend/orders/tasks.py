@@ -0,0 +1,55 @@
+"""Deferred monthly-order generation (worked by `manage.py run_workers`)."""
+from datetime import date
+from typing import Optional
+
+from django.utils import timezone
+
+from jobs.queue import PRIORITY_HIGH, enqueue, task
+
+from .models import Order
+
+
+@task("orders.ensure_monthly_orders")
+def ensure_monthly_orders(*, subscription_id, date):
+    from subscriptions.models import CustomerSubscription
+    from .views import _ensure_monthly_orders_for_subscription
+
+    day = _parse_date(date)
+    sub = CustomerSubscription.objects.select_related("user").filter(id=subscription_id).first()
+    return _ensure_monthly_orders_for_subscription(sub, day, day)
+
+
+@task("orders.ensure_monthly_orders_for_all", atomic=False)  # takes the monthly_orders lease
+def ensure_monthly_orders_for_all(*, date):
+    from jobs.runs import record_run
+    from .views import _ensure_monthly_orders_for_all
+    with record_run("monthly_orders", trigger="queue"):
+        return _ensure_monthly_orders_for_all(for_date=_parse_date(date), lock_timeout_s=10)
+
+
+def _parse_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def enqueue_todays_order(sub, *, today: Optional[date] = None):
+    """Queue generation of today's monthly order for `sub` (no-op if it already exists)."""
+    if not sub or not getattr(sub, "is_active", False):
+        return None
+    today = today or timezone.localdate()
+    if Order.objects.filter(user_id=sub.user_id, order_type="monthly", pickup_date=today).exists():
+        return None
+    return enqueue(
+        "orders.ensure_monthly_orders",
+        {"subscription_id": sub.id, "date": today.isoformat()},
+        priority=PRIORITY_HIGH,
+        dedupe_key=f"monthly-order:{sub.id}:{today.isoformat()}",
+    )
+
+
+def enqueue_monthly_orders_for_all(*, today: Optional[date] = None):
+    today = today or timezone.localdate()
+    return enqueue(
+        "orders.ensure_monthly_orders_for_all",
+        {"date": today.isoformat()},
+        dedupe_key=f"monthly-orders:{today.isoformat()}",
+    )
@@ -1,2 +1,434 @@
-from django.test import TestCase
-# ...add tests later...
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from analytics.models import DailyFineRollup, DailyOrderRollup, DailyPaymentRollup, DailySubscriptionRollup
+from analytics.services import order_total, rebuild_all_rollups, revenue_total
+from branch_management.models import DeliveryStaff
+from locations.models import City, Branch, CustomerAddress, CustomerBranchAffinity, ServiceZone
+from orders.archive import archive_orders
+from orders.models import (
+    ArchiveCheckpoint,
+    ArchivedOrder,
+    ArchivedOrderStatusLog,
+    ArchivedOrderWeight,
+    CustomerSummary,
+    Order,
+    OrderStatusLog,
+    OrderWeight,
+)
+from orders.services import rebuild_customer_summaries
+from payments.models import ArchivedPayment, ArchivedPaymentFine, Payment, PaymentFine
+from subscriptions.models import SubscriptionPlan, CustomerSubscription
+
+
+class CustomerSummaryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="summary@example.com",
+            password="pass12345",
+            full_name="Summary Customer",
+            phone="9000000001",
+            role=User.Role.CUSTOMER,
+            is_active=True,
+            is_approved=True,
+        )
+        city = City.objects.create(name="SummaryCity", state="SC")
+        self.branch = Branch.objects.create(
+            city=city,
+            branch_name="Main",
+            address="Addr",
+            latitude=Decimal("10.000000"),
+            longitude=Decimal("76.000000"),
+        )
+        self.address = CustomerAddress.objects.create(
+            user=self.user,
+            address_label="Home",
+            full_address="Home",
+            pincode="682001",
+            latitude=Decimal("10.000000"),
+            longitude=Decimal("76.000000"),
+        )
+        self.plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _order(self, **kwargs):
+        defaults = {
+            "user": self.user,
+            "branch": self.branch,
+            "address": self.address,
+            "order_type": "demand",
+            "pickup_shift": "morning",
+            "pickup_date": timezone.localdate(),
+        }
+        defaults.update(kwargs)
+        return Order.objects.create(**defaults)
+
+    def test_overview_reflects_writes_and_is_single_read(self):
+        today = timezone.localdate()
+        sub = CustomerSubscription.objects.create(
+            user=self.user,
+            plan=self.plan,
+            preferred_pickup_shift="morning",
+            start_date=today,
+            end_date=today + timedelta(days=30),
+        )
+        monthly = self._order(order_type="monthly")
+        self._order(status="delivered")
+        Payment.objects.create(
+            user=self.user, subscription=sub, amount=Decimal("199.00"),
+            payment_type="monthly", payment_status="pending", due_date=today,
+        )
+
+        with self.assertNumQueries(1):
+            res = self.client.get("/api/customer/overview/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["activeOrders"], 1)
+        self.assertEqual(res.data["pendingPayments"], 1)
+        self.assertEqual(res.data["outstandingAmount"], 199.0)
+        self.assertTrue(res.data["activeSubscription"])
+        self.assertEqual(res.data["todaySubscriptionOrder"]["id"], monthly.id)
+
+        monthly.status = "cancelled"
+        monthly.save(update_fields=["status"])
+        sub.is_active = False
+        sub.save(update_fields=["is_active"])
+
+        res = self.client.get("/api/customer/overview/")
+        self.assertEqual(res.data["activeOrders"], 0)
+        self.assertFalse(res.data["activeSubscription"])
+        self.assertEqual(res.data["todaySubscriptionOrder"]["status"], "cancelled")
+
+    def test_rebuild_matches_signal_maintained_rows(self):
+        self._order()
+        self._order(status="picked_up")
+        expected = CustomerSummary.objects.get(user=self.user)
+
+        CustomerSummary.objects.all().delete()
+        rebuild_customer_summaries()
+
+        rebuilt = CustomerSummary.objects.get(user=self.user)
+        self.assertEqual(rebuilt.active_orders, expected.active_orders)
+        self.assertEqual(rebuilt.pending_payments, expected.pending_payments)
+        self.assertEqual(rebuilt.today_order_id, expected.today_order_id)
+
+
+class AsyncReadViewTests(TestCase):
+    """The /api/async/ twins must return exactly what the DRF views return."""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.customer = User.objects.create_user(
+            email="async@example.com", password="pass12345", full_name="Async Customer",
+            phone="9000000003", role=User.Role.CUSTOMER, is_active=True, is_approved=True,
+        )
+        courier = User.objects.create_user(
+            email="courier@example.com", password="pass12345", full_name="Courier",
+            phone="9000000004", role=User.Role.DELIVERY_STAFF, is_active=True, is_approved=True,
+        )
+        city = City.objects.create(name="AsyncCity", state="AC")
+        branch = Branch.objects.create(
+            city=city, branch_name="Main", address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        zone = ServiceZone.objects.create(branch=branch, zone_name="Z1", pincodes=["682001"])
+        self.staff = DeliveryStaff.objects.create(user=courier, branch=branch, zone=zone)
+        address = CustomerAddress.objects.create(
+            user=self.customer, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        sub = CustomerSubscription.objects.create(
+            user=self.customer, plan=plan, preferred_pickup_shift="morning",
+            start_date=self.today, end_date=self.today + timedelta(days=30),
+        )
+        for i, order_status in enumerate(["scheduled", "picked_up", "delivered"]):
+            order = Order.objects.create(
+                user=self.customer, branch=branch, address=address, delivery_staff=self.staff,
+                order_type="demand", pickup_shift="morning",
+                pickup_date=self.today - timedelta(days=i), status=order_status,
+            )
+            Payment.objects.create(
+                user=self.customer, order=order, amount=Decimal("50.00") * i, payment_type="demand",
+                payment_status="pending", due_date=self.today - timedelta(days=i),
+            )
+        Payment.objects.create(
+            user=self.customer, subscription=sub, amount=plan.monthly_price, payment_type="monthly",
+            payment_status="pending", due_date=self.today - timedelta(days=3),
+        )
+
+    def _assert_same(self, user, path, query=None):
+        client = Client()
+        client.force_login(user)
+        sync_res = client.get(f"/api/{path}", query or {})
+        async_res = client.get(f"/api/async/{path}", query or {})
+        self.assertEqual(sync_res.status_code, 200)
+        self.assertEqual(async_res.status_code, 200)
+        self.assertEqual(async_res.json(), sync_res.json())
+        self.assertEqual(async_res.get("X-Next-Cursor"), sync_res.get("X-Next-Cursor"))
+        return async_res.json()
+
+    def test_async_twins_match_sync_views(self):
+        self.assertEqual(len(self._assert_same(self.customer, "customer/orders/")), 3)
+        self._assert_same(self.customer, "customer/orders/", {"status": "delivered"})
+        self.assertEqual(self._assert_same(self.customer, "customer/overview/")["pendingPayments"], 4)
+        self.assertEqual(len(self._assert_same(self.customer, "customer/payments/", {"limit": 2})), 2)
+        self._assert_same(self.customer, "subscriptions/plans/")
+        self.assertEqual(len(self._assert_same(self.staff.user, "delivery/orders/", {"order_type": "demand"})), 3)
+
+    def test_delivery_list_survives_a_failing_enqueue(self):
+        from orders import views as order_views
+
+        def _fail(**kwargs):
+            raise RuntimeError("queue down")
+
+        client = Client()
+        client.force_login(self.staff.user)
+        for path in ("/api/delivery/orders/", "/api/async/delivery/orders/"):
+            order_views._LAST_MONTHLY_ENSURE_LOCALDATE = None
+            with mock.patch("orders.tasks.enqueue_monthly_orders_for_all", _fail), self.assertLogs("orders", "ERROR"):
+                self.assertEqual(client.get(path).status_code, 200)
+
+    def test_anonymous_and_wrong_role_are_rejected(self):
+        self.assertEqual(Client().get("/api/async/customer/overview/").status_code, 403)
+        client = Client()
+        client.force_login(self.customer)
+        self.assertEqual(client.get("/api/async/delivery/orders/").status_code, 403)
+        self.assertEqual(client.get("/api/async/customer/payments/", {"cursor": "x"}).status_code, 400)
+
+    async def test_served_through_the_asgi_handler(self):
+        await self.async_client.aforce_login(self.customer)
+        res = await self.async_client.get("/api/async/customer/orders/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sorted(row["status"] for row in res.json()), ["delivered", "picked_up", "scheduled"])
+
+
+class BulkCascadeDeleteTests(TestCase):
+    """Branch/city deletes remove orders set-based (orders/deletion.py), not per order."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.today = timezone.localdate()
+        self.customer = User.objects.create_user(
+            email="cascade@example.com", password="pass12345", full_name="Cascade Customer",
+            phone="9000000201", role=User.Role.CUSTOMER, is_active=True, is_approved=True,
+        )
+        self.city = City.objects.create(name="CascadeCity", state="CC")
+        self.kept = self._branch("Kept")
+        self.address = CustomerAddress.objects.create(
+            user=self.customer, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.kept_order = self._order(self.kept, "delivered")
+
+    def _branch(self, name):
+        return Branch.objects.create(
+            city=self.city, branch_name=name, address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+
+    def _order(self, branch, order_status="scheduled"):
+        order = Order.objects.create(
+            user=self.customer, branch=branch, address=self.address, order_type="demand",
+            pickup_shift="morning", pickup_date=self.today, status=order_status,
+        )
+        payment = Payment.objects.create(
+            user=self.customer, order=order, branch=branch, amount=Decimal("40.00"), payment_type="demand",
+            payment_status="pending", due_date=self.today - timedelta(days=2),
+        )
+        PaymentFine.objects.create(payment=payment, fine_amount=Decimal("10.00"), fine_days=2)
+        OrderWeight.objects.create(order=order, weight_kg=Decimal("3.50"))
+        OrderStatusLog.objects.create(order=order, status=order_status)
+        return order
+
+    def _branch_with_orders(self, name, n):
+        branch = self._branch(name)
+        for _ in range(n):
+            self._order(branch)
+        return branch
+
+    def _rollups(self):
+        """Non-empty rollup rows (incremental updates leave zeroed rows behind, a rebuild does not)."""
+        snapshot = {}
+        for model in (DailyPaymentRollup, DailyOrderRollup, DailyFineRollup, DailySubscriptionRollup):
+            snapshot[model.__name__] = sorted(
+                (
+                    tuple(v for k, v in row.items() if k != "id")
+                    for row in model.objects.values().order_by()
+                    if any(v for k, v in row.items() if k.endswith(("_count", "_total")))
+                ),
+                key=repr,  # branch_id may be None
+            )
+        return snapshot
+
+    def _destroy_queries(self, branch):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.delete(f"/api/admin/branches/{branch.id}/")
+        self.assertEqual(res.status_code, 204)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_orders(self):
+        few = self._destroy_queries(self._branch_with_orders("Few", 2))
+        many = self._destroy_queries(self._branch_with_orders("Many", 12))
+        self.assertEqual(few, many)
+
+    def test_dependents_and_derived_tables_match_a_rebuild(self):
+        doomed = self._branch_with_orders("Doomed", 3)
+        # attributed to the branch directly, not through its orders: kept, branch set to NULL
+        plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        sub = CustomerSubscription.objects.create(
+            user=self.customer, plan=plan, branch=doomed, preferred_pickup_shift="morning",
+            start_date=self.today - timedelta(days=40), end_date=self.today - timedelta(days=10), is_active=False,
+        )
+        monthly = Payment.objects.create(
+            user=self.customer, subscription=sub, branch=doomed, amount=Decimal("199.00"), payment_type="monthly",
+            payment_status="pending", due_date=self.today - timedelta(days=3),
+        )
+        PaymentFine.objects.create(payment=monthly, fine_amount=Decimal("30.00"), fine_days=3)
+        Payment.objects.create(
+            user=self.customer, subscription=sub, branch=doomed, amount=Decimal("199.00"), payment_type="monthly",
+            payment_status="paid", payment_date=self.today - timedelta(days=40), due_date=self.today - timedelta(days=36),
+        )
+        self._destroy_queries(doomed)
+
+        self.assertEqual(list(Order.objects.values_list("id", flat=True)), [self.kept_order.id])
+        self.assertEqual(Payment.objects.filter(branch__isnull=True).count(), 2)
+        self.assertEqual(CustomerSubscription.objects.get(id=sub.id).branch_id, None)
+        self.assertEqual(Payment.objects.count(), 3)
+        self.assertEqual(PaymentFine.objects.count(), 2)
+        self.assertEqual(OrderWeight.objects.count(), 1)
+        self.assertEqual(OrderStatusLog.objects.count(), 1)
+
+        summary = CustomerSummary.objects.get(user=self.customer)
+        self.assertEqual((summary.active_orders, summary.pending_payments), (0, 2))
+        self.assertEqual(summary.outstanding_amount, Decimal("239.00"))
+        self.assertEqual(
+            list(CustomerBranchAffinity.objects.filter(user=self.customer, via_orders=True).values_list("branch_id", flat=True)),
+            [self.kept.id],
+        )
+
+        incremental = self._rollups()
+        rebuild_all_rollups()
+        self.assertEqual(incremental, self._rollups())
+
+    def test_city_delete_uses_the_same_path(self):
+        self._branch_with_orders("Doomed", 2)
+        res = self.client.delete(f"/api/admin/cities/{self.city.id}/")
+        self.assertEqual(res.status_code, 204)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(DailyOrderRollup.objects.exclude(order_count=0).exists())
+
+    def test_single_order_delete_still_uses_signals(self):
+        order = self._order(self.kept)
+        order.delete()
+        self.assertFalse(Payment.objects.filter(order_id=order.id).exists())
+        self.assertEqual(CustomerSummary.objects.get(user=self.customer).pending_payments, 1)
+
+
+class ArchiveOrdersTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.old = self.today - timedelta(days=120)
+        self.customer = User.objects.create_user(
+            email="archive@example.com", password="pass12345", full_name="Archive Customer",
+            phone="9000000301", role=User.Role.CUSTOMER, is_active=True, is_approved=True,
+        )
+        city = City.objects.create(name="ArchiveCity", state="AR")
+        self.branch = Branch.objects.create(
+            city=city, branch_name="Main", address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.address = CustomerAddress.objects.create(
+            user=self.customer, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.finished = [self._order(self.old, "delivered", "paid"), self._order(self.old, "cancelled", None)]
+        self.kept = [
+            self._order(self.old, "delivered", "pending"),  # unpaid
+            self._order(self.old, "scheduled", None),  # not finished
+            self._order(self.today - timedelta(days=5), "delivered", "paid"),  # too recent
+        ]
+        self.client = APIClient()
+        self.client.force_login(self.customer)
+
+    def _order(self, pickup_date, order_status, payment_status):
+        order = Order.objects.create(
+            user=self.customer, branch=self.branch, address=self.address, order_type="demand",
+            pickup_shift="morning", pickup_date=pickup_date, status=order_status,
+        )
+        created_at = timezone.make_aware(datetime.combine(pickup_date, time(8))) + timedelta(minutes=order.id)
+        Order.objects.filter(id=order.id).update(created_at=created_at)
+        OrderStatusLog.objects.create(order=order, status=order_status)
+        if order_status == "delivered":
+            OrderWeight.objects.create(order=order, weight_kg=Decimal("4.00"))
+        if payment_status:
+            payment = Payment.objects.create(
+                user=self.customer, order=order, amount=Decimal("60.00"), payment_type="demand",
+                payment_status=payment_status, due_date=pickup_date,
+                payment_date=pickup_date if payment_status == "paid" else None,
+            )
+            PaymentFine.objects.create(payment=payment, fine_amount=Decimal("10.00"), fine_days=1)
+        return order
+
+    def _history(self):
+        return (
+            self.client.get("/api/customer/orders/").json(),
+            self.client.get("/api/customer/payments/").json(),
+            self.client.get("/api/customer/payments/", {"limit": 1, "status": "paid"}).json(),
+        )
+
+    def test_moves_finished_orders_and_history_reads_both_tables(self):
+        before = self._history()
+        call_command("archive_orders", "--older-than", "30", "--batch-size", "1", stdout=StringIO())
+
+        finished_ids = sorted(o.id for o in self.finished)
+        self.assertEqual(sorted(ArchivedOrder.objects.values_list("id", flat=True)), finished_ids)
+        self.assertEqual(sorted(Order.objects.values_list("id", flat=True)), sorted(o.id for o in self.kept))
+        self.assertEqual(ArchivedPayment.objects.get().order_id, self.finished[0].id)
+        self.assertEqual(ArchivedPaymentFine.objects.count(), 1)
+        self.assertEqual(ArchivedOrderWeight.objects.count(), 1)
+        self.assertEqual(ArchivedOrderStatusLog.objects.count(), 2)
+        self.assertFalse(OrderStatusLog.objects.filter(order_id__in=finished_ids).exists())
+        self.assertFalse(ArchiveCheckpoint.objects.exists())
+
+        self.assertEqual(self._history(), before)
+        self.assertEqual(Client().get("/api/async/customer/orders/").status_code, 403)
+        async_client = Client()
+        async_client.force_login(self.customer)
+        self.assertEqual(async_client.get("/api/async/customer/orders/").json(), before[0])
+
+    def test_interrupted_pass_resumes_from_checkpoint(self):
+        cutoff = self.today - timedelta(days=30)
+        stats = archive_orders(before=cutoff, batch_size=1, max_batches=1)
+        self.assertEqual((stats["orders"], stats["done"]), (1, False))
+        checkpoint = ArchiveCheckpoint.objects.get()
+        self.assertEqual((checkpoint.last_id, checkpoint.cutoff), (self.finished[0].id, cutoff))
+
+        # a later run with another cutoff finishes the interrupted pass first
+        stats = archive_orders(before=self.today)
+        self.assertEqual((stats["orders"], stats["cutoff"], stats["done"]), (1, cutoff, True))
+        self.assertFalse(ArchiveCheckpoint.objects.exists())
+
+    def test_rollups_still_count_archived_rows(self):
+        archive_orders(before=self.today - timedelta(days=30))
+        before = (order_total(), revenue_total())
+        rebuild_all_rollups()
+        self.assertEqual((order_total(), revenue_total()), before)
+        self.assertEqual(before, (5, Decimal("120.00")))
@@ -7,19 +7,22 @@ from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 from branch_management.models import DeliveryStaff
-from .models import Order, OrderWeight, OrderStatusLog
+from .models import ArchivedOrder, Order, OrderWeight, OrderStatusLog, CustomerSummary
+from .services import refresh_customer_summary
 from datetime import date, timedelta
-from locations.models import CustomerAddress, ServiceZone, Branch
-from payments.models import Payment
+from locations.models import CustomerAddress, Branch, ZonePincode
+from locations.services import zones_for_pincode
+from payments.models import ArchivedPayment, Payment
 from subscriptions.models import CustomerSubscription
 from django.contrib.auth import update_session_auth_hash
 from django.conf import settings
 from django.utils import timezone  # NEW
-from django.db import connection  # NEW
-from contextlib import contextmanager  # NEW
 import logging  # NEW
+from jobs.leases import lease
+from jobs.runs import current_run, record_run
 
 from subscriptions.models import SubscriptionSkipDay
+from subscriptions.services import record_monthly_pickup, release_monthly_pickup
 
 # Price per kg for demand orders
 DEMAND_PRICE_PER_KG = Decimal("10.00")  # CHANGED: ₹10 per kg
@@ -35,42 +38,6 @@ logger = logging.getLogger(__name__)  # NEW
 # NEW: per-process throttle so we don't scan all subscriptions on every request
 _LAST_MONTHLY_ENSURE_LOCALDATE = None
 
-@contextmanager
-def _mysql_named_lock(lock_name: str, timeout_s: int = 1):
-    """
-    Best-effort cross-process lock.
-
-    - MySQL/MariaDB: uses GET_LOCK/RELEASE_LOCK.
-    - Other backends (e.g., SQLite): falls back to an "always acquired" lock.
-
-    We still rely on idempotent generation (checking existing orders / skip-days)
-    to prevent duplicates.
-    """
-    # Non-MySQL backends don't support GET_LOCK; run unlocked.
-    if getattr(connection, "vendor", "") != "mysql":
-        yield True
-        return
-
-    got = False
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT GET_LOCK(%s, %s)", [lock_name, int(timeout_s)])
-            row = cursor.fetchone()
-            got = bool(row and row[0] == 1)
-    except Exception:
-        got = False
-
-    try:
-        yield got
-    finally:
-        if got:
-            try:
-                with connection.cursor() as cursor:
-                    cursor.execute("SELECT RELEASE_LOCK(%s)", [lock_name])
-            except Exception:
-                pass
-
-
 def _as_date(d):
     """Normalize a Date/DateTime-ish value to date (or None)."""
     if d is None:
@@ -96,20 +63,16 @@ def _subscription_is_suspended_for_generation(sub, on_date):
         )
         due = _as_date(getattr(p, "due_date", None))
         suspended = bool(due and due < on_date)
-
-        # NEW: if overdue, persist/update fine row so PaymentFine table is populated.
-        if suspended and p:
-            try:
-                from payments.services import ensure_fine_for_payment
-                ensure_fine_for_payment(p, today=_as_date(on_date))
-            except Exception:
-                pass
-
-        return suspended
     except Exception:
         # Fail open (don't block) if payment schema differs
         return False
 
+    # CHANGED: the fine row is written by a queued job, not on this (often read) path
+    if suspended:
+        from payments.tasks import enqueue_fines
+        enqueue_fines([p], today=_as_date(on_date))
+    return suspended
+
 
 def _resolve_monthly_order_context_for_user(user):
     """
@@ -203,6 +166,7 @@ def _ensure_monthly_orders_for_subscription(sub, start_date, end_date):
     return created
 
 
+@record_run("monthly_orders")  # NEW: JobRun ledger (jobs/runs.py)
 def _ensure_monthly_orders_for_all(*, for_date=None, days_ahead=0, lock_timeout_s=1):
     """
     Generate missing monthly orders for all active subscriptions.
@@ -222,7 +186,10 @@ def _ensure_monthly_orders_for_all(*, for_date=None, days_ahead=0, lock_timeout_
     created_total = 0
     scanned = 0
 
-    with _mysql_named_lock("washmate:monthly_orders", timeout_s=lock_timeout_s) as got:
+    # CHANGED: portable DB lease (was MySQL GET_LOCK, a no-op on other backends)
+    run = current_run()
+    with lease("washmate:monthly_orders", ttl_s=60, timeout_s=lock_timeout_s) as got:
+        run.lock_outcome(bool(got))
         if not got:
             return {"created": 0, "scanned": 0, "start": str(start), "end": str(end), "locked": False}
 
@@ -230,17 +197,22 @@ def _ensure_monthly_orders_for_all(*, for_date=None, days_ahead=0, lock_timeout_
         for sub in subs:
             scanned += 1
             try:
-                created_total += _ensure_monthly_orders_for_subscription(sub, start, end)
-            except Exception:
+                created = _ensure_monthly_orders_for_subscription(sub, start, end)
+            except Exception as exc:
                 # keep batch alive
                 logger.exception("monthly order generation failed for subscription=%s", getattr(sub, "id", None))
+                run.row_failed(f"subscription {getattr(sub, 'id', None)}: {exc!r}")
+                created = 0
+            created_total += created
+            run.add(scanned=1, created=created)
+        run.details.update(start=str(start), end=str(end))
 
     return {"created": created_total, "scanned": scanned, "start": str(start), "end": str(end), "locked": True}
 
 
 def _ensure_monthly_orders_once_per_process_per_day():
     """
-    Safe to call from request handlers; does real work at most once/day per process.
+    Safe to call from request handlers; enqueues the day's generation at most once/day per process.
     """
     global _LAST_MONTHLY_ENSURE_LOCALDATE
     today = timezone.localdate()
@@ -248,8 +220,9 @@ def _ensure_monthly_orders_once_per_process_per_day():
         return
     _LAST_MONTHLY_ENSURE_LOCALDATE = today
 
-    # CHANGED: only ensure TODAY (avoid generating tomorrow)
-    _ensure_monthly_orders_for_all(for_date=today, lock_timeout_s=1)
+    # CHANGED: queued for run_workers instead of scanning every subscription in the request
+    from .tasks import enqueue_monthly_orders_for_all
+    enqueue_monthly_orders_for_all(today=today)
 
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
@@ -274,21 +247,16 @@ def _get_available_branches_for_pincode(pincode):
     pincode = str(pincode).strip() if pincode is not None else ""
     if not pincode:
         return Branch.objects.none()
-    zones = ServiceZone.objects.select_related("branch").filter(
-        pincodes__contains=[pincode],
-        branch__is_active=True,
+    return Branch.objects.filter(
+        id__in=ZonePincode.objects.filter(pincode=pincode, branch__is_active=True).values("branch_id"),
+        is_active=True,
     )
-    branch_ids = {z.branch_id for z in zones if z.branch_id}
-    return Branch.objects.filter(id__in=branch_ids, is_active=True)
 
 def _get_service_zone_for_pincode(pincode, branch_id=None):
     pincode = str(pincode).strip() if pincode is not None else ""
     if not pincode:
         return None
-    qs = ServiceZone.objects.select_related("branch").filter(
-        pincodes__contains=[pincode],
-        branch__is_active=True,
-    )
+    qs = zones_for_pincode(pincode).select_related("branch")
     if branch_id:
         qs = qs.filter(branch_id=branch_id)
     return qs.first()
@@ -344,6 +312,29 @@ def _require_delivery_user(request):
     return staff, None
 
 
+def _delivery_order_row(o):
+    # UI uses this for "Deliver Today / Deliver Later" grouping.
+    # Demand: assume delivery is next day by default (no explicit delivery_date field in model).
+    expected_delivery_date = o.pickup_date + timedelta(days=1) if o.order_type == "demand" else o.pickup_date
+    return {
+        "id": o.id,
+        "customer": o.user.full_name,
+        "customer_phone": o.user.phone,
+        "customer_email": o.user.email,
+        "address": _format_address(o.address),
+        "full_address": getattr(o.address, "full_address", ""),
+        "pincode": getattr(o.address, "pincode", ""),
+        "latitude": str(getattr(o.address, "latitude", "")) if getattr(o.address, "latitude", None) is not None else "",
+        "longitude": str(getattr(o.address, "longitude", "")) if getattr(o.address, "longitude", None) is not None else "",
+        "branch_name": o.branch.branch_name if o.branch else None,
+        "pickup_date": o.pickup_date,
+        "pickup_shift": o.pickup_shift,
+        "expected_delivery_date": expected_delivery_date,
+        "status": o.status,
+        "order_type": o.order_type,
+    }
+
+
 class DeliveryOrdersView(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]
     permission_classes = [IsAuthenticated]
@@ -353,11 +344,12 @@ class DeliveryOrdersView(APIView):
         if err:
             return err
 
-        # CHANGED: ensure monthly orders exist (throttled: once/day/process)
+        # CHANGED: ensure monthly orders exist (throttled: once/day/process, run by a worker);
+        # failing to enqueue must not take the courier's order list down with it
         try:
             _ensure_monthly_orders_once_per_process_per_day()
         except Exception:
-            pass
+            logger.exception("could not enqueue today's monthly order generation")
 
         status_filter = request.query_params.get("status")
         order_type = request.query_params.get("order_type")  # "demand" | "monthly" | None
@@ -374,32 +366,7 @@ class DeliveryOrdersView(APIView):
         if order_type in {"demand", "monthly"}:
             qs = qs.filter(order_type=order_type)
 
-        data = []
-        for o in qs:
-            # UI uses this for "Deliver Today / Deliver Later" grouping.
-            # Demand: assume delivery is next day by default (no explicit delivery_date field in model).
-            expected_delivery_date = o.pickup_date + timedelta(days=1) if o.order_type == "demand" else o.pickup_date
-
-            data.append(
-                {
-                    "id": o.id,
-                    "customer": o.user.full_name,
-                    "customer_phone": o.user.phone,
-                    "customer_email": o.user.email,
-                    "address": _format_address(o.address),
-                    "full_address": getattr(o.address, "full_address", ""),
-                    "pincode": getattr(o.address, "pincode", ""),
-                    "latitude": str(getattr(o.address, "latitude", "")) if getattr(o.address, "latitude", None) is not None else "",
-                    "longitude": str(getattr(o.address, "longitude", "")) if getattr(o.address, "longitude", None) is not None else "",
-                    "branch_name": o.branch.branch_name if o.branch else None,
-                    "pickup_date": o.pickup_date,
-                    "pickup_shift": o.pickup_shift,
-                    "expected_delivery_date": expected_delivery_date,
-                    "status": o.status,
-                    "order_type": o.order_type,
-                }
-            )
-
+        data = [_delivery_order_row(o) for o in qs]
         return Response(data, status=status.HTTP_200_OK)
 
 class DeliveryOrderStatusView(APIView):
@@ -446,6 +413,7 @@ class DeliveryOrderStatusView(APIView):
                 if weight <= 0:
                     return Response({"detail": "invalid weight_kg"}, status=status.HTTP_400_BAD_REQUEST)
 
+                previous_weight = OrderWeight.objects.filter(order=order).values_list("weight_kg", flat=True).first()
                 OrderWeight.objects.update_or_create(
                     order=order,
                     defaults={"weight_kg": weight, "recorded_by": request.user},
@@ -454,6 +422,9 @@ class DeliveryOrderStatusView(APIView):
                 # Update payment amount based on actual weight for demand orders
                 if order.order_type == "demand":
                     _update_demand_order_payment_amount(order, weight)
+                else:
+                    # NEW: roll the pickup into the subscription's billing-period usage
+                    record_monthly_pickup(order, weight, previous_weight=previous_weight)
 
             order.status = new_status
             order.save(update_fields=["status"])
@@ -544,52 +515,39 @@ class DeliveryAvailabilityView(APIView):
         staff.save(update_fields=["is_available"])
         return Response({"is_available": staff.is_available}, status=status.HTTP_200_OK)
 
+def _customer_overview_payload(summary):
+    # NEW: today’s subscription pickup (monthly order) for overview-card
+    todays_monthly = summary.today_order
+    today_subscription_order = None
+    if todays_monthly:
+        today_subscription_order = {
+            "id": todays_monthly.id,
+            "pickup_date": todays_monthly.pickup_date,
+            "pickup_shift": todays_monthly.pickup_shift,
+            "status": todays_monthly.status,
+        }
+    return {
+        "activeOrders": summary.active_orders,
+        "pendingPayments": summary.pending_payments,
+        "outstandingAmount": float(summary.outstanding_amount),  # NEW
+        "activeSubscription": summary.active_subscription_id is not None,
+        "todaySubscriptionOrder": today_subscription_order,  # NEW
+    }
+
+
 class CustomerOverviewView(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        active_orders = Order.objects.filter(
-            user=request.user,
-            status__in=["scheduled", "picked_up", "reached_branch", "washing", "ready_for_delivery"],
-        ).count()
-
-        pending_payments = Payment.objects.filter(
-            user=request.user,
-            payment_status="pending",
-        ).count()
-
-        active_subscription = CustomerSubscription.objects.filter(
-            user=request.user,
-            is_active=True,
-        ).exists()
-
-        # NEW: today’s subscription pickup (monthly order) for overview-card
+        # CHANGED: single primary-key read of the signal-maintained summary row
         today = timezone.localdate()
-        todays_monthly = (
-            Order.objects.filter(user=request.user, order_type="monthly", pickup_date=today)
-            .order_by("-id")
-            .first()
-        )
+        summary = CustomerSummary.objects.select_related("today_order").filter(user=request.user).first()
+        if summary is None or summary.today_order_date != today:
+            # first visit, or first visit of the day (today's order pointer rolled over)
+            summary = refresh_customer_summary(request.user.id, today=today)
 
-        today_subscription_order = None
-        if todays_monthly:
-            today_subscription_order = {
-                "id": todays_monthly.id,
-                "pickup_date": todays_monthly.pickup_date,
-                "pickup_shift": todays_monthly.pickup_shift,
-                "status": todays_monthly.status,
-            }
-
-        return Response(
-            {
-                "activeOrders": active_orders,
-                "pendingPayments": pending_payments,
-                "activeSubscription": active_subscription,
-                "todaySubscriptionOrder": today_subscription_order,  # NEW
-            },
-            status=status.HTTP_200_OK,
-        )
+        return Response(_customer_overview_payload(summary), status=status.HTTP_200_OK)
 
 def _update_customer_demand_order(order, request):
     # NOTE: must be defined before CustomerOrderDetailView.put calls it
@@ -627,19 +585,58 @@ def _update_customer_demand_order(order, request):
     order.save()
     return None
 
+def _customer_order_row(o, payment):
+    # CHANGED: treat 0/None as not-calculated => send None
+    amt = None
+    if payment and payment.amount not in [None, 0]:
+        amt = float(payment.amount)
+
+    return {
+        "id": o.id,
+        "order_type": o.order_type,
+        "status": o.status,
+        "pickup_date": o.pickup_date,
+        "pickup_shift": o.pickup_shift,
+        "branch_id": o.branch_id,
+        "branch_name": o.branch.branch_name if o.branch else None,
+        "address_id": o.address_id,
+
+        # NEW: address fields for UI
+        "address_label": getattr(o.address, "address_label", None),
+        "full_address": getattr(o.address, "full_address", None),
+        "pincode": getattr(o.address, "pincode", None),
+
+        "payment_id": payment.id if payment else None,
+        "payment_status": payment.payment_status if payment else None,
+        "payment_amount": amt,
+    }
+
+
+def _archived_customer_orders(user, status_filter=None):
+    """Archived demand orders (orders/archive.py), shaped like the live queryset."""
+    qs = (
+        ArchivedOrder.objects.select_related("branch", "address")
+        .filter(user=user, order_type="demand")
+        .order_by("-created_at")
+    )
+    if status_filter:
+        qs = qs.filter(status=status_filter)
+    return qs
+
+
+def _newest_first(live_orders, archived_orders):
+    return sorted([*live_orders, *archived_orders], key=lambda o: o.created_at, reverse=True)
+
+
 class CustomerOrdersView(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # CHANGED: only ensure TODAY for this user (avoid generating tomorrow)
-        try:
-            sub = CustomerSubscription.objects.select_related("user").filter(user=request.user, is_active=True).first()
-            start = timezone.localdate()
-            end = start
-            _ensure_monthly_orders_for_subscription(sub, start, end)
-        except Exception:
-            pass
+        # CHANGED: only ensure TODAY for this user; generation runs in a queued job
+        from .tasks import enqueue_todays_order
+        sub = CustomerSubscription.objects.filter(user=request.user, is_active=True).first()
+        enqueue_todays_order(sub)
 
         status_filter = request.query_params.get("status")
 
@@ -652,39 +649,15 @@ class CustomerOrdersView(APIView):
         if status_filter:
             qs = qs.filter(status=status_filter)
 
-        order_ids = [o.id for o in qs]
-        payments = Payment.objects.filter(order_id__in=order_ids)
-        payment_map = {p.order_id: p for p in payments}
-
-        data = []
-        for o in qs:
-            payment = payment_map.get(o.id)
-
-            # CHANGED: treat 0/None as not-calculated => send None
-            amt = None
-            if payment and payment.amount not in [None, 0]:
-                amt = float(payment.amount)
-
-            data.append({
-                "id": o.id,
-                "order_type": o.order_type,
-                "status": o.status,
-                "pickup_date": o.pickup_date,
-                "pickup_shift": o.pickup_shift,
-                "branch_id": o.branch_id,
-                "branch_name": o.branch.branch_name if o.branch else None,
-                "address_id": o.address_id,
-
-                # NEW: address fields for UI
-                "address_label": getattr(o.address, "address_label", None),
-                "full_address": getattr(o.address, "full_address", None),
-                "pincode": getattr(o.address, "pincode", None),
-
-                "payment_id": payment.id if payment else None,
-                "payment_status": payment.payment_status if payment else None,
-                "payment_amount": amt,
-            })
+        # NEW: history includes archived orders (ids are unique across both tables)
+        live = list(qs)
+        archived = list(_archived_customer_orders(request.user, status_filter))
+        payment_map = {p.order_id: p for p in Payment.objects.filter(order_id__in=[o.id for o in live])}
+        payment_map.update(
+            {p.order_id: p for p in ArchivedPayment.objects.filter(order_id__in=[o.id for o in archived])}
+        )
 
+        data = [_customer_order_row(o, payment_map.get(o.id)) for o in _newest_first(live, archived)]
         return Response(data, status=status.HTTP_200_OK)
 
     @transaction.atomic
@@ -913,6 +886,7 @@ class CustomerNoPickupTodayView(APIView):
             todays_order.status = "cancelled"
             todays_order.save(update_fields=["status"])
             OrderStatusLog.objects.create(order=todays_order, status="cancelled", changed_by=request.user)
+            release_monthly_pickup(todays_order)
 
         return Response(
             {
@@ -1,5 +1,6 @@
 from django.apps import AppConfig
 
+import logging
 import os
 import sys
 import threading
@@ -10,6 +11,9 @@ from django.conf import settings
 from django.utils import timezone
 
 
+logger = logging.getLogger(__name__)
+
+
 class PaymentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "payments"
@@ -24,12 +28,19 @@ class PaymentsConfig(AppConfig):
         if settings.DEBUG and os.environ.get("RUN_MAIN") != "true":
             return
 
+        # NEW: jobs owned by `manage.py run_scheduler` instead
+        if not getattr(settings, "RUN_JOBS_IN_WEB_WORKERS", False):
+            return
+
         def _run_fine_batch():
             try:
+                from jobs.runs import record_run
                 from .services import ensure_fines_for_all_overdue
-                ensure_fines_for_all_overdue(today=timezone.localdate())
+                with record_run("fines", trigger="web_thread"):
+                    ensure_fines_for_all_overdue(today=timezone.localdate())
             except Exception:
-                pass
+                # CHANGED: logged (and recorded as a failed JobRun) instead of swallowed
+                logger.exception("fine batch failed")
 
         # Startup catch-up (covers downtime / missed daily fine run)
         if getattr(settings, "ENABLE_FINE_STARTUP_CATCHUP", True):
@@ -49,6 +60,7 @@ class PaymentsConfig(AppConfig):
                     _time.sleep(sleep_s)
                     _run_fine_batch()
                 except Exception:
+                    logger.exception("daily fine job loop failed")
                     _time.sleep(60)
 
         threading.Thread(target=_job_loop, name="daily-fine-job", daemon=True).start()
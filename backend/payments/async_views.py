@@ -0,0 +1,21 @@
+"""Async twin of the customer payments list (see core/async_views.py)."""
+from django.utils import timezone
+
+from core.async_views import AsyncSessionView, json_response
+
+from .views import _customer_payments_page, _customer_payments_query
+
+
+class AsyncCustomerPaymentsView(AsyncSessionView):
+    async def get(self, request):
+        today = timezone.localdate()
+        try:
+            rows, limit = _customer_payments_query(request.user, request.GET)
+        except ValueError as e:
+            return json_response({"detail": str(e)}, status=400)
+
+        data, next_cursor = _customer_payments_page([r async for r in rows], limit, today)
+        response = json_response(data)
+        if next_cursor:
+            response["X-Next-Cursor"] = next_cursor
+        return response
@@ -6,6 +6,7 @@ Run daily via cron/scheduler:
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from jobs.runs import record_run
 from payments.models import Payment
 from payments.services import compute_fine_amount, ensure_fine_for_payment
 
@@ -21,6 +22,11 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        # NEW: recorded in the JobRun ledger as a fines run
+        with record_run("fines", trigger="command", dry_run=options["dry_run"]) as run:
+            self._handle(options, run)
+
+    def _handle(self, options, run):
         dry_run = options["dry_run"]
         today = timezone.localdate()
         
@@ -41,6 +47,7 @@ class Command(BaseCommand):
                 ensure_fine_for_payment(payment, today=today)
             
             updated_count += 1
+            run.add(scanned=1)
         
         action = "Would update" if dry_run else "Updated"
         self.stdout.write(
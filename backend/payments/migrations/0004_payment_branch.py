@@ -0,0 +1,44 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_payment_branch(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    Order = apps.get_model("orders", "Order")
+    CustomerBranchAffinity = apps.get_model("locations", "CustomerBranchAffinity")
+
+    order_branch = dict(Order.objects.values_list("id", "branch_id"))
+    latest_order_branch = {}
+    for uid, bid in Order.objects.order_by("user_id", "id").values_list("user_id", "branch_id"):
+        latest_order_branch[uid] = bid
+    address_branch = {}
+    for uid, bid in CustomerBranchAffinity.objects.filter(via_address=True).order_by("-id").values_list("user_id", "branch_id"):
+        address_branch[uid] = bid
+
+    for pid, order_id, user_id in Payment.objects.filter(branch__isnull=True).values_list("id", "order_id", "user_id"):
+        if order_id:
+            bid = order_branch.get(order_id)
+        else:
+            bid = latest_order_branch.get(user_id) or address_branch.get(user_id)
+        if bid:
+            Payment.objects.filter(id=pid).update(branch_id=bid)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_branch_affinity'),
+        ('payments', '0003_alter_payment_payment_status_and_more'),
+        ('orders', '0002_customersummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='branch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='locations.branch'),
+        ),
+        migrations.RunPython(backfill_payment_branch, migrations.RunPython.noop),
+    ]
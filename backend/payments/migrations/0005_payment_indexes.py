@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_branch_affinity'),
+        ('orders', '0003_order_indexes'),
+        ('payments', '0004_payment_branch'),
+        ('subscriptions', '0004_customersubscription_branch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user', 'payment_status'], name='payment_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['subscription', 'payment_type', 'payment_status', 'due_date'], name='payment_sub_type_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_status', 'due_date'], name='payment_status_due_idx'),
+        ),
+    ]
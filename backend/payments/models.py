@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
 from accounts.models import User
 from orders.models import Order
 from subscriptions.models import CustomerSubscription
@@ -26,6 +28,11 @@ class Payment(models.Model):
         blank=True,
         related_name="payments"
     )
+    # Branch the payment is attributed to for reporting (demand: order's branch,
+    # monthly: customer's branch when the payment was created).
+    branch = models.ForeignKey(
+        "locations.Branch", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
     amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     payment_type = models.CharField(max_length=10, choices=PAYMENT_TYPE_CHOICES)
     payment_status = models.CharField(
@@ -34,10 +41,50 @@ class Payment(models.Model):
     payment_date = models.DateField(null=True, blank=True)
     due_date = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # customer payment lists and pending totals
+            models.Index(fields=["user", "payment_status"], name="payment_user_status_idx"),
+            # pending monthly payments of a subscription (suspension checks, pay flow)
+            models.Index(
+                fields=["subscription", "payment_type", "payment_status", "due_date"],
+                name="payment_sub_type_status_idx",
+            ),
+            # overdue pending payments for the fine job
+            models.Index(fields=["payment_status", "due_date"], name="payment_status_due_idx"),
+        ]
+
     def __str__(self):
         return f"Payment {self.id} - {self.user.full_name} - {self.payment_status}"
 
 
+def resolve_payment_branch_id(payment):
+    """Demand -> the order's branch; monthly -> the customer's branch (see customer_branch_id)."""
+    from locations.services import customer_branch_id
+
+    if payment.order_id:
+        return Order.objects.filter(id=payment.order_id).values_list("branch_id", flat=True).first()
+    return customer_branch_id(payment.user_id)
+
+
+@receiver(pre_save, sender=Payment)
+def _attribute_branch_on_create(sender, instance, **kwargs):
+    if instance._state.adding and instance.branch_id is None:
+        instance.branch_id = resolve_payment_branch_id(instance)
+
+
+@receiver(post_save, sender=Payment)
+def _refresh_summary_on_payment_save(sender, instance, **kwargs):
+    from orders.services import refresh_customer_summary
+    refresh_customer_summary(instance.user_id)
+
+
+@receiver(post_delete, sender=Payment)
+def _refresh_summary_on_payment_delete(sender, instance, **kwargs):
+    from orders.services import refresh_customer_summary
+    refresh_customer_summary(instance.user_id, create=False)
+
+
 class PaymentFine(models.Model):
     payment = models.OneToOneField(
         Payment, on_delete=models.CASCADE, related_name="fine"
@@ -48,3 +95,43 @@ class PaymentFine(models.Model):
 
     def __str__(self):
         return f"Fine for Payment {self.payment_id}"
+
+
+# --- cold storage (see orders.models.ArchivedOrder) ------------------------------
+
+class ArchivedPayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    order = models.ForeignKey(
+        "orders.ArchivedOrder", on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+        related_name="payments",
+    )
+    subscription = models.ForeignKey(
+        CustomerSubscription, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+        related_name="+",
+    )
+    branch = models.ForeignKey(
+        "locations.Branch", on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    payment_type = models.CharField(max_length=10, choices=Payment.PAYMENT_TYPE_CHOICES)
+    payment_status = models.CharField(max_length=10, choices=Payment.PAYMENT_STATUS_CHOICES)
+    payment_date = models.DateField(null=True, blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "payment_status"], name="arch_payment_user_status_idx")]
+
+    def __str__(self):
+        return f"Archived payment {self.id}"
+
+
+class ArchivedPaymentFine(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    payment = models.OneToOneField(
+        ArchivedPayment, on_delete=models.DO_NOTHING, db_constraint=False, related_name="fine"
+    )
+    fine_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    fine_days = models.IntegerField()
+    calculated_at = models.DateTimeField()
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 from typing import Optional
 
 from django.db import transaction
 from django.utils import timezone
 
+from jobs.runs import current_run, record_run
+
 from .models import Payment, PaymentFine
 
 
@@ -49,25 +51,115 @@ def ensure_fine_for_payment(payment: Payment, *, today: Optional[date] = None) -
     fine_amount = compute_fine_amount(days_overdue=days_overdue)
 
     with transaction.atomic():
-        fine, _ = PaymentFine.objects.update_or_create(
+        fine, created = PaymentFine.objects.update_or_create(
             payment=payment,
             defaults={"fine_amount": fine_amount, "fine_days": days_overdue},
         )
+    current_run().add(created=int(created), updated=int(not created))
     return fine
 
 
-def ensure_fines_for_all_overdue(*, today: Optional[date] = None, limit: int | None = None) -> int:
+@record_run("fines")
+def ensure_fines_for_all_overdue(
+    *, today: Optional[date] = None, limit: int | None = None, lock_timeout_s: float = 0
+) -> int:
     """Batch ensure fines for all overdue pending payments.
 
+    Runs under the "washmate:fines" lease so web-worker threads, the scheduler
+    and commands never process the batch concurrently; returns 0 if another
+    process holds it. Recorded as a "fines" JobRun (jobs/runs.py).
+
     Returns number of payments processed.
     """
+    from jobs.leases import lease
+
     today_d = _local_today(today)
     qs = Payment.objects.filter(payment_status="pending", due_date__isnull=False, due_date__lt=today_d).order_by("id")
     if limit:
         qs = qs[: int(limit)]
 
     processed = 0
-    for p in qs:
-        ensure_fine_for_payment(p, today=today_d)
-        processed += 1
+    run = current_run()
+    with lease("washmate:fines", ttl_s=60, timeout_s=lock_timeout_s) as got:
+        run.lock_outcome(bool(got))
+        if not got:
+            return 0
+        for p in qs:
+            ensure_fine_for_payment(p, today=today_d)
+            processed += 1
+            run.add(scanned=1)
     return processed
+
+
+@record_run("monthly_payments")
+def generate_monthly_payments(
+    *, today: Optional[date] = None, dry_run: bool = False, log=None, lock_timeout_s: float = 0
+) -> dict:
+    """Create renewal payments for active subscriptions whose 30-day period has completed.
+
+    - Never creates a second pending monthly payment for a subscription.
+    - Due date is today + 4 days (grace window).
+
+    `log(message, detail=...)` receives per-subscription lines; detail=True
+    marks skip notices (only shown at higher verbosity by the command).
+    Runs under the "washmate:monthly_payments" lease (check-then-insert is not
+    safe to run twice concurrently) and recorded as a "monthly_payments" JobRun.
+    Returns {"created": n, "skipped": n, "locked": bool}.
+    """
+    from jobs.leases import lease
+
+    run = current_run()
+    run.dry_run = run.dry_run or dry_run
+    with lease("washmate:monthly_payments", ttl_s=60, timeout_s=lock_timeout_s) as got:
+        run.lock_outcome(bool(got))
+        if not got:
+            return {"created": 0, "skipped": 0, "locked": False}
+        result = _generate_monthly_payments(today=today, dry_run=dry_run, log=log)
+        run.add(scanned=result["created"] + result["skipped"], created=0 if dry_run else result["created"])
+        run.details["skipped"] = result["skipped"]
+        return {**result, "locked": True}
+
+
+def _generate_monthly_payments(*, today: Optional[date], dry_run: bool, log) -> dict:
+    from subscriptions.models import CustomerSubscription
+
+    today_d = _local_today(today)
+    log = log or (lambda message, detail=False: None)
+
+    active_subs = CustomerSubscription.objects.select_related("plan", "user").filter(
+        is_active=True,
+        start_date__lte=today_d,
+    )
+
+    created = skipped = 0
+    for sub in active_subs:
+        # Idempotency: if there's any pending monthly payment, never create another.
+        if Payment.objects.filter(subscription=sub, payment_type="monthly", payment_status="pending").exists():
+            skipped += 1
+            log(f"  Skipped: {sub.user.full_name} (has pending monthly payment)", detail=True)
+            continue
+
+        # Rolling renewal: generate only when the current period completes.
+        # Subscription end_date is extended by +30 days upon successful payment.
+        cycle_end = sub.end_date or (sub.start_date + timedelta(days=30))
+        if today_d < cycle_end:
+            skipped += 1
+            log(f"  Skipped: {sub.user.full_name} (not due yet)", detail=True)
+            continue
+
+        if dry_run:
+            log(f"  [DRY-RUN] Would create: {sub.user.full_name} - ₹{sub.plan.monthly_price}")
+        else:
+            with transaction.atomic():
+                Payment.objects.create(
+                    user=sub.user,
+                    subscription=sub,
+                    order=None,
+                    amount=sub.plan.monthly_price,
+                    payment_type="monthly",
+                    payment_status="pending",
+                    due_date=today_d + timedelta(days=4),
+                )
+        created += 1
+
+    return {"created": created, "skipped": skipped}
@@ -0,0 +1,51 @@
+"""Deferred fine writes (worked by `manage.py run_workers`)."""
+import hashlib
+from datetime import date
+from typing import Iterable, Optional
+
+from django.utils import timezone
+
+from jobs.queue import enqueue, task
+
+from .models import Payment, PaymentFine
+from .services import ensure_fine_for_payment
+
+
+@task("payments.ensure_fines")
+def ensure_fines(*, payment_ids, date: str):
+    today = _parse_date(date)
+    processed = 0
+    for payment in Payment.objects.filter(id__in=payment_ids).order_by("id"):
+        ensure_fine_for_payment(payment, today=today)
+        processed += 1
+    return {"processed": processed}
+
+
+def _parse_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def enqueue_fines(payments: Iterable[Payment], *, today: Optional[date] = None):
+    """Queue a PaymentFine refresh for the overdue pending payments among `payments`.
+
+    Returns the job, or None when no overdue payment has a stale or missing fine row.
+    """
+    today = today or timezone.localdate()
+    fine_days = {
+        p.id: (today - p.due_date).days
+        for p in payments
+        if p.payment_status == "pending" and p.due_date is not None and p.due_date < today
+    }
+    if not fine_days:
+        return None
+    # rows already up to date need no job (keeps repeated reads write-free)
+    current = set(PaymentFine.objects.filter(payment_id__in=fine_days).values_list("payment_id", "fine_days"))
+    ids = sorted(pid for pid, days in fine_days.items() if (pid, days) not in current)
+    if not ids:
+        return None
+    digest = hashlib.sha1(",".join(map(str, ids)).encode()).hexdigest()[:16]
+    return enqueue(
+        "payments.ensure_fines",
+        {"payment_ids": ids, "date": today.isoformat()},
+        dedupe_key=f"fines:{today.isoformat()}:{digest}",
+    )
@@ -1,2 +1,103 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
-# ...add tests later...
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from locations.models import City, Branch, CustomerAddress
+from orders.models import Order, OrderWeight
+from payments.models import Payment, PaymentFine
+from subscriptions.models import SubscriptionPlan, CustomerSubscription
+
+
+class CustomerPaymentsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="payer@example.com",
+            password="pass12345",
+            full_name="Payer",
+            phone="9000000002",
+            role=User.Role.CUSTOMER,
+            is_active=True,
+            is_approved=True,
+        )
+        city = City.objects.create(name="PayCity", state="PC")
+        self.branch = Branch.objects.create(
+            city=city, branch_name="Main", address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.address = CustomerAddress.objects.create(
+            user=self.user, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        self.today = timezone.localdate()
+        self.sub = CustomerSubscription.objects.create(
+            user=self.user, plan=plan, preferred_pickup_shift="morning",
+            start_date=self.today, end_date=self.today + timedelta(days=30),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _demand_payment(self, weight):
+        order = Order.objects.create(
+            user=self.user, branch=self.branch, address=self.address, order_type="demand",
+            pickup_shift="morning", pickup_date=self.today, status="delivered",
+        )
+        OrderWeight.objects.create(order=order, weight_kg=weight)
+        return Payment.objects.create(
+            user=self.user, order=order, amount=weight * 10, payment_type="demand",
+            payment_status="pending", due_date=self.today + timedelta(days=1),
+        )
+
+    def _count_queries(self, path):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(path)
+        self.assertEqual(res.status_code, 200)
+        return len(ctx.captured_queries), res
+
+    def test_query_count_independent_of_rows_and_no_fine_writes(self):
+        overdue = Payment.objects.create(
+            user=self.user, subscription=self.sub, amount=Decimal("199.00"), payment_type="monthly",
+            payment_status="pending", due_date=self.today - timedelta(days=3),
+        )
+        first_demand = self._demand_payment(Decimal("2.50"))
+        small, _ = self._count_queries("/api/customer/payments/")
+
+        for _ in range(10):
+            self._demand_payment(Decimal("1.00"))
+        large, res = self._count_queries("/api/customer/payments/")
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(res.data), 12)
+        row = next(r for r in res.data if r["id"] == overdue.id)
+        self.assertEqual(row["fine_days"], 3)
+        self.assertEqual(row["fine_amount"], 30.0)
+        self.assertEqual(row["plan_name"], "Basic")
+        self.assertFalse(PaymentFine.objects.exists())
+
+        demand_row = next(r for r in res.data if r["id"] == first_demand.id)
+        self.assertEqual(demand_row["weight_kg"], 2.5)
+        self.assertEqual(demand_row["order_status"], "delivered")
+        self.assertTrue(demand_row["is_payable"])
+
+    def test_cursor_paging_and_status_filter(self):
+        ids = [self._demand_payment(Decimal("1.00")).id for _ in range(5)]
+        Payment.objects.filter(id=ids[0]).update(payment_status="paid")
+
+        res = self.client.get("/api/customer/payments/", {"limit": 2})
+        self.assertEqual([r["id"] for r in res.data], ids[:-3:-1])
+        cursor = res["X-Next-Cursor"]
+
+        res = self.client.get("/api/customer/payments/", {"limit": 10, "cursor": cursor})
+        self.assertEqual([r["id"] for r in res.data], ids[2::-1])
+        self.assertNotIn("X-Next-Cursor", res)
+
+        res = self.client.get("/api/customer/payments/", {"status": "paid"})
+        self.assertEqual([r["id"] for r in res.data], [ids[0]])
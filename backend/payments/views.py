@@ -1,18 +1,23 @@
 from django.shortcuts import render
-from django.db.models import Sum, Count
+from django.db.models import Sum, F
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from accounts.models import User
-from locations.models import Branch, CustomerAddress, ServiceZone
-from orders.models import Order
-from .models import Payment, PaymentFine
-from .services import ensure_fine_for_payment
+from locations.models import Branch
+from .models import ArchivedPayment, Payment, PaymentFine
+from .services import compute_fine_amount
+from .tasks import enqueue_fines
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 from branch_management.models import BranchManager
 from subscriptions.models import CustomerSubscription
+from analytics.cache import swr_cached
+from core.db_router import ReplicaReadMixin, replica_reads
+from orders.tasks import enqueue_todays_order
+from analytics.models import DailyOrderRollup
+from analytics.services import order_total, revenue_total
 import razorpay
 from django.conf import settings
 from rest_framework.decorators import api_view, permission_classes
@@ -42,38 +47,55 @@ def _get_razorpay_client():
     _client = razorpay.Client(auth=(key_id, key_secret))
     return _client
 
-class AdminOverviewView(APIView):
+# Dashboard aggregates are shared by every admin; serve them stale-while-revalidate.
+DASHBOARD_CACHE_TTL_S = getattr(settings, "DASHBOARD_CACHE_TTL_S", 30)
+DASHBOARD_CACHE_STALE_S = getattr(settings, "DASHBOARD_CACHE_STALE_S", 300)
+
+
+@swr_cached("admin-overview", ttl_s=DASHBOARD_CACHE_TTL_S, stale_s=DASHBOARD_CACHE_STALE_S)
+@replica_reads()  # also covers background refreshes
+def _admin_overview_payload():
+    total_revenue = revenue_total()
+
+    active_branches = Branch.objects.filter(is_active=True).count()
+    users_total = User.objects.count()
+    orders_total = order_total()
+
+    perf_qs = (
+        DailyOrderRollup.objects.values("branch__branch_name")
+        .annotate(total=Sum("order_count"))
+        .order_by("-total")[:10]
+    )
+    branch_performance = [p["total"] for p in perf_qs]
+
+    return {
+        "weeklyRevenue": float(total_revenue),
+        "activeBranches": active_branches,
+        "onlineUsers": users_total,
+        "ordersTotal": orders_total,
+        "branchPerformance": branch_performance,
+    }
+
+
+@swr_cached("admin-analytics", ttl_s=DASHBOARD_CACHE_TTL_S, stale_s=DASHBOARD_CACHE_STALE_S)
+@replica_reads()
+def _admin_analytics_payload(today):
+    monthly_revenue = revenue_total(start=today.replace(day=1), end=today)
+    return {
+        "totalOrders": order_total(),
+        "monthlyRevenue": float(monthly_revenue),
+        "activeBranches": Branch.objects.filter(is_active=True).count(),
+        "usersTotal": User.objects.count(),
+    }
+
+
+class AdminOverviewView(ReplicaReadMixin, APIView):
     authentication_classes = []  # TODO: secure with proper auth
 
     def get(self, request):
-        total_revenue = Payment.objects.filter(payment_status="paid").aggregate(
-            total=Sum("amount")
-        )["total"] or 0
-
-        active_branches = Branch.objects.filter(is_active=True).count()
-        users_total = User.objects.count()
-        orders_total = Order.objects.count()
-
-        perf_qs = (
-            Order.objects.values("branch__branch_name")
-            .annotate(total=Count("id"))
-            .order_by("-total")[:10]
-        )
-        branch_performance = [p["total"] for p in perf_qs] or [60, 40, 80, 50, 70, 90, 55, 35, 75, 65]
+        return Response(_admin_overview_payload(), status=status.HTTP_200_OK)
 
-        return Response(
-            {
-                "weeklyRevenue": float(total_revenue),
-                "activeBranches": active_branches,
-                "onlineUsers": users_total,
-                "ordersTotal": orders_total,
-                "branchPerformance": branch_performance,
-                "traffic": {"search": 40, "direct": 30, "social": 30},
-            },
-            status=status.HTTP_200_OK,
-        )
-
-class AdminPaymentsView(APIView):
+class AdminPaymentsView(ReplicaReadMixin, APIView):
     authentication_classes = []  # TODO: secure with proper auth
 
     def get(self, request):
@@ -90,26 +112,11 @@ class AdminPaymentsView(APIView):
         ]
         return Response(data, status=status.HTTP_200_OK)
 
-class AdminAnalyticsView(APIView):
+class AdminAnalyticsView(ReplicaReadMixin, APIView):
     authentication_classes = []  # TODO: secure with proper auth
 
     def get(self, request):
-        now = timezone.now()
-        monthly_revenue = Payment.objects.filter(
-            payment_status="paid",
-            payment_date__year=now.year,
-            payment_date__month=now.month,
-        ).aggregate(total=Sum("amount"))["total"] or 0
-
-        return Response(
-            {
-                "totalOrders": Order.objects.count(),
-                "monthlyRevenue": float(monthly_revenue),
-                "activeBranches": Branch.objects.filter(is_active=True).count(),
-                "usersTotal": User.objects.count(),
-            },
-            status=status.HTTP_200_OK,
-        )
+        return Response(_admin_analytics_payload(timezone.localdate()), status=status.HTTP_200_OK)
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
     def enforce_csrf(self, request):
@@ -133,83 +140,35 @@ class ManagerMonthlyPaymentsView(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]
     permission_classes = [IsAuthenticated]
 
-    def _get_branch_pincode_set(self, branch):
-        pincodes = set()
-        zones = ServiceZone.objects.filter(branch=branch).only("pincodes")
-        for z in zones:
-            raw = getattr(z, "pincodes", None) or []
-            if isinstance(raw, str):
-                # tolerate legacy/incorrect storage like "682001,682002"
-                raw = [p.strip() for p in raw.replace(";", ",").split(",") if p.strip()]
-            if isinstance(raw, (list, tuple)):
-                for p in raw:
-                    s = str(p).strip()
-                    if s:
-                        pincodes.add(s)
-        return pincodes
-
     def get(self, request):
         branch = _get_branch(request)
         if not branch:
             return Response({"detail": "branch not found"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Determine customers for this branch using their latest address pincode,
-        # matched against this branch's service-zone pincodes.
-        # This avoids missing payments when monthly orders haven't been generated yet.
-        branch_pincodes = self._get_branch_pincode_set(branch)
-        if not branch_pincodes:
-            return Response([], status=status.HTTP_200_OK)
-
-        # Consider users who have (or had) subscriptions at any point; payments always link to subscription.
-        sub_user_ids = list(CustomerSubscription.objects.values_list("user_id", flat=True).distinct())
-
-        latest_addr_by_user = {}
-        for addr in (
-            CustomerAddress.objects.filter(user_id__in=sub_user_ids)
-            .only("id", "user_id", "pincode")
-            .order_by("user_id", "-id")
-        ):
-            if addr.user_id not in latest_addr_by_user:
-                latest_addr_by_user[addr.user_id] = addr
-
-        eligible_user_ids = [
-            uid
-            for uid, addr in latest_addr_by_user.items()
-            if str(getattr(addr, "pincode", "")).strip() in branch_pincodes
-        ]
-
-        # Also include users that already have orders in this branch.
-        # This covers cases where the customer's latest address changed, but their
-        # subscription orders (and payments) still belong to this branch.
-        order_user_ids = list(
-            Order.objects.filter(branch=branch)
-            .values_list("user_id", flat=True)
-            .distinct()
-        )
-
-        eligible_user_ids = list(set(eligible_user_ids).union(set(order_user_ids)))
-
+        # CHANGED: "subscribers of this branch" come from the maintained customer->branch
+        # affinity table (latest address pincode in the branch's zones, or existing orders
+        # in the branch), so this is a single indexed join instead of a Python-side match.
         payments = Payment.objects.select_related(
             "user", "subscription", "subscription__plan"
         ).filter(
             payment_type="monthly",
             subscription__isnull=False,
-            subscription__user_id__in=eligible_user_ids,
+            subscription__user__branch_affinities__branch=branch,
         ).order_by("-due_date")[:200]
+        payments = list(payments)
 
-        # NEW: ensure fine rows exist for any overdue pending payments in this list
-        try:
-            today = timezone.localdate()
-            for p in payments:
-                ensure_fine_for_payment(p, today=today)
-        except Exception:
-            pass
-
-        fines_qs = PaymentFine.objects.filter(payment__in=payments).order_by("payment_id", "-calculated_at")
+        # CHANGED: fines are computed for display (same rule as ensure_fine_for_payment);
+        # the PaymentFine rows are written by a queued job instead of in this GET
+        today = timezone.localdate()
+        enqueue_fines(payments, today=today)
         fine_map = {}
-        for f in fines_qs:
-            if f.payment_id not in fine_map:
-                fine_map[f.payment_id] = {"fine_amount": float(f.fine_amount), "fine_days": f.fine_days}
+        for p in payments:
+            if p.payment_status == "pending" and p.due_date and p.due_date < today:
+                fine_days = (today - p.due_date).days
+                fine_map[p.id] = {
+                    "fine_amount": float(compute_fine_amount(days_overdue=fine_days)),
+                    "fine_days": fine_days,
+                }
 
         data = [
             {
@@ -236,7 +195,16 @@ class CustomerPayNowView(APIView):
             return Response({"detail": "payment_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            p = Payment.objects.select_related("subscription", "subscription__plan", "order").get(
+            payment_id = int(payment_id)
+        except (TypeError, ValueError):
+            payment_id = 0
+        if not 0 < payment_id < 2 ** 63:  # a primary key, not any string the client sends
+            return Response({"detail": "payment_id must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # NEW: the row lock serializes a double submit (it would otherwise extend the
+            # subscription twice); the second request then sees the payment paid
+            p = Payment.objects.select_for_update().get(
                 id=payment_id,
                 user=request.user,
                 payment_status="pending",
@@ -260,85 +228,137 @@ class CustomerPayNowView(APIView):
         if p.payment_type == "monthly" and p.subscription:
             _renew_subscription_after_payment(p.subscription, request.user, payment=p)
 
-            # NEW: resume service by ensuring today's monthly order exists
-            try:
-                from django.utils import timezone
-                from orders import views as order_views
-                today_local = timezone.localdate()
-                order_views._ensure_monthly_orders_for_subscription(p.subscription, today_local, today_local)
-            except Exception:
-                pass
+            # CHANGED: resume service by queueing today's monthly order (committed with the payment)
+            enqueue_todays_order(p.subscription)
 
         return Response({"detail": "Payment successful"}, status=status.HTTP_200_OK)
 
-class CustomerPaymentsView(APIView):
-    authentication_classes = [CsrfExemptSessionAuthentication]
-    permission_classes = [IsAuthenticated]
+CUSTOMER_PAYMENTS_PAGE_SIZE = 200
 
-    def get(self, request):
-        today = timezone.localdate()
-        payments = Payment.objects.select_related(
-            "order", "subscription", "subscription__plan"
-        ).filter(user=request.user).order_by("-id")[:200]
 
-        # NEW: ensure fines for any overdue pending payments in this list
+def _customer_payments_query(user, params):
+    """(values queryset sliced to limit + 1, limit) for the customer payments list.
+
+    Raises ValueError with the 400 detail message on bad paging params.
+    """
+    # CHANGED: one projected query (order status, weight and plan joined in);
+    # no per-payment fine writes on read (the daily fine job persists PaymentFine).
+    # NEW: archived payments (orders/archive.py) are read from their table in the same query
+    live = Payment.objects.filter(user=user)
+    archived = ArchivedPayment.objects.filter(user=user)
+
+    status_filter = params.get("status")
+    if status_filter:
+        live = live.filter(payment_status=status_filter)
+        archived = archived.filter(payment_status=status_filter)
+
+    # NEW: keyset paging on id (newest first); next page cursor is sent in X-Next-Cursor
+    cursor = params.get("cursor")
+    if cursor not in [None, ""]:
         try:
-            for p in payments:
-                ensure_fine_for_payment(p, today=today)
-        except Exception:
-            pass
+            cursor_id = int(cursor)
+        except (TypeError, ValueError):
+            raise ValueError("invalid cursor")
+        live = live.filter(id__lt=cursor_id)
+        archived = archived.filter(id__lt=cursor_id)
 
-        payment_ids = [p.id for p in payments]
-        fines = PaymentFine.objects.filter(payment_id__in=payment_ids)
-        fine_map = {f.payment_id: f for f in fines}
+    try:
+        limit = int(params.get("limit") or CUSTOMER_PAYMENTS_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError("invalid limit")
+    limit = max(1, min(limit, CUSTOMER_PAYMENTS_PAGE_SIZE))
+
+    def _projected(qs, weight_path):
+        return qs.values(
+            "id",
+            "amount",
+            "payment_type",
+            "payment_status",
+            "payment_date",
+            "due_date",
+            "order_id",
+            "subscription_id",
+            order_status=F("order__status"),
+            weight_kg=F(weight_path),
+            plan_name=F("subscription__plan__name"),
+        )
 
-        order_ids = [p.order_id for p in payments if p.order_id]
-        from orders.models import OrderWeight
-        weights = OrderWeight.objects.filter(order_id__in=order_ids)
-        weight_map = {w.order_id: w.weight_kg for w in weights}
+    rows = (
+        _projected(live, "order__orderweight__weight_kg")
+        .union(_projected(archived, "order__weight__weight_kg"), all=True)
+        .order_by("-id")[: limit + 1]
+    )
+    return rows, limit
 
-        data = []
-        for p in payments:
-            fine = fine_map.get(p.id)
-            weight = weight_map.get(p.order_id) if p.order_id else None
-
-            order_status = p.order.status if getattr(p, "order", None) else None
-            is_payable = (p.payment_type == "monthly") or (order_status == "delivered")
-
-            # CHANGED: treat demand amount 0/NULL as not-calculated => send None to UI
-            amt = p.amount
-            if p.payment_type == "demand" and (amt is None or amt == 0):
-                amt_out = None
-            else:
-                amt_out = float(amt) if amt is not None else None
-
-            # NEW: hide demand due_date until delivered (avoid placeholder/far-future dates in UI)
-            if p.payment_type == "demand" and order_status != "delivered":
-                due_out = None
-            else:
-                due_out = p.due_date.isoformat() if p.due_date else None
-
-            data.append({
-                "id": p.id,
-                "amount": amt_out,
-                "payment_type": p.payment_type,
-                "payment_status": p.payment_status,
-                "payment_date": p.payment_date.isoformat() if p.payment_date else None,
-                "due_date": due_out,  # CHANGED
 
-                "fine_amount": float(fine.fine_amount) if fine else 0,
-                "fine_days": fine.fine_days if fine else 0,
+def _customer_payment_row(p, today):
+    order_status = p["order_status"]
+    is_payable = (p["payment_type"] == "monthly") or (order_status == "delivered")
 
-                "order_id": p.order_id,
-                "order_status": order_status,
-                "is_payable": is_payable,
-                "weight_kg": float(weight) if weight else None,
+    # Same rule as ensure_fine_for_payment: pending and past due => fine per day overdue
+    due = p["due_date"]
+    fine_days = (today - due).days if (p["payment_status"] == "pending" and due and due < today) else 0
+    fine_amount = compute_fine_amount(days_overdue=fine_days)
 
-                "subscription_id": p.subscription_id,
-                "plan_name": p.subscription.plan.name if p.subscription and p.subscription.plan else None,
-            })
+    # CHANGED: treat demand amount 0/NULL as not-calculated => send None to UI
+    amt = p["amount"]
+    if p["payment_type"] == "demand" and (amt is None or amt == 0):
+        amt_out = None
+    else:
+        amt_out = float(amt) if amt is not None else None
 
-        return Response(data, status=status.HTTP_200_OK)
+    # NEW: hide demand due_date until delivered (avoid placeholder/far-future dates in UI)
+    if p["payment_type"] == "demand" and order_status != "delivered":
+        due_out = None
+    else:
+        due_out = due.isoformat() if due else None
+
+    weight = p["weight_kg"]
+    return {
+        "id": p["id"],
+        "amount": amt_out,
+        "payment_type": p["payment_type"],
+        "payment_status": p["payment_status"],
+        "payment_date": p["payment_date"].isoformat() if p["payment_date"] else None,
+        "due_date": due_out,  # CHANGED
+
+        "fine_amount": float(fine_amount) if fine_days else 0,
+        "fine_days": fine_days,
+
+        "order_id": p["order_id"],
+        "order_status": order_status,
+        "is_payable": is_payable,
+        "weight_kg": float(weight) if weight else None,
+
+        "subscription_id": p["subscription_id"],
+        "plan_name": p["plan_name"],
+    }
+
+
+def _customer_payments_page(rows, limit, today):
+    """(response data, next cursor or None) from the limit + 1 fetched rows."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    data = [_customer_payment_row(p, today) for p in rows]
+    return data, (str(rows[-1]["id"]) if has_more and rows else None)
+
+
+class CustomerPaymentsView(APIView):
+    authentication_classes = [CsrfExemptSessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        today = timezone.localdate()
+        try:
+            rows, limit = _customer_payments_query(request.user, request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data, next_cursor = _customer_payments_page(list(rows), limit, today)
+        response = Response(data, status=status.HTTP_200_OK)
+        if next_cursor:
+            response["X-Next-Cursor"] = next_cursor
+        return response
 
 @api_view(["POST"])
 @authentication_classes([CsrfExemptSessionAuthentication])  # <-- key fix (avoid CSRF 403 on POST)
@@ -407,15 +427,15 @@ def verify_payment(request):
     except Exception:
         return Response({"detail": "Verification error"}, status=status.HTTP_502_BAD_GATEWAY)
 
-def _renew_subscription_after_payment(sub, user, *, payment=None):
-    """Extend subscription by 30 days.
+def _renew_subscription_after_payment(sub, user, *, payment=None, today=None):
+    """Extend subscription by 30 days; returns whether end_date moved.
 
     NOTE: Do NOT create the next monthly payment immediately after a successful payment.
     A new payment should be generated only when the current 30-day period completes
     (see management command generate_monthly_payments).
     """
     if not sub or not sub.is_active:
-        return
+        return False
 
     # If this is the first monthly payment created at subscription signup,
     # it covers the initial 30-day period and should NOT extend end_date.
@@ -428,7 +448,7 @@ def _renew_subscription_after_payment(sub, user, *, payment=None):
                 .first()
             )
             if first_monthly_payment_id == getattr(payment, "id", None):
-                return
+                return False
     except Exception:
         # Fail open: if we can't determine, keep existing behavior.
         pass
@@ -437,11 +457,11 @@ def _renew_subscription_after_payment(sub, user, *, payment=None):
     if not hasattr(sub, "plan") or sub.plan is None:
         sub = CustomerSubscription.objects.select_related("plan").get(id=sub.id)
 
-    today = date.today()
+    today = today or date.today()
 
     # Do not extend early. Renewal should happen only when the period completed.
     if sub.end_date and today < sub.end_date:
-        return
+        return False
 
     # Extend from end_date (spec requirement). If end_date is missing, extend from today.
     base_end = sub.end_date or today
@@ -457,3 +477,4 @@ def _renew_subscription_after_payment(sub, user, *, payment=None):
         payment_type="monthly",
         payment_status="pending",
     ).delete()
+    return True
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class PerfConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'perf'
+
+    def ready(self):
+        from .slowqueries import enable
+        enable()  # slow-query capture on every connection (SLOW_QUERY_ENABLED)
@@ -0,0 +1,140 @@
+"""Scaling benchmark of the batch jobs (`manage.py bench_jobs`).
+
+bench_scale(n) seeds a lean world of n subscribed customers (seed_world with
+months=0: today's order, renewal payments and fines, no long order history)
+into the current, empty database, then runs the jobs in the order the
+scheduler does and measures each: wall time, rows/s, queries (and per input
+row, to see whether a job is linear in queries per subscription), DB time and
+peak RSS.
+
+    JOBS                         input rows                   new rows counted
+    monthly_orders               active subscriptions         Order  (tomorrow's orders)
+    monthly_orders_rerun         active subscriptions         Order  (idempotent pass)
+    generate_monthly_orders_cmd  active subscriptions         Order  (the command, day after)
+    fines                        overdue pending payments     PaymentFine
+    calculate_fines_cmd          overdue pending payments     PaymentFine
+    monthly_payments             active started subscriptions Payment  (as of 30 days ahead)
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from io import StringIO
+from typing import Callable, Dict, Iterable, Optional
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from orders.models import Order
+from payments.models import Payment, PaymentFine
+from payments.services import ensure_fines_for_all_overdue, generate_monthly_payments
+from subscriptions.models import CustomerSubscription
+
+from .bench import PeakRss, QueryTimer
+from .seed import SeedConfig, seed_world
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    run: Callable[[date], object]
+    inputs: Callable[[date], object]  # queryset of the rows the job has to look at
+    output: type  # model whose new rows are counted as "created"
+
+
+def _monthly_orders(days):
+    from orders.views import _ensure_monthly_orders_for_all
+
+    return lambda today: _ensure_monthly_orders_for_all(for_date=today + timedelta(days=days), lock_timeout_s=10)
+
+
+def _active_subscriptions(today):
+    return CustomerSubscription.objects.filter(is_active=True)
+
+
+def _started_subscriptions(today):
+    return CustomerSubscription.objects.filter(is_active=True, start_date__lte=today)
+
+
+def _overdue_payments(today):
+    return Payment.objects.filter(payment_status="pending", due_date__isnull=False, due_date__lt=today)
+
+
+JOBS = [
+    Job("monthly_orders", _monthly_orders(1), _active_subscriptions, Order),
+    Job("monthly_orders_rerun", _monthly_orders(1), _active_subscriptions, Order),
+    Job(
+        "generate_monthly_orders_cmd",
+        lambda today: call_command("generate_monthly_orders", date=str(today + timedelta(days=2)), stdout=StringIO()),
+        _active_subscriptions, Order,
+    ),
+    Job("fines", lambda today: ensure_fines_for_all_overdue(today=today, lock_timeout_s=10), _overdue_payments, PaymentFine),
+    Job(
+        "calculate_fines_cmd", lambda today: call_command("calculate_fines", stdout=StringIO()),
+        _overdue_payments, PaymentFine,
+    ),
+    Job(
+        "monthly_payments",
+        lambda today: generate_monthly_payments(today=today + timedelta(days=30), lock_timeout_s=10),
+        _started_subscriptions, Payment,
+    ),
+]
+
+
+def measure_job(job: Job, *, today: date) -> dict:
+    rows = job.inputs(today).count()
+    before = job.output.objects.count()
+    timer = QueryTimer()
+    with PeakRss() as rss, timer.capture():
+        started = time.perf_counter()
+        job.run(today)
+        wall_s = time.perf_counter() - started
+    created = job.output.objects.count() - before
+    return {
+        "rows": rows,
+        "created": created,
+        "wall_ms": round(wall_s * 1000.0, 1),
+        "rows_per_s": round(rows / wall_s, 1) if wall_s else None,
+        "queries": timer.count,
+        "queries_per_row": round(timer.count / rows, 2) if rows else None,
+        "db_ms": round(timer.seconds * 1000.0, 1),
+        "peak_rss_mb": rss.peak_mb,
+    }
+
+
+def bench_scale(
+    subscriptions: int,
+    *,
+    seed: int = 42,
+    only: Optional[Iterable[str]] = None,
+    log: Callable[[str], None] = lambda message: None,
+) -> Dict[str, dict]:
+    """Seed `subscriptions` subscribers into the (empty) database and measure JOBS.
+
+    Returns {job name: result}; each result also carries "subscriptions".
+    """
+    today = timezone.localdate()
+    log(f"seeding {subscriptions} subscriptions")
+    seed_world(
+        SeedConfig(
+            customers=subscriptions, subscription_rate=1.0, months=0, demand_orders_per_month=0,
+            status_logs=False, chunk_size=5000, seed=seed, tag=f"jobs{subscriptions}", today=today,
+        )
+    )
+    results = {}
+    for job in JOBS:
+        if only and not any(part in job.name for part in only):
+            continue
+        result = {"subscriptions": subscriptions, **measure_job(job, today=today)}
+        results[job.name] = result
+        log(f"{job.name}: {_summary(result)}")
+    return results
+
+
+def _summary(result):
+    return (
+        f"{result['rows']} rows in {result['wall_ms']:.0f}ms ({result['rows_per_s']} rows/s), "
+        f"{result['queries']} queries ({result['queries_per_row']}/row), created {result['created']}, "
+        f"peak RSS {result['peak_rss_mb']} MB"
+    )
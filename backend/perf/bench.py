@@ -0,0 +1,193 @@
+"""Shared pieces of the benchmark commands (bench_api, ...).
+
+- QueryTimer counts the statements a block runs, and the time spent in
+  cursor.execute, on every configured database (the replica too).
+- PeakRss samples resident memory while a block runs.
+- Results files are JSON: {"meta": {...}, "results": {name: {metric: value}}},
+  so two runs (e.g. before/after a commit) can be compared with
+  compare_results() / format_report().
+"""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class QueryTimer:
+    """connection.execute_wrapper that tallies statements and seconds in the database."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+    @contextmanager
+    def capture(self):
+        self.count = 0
+        self.seconds = 0.0
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux), else the process high-water mark, else None."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRss:
+    """Highest RSS seen while the block runs, sampled every interval_s from a thread.
+
+    Where /proc is not available this degrades to the process-wide peak.
+    """
+
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        value = _rss_bytes()
+        if value is not None and (self.peak is None or value > self.peak):
+            self.peak = value
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="perf-rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return None if self.peak is None else round(self.peak / (1024 * 1024), 1)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_meta(**extra) -> dict:
+    return {
+        "created_at": timezone.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "database": connections["default"].vendor,
+        **extra,
+    }
+
+
+def write_results(path: str, meta: dict, results: Dict[str, dict]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta, "results": results}, fh, indent=2, default=str)
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, dict) or not isinstance(data.get("results"), dict):
+        raise ValueError(f"{path} is not a benchmark results file")
+    return data
+
+
+def compare_results(
+    baseline: Dict[str, dict],
+    current: Dict[str, dict],
+    *,
+    timing_metrics: Iterable[str] = ("p50_ms", "p95_ms"),
+    count_metrics: Iterable[str] = ("queries",),
+    threshold_pct: float = 20.0,
+    min_delta_ms: float = 1.0,
+) -> List[dict]:
+    """One row per (name, metric) present in both runs.
+
+    A timing metric regresses when it grows by more than threshold_pct percent
+    *and* by at least min_delta_ms (sub-millisecond noise is ignored); a count
+    metric (queries) regresses on any increase, and so does an endpoint that
+    starts answering with an HTTP status >= 400 it did not return before.
+    """
+    timing_metrics, count_metrics = tuple(timing_metrics), tuple(count_metrics)
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        old, new = baseline.get(name), current.get(name)
+        if old is None or new is None:
+            rows.append({"name": name, "metric": None, "old": None, "new": None, "change_pct": None,
+                         "regression": False, "note": "only in baseline" if new is None else "new"})
+            continue
+        if {k for k in new.get("status", {}) if int(k) >= 400} - set(old.get("status", {})):
+            rows.append({"name": name, "metric": "status", "old": ",".join(old.get("status", {})),
+                         "new": ",".join(new["status"]), "change_pct": None, "regression": True, "note": ""})
+        for metric in timing_metrics + count_metrics:
+            a, b = old.get(metric), new.get(metric)
+            if a is None or b is None:
+                continue
+            change = None if not a else round((b - a) * 100.0 / a, 1)
+            if metric in count_metrics:
+                regression = b > a
+            else:
+                regression = b - a >= min_delta_ms and (not a or b > a * (1 + threshold_pct / 100.0))
+            rows.append({"name": name, "metric": metric, "old": a, "new": b, "change_pct": change,
+                         "regression": regression, "note": ""})
+    return rows
+
+
+def format_report(rows: List[dict]) -> List[str]:
+    lines = []
+    for row in rows:
+        if row["metric"] is None:
+            lines.append(f"  {row['name']:<32} ({row['note']})")
+            continue
+        change = "" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"  {row['name']:<32} {row['metric']:<10} {row['old']:>10} -> {row['new']:<10} {change:>8}{flag}")
+    return lines
@@ -0,0 +1,258 @@
+"""
+Latency benchmark of the read endpoints in core/urls.py, in-process with DRF's
+APIClient (no HTTP server), each endpoint called as the role it serves.
+
+Run it against a seeded database (`manage.py seed_load`), e.g. on SQLite:
+
+    SQLITE_PATH=load.sqlite3 python manage.py seed_load --customers 20000
+    SQLITE_PATH=load.sqlite3 python manage.py bench_api --output before.json
+    ... change code ...
+    SQLITE_PATH=load.sqlite3 python manage.py bench_api --output after.json --baseline before.json
+
+Per endpoint it records p50/p95/p99/mean latency, queries per request and
+time spent in the database (cursor.execute, all database aliases) over
+--iterations calls after --warmup calls. Users default to the seeded accounts
+of --tag: the customer, delivery staff and branch (manager) with the most
+orders, and admin@<tag>.test; --customer/--staff/--manager/--admin pick
+others by email.
+
+With --baseline the run is compared to an earlier results file: a latency
+metric regresses when it grows by more than --threshold percent and at least
+--min-delta-ms, a query count on any increase; --fail-on-regression turns
+regressions into a non-zero exit. `--results FILE --baseline FILE` compares
+two files without running anything.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from branch_management.models import BranchManager
+from locations.models import CustomerAddress
+from orders.models import Order
+from payments.models import Payment
+from perf.bench import (
+    QueryTimer,
+    compare_results,
+    format_report,
+    load_results,
+    percentile,
+    run_meta,
+    write_results,
+)
+
+
+# (name, role, path); {placeholders} are filled from the chosen users' data
+ENDPOINTS = [
+    ("delivery_orders", User.Role.DELIVERY_STAFF, "/api/delivery/orders/"),
+    ("delivery_profile", User.Role.DELIVERY_STAFF, "/api/delivery/profile/"),
+    ("customer_overview", User.Role.CUSTOMER, "/api/customer/overview/"),
+    ("customer_orders", User.Role.CUSTOMER, "/api/customer/orders/"),
+    ("customer_orders_demand", User.Role.CUSTOMER, "/api/customer/orders/?order_type=demand"),
+    ("customer_payments", User.Role.CUSTOMER, "/api/customer/payments/"),
+    ("customer_payments_pending", User.Role.CUSTOMER, "/api/customer/payments/?status=pending"),
+    ("customer_subscription", User.Role.CUSTOMER, "/api/subscriptions/me/"),
+    ("customer_plans", User.Role.CUSTOMER, "/api/subscriptions/plans/"),
+    ("customer_profile", User.Role.CUSTOMER, "/api/customer/profile/"),
+    ("customer_addresses", User.Role.CUSTOMER, "/api/customer/addresses/"),
+    ("customer_available_branches", User.Role.CUSTOMER, "/api/customer/available-branches/?address_id={address_id}"),
+    ("manager_overview", User.Role.BRANCH_MANAGER, "/api/manager/overview/"),
+    ("manager_orders", User.Role.BRANCH_MANAGER, "/api/manager/orders/"),
+    ("manager_staff", User.Role.BRANCH_MANAGER, "/api/manager/staff/"),
+    ("manager_zones", User.Role.BRANCH_MANAGER, "/api/manager/zones/"),
+    ("manager_subscriptions", User.Role.BRANCH_MANAGER, "/api/manager/subscriptions/"),
+    ("manager_monthly_payments", User.Role.BRANCH_MANAGER, "/api/manager/monthly-payments/"),
+    ("manager_approvals", User.Role.BRANCH_MANAGER, "/api/manager/approvals/"),
+    ("manager_branch", User.Role.BRANCH_MANAGER, "/api/manager/branch/"),
+    ("admin_overview", User.Role.SUPER_ADMIN, "/api/admin/overview/"),
+    ("admin_analytics", User.Role.SUPER_ADMIN, "/api/admin/analytics/"),
+    ("admin_timeseries", User.Role.SUPER_ADMIN, "/api/admin/analytics/timeseries/?granularity=week"),
+    ("admin_payments", User.Role.SUPER_ADMIN, "/api/admin/payments/"),
+    ("admin_branches", User.Role.SUPER_ADMIN, "/api/admin/branches/"),
+    ("admin_cities", User.Role.SUPER_ADMIN, "/api/admin/cities/"),
+    ("admin_users", User.Role.SUPER_ADMIN, "/api/admin/users/"),
+    ("admin_approvals", User.Role.SUPER_ADMIN, "/api/admin/approvals/"),
+    ("admin_plans", User.Role.SUPER_ADMIN, "/api/admin/plans/"),
+]
+
+
+def _busiest(field, tag):
+    """Value of `field` (an Order lookup) with the most orders of the tag's customers."""
+    row = (
+        Order.objects.filter(user__email__endswith=f"@{tag}.test")
+        .exclude(**{f"{field}__isnull": True})
+        .values(field)
+        .annotate(n=Count("id"))
+        .order_by("-n", field)
+        .first()
+    )
+    return row and row[field]
+
+
+def _measure(client, path, *, iterations, warmup, timer):
+    for _ in range(warmup):
+        client.get(path)
+    latencies, queries, db_ms, statuses = [], [], [], {}
+    for _ in range(iterations):
+        with timer.capture():
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+        latencies.append(elapsed_ms)
+        queries.append(timer.count)
+        db_ms.append(timer.seconds * 1000.0)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    latencies.sort()
+    db_ms.sort()
+    return {
+        "path": path,
+        "iterations": iterations,
+        "status": {str(code): n for code, n in sorted(statuses.items())},
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "queries": max(queries),
+        "db_p50_ms": round(percentile(db_ms, 50), 2),
+        "db_share": round(sum(db_ms) / sum(latencies), 3) if sum(latencies) else None,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark API read endpoints per role (latency percentiles, queries, DB time) and diff against a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tag", default="load", help="seed_load tag whose accounts to use")
+        parser.add_argument("--customer", help="Customer email (default: busiest seeded customer)")
+        parser.add_argument("--staff", help="Delivery staff email (default: busiest seeded courier)")
+        parser.add_argument("--manager", help="Branch manager email (default: manager of the busiest branch)")
+        parser.add_argument("--admin", help="Super admin email (default: admin@<tag>.test)")
+        parser.add_argument("--only", action="append", help="Run endpoints whose name contains this (repeatable)")
+        parser.add_argument("--iterations", type=int, default=30, help="Measured calls per endpoint")
+        parser.add_argument("--warmup", type=int, default=3, help="Unmeasured calls per endpoint first")
+        parser.add_argument("--output", help="Write results as JSON to this file")
+        parser.add_argument("--results", help="Compare this results file instead of running")
+        parser.add_argument("--baseline", help="Earlier results file to compare against")
+        parser.add_argument("--threshold", type=float, default=20.0, help="Latency regression threshold in percent")
+        parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency changes smaller than this")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1 or options["warmup"] < 0:
+            raise CommandError("--iterations must be >= 1 and --warmup >= 0")
+        if options["results"] and not options["baseline"]:
+            raise CommandError("--results needs --baseline")
+
+        try:
+            baseline = load_results(options["baseline"]) if options["baseline"] else None
+            current = load_results(options["results"]) if options["results"] else None
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if current is None:
+            meta, results = self._run(options)
+            if options["output"]:
+                write_results(options["output"], meta, results)
+                self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+            current = {"meta": meta, "results": results}
+
+        if baseline is not None:
+            self._report(baseline, current, options)
+
+    def _users(self, options):
+        tag = options["tag"]
+        manager_id = None
+        branch_id = _busiest("branch", tag) if not options["manager"] else None
+        if branch_id:
+            manager_id = BranchManager.objects.filter(branch_id=branch_id).values_list("user_id", flat=True).first()
+        lookups = {
+            User.Role.CUSTOMER: options["customer"] or _busiest("user", tag),
+            User.Role.DELIVERY_STAFF: options["staff"] or _busiest("delivery_staff__user", tag),
+            User.Role.BRANCH_MANAGER: options["manager"] or manager_id,
+            User.Role.SUPER_ADMIN: options["admin"] or f"admin@{tag}.test",
+        }
+        users = {}
+        for role, key in lookups.items():
+            if key is None:
+                continue
+            field = "email" if isinstance(key, str) else "id"
+            user = User.objects.filter(**{field: key}, role=role).first()
+            if user is None and field == "email":
+                raise CommandError(f"no {role} with email {key}")
+            if user is not None:
+                users[role] = user
+        return users
+
+    def _run(self, options):
+        users = self._users(options)
+        endpoints = [
+            e for e in ENDPOINTS if not options["only"] or any(part in e[0] for part in options["only"])
+        ]
+        missing = sorted({role for _, role, _ in endpoints if role not in users})
+        if missing:
+            raise CommandError(
+                f"no user for role(s) {', '.join(missing)}: seed with seed_load --tag {options['tag']} "
+                "or pass --customer/--staff/--manager/--admin"
+            )
+
+        customer = users.get(User.Role.CUSTOMER)
+        context = {
+            "address_id": customer and CustomerAddress.objects.filter(user=customer).order_by("-is_default", "id")
+            .values_list("id", flat=True).first(),
+        }
+        clients = {}
+        for role, user in users.items():
+            # a failing view is reported as status 500 instead of aborting the run
+            clients[role] = APIClient(raise_request_exception=False)
+            clients[role].force_login(user)
+
+        timer = QueryTimer()
+        results = {}
+        for name, role, path in endpoints:
+            stats = _measure(
+                clients[role], path.format(**context), iterations=options["iterations"], warmup=options["warmup"], timer=timer
+            )
+            results[name] = {"role": role, **stats}
+            self.stdout.write(
+                f"{name:<30} p50={stats['p50_ms']:>8.2f}ms p95={stats['p95_ms']:>8.2f}ms "
+                f"p99={stats['p99_ms']:>8.2f}ms queries={stats['queries']:>3} db_p50={stats['db_p50_ms']:.2f}ms "
+                f"status={stats['status']}"
+            )
+
+        meta = run_meta(
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            users={role: user.email for role, user in users.items()},
+            rows={
+                "orders": Order.objects.count(),
+                "payments": Payment.objects.count(),
+                "customers": User.objects.filter(role=User.Role.CUSTOMER).count(),
+            },
+        )
+        return meta, results
+
+    def _report(self, baseline, current, options):
+        rows = compare_results(
+            baseline["results"],
+            current["results"],
+            threshold_pct=options["threshold"],
+            min_delta_ms=options["min_delta_ms"],
+        )
+        self.stdout.write(
+            f"Compared with baseline {baseline['meta'].get('git') or '?'} ({baseline['meta'].get('created_at')}):"
+        )
+        for line in format_report(rows):
+            self.stdout.write(line)
+        regressions = [r for r in rows if r["regression"]]
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions"))
+            return
+        summary = f"{len(regressions)} regression(s): " + ", ".join(
+            sorted({f"{r['name']}.{r['metric']}" for r in regressions})
+        )
+        if options["fail_on_regression"]:
+            raise CommandError(summary)
+        self.stdout.write(self.style.WARNING(summary))
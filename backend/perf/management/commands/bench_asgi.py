@@ -0,0 +1,152 @@
+"""
+Concurrency benchmark: sync DRF views on a WSGI server vs their async twins
+(/api/async/..., see core/async_views.py) on an ASGI server.
+
+Start both servers against the same (seeded) database, with the same number
+of worker processes, then drive them with identical load:
+
+    gunicorn core.wsgi -w 4 -b 127.0.0.1:8000
+    uvicorn core.asgi:application --workers 4 --port 8001
+    python manage.py bench_asgi --email customer@example.com \
+        --wsgi-url http://127.0.0.1:8000 --asgi-url http://127.0.0.1:8001 \
+        --concurrency 64 --requests 2000 --output bench_asgi.json
+
+The command logs in as --email by writing a session row directly (no
+password needed) and sends it as the session cookie. Endpoints default to the
+ones the user's role can call (delivery staff: delivery/orders/; customers:
+overview, orders, payments, plans); --path limits the run to given sub-paths.
+"""
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from perf.bench import percentile
+
+
+CUSTOMER_PATHS = ["customer/overview/", "customer/orders/", "customer/payments/", "subscriptions/plans/"]
+DELIVERY_PATHS = ["delivery/orders/"]
+
+
+def _session_cookie(user):
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+
+def _load(url, cookie, *, requests, concurrency, timeout_s):
+    """Fire `requests` GETs at url from `concurrency` threads; returns latency stats."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def _worker():
+        nonlocal errors
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            req = urllib.request.Request(url, headers={"Cookie": cookie, "Accept": "application/json"})
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=timeout_s) as res:
+                    res.read()
+                    ok = res.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                if ok:
+                    latencies.append(elapsed_ms)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(_worker)
+    wall_s = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall_s, 3),
+        "rps": round(len(latencies) / wall_s, 1) if wall_s else None,
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare sync (WSGI) and async (ASGI) read endpoints under concurrent load"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="User to run the requests as")
+        parser.add_argument("--wsgi-url", default="http://127.0.0.1:8000", help="Base URL of the WSGI server")
+        parser.add_argument("--asgi-url", default="http://127.0.0.1:8001", help="Base URL of the ASGI server")
+        parser.add_argument("--path", action="append", dest="paths", help="Endpoint sub-path (repeatable)")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint per server")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+        parser.add_argument("--output", help="Write results as JSON to this file")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).first()
+        if user is None:
+            raise CommandError(f"no user with email {options['email']}")
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be >= 1")
+
+        paths = options["paths"] or (DELIVERY_PATHS if user.role == "delivery_staff" else CUSTOMER_PATHS)
+        cookie = _session_cookie(user)
+        targets = {
+            "wsgi": options["wsgi_url"].rstrip("/") + "/api/",
+            "asgi": options["asgi_url"].rstrip("/") + "/api/async/",
+        }
+
+        results = []
+        for sub_path in paths:
+            for server, base in targets.items():
+                stats = _load(
+                    base + sub_path,
+                    cookie,
+                    requests=options["requests"],
+                    concurrency=options["concurrency"],
+                    timeout_s=options["timeout"],
+                )
+                results.append({"path": sub_path, "server": server, **stats})
+                self.stdout.write(
+                    f"{sub_path:<24} {server}  rps={stats['rps']}  p50={_fmt(stats['p50_ms'])}  "
+                    f"p95={_fmt(stats['p95_ms'])}  p99={_fmt(stats['p99_ms'])}  errors={stats['errors']}"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(
+                    {"concurrency": options["concurrency"], "requests": options["requests"], "results": results},
+                    fh,
+                    indent=2,
+                )
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+
+def _fmt(ms):
+    return "-" if ms is None else f"{ms:.1f}ms"
@@ -0,0 +1,113 @@
+"""
+Scaling benchmark of the batch jobs (see perf/batch.py): the monthly order
+generator and its command, the fine job and calculate_fines, and monthly
+payment generation, at several numbers of subscriptions:
+
+    python manage.py bench_jobs                                  # 1000, 10000, 100000
+    python manage.py bench_jobs --scales 1000,5000 --output jobs.json
+    python manage.py bench_jobs --output after.json --baseline jobs.json
+
+Like `manage.py test`, it runs in a throwaway test database created from the
+default database settings (an existing test database is replaced) and
+flushed between scales; your data is not touched. On SQLite that is an
+in-memory database.
+
+Per job and scale it reports rows/s, queries (total and per input row), DB
+time, wall time and peak RSS, prints them as scaling curves and writes them as
+JSON ("<job>@<subscriptions>" entries). With --baseline, wall time regressing
+by more than --threshold percent (and --min-delta-ms) or any increase in
+queries is reported.
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from perf.batch import JOBS, bench_scale
+from perf.bench import compare_results, format_report, load_results, run_meta, write_results
+
+
+DEFAULT_SCALES = "1000,10000,100000"
+
+
+class Command(BaseCommand):
+    help = "Benchmark the batch jobs at increasing numbers of subscriptions (in a throwaway test database)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated subscription counts")
+        parser.add_argument("--only", action="append", help="Run jobs whose name contains this (repeatable)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write results as JSON to this file")
+        parser.add_argument("--baseline", help="Earlier results file to compare against")
+        parser.add_argument("--threshold", type=float, default=20.0, help="Wall time regression threshold in percent")
+        parser.add_argument("--min-delta-ms", type=float, default=50.0, help="Ignore wall time changes smaller than this")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            scales = sorted({int(part) for part in options["scales"].split(",") if part.strip()})
+        except ValueError:
+            raise CommandError("--scales must be comma-separated integers")
+        if not scales or scales[0] < 1:
+            raise CommandError("--scales must be positive")
+        try:
+            baseline = load_results(options["baseline"]) if options["baseline"] else None
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        def log(message):
+            self.stdout.write(f"  {message}")
+
+        original_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            meta = run_meta(scales=scales, seed=options["seed"])
+            results = {}
+            for i, subscriptions in enumerate(scales):
+                if i:
+                    call_command("flush", interactive=False, verbosity=0)
+                self.stdout.write(f"{subscriptions} subscriptions:")
+                for job, result in bench_scale(
+                    subscriptions, seed=options["seed"], only=options["only"], log=log
+                ).items():
+                    results[f"{job}@{subscriptions}"] = result
+        finally:
+            connection.creation.destroy_test_db(original_name, verbosity=0)
+
+        self._curves(results, scales)
+        if options["output"]:
+            write_results(options["output"], meta, results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        if baseline is not None:
+            self._report(baseline, results, options)
+
+    def _curves(self, results, scales):
+        self.stdout.write("\nScaling (subscriptions: wall ms / rows/s / queries per row / peak RSS MB):")
+        for job in JOBS:
+            points = [(n, results.get(f"{job.name}@{n}")) for n in scales]
+            points = [(n, r) for n, r in points if r]
+            if not points:
+                continue
+            cells = "  ".join(
+                f"{n}: {r['wall_ms']:.0f} / {r['rows_per_s']} / {r['queries_per_row']} / {r['peak_rss_mb']}"
+                for n, r in points
+            )
+            self.stdout.write(f"  {job.name:<28} {cells}")
+
+    def _report(self, baseline, results, options):
+        rows = compare_results(
+            baseline["results"],
+            results,
+            timing_metrics=("wall_ms",),
+            threshold_pct=options["threshold"],
+            min_delta_ms=options["min_delta_ms"],
+        )
+        self.stdout.write(f"Compared with baseline {baseline['meta'].get('git') or '?'}:")
+        for line in format_report(rows):
+            self.stdout.write(line)
+        regressions = sorted({f"{r['name']}.{r['metric']}" for r in rows if r["regression"]})
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions"))
+        elif options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(regressions)} regression(s): {', '.join(regressions)}"))
@@ -0,0 +1,21 @@
+"""
+Mint a signed header that lets any session's request be profiled (see
+perf/profiling.py), valid for PROFILE_TOKEN_MAX_AGE_S:
+
+    python manage.py profile_token
+    curl -H "X-Profile: cprofile" -H "X-Profile-Token: <token>" ...
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from perf.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = "Print an X-Profile-Token header value for profiling a request"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"X-Profile-Token: {make_token()}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Valid for {getattr(settings, 'PROFILE_TOKEN_MAX_AGE_S', 3600)}s; send with X-Profile: cprofile|sample"
+        ))
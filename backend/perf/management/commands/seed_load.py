@@ -0,0 +1,84 @@
+"""
+Fill the database with a synthetic world for load tests (see perf/seed.py):
+
+    python manage.py seed_load --customers 10000
+    python manage.py seed_load --customers 200000 --months 6 --seed 7 --tag big
+
+--customers and --months drive the size: subscribers get a monthly order
+nearly every day, everyone a few demand orders, about 16 orders per customer
+per month with the defaults, so --customers 21000 --months 3 gives about a
+million orders: about 5 minutes on SQLite with --skip-status-logs, twice that
+with the ~5 status logs per order. The same options on an empty database give
+the same data. Accounts are <role><n>@<tag>.test with password --password
+(customer1@load.test, staff1@load.test, manager1@load.test, admin@load.test);
+a tag can be seeded once per database.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.seed import SeedConfig, seed_world
+
+
+class Command(BaseCommand):
+    help = "Generate cities, branches, staff, customers and months of orders/payments for load testing"
+
+    def add_arguments(self, parser):
+        defaults = SeedConfig()
+        parser.add_argument("--customers", type=int, default=defaults.customers)
+        parser.add_argument("--months", type=int, default=defaults.months, help="Months of order/payment history")
+        parser.add_argument("--cities", type=int, default=defaults.cities)
+        parser.add_argument("--branches-per-city", type=int, default=defaults.branches_per_city)
+        parser.add_argument("--zones-per-branch", type=int, default=defaults.zones_per_branch)
+        parser.add_argument("--pincodes-per-zone", type=int, default=defaults.pincodes_per_zone)
+        parser.add_argument("--staff-per-zone", type=int, default=defaults.staff_per_zone)
+        parser.add_argument("--subscription-rate", type=float, default=defaults.subscription_rate,
+                            help="Share of customers with a subscription (0-1)")
+        parser.add_argument("--demand-orders", type=float, default=defaults.demand_orders_per_month,
+                            help="Mean demand orders per customer per month")
+        parser.add_argument("--skip-status-logs", action="store_true", help="Don't write OrderStatusLog rows")
+        parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size, help="Customers per transaction")
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--tag", default=defaults.tag, help="Email domain prefix, <role><n>@<tag>.test")
+        parser.add_argument("--password", default=defaults.password)
+
+    def handle(self, *args, **options):
+        if options["customers"] < 0 or options["months"] < 1:
+            raise CommandError("--customers must be >= 0 and --months >= 1")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be >= 1")
+        if not 0 <= options["subscription_rate"] <= 1:
+            raise CommandError("--subscription-rate must be between 0 and 1")
+        if min(options["cities"], options["branches_per_city"], options["zones_per_branch"],
+               options["pincodes_per_zone"]) < 1:
+            raise CommandError("--cities, --branches-per-city, --zones-per-branch and --pincodes-per-zone must be >= 1")
+
+        config = SeedConfig(
+            customers=options["customers"],
+            months=options["months"],
+            cities=options["cities"],
+            branches_per_city=options["branches_per_city"],
+            zones_per_branch=options["zones_per_branch"],
+            pincodes_per_zone=options["pincodes_per_zone"],
+            staff_per_zone=options["staff_per_zone"],
+            subscription_rate=options["subscription_rate"],
+            demand_orders_per_month=options["demand_orders"],
+            status_logs=not options["skip_status_logs"],
+            chunk_size=options["chunk_size"],
+            seed=options["seed"],
+            tag=options["tag"],
+            password=options["password"],
+        )
+        started = time.perf_counter()
+        try:
+            counts = seed_world(config, log=lambda message: self.stdout.write(f"  {message}"))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for model, n in sorted(counts.items()):
+            self.stdout.write(f"  {model:<22} {n:>10}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded tag '{config.tag}' ({config.customers} customers, {counts.get('Order', 0)} orders) "
+            f"in {elapsed:.1f}s; log in as customer1@{config.tag}.test / {config.password}"
+        ))
@@ -0,0 +1,145 @@
+"""
+Run the business forward day by day on a virtual clock (see perf/simulate.py)
+and record how the daily jobs and writes slow down as history accumulates:
+
+    SQLITE_PATH=load.sqlite3 python manage.py seed_load --customers 5000
+    SQLITE_PATH=load.sqlite3 python manage.py simulate_days --days 180 --tag load --output sim.json
+    python manage.py simulate_days --start 2027-01-01 --days 365 --probe-every 30 --output year.json
+
+Each day runs monthly order generation, fines and renewal payments (the real
+services, for the virtual day), then skips, demand orders, courier status
+transitions (--transition scheduled=0.9 overrides one step's daily chance)
+and payments. It writes to the database it runs against: use a copy of a
+seeded database, not one you care about.
+
+Per day it prints each step's wall time and queries and the table sizes;
+--output writes every day's record as JSON ({"meta", "results": {date: day}}).
+--probe-every N also runs bench_api on every Nth day (and the last), so read
+latency is measured on the same growing data; it needs the accounts of a
+seed_load --tag. The summary compares the first and last week per step.
+"""
+import os
+import tempfile
+import time
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.bench import load_results, run_meta, write_results
+from perf.simulate import STEPS, TRANSITIONS, SimConfig, degradation, simulate_days
+
+
+class Command(BaseCommand):
+    help = "Simulate days of operations on a virtual clock and record job/query times and table growth"
+
+    def add_arguments(self, parser):
+        defaults = SimConfig()
+        parser.add_argument("--start", help="First virtual day, YYYY-MM-DD (default: tomorrow)")
+        parser.add_argument("--days", type=int, default=defaults.days)
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--tag", help="Only act for the customers of this seed_load tag")
+        parser.add_argument("--skip-rate", type=float, default=defaults.skip_rate,
+                            help="Chance a subscriber skips a day (0-1)")
+        parser.add_argument("--demand-orders", type=float, default=defaults.demand_orders_per_month,
+                            help="Mean demand orders per customer per month")
+        parser.add_argument("--pay-rate", type=float, default=defaults.pay_rate,
+                            help="Daily chance a payable pending payment is paid (0-1)")
+        parser.add_argument("--transition", action="append", default=[], metavar="STATUS=CHANCE",
+                            help="Daily chance an order leaves STATUS (repeatable)")
+        parser.add_argument("--probe-every", type=int, default=0, help="Run bench_api every N days (0: never)")
+        parser.add_argument("--probe-iterations", type=int, default=5)
+        parser.add_argument("--output", help="Write the daily records as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be >= 1")
+        for name in ("skip_rate", "pay_rate"):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be between 0 and 1")
+        try:
+            start = date.fromisoformat(options["start"]) if options["start"] else None
+        except ValueError:
+            raise CommandError("--start must be YYYY-MM-DD")
+        transitions = dict(TRANSITIONS)
+        for item in options["transition"]:
+            status, _, chance = item.partition("=")
+            try:
+                value = float(chance)
+            except ValueError:
+                raise CommandError(f"--transition {item}: expected STATUS=CHANCE")
+            if status not in TRANSITIONS or not 0 <= value <= 1:
+                raise CommandError(f"--transition {item}: STATUS is one of {', '.join(TRANSITIONS)}, CHANCE 0-1")
+            transitions[status] = value
+
+        config = SimConfig(
+            start=start,
+            days=options["days"],
+            seed=options["seed"],
+            tag=options["tag"],
+            skip_rate=options["skip_rate"],
+            demand_orders_per_month=options["demand_orders"],
+            pay_rate=options["pay_rate"],
+            transitions=transitions,
+        )
+        probe_every = options["probe_every"]
+        seen = [0]
+
+        def on_day(record):
+            seen[0] += 1
+            if probe_every and (seen[0] % probe_every == 0 or seen[0] == config.days):
+                record["probe"] = self._probe(options)
+            self._print_day(record)
+
+        started = time.perf_counter()
+        records = simulate_days(config, on_day=on_day, log=lambda message: self.stdout.write(f"  {message}"))
+        elapsed = time.perf_counter() - started
+
+        summary = degradation(records)
+        self.stdout.write("first week -> last week (mean per day):")
+        for name, row in summary.items():
+            ratio = "" if row["wall_ratio"] is None else f"x{row['wall_ratio']}"
+            self.stdout.write(
+                f"  {name:<15} {row['first_wall_ms']:>9.1f}ms -> {row['last_wall_ms']:>9.1f}ms {ratio:>7}   "
+                f"queries {row['first_queries']:.0f} -> {row['last_queries']:.0f}"
+            )
+        if options["output"]:
+            meta = run_meta(
+                start=records[0]["date"], days=config.days, seed=config.seed, tag=config.tag,
+                skip_rate=config.skip_rate, demand_orders_per_month=config.demand_orders_per_month,
+                pay_rate=config.pay_rate, transitions=transitions, degradation=summary,
+            )
+            write_results(options["output"], meta, {r["date"]: r for r in records})
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Simulated {config.days} days ({records[0]['date']} to {records[-1]['date']}) in {elapsed:.1f}s"
+        ))
+
+    def _probe(self, options):
+        """bench_api on today's data: {endpoint: {"p50_ms", "queries"}}."""
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            call_command(
+                "bench_api", tag=options["tag"] or "load", iterations=options["probe_iterations"], warmup=1,
+                output=path, stdout=StringIO(),
+            )
+            results = load_results(path)["results"]
+        except CommandError as exc:
+            raise CommandError(f"--probe-every: {exc}")
+        finally:
+            os.unlink(path)
+        return {name: {"p50_ms": r["p50_ms"], "queries": r["queries"]} for name, r in results.items()}
+
+    def _print_day(self, record):
+        steps = "  ".join(
+            f"{name} {record['steps'][name]['wall_ms']:.0f}ms/{record['steps'][name]['queries']}q" for name in STEPS
+        )
+        sizes = record["sizes"]
+        line = f"{record['date']}  {steps}  orders={sizes['Order']} payments={sizes['Payment']}"
+        if "probe" in record:
+            slowest = max(record["probe"].items(), key=lambda item: item[1]["p50_ms"], default=None)
+            if slowest:
+                line += f"  probe: slowest {slowest[0]} p50={slowest[1]['p50_ms']}ms"
+        self.stdout.write(line)
@@ -0,0 +1,66 @@
+"""
+Report the statements captured over SLOW_QUERY_MS (see perf/slowqueries.py),
+one line per SQL fingerprint, worst first:
+
+    python manage.py slow_queries                        # top 20 by total time
+    python manage.py slow_queries --order mean --limit 5 --explain
+    python manage.py slow_queries --origin job:monthly_orders --full-scans
+    python manage.py slow_queries --json > slow.json
+    python manage.py slow_queries --reset
+
+--explain adds each fingerprint's latest plan, call stacks and origins;
+SCAN marks plans that read a whole table. The same data is served to super
+admins at /api/admin/slow-queries/.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from perf.slowqueries import ORDERINGS, report, reset
+
+
+class Command(BaseCommand):
+    help = "Show slow queries aggregated by SQL fingerprint, with EXPLAIN plans"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order", choices=sorted(ORDERINGS), default="total")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--origin", help="Only fingerprints seen from an origin containing this")
+        parser.add_argument("--full-scans", action="store_true", help="Only plans that scan a whole table")
+        parser.add_argument("--explain", action="store_true", help="Show plans, stacks and origins")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+        parser.add_argument("--reset", action="store_true", help="Delete the captured queries")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {reset()} slow query fingerprints"))
+            return
+
+        rows = report(
+            order=options["order"], limit=max(1, options["limit"]), origin=options["origin"],
+            full_scan=True if options["full_scans"] else None,
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps(rows, indent=2, default=str))
+            return
+        if not rows:
+            self.stdout.write("No slow queries captured")
+            return
+
+        self.stdout.write(f"{'fingerprint':<16} {'count':>7} {'total_ms':>10} {'mean_ms':>8} {'max_ms':>8}       top origin")
+        for row in rows:
+            top_origin = max(row["origins"].items(), key=lambda item: item[1], default=("-", 0))[0]
+            scan = "SCAN" if row["full_scan"] else ""
+            self.stdout.write(
+                f"{row['fingerprint']:<16} {row['count']:>7} {row['total_ms']:>10.1f} {row['mean_ms']:>8.1f} "
+                f"{row['max_ms']:>8.1f} {scan:>5} {top_origin}"
+            )
+            self.stdout.write(f"  {row['normalized_sql'][:200]}")
+            if options["explain"]:
+                self.stdout.write(f"  params {row['params_shape'] or '-'} on {row['alias']}")
+                for name, n in row["origins"].items():
+                    self.stdout.write(f"  origin {name} x{n}")
+                for stack in row["stacks"].values():
+                    self.stdout.write(f"  stack x{stack['count']}: {' > '.join(stack['frames']) or '-'}")
+                for line in (row["explain"] or "(not explained)").splitlines():
+                    self.stdout.write(f"    {line}")
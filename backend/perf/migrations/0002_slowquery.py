@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perf', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=16, unique=True)),
+                ('alias', models.CharField(default='default', max_length=50)),
+                ('normalized_sql', models.TextField()),
+                ('sample_sql', models.TextField(blank=True, default='')),
+                ('params_shape', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('origins', models.JSONField(blank=True, default=dict)),
+                ('stacks', models.JSONField(blank=True, default=dict)),
+                ('last_origin', models.CharField(blank=True, default='', max_length=255)),
+                ('last_stack', models.CharField(blank=True, default='', max_length=12)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField(db_index=True)),
+                ('explain', models.TextField(blank=True, default='')),
+                ('explained_at', models.DateTimeField(blank=True, null=True)),
+                ('full_scan', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import models
+
+
+class ProfileCapture(models.Model):
+    """One request run under the profiling hook (see perf/profiling.py)."""
+    CPROFILE = "cprofile"
+    SAMPLE = "sample"
+    ENGINE_CHOICES = [
+        (CPROFILE, "cProfile"),
+        (SAMPLE, "Sampling"),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    engine = models.CharField(max_length=10, choices=ENGINE_CHOICES)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    route = models.CharField(max_length=255, blank=True, default="")
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    db_ms = models.FloatField(default=0)
+    queries = models.JSONField(default=list, blank=True)  # [{"alias", "sql", "ms"}], capped
+    pstats = models.BinaryField(null=True, blank=True)  # marshal dump, as pstats.Stats.dump_stats writes
+    collapsed = models.TextField(blank=True, default="")  # "frame;frame;frame value" lines for flamegraphs
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    via_token = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.engine}, {self.duration_ms:.0f}ms)"
+
+
+class SlowQuery(models.Model):
+    """Statements that ran over SLOW_QUERY_MS, one row per SQL fingerprint (see perf/slowqueries.py)."""
+    fingerprint = models.CharField(max_length=16, unique=True)  # normalized SQL + alias
+    alias = models.CharField(max_length=50, default="default")
+    normalized_sql = models.TextField()
+    sample_sql = models.TextField(blank=True, default="")  # latest, placeholders unfilled
+    params_shape = models.CharField(max_length=255, blank=True, default="")  # types only, e.g. "(int, str)"
+    count = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    origins = models.JSONField(default=dict, blank=True)  # {"job:fines": n, "view:GET api/...": n}
+    stacks = models.JSONField(default=dict, blank=True)  # {stack fingerprint: {"frames": [...], "count": n}}
+    last_origin = models.CharField(max_length=255, blank=True, default="")
+    last_stack = models.CharField(max_length=12, blank=True, default="")
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField(db_index=True)
+    explain = models.TextField(blank=True, default="")
+    explained_at = models.DateTimeField(null=True, blank=True)
+    full_scan = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.fingerprint} x{self.count} ({self.total_ms:.0f}ms)"
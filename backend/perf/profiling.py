@@ -0,0 +1,274 @@
+"""On-demand profiling of single requests.
+
+A request is profiled when it carries `X-Profile: cprofile` (or `sample`, or
+`1` for cprofile) and either comes from a logged-in super admin or also
+carries a valid `X-Profile-Token` (`manage.py profile_token` mints one, valid
+for PROFILE_TOKEN_MAX_AGE_S). That lets someone replay exactly the slow call a
+manager reported, with the manager's session, and get a profile back:
+
+    curl -H "X-Profile: cprofile" -H "X-Profile-Token: ..." -b sessionid=... \\
+         https://.../api/manager/monthly-payments/
+    -> X-Profile-Id: 17
+
+Engines:
+    cprofile  deterministic; stores pstats (`python -m pstats 17.pstats`,
+              snakeviz) and collapsed stacks derived from its call graph
+              (values in microseconds, approximate where a function has
+              several callers)
+    sample    a thread samples the request thread's stack every
+              PROFILE_SAMPLE_INTERVAL_S; collapsed stacks only (values are
+              sample counts), lower overhead, exact call paths
+
+Either way the capture also records the route, status, wall time and the
+query log (SQL and time per statement, no parameters), in ProfileCapture; the
+newest PROFILE_KEEP are kept. Super admins list and download them under
+/api/admin/profiles/ (perf/views.py).
+
+ProfilingMiddleware sits after AuthenticationMiddleware. Requests without
+X-Profile cost one dict lookup; PROFILING_ENABLED=False removes the middleware
+altogether. Only sync (WSGI) requests are profiled: on an event loop a
+profile would mix in every other request's coroutines.
+"""
+from __future__ import annotations
+
+import cProfile
+import logging
+import marshal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from accounts.models import User
+from core.instrumentation import setting
+from core.metrics import route_label
+
+from .models import ProfileCapture
+
+
+logger = logging.getLogger(__name__)
+
+ENGINE_HEADER = "HTTP_X_PROFILE"
+TOKEN_HEADER = "HTTP_X_PROFILE_TOKEN"
+ENGINES = {"1": ProfileCapture.CPROFILE, "cprofile": ProfileCapture.CPROFILE, "sample": ProfileCapture.SAMPLE}
+TOKEN_SALT = "perf.profile"
+MAX_SQL_CHARS = 2000
+
+
+def make_token() -> str:
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign("profile")
+
+
+def token_is_valid(token: str) -> bool:
+    try:
+        value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=setting("PROFILE_TOKEN_MAX_AGE_S", 3600)
+        )
+    except signing.BadSignature:  # includes SignatureExpired
+        return False
+    return value == "profile"
+
+
+def _frame_label(filename: str, name: str) -> str:
+    if filename == "~":  # builtins in pstats
+        return name
+    path = Path(filename)
+    try:
+        return f"{path.relative_to(settings.BASE_DIR)}:{name}"
+    except ValueError:
+        return f"{'/'.join(path.parts[-2:])}:{name}"
+
+
+def collapsed_from_pstats(stats: dict, *, max_depth: int = 200) -> str:
+    """Collapsed stacks from a pstats call graph; own time in microseconds.
+
+    pstats only keeps caller->callee edges, so time is split over paths in
+    proportion to each edge's share of the callee's cumulative time.
+    """
+    callees = {}
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    # the profiled callable has callers of its own when it recurses (Django's middleware chain)
+    top = max(stats, key=lambda func: stats[func][3], default=None)
+    if top is not None and top not in roots:
+        roots.append(top)
+    lines = Counter()
+
+    def visit(func, stack, fraction):
+        entry = stats.get(func)
+        if entry is None or func in stack or len(stack) >= max_depth:
+            return
+        stack = stack + (func,)
+        own_us = int(entry[2] * fraction * 1_000_000)
+        if own_us:
+            lines[";".join(_frame_label(f[0], f[2]) for f in stack)] += own_us
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = stats[callee][3]
+            share = fraction * edge_ct / callee_ct if callee_ct else 0.0
+            if share * callee_ct >= 1e-6:
+                visit(callee, stack, share)
+
+    for root in roots:
+        visit(root, (), 1.0)
+    return "".join(f"{stack} {value}\n" for stack, value in sorted(lines.items()))
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a helper thread into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="perf-stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.counts.items()))
+
+
+class QueryLog:
+    """execute_wrapper keeping each statement's SQL and time (first `keep` statements)."""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self.entries = []
+        self.count = 0
+        self.seconds = 0.0
+
+    def wrapper(self, alias):
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.count += 1
+                self.seconds += elapsed
+                if len(self.entries) < self.keep:
+                    self.entries.append({"alias": alias, "sql": sql[:MAX_SQL_CHARS], "ms": round(elapsed * 1000.0, 3)})
+        return record
+
+
+def _store(request, response, *, engine, duration_s, log, stats=None, collapsed="", via_token):
+    user = getattr(request, "user", None)
+    capture = ProfileCapture.objects.create(
+        engine=engine,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        route=route_label(request)[:255],
+        status_code=response.status_code,
+        duration_ms=round(duration_s * 1000.0, 2),
+        query_count=log.count,
+        db_ms=round(log.seconds * 1000.0, 2),
+        queries=log.entries,
+        pstats=marshal.dumps(stats) if stats is not None else None,
+        collapsed=collapsed,
+        requested_by=user if user is not None and user.is_authenticated else None,
+        via_token=via_token,
+    )
+    keep = setting("PROFILE_KEEP", 200)
+    stale = ProfileCapture.objects.order_by("-created_at", "-id").values_list("id", flat=True)[keep:]
+    ProfileCapture.objects.filter(id__in=list(stale)).delete()
+    return capture
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it (see module docstring); after AuthenticationMiddleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not setting("PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _authorize(self, request):
+        """(engine, via_token) when this request may be profiled, else None."""
+        engine = ENGINES.get(request.META[ENGINE_HEADER].strip().lower())
+        if engine is None:
+            return None
+        token = request.META.get(TOKEN_HEADER)
+        if token:
+            return (engine, True) if token_is_valid(token) else None
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and user.role == User.Role.SUPER_ADMIN:
+            return engine, False
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if ENGINE_HEADER not in request.META:
+            return self.get_response(request)
+        allowed = self._authorize(request)
+        if allowed is None:
+            return self.get_response(request)
+        return self._profile(request, *allowed)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def _profile(self, request, engine, via_token):
+        log = QueryLog(keep=setting("PROFILE_MAX_QUERIES", 500))
+        stats, collapsed = None, ""
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(log.wrapper(alias)))
+            started = time.perf_counter()
+            if engine == ProfileCapture.CPROFILE:
+                profiler = cProfile.Profile()
+                response = profiler.runcall(self.get_response, request)
+                duration_s = time.perf_counter() - started
+                profiler.create_stats()
+                stats = profiler.stats
+                collapsed = collapsed_from_pstats(stats)
+            else:
+                with StackSampler(threading.get_ident(), setting("PROFILE_SAMPLE_INTERVAL_S", 0.005)) as sampler:
+                    response = self.get_response(request)
+                duration_s = time.perf_counter() - started
+                collapsed = sampler.collapsed()
+        try:
+            capture = _store(
+                request, response, engine=engine, duration_s=duration_s, log=log,
+                stats=stats, collapsed=collapsed, via_token=via_token,
+            )
+        except Exception:
+            logger.exception("Could not store profile of %s %s", request.method, request.path)
+            return response
+        response["X-Profile-Id"] = str(capture.pk)
+        return response
@@ -0,0 +1,391 @@
+"""Synthetic "world" for load tests and benchmarks (`manage.py seed_load`).
+
+    seed_world(SeedConfig(customers=100_000, months=3, seed=7))
+
+Builds cities -> branches -> service zones (pincode lists) -> delivery staff
+and managers, then customers in chunks: an address in a zone (zone sizes are
+skewed), for some a subscription with daily monthly orders, skip days and
+30-day renewal payments, plus demand orders with weights, status logs,
+payments and fines for overdue ones.
+
+- Rows are written with bulk_create, one transaction per customer chunk, and
+  explicit primary keys (so no backend has to return ids from bulk inserts).
+- Everything comes from one random.Random(seed): the same config on an empty
+  database gives the same data.
+- bulk_create sends no signals, so the derived tables (ZonePincode,
+  CustomerBranchAffinity, CustomerSummary, rollups) are rebuilt at the end.
+- Accounts are <role><n>@<tag>.test with the given password, e.g.
+  customer1@load.test, staff1@load.test, manager1@load.test, admin@load.test.
+"""
+from __future__ import annotations
+
+import math
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import User
+from branch_management.models import BranchManager, DeliveryStaff
+from locations.models import Branch, City, CustomerAddress, ServiceZone
+from orders.models import Order, OrderStatusLog, OrderWeight
+from orders.views import DEMAND_MINIMUM_CHARGE, DEMAND_PRICE_PER_KG
+from payments.models import Payment, PaymentFine
+from payments.services import compute_fine_amount
+from subscriptions.models import CustomerSubscription, SubscriptionPlan, SubscriptionSkipDay
+from subscriptions.services import BILLING_PERIOD_DAYS
+
+
+BILLING_DAYS = BILLING_PERIOD_DAYS
+PROGRESS = ["scheduled", "picked_up", "reached_branch", "washing", "ready_for_delivery", "delivered"]
+
+# (name, monthly price, max kg, share of subscribers)
+PLANS = [
+    ("Basic", Decimal("199.00"), Decimal("30.00"), 0.5),
+    ("Standard", Decimal("349.00"), Decimal("60.00"), 0.35),
+    ("Premium", Decimal("599.00"), Decimal("120.00"), 0.15),
+]
+
+
+@dataclass
+class SeedConfig:
+    customers: int = 10_000
+    cities: int = 3
+    branches_per_city: int = 4
+    zones_per_branch: int = 4
+    pincodes_per_zone: int = 6
+    staff_per_zone: int = 2
+    months: int = 3  # history window for orders/payments
+    subscription_rate: float = 0.6
+    demand_orders_per_month: float = 1.5  # mean per customer
+    skip_rate: float = 0.05  # subscriber days marked "no pickup"
+    status_logs: bool = True
+    chunk_size: int = 2000  # customers per transaction
+    seed: int = 42
+    tag: str = "load"
+    password: str = "loadtest123"
+    today: Optional[date] = None
+
+
+@dataclass
+class _Zone:
+    id: int
+    branch_id: int
+    pincodes: List[str]
+    staff_ids: List[int] = field(default_factory=list)
+
+
+class _Ids:
+    """Next primary key per model, continuing after existing rows."""
+
+    def __init__(self, models):
+        self._next = {m: (m.objects.aggregate(n=Max("pk"))["n"] or 0) + 1 for m in models}
+
+    def __call__(self, model) -> int:
+        value = self._next[model]
+        self._next[model] = value + 1
+        return value
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    """Let bulk_create keep the created_at-style values we set (auto_now_add would overwrite them)."""
+    saved = [(f, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, value in saved:
+            f.auto_now_add = value
+
+
+class _World:
+    def __init__(self, config: SeedConfig, log: Callable[[str], None]):
+        self.c = config
+        self.log = log
+        self.rng = random.Random(config.seed)
+        self.today = config.today or timezone.localdate()
+        self.window_start = self.today - timedelta(days=30 * config.months)
+        self.tz = timezone.get_current_timezone()
+        self.password = make_password(config.password)  # hashed once, shared by every account
+        self.ids = _Ids([
+            User, City, Branch, ServiceZone, DeliveryStaff, BranchManager, CustomerAddress, SubscriptionPlan,
+            CustomerSubscription, SubscriptionSkipDay, Order, OrderWeight, OrderStatusLog, Payment, PaymentFine,
+        ])
+        self.counts: Dict[str, int] = {}
+        self.rows: Dict[type, list] = {}
+
+    # --- helpers ------------------------------------------------------------
+
+    def _at(self, d: date, hour: int, minute: int = 0) -> datetime:
+        return datetime.combine(d, time(hour, minute), tzinfo=self.tz)
+
+    def _add(self, obj):
+        self.rows.setdefault(type(obj), []).append(obj)
+        return obj
+
+    def _flush(self):
+        for model in (
+            User, CustomerAddress, CustomerSubscription, SubscriptionSkipDay, Order, OrderWeight,
+            OrderStatusLog, Payment, PaymentFine, City, Branch, ServiceZone, DeliveryStaff, BranchManager,
+            SubscriptionPlan,
+        ):
+            rows = self.rows.pop(model, None)
+            if rows:
+                model.objects.bulk_create(rows, batch_size=1000)
+                self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(rows)
+
+    def _user(self, role, email, name, created_at):
+        uid = self.ids(User)
+        return self._add(User(
+            id=uid, email=email, full_name=name, phone=f"{uid:012d}", role=role, password=self.password,
+            is_active=True, is_approved=True, is_staff=role == User.Role.SUPER_ADMIN,
+            is_superuser=role == User.Role.SUPER_ADMIN, created_at=created_at,
+        ))
+
+    # --- static world -------------------------------------------------------
+
+    def build_network(self):
+        c, rng = self.c, self.rng
+        long_ago = self._at(self.window_start - timedelta(days=365), 9)
+        self._user(User.Role.SUPER_ADMIN, f"admin@{c.tag}.test", "Load Admin", long_ago)
+        self.plans = []
+        for name, price, max_kg, share in PLANS:
+            plan = self._add(SubscriptionPlan(
+                id=self.ids(SubscriptionPlan), name=f"{name} ({c.tag})", monthly_price=price, max_weight_per_month=max_kg,
+            ))
+            self.plans.append((plan, share))
+
+        self.zones: List[_Zone] = []
+        pincode = 500000
+        staff_n = manager_n = 0
+        for ci in range(1, c.cities + 1):
+            city = self._add(City(id=self.ids(City), name=f"{c.tag.title()} City {ci}", state=f"State {ci}"))
+            lat0, lng0 = 8 + rng.random() * 20, 70 + rng.random() * 15
+            for bi in range(1, c.branches_per_city + 1):
+                branch = self._add(Branch(
+                    id=self.ids(Branch), city_id=city.id, branch_name=f"{city.name} Branch {bi}",
+                    address=f"{bi} Main Road, {city.name}", latitude=Decimal(f"{lat0 + rng.random():.6f}"),
+                    longitude=Decimal(f"{lng0 + rng.random():.6f}"), created_at=long_ago,
+                ))
+                manager_n += 1
+                manager = self._user(
+                    User.Role.BRANCH_MANAGER, f"manager{manager_n}@{c.tag}.test", f"Manager {manager_n}", long_ago
+                )
+                self._add(BranchManager(id=self.ids(BranchManager), user_id=manager.id, branch_id=branch.id))
+                for zi in range(1, c.zones_per_branch + 1):
+                    pins = [str(pincode + k) for k in range(c.pincodes_per_zone)]
+                    pincode += c.pincodes_per_zone
+                    zone = self._add(ServiceZone(
+                        id=self.ids(ServiceZone), branch_id=branch.id, zone_name=f"Zone {zi}", pincodes=pins,
+                    ))
+                    z = _Zone(zone.id, branch.id, pins)
+                    for _ in range(c.staff_per_zone):
+                        staff_n += 1
+                        user = self._user(
+                            User.Role.DELIVERY_STAFF, f"staff{staff_n}@{c.tag}.test", f"Staff {staff_n}", long_ago
+                        )
+                        z.staff_ids.append(self._add(DeliveryStaff(
+                            id=self.ids(DeliveryStaff), user_id=user.id, branch_id=branch.id, zone_id=zone.id,
+                        )).id)
+                    self.zones.append(z)
+        # a few zones are much busier than others
+        self.zone_weights = [rng.lognormvariate(0, 0.8) for _ in self.zones]
+        self._flush()
+
+    # --- customers ----------------------------------------------------------
+
+    def _order(self, user_id, zone, address_id, order_type, shift, pickup: date, status: str, created_at: datetime):
+        staff_id = self.rng.choice(zone.staff_ids) if zone.staff_ids else None
+        order = self._add(Order(
+            id=self.ids(Order), user_id=user_id, branch_id=zone.branch_id, address_id=address_id,
+            delivery_staff_id=staff_id, order_type=order_type, pickup_shift=shift, pickup_date=pickup,
+            status=status, created_at=created_at,
+        ))
+        if self.c.status_logs:
+            steps = ["cancelled"] if status == "cancelled" else PROGRESS[1:PROGRESS.index(status) + 1]
+            for k, step in enumerate(steps):
+                self._add(OrderStatusLog(
+                    id=self.ids(OrderStatusLog), order_id=order.id, status=step,
+                    changed_by_id=None, changed_at=self._at(pickup, 8 + min(k * 2, 14)),
+                ))
+        weight = None
+        if status not in ("scheduled", "cancelled"):
+            weight = Decimal(f"{min(20.0, max(0.5, self.rng.gauss(5.0, 2.0))):.2f}")
+            self._add(OrderWeight(
+                id=self.ids(OrderWeight), order_id=order.id, weight_kg=weight, recorded_at=self._at(pickup, 10),
+            ))
+        return order, weight
+
+    def _payment(self, user_id, branch_id, *, order_id=None, subscription_id=None, payment_type, amount,
+                 due: date, paid: bool):
+        payment = self._add(Payment(
+            id=self.ids(Payment), user_id=user_id, order_id=order_id, subscription_id=subscription_id,
+            branch_id=branch_id, amount=amount, payment_type=payment_type,
+            payment_status="paid" if paid else "pending",
+            payment_date=min(self.today, due - timedelta(days=self.rng.randint(0, 3))) if paid else None,
+            due_date=due,
+        ))
+        days_overdue = (self.today - due).days
+        if not paid and days_overdue > 0:
+            self._add(PaymentFine(
+                id=self.ids(PaymentFine), payment_id=payment.id,
+                fine_amount=compute_fine_amount(days_overdue=days_overdue), fine_days=days_overdue,
+                calculated_at=self._at(self.today, 0, 5),
+            ))
+        return payment
+
+    def _demand_status(self, pickup: date) -> str:
+        age = (self.today - pickup).days
+        r = self.rng.random()
+        if age < 0:
+            return "scheduled"
+        if age == 0:
+            return self.rng.choice(PROGRESS[:4])
+        if age <= 3:
+            return "cancelled" if r < 0.05 else self.rng.choice(PROGRESS[2:])
+        return "cancelled" if r < 0.08 else "delivered"
+
+    def _subscription(self, user_id, zone, address_id, joined: date):
+        c, rng = self.c, self.rng
+        plan = rng.choices([p for p, _ in self.plans], weights=[w for _, w in self.plans])[0]
+        shift = rng.choice(["morning", "evening"])
+        start = max(joined, self.window_start - timedelta(days=rng.randint(0, 60)))
+        # completed 30-day periods before today; the current one ends at period_end
+        periods = max(0, (self.today - start).days // BILLING_DAYS)
+        period_end = start + timedelta(days=BILLING_DAYS * (periods + 1))
+        cancelled = periods > 0 and rng.random() < 0.08
+        end = start + timedelta(days=BILLING_DAYS * periods) if cancelled else period_end
+        sub = self._add(CustomerSubscription(
+            id=self.ids(CustomerSubscription), user_id=user_id, plan_id=plan.id, preferred_pickup_shift=shift,
+            is_active=not cancelled, start_date=start, end_date=end, branch_id=zone.branch_id,
+        ))
+
+        for p in range(periods):
+            due = start + timedelta(days=BILLING_DAYS * (p + 1) + 4)
+            # older renewals are paid; the latest is often still open, sometimes overdue
+            paid = cancelled or p < periods - 1 or rng.random() < 0.7
+            self._payment(user_id, zone.branch_id, subscription_id=sub.id, payment_type="monthly",
+                          amount=plan.monthly_price, due=due, paid=paid)
+
+        d = max(start, self.window_start)
+        last = min(self.today, end - timedelta(days=1))
+        while d <= last:
+            if rng.random() < c.skip_rate:
+                self._add(SubscriptionSkipDay(id=self.ids(SubscriptionSkipDay), subscription_id=sub.id,
+                                              skip_date=d, reason="No Pickup Today"))
+            else:
+                if d < self.today:
+                    status = "cancelled" if rng.random() < 0.03 else "delivered"
+                else:
+                    status = "scheduled"
+                self._order(user_id, zone, address_id, "monthly", shift, d, status, self._at(d, 0, 1))
+            d += timedelta(days=1)
+
+    def _demand_orders(self, user_id, zone, address_id, subscribed: bool):
+        rng = self.rng
+        mean = self.c.demand_orders_per_month * self.c.months * (0.4 if subscribed else 1.0)
+        # heavy-tailed: most customers order a little, some a lot
+        n = int(rng.expovariate(1 / mean)) if mean > 0 else 0
+        span = (self.today - self.window_start).days
+        for _ in range(n):
+            pickup = self.window_start + timedelta(days=rng.randint(0, span + 3))
+            status = self._demand_status(pickup)
+            created = self._at(pickup - timedelta(days=rng.randint(0, 3)), rng.randint(7, 21), rng.randint(0, 59))
+            order, weight = self._order(user_id, zone, address_id, "demand", rng.choice(["morning", "evening"]),
+                                        pickup, status, created)
+            if status == "cancelled":
+                continue
+            if status == "delivered":
+                amount = max(DEMAND_MINIMUM_CHARGE, (weight * DEMAND_PRICE_PER_KG).quantize(Decimal("0.01")))
+                due = pickup + timedelta(days=1)
+                paid = rng.random() < (0.93 if (self.today - due).days > 3 else 0.5)
+                self._payment(user_id, zone.branch_id, order_id=order.id, payment_type="demand",
+                              amount=amount, due=due, paid=paid)
+            else:  # amount is set on delivery; placeholder due date like the API
+                self._payment(user_id, zone.branch_id, order_id=order.id, payment_type="demand",
+                              amount=Decimal("0.00"), due=self.today + timedelta(days=3650), paid=False)
+
+    def build_customers(self, first: int, last: int):
+        c, rng = self.c, self.rng
+        for n in range(first, last + 1):
+            zone = rng.choices(self.zones, weights=self.zone_weights)[0]
+            joined = self.window_start - timedelta(days=int(rng.expovariate(1 / 180)))
+            if rng.random() < 0.2:  # recent sign-ups
+                joined = self.window_start + timedelta(days=rng.randint(0, (self.today - self.window_start).days))
+            user = self._user(User.Role.CUSTOMER, f"customer{n}@{c.tag}.test", f"Customer {n}", self._at(joined, 12))
+            address = self._add(CustomerAddress(
+                id=self.ids(CustomerAddress), user_id=user.id, address_label="Home",
+                full_address=f"{n} Residency Road", pincode=rng.choice(zone.pincodes),
+                latitude=Decimal("12.000000"), longitude=Decimal("77.000000"), is_default=True,
+                created_at=self._at(joined, 12),
+            ))
+            subscribed = rng.random() < c.subscription_rate
+            if subscribed:
+                self._subscription(user.id, zone, address.id, joined)
+            self._demand_orders(user.id, zone, address.id, subscribed)
+        self._flush()
+
+
+def _reset_sequences(models):
+    # PostgreSQL keeps sequences apart from the table; MySQL/SQLite return no SQL here
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild_derived_tables(*, today: Optional[date] = None, log: Callable[[str], None] = lambda message: None) -> None:
+    """Recompute what the model signals would have maintained."""
+    from analytics.services import rebuild_all_rollups
+    from locations.services import rebuild_branch_affinity
+    from orders.services import rebuild_customer_summaries
+
+    log("rebuilding zone pincodes and branch affinity")
+    rebuild_branch_affinity()
+    log("rebuilding customer summaries")
+    rebuild_customer_summaries(today=today)
+    log("rebuilding rollups")
+    rebuild_all_rollups()
+
+
+def seed_world(config: SeedConfig, *, log: Callable[[str], None] = lambda message: None) -> Dict[str, int]:
+    """Generate the world described by config; returns rows written per model."""
+    if User.objects.filter(email=f"admin@{config.tag}.test").exists():
+        raise ValueError(f"tag '{config.tag}' is already seeded in this database")
+
+    world = _World(config, log)
+    if connection.vendor == "sqlite" and not connection.in_atomic_block:  # no fsync per chunk commit
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous = OFF")
+
+    timestamps = [
+        User._meta.get_field("created_at"), Branch._meta.get_field("created_at"),
+        CustomerAddress._meta.get_field("created_at"), Order._meta.get_field("created_at"),
+        OrderWeight._meta.get_field("recorded_at"), OrderStatusLog._meta.get_field("changed_at"),
+        PaymentFine._meta.get_field("calculated_at"),
+    ]
+    with _explicit_timestamps(*timestamps):
+        with transaction.atomic():
+            world.build_network()
+        chunks = math.ceil(config.customers / config.chunk_size)
+        for i in range(chunks):
+            first = i * config.chunk_size + 1
+            last = min(config.customers, first + config.chunk_size - 1)
+            with transaction.atomic():
+                world.build_customers(first, last)
+            log(f"customers {last}/{config.customers}: {world.counts.get('Order', 0)} orders so far")
+
+    _reset_sequences(list(world.ids._next))
+    rebuild_derived_tables(today=world.today, log=log)
+    return world.counts
@@ -0,0 +1,357 @@
+"""Multi-day operations simulator for capacity tests (`manage.py simulate_days`).
+
+    simulate_days(SimConfig(start=date(2026, 1, 1), days=180, seed=7, tag="load"))
+
+Runs a virtual clock forward one day at a time over a seeded database
+(`manage.py seed_load`) and does what a day of operations does, in the order
+it happens:
+
+    monthly_orders  the day's monthly orders (scheduler, 00:00)
+    fines           ensure_fines_for_all_overdue(today=day) (00:05)
+    renewals        generate_monthly_payments(today=day) (00:10)
+    skips           some subscribers mark "no pickup today"; a scheduled order is cancelled
+    demand_orders   customers book demand orders (pending 0.00 payment, like the API)
+    courier         open orders move one step along PROGRESS with TRANSITIONS'
+                    probabilities: weight on pickup (usage / demand amount),
+                    demand due date on delivery
+    payments        customers pay payable pending payments (fine cleared, renewal)
+
+The jobs are the real services, given the virtual day through their date
+parameters and recorded in the JobRun ledger with trigger "simulate". Customer
+and courier actions do the model writes the API does, one transaction each,
+so the signals keep summaries, usage, affinity and rollups current; created/
+changed timestamps are on the virtual day. Per day and step it records wall
+time, queries, DB time and what the step did, plus the size of the growing
+tables, so job and query times can be followed as months of history pile up.
+
+- Code that reads the wall clock (timezone.localdate(), date.today()) still
+  does: CustomerSummary's "today" counters, JobRun and lease times, and the
+  created_at of the monthly orders the generator makes.
+- Everything random comes from one random.Random(seed), so the same config on
+  the same database makes the same days.
+"""
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import User
+from branch_management.models import DeliveryStaff
+from jobs.models import JobRun
+from jobs.runs import record_run
+from locations.models import CustomerAddress, ZonePincode
+from orders.models import Order, OrderStatusLog, OrderWeight
+from orders.views import DEMAND_DUE_DATE_PLACEHOLDER_DAYS, DEMAND_MINIMUM_CHARGE, DEMAND_PRICE_PER_KG
+from payments.models import Payment, PaymentFine
+from payments.services import ensure_fines_for_all_overdue, generate_monthly_payments
+from payments.views import _renew_subscription_after_payment
+from subscriptions.models import CustomerSubscription, SubscriptionSkipDay, SubscriptionUsage
+from subscriptions.services import record_monthly_pickup, release_monthly_pickup
+
+from .bench import QueryTimer
+from .seed import BILLING_DAYS, PROGRESS, _explicit_timestamps
+
+# status -> chance an open order moves to the next PROGRESS status on a given day
+TRANSITIONS = {
+    "scheduled": 0.92,
+    "picked_up": 0.9,
+    "reached_branch": 0.7,
+    "washing": 0.8,
+    "ready_for_delivery": 0.85,
+}
+
+STEPS = ["monthly_orders", "fines", "renewals", "skips", "demand_orders", "courier", "payments"]
+
+# tables whose growth is reported per day
+SIZED_MODELS = [
+    Order, OrderStatusLog, OrderWeight, Payment, PaymentFine, SubscriptionSkipDay, SubscriptionUsage, JobRun,
+]
+
+
+@dataclass
+class SimConfig:
+    start: Optional[date] = None  # default: tomorrow
+    days: int = 30
+    seed: int = 42
+    tag: Optional[str] = None  # only act for <role><n>@<tag>.test customers (jobs always see everyone)
+    skip_rate: float = 0.05  # subscriber days marked "no pickup"
+    demand_orders_per_month: float = 1.5  # mean per customer
+    pay_rate: float = 0.35  # chance a payable pending payment is paid on a given day
+    transitions: Dict[str, float] = field(default_factory=lambda: dict(TRANSITIONS))
+    chunk_size: int = 500  # orders loaded per query in the courier step
+
+
+@dataclass
+class _Customer:
+    user_id: int
+    address_id: int
+    branch_id: int
+    staff_id: Optional[int]
+
+
+class _Sim:
+    def __init__(self, config: SimConfig, log: Callable[[str], None]):
+        self.c = config
+        self.log = log
+        self.rng = random.Random(config.seed)
+        self.tz = timezone.get_current_timezone()
+        self.customers = self._load_customers()
+        # open orders of the customers in scope: id -> (status, pickup_date)
+        self.open: Dict[int, tuple] = {
+            oid: (status, pickup)
+            for oid, status, pickup in self._scoped(Order.objects.exclude(status__in=("delivered", "cancelled")))
+            .order_by("id").values_list("id", "status", "pickup_date")
+        }
+        self.last_order_id = Order.objects.aggregate(n=Max("id"))["n"] or 0
+
+    # --- helpers ------------------------------------------------------------
+
+    def _at(self, d: date, hour: int, minute: int = 0) -> datetime:
+        return datetime.combine(d, dtime(hour, minute), tzinfo=self.tz)
+
+    def _scoped(self, qs, prefix="user__"):
+        if self.c.tag:
+            return qs.filter(**{f"{prefix}email__endswith": f"@{self.c.tag}.test"})
+        return qs
+
+    def _load_customers(self) -> Dict[int, _Customer]:
+        """Customers in scope with their latest address, its zone's branch and courier (via ZonePincode)."""
+        zones = {}
+        for pincode, zone_id, branch_id in (
+            ZonePincode.objects.filter(branch__is_active=True).order_by("zone_id").values_list("pincode", "zone_id", "branch_id")
+        ):
+            zones.setdefault(pincode, (zone_id, branch_id))
+        staff = {}
+        for zone_id, staff_id, available in (
+            DeliveryStaff.objects.filter(user__is_active=True, user__is_approved=True, zone__isnull=False)
+            .order_by("id").values_list("zone_id", "id", "is_available")
+        ):
+            # like _resolve_delivery_staff_for_zone: first available, else first
+            if zone_id not in staff or (available and not staff[zone_id][1]):
+                staff[zone_id] = (staff_id, available)
+        customers = {}
+        addresses = self._scoped(CustomerAddress.objects.filter(user__role=User.Role.CUSTOMER))
+        for address_id, user_id, pincode in addresses.order_by("user_id", "-id").values_list("id", "user_id", "pincode"):
+            if user_id in customers or pincode not in zones:
+                continue
+            zone_id, branch_id = zones[pincode]
+            customers[user_id] = _Customer(user_id, address_id, branch_id, staff.get(zone_id, (None,))[0])
+        return customers
+
+    def _track_new_orders(self):
+        new = self._scoped(Order.objects.filter(id__gt=self.last_order_id)).values_list("id", "status", "pickup_date")
+        for oid, status, pickup in new:
+            if status not in ("delivered", "cancelled"):
+                self.open[oid] = (status, pickup)
+        self.last_order_id = Order.objects.aggregate(n=Max("id"))["n"] or self.last_order_id
+
+    # --- jobs ---------------------------------------------------------------
+
+    def monthly_orders(self, day: date) -> dict:
+        from orders.views import _ensure_monthly_orders_for_all
+
+        with record_run("monthly_orders", trigger="simulate"):
+            result = _ensure_monthly_orders_for_all(for_date=day, lock_timeout_s=10)
+        self._track_new_orders()
+        return {"scanned": result["scanned"], "created": result["created"]}
+
+    def fines(self, day: date) -> dict:
+        with record_run("fines", trigger="simulate"):
+            return {"processed": ensure_fines_for_all_overdue(today=day, lock_timeout_s=10)}
+
+    def renewals(self, day: date) -> dict:
+        with record_run("monthly_payments", trigger="simulate"):
+            result = generate_monthly_payments(today=day, lock_timeout_s=10)
+        return {"created": result["created"], "skipped": result["skipped"]}
+
+    # --- customers and couriers ---------------------------------------------
+
+    def skips(self, day: date) -> dict:
+        subs = self._scoped(
+            CustomerSubscription.objects.filter(is_active=True, start_date__lte=day, end_date__gte=day)
+        ).order_by("id").values_list("id", "user_id")
+        skipped = cancelled = 0
+        for sub_id, user_id in subs:
+            if self.rng.random() >= self.c.skip_rate:
+                continue
+            with transaction.atomic():
+                _, created = SubscriptionSkipDay.objects.get_or_create(
+                    subscription_id=sub_id, skip_date=day, defaults={"reason": "No Pickup Today"}
+                )
+                skipped += int(created)
+                order = Order.objects.filter(
+                    user_id=user_id, order_type="monthly", pickup_date=day, status="scheduled"
+                ).first()
+                if order is not None:
+                    order.status = "cancelled"
+                    order.save(update_fields=["status"])
+                    with _explicit_timestamps(OrderStatusLog._meta.get_field("changed_at")):
+                        OrderStatusLog.objects.create(order=order, status="cancelled", changed_at=self._at(day, 7))
+                    release_monthly_pickup(order)
+                    self.open.pop(order.id, None)
+                    cancelled += 1
+        return {"skipped": skipped, "cancelled": cancelled}
+
+    def demand_orders(self, day: date) -> dict:
+        chance = self.c.demand_orders_per_month / BILLING_DAYS
+        booked = 0
+        fields = [Order._meta.get_field("created_at")]
+        for customer in self.customers.values():
+            if self.rng.random() >= chance:
+                continue
+            pickup = day + timedelta(days=self.rng.randint(0, 2))
+            created_at = self._at(day, self.rng.randint(7, 21), self.rng.randint(0, 59))
+            with transaction.atomic(), _explicit_timestamps(*fields):
+                order = Order.objects.create(
+                    user_id=customer.user_id, branch_id=customer.branch_id, address_id=customer.address_id,
+                    delivery_staff_id=customer.staff_id, order_type="demand",
+                    pickup_shift=self.rng.choice(["morning", "evening"]), pickup_date=pickup,
+                    status="scheduled", created_at=created_at,
+                )
+                Payment.objects.create(
+                    user_id=customer.user_id, order=order, amount=Decimal("0.00"), payment_type="demand",
+                    payment_status="pending", due_date=day + timedelta(days=DEMAND_DUE_DATE_PLACEHOLDER_DAYS),
+                )
+            self.open[order.id] = ("scheduled", pickup)
+            booked += 1
+        self.last_order_id = max(self.last_order_id, Order.objects.aggregate(n=Max("id"))["n"] or 0)
+        return {"created": booked}
+
+    def courier(self, day: date) -> dict:
+        moving = [
+            oid for oid, (status, pickup) in self.open.items()
+            if pickup <= day and self.rng.random() < self.c.transitions.get(status, 0.0)
+        ]
+        moved = delivered = 0
+        for i in range(0, len(moving), self.c.chunk_size):
+            for order in Order.objects.filter(id__in=moving[i:i + self.c.chunk_size]).order_by("id"):
+                if order.status not in self.c.transitions:  # changed since it was tracked
+                    self.open.pop(order.id, None)
+                    continue
+                step = PROGRESS.index(order.status) + 1
+                self._advance(order, PROGRESS[step], day, step)
+                moved += 1
+                if order.status == "delivered":
+                    self.open.pop(order.id, None)
+                    delivered += 1
+                else:
+                    self.open[order.id] = (order.status, order.pickup_date)
+        return {"moved": moved, "delivered": delivered, "open": len(self.open)}
+
+    def _advance(self, order: Order, new_status: str, day: date, step: int):
+        """What DeliveryOrderStatusView (and the branch's status updates) write for one step."""
+        stamps = [OrderWeight._meta.get_field("recorded_at"), OrderStatusLog._meta.get_field("changed_at")]
+        with transaction.atomic(), _explicit_timestamps(*stamps):
+            if new_status == "picked_up":
+                weight = Decimal(f"{min(20.0, max(0.5, self.rng.gauss(5.0, 2.0))):.2f}")
+                OrderWeight.objects.create(order=order, weight_kg=weight, recorded_at=self._at(day, 9))
+                if order.order_type == "demand":
+                    payment = Payment.objects.filter(order=order, payment_status="pending").first()
+                    if payment is not None:
+                        payment.amount = max(weight * DEMAND_PRICE_PER_KG, DEMAND_MINIMUM_CHARGE)
+                        payment.save(update_fields=["amount"])
+                else:
+                    record_monthly_pickup(order, weight)
+            order.status = new_status
+            order.save(update_fields=["status"])
+            OrderStatusLog.objects.create(order=order, status=new_status, changed_at=self._at(day, 8 + min(step * 2, 14)))
+            if new_status == "delivered" and order.order_type == "demand":
+                Payment.objects.filter(order=order, payment_status="pending").update(due_date=day + timedelta(days=1))
+
+    def payments(self, day: date) -> dict:
+        pending = self._scoped(Payment.objects.filter(payment_status="pending")).select_related(
+            "order", "user", "subscription__plan"
+        ).order_by("id")
+        paid = renewed = 0
+        for payment in pending:
+            if payment.payment_type == "demand" and (
+                payment.order is None or payment.order.status != "delivered" or not payment.amount
+            ):
+                continue
+            if self.rng.random() >= self.c.pay_rate:
+                continue
+            with transaction.atomic():
+                payment.payment_status = "paid"
+                payment.payment_date = day
+                payment.save(update_fields=["payment_status", "payment_date"])
+                PaymentFine.objects.filter(payment=payment).delete()
+                if payment.payment_type == "monthly" and payment.subscription is not None:
+                    renewed += int(_renew_subscription_after_payment(
+                        payment.subscription, payment.user, payment=payment, today=day
+                    ))
+            paid += 1
+        return {"paid": paid, "renewed": renewed}
+
+
+def table_sizes() -> Dict[str, int]:
+    return {model.__name__: model.objects.count() for model in SIZED_MODELS}
+
+
+def simulate_days(
+    config: SimConfig,
+    *,
+    on_day: Callable[[dict], None] = lambda record: None,
+    log: Callable[[str], None] = lambda message: None,
+) -> List[dict]:
+    """Run config.days virtual days; returns one record per day.
+
+    A record is {"date", "steps": {step: {"wall_ms", "queries", "db_ms", ...what it did}},
+    "wall_ms", "sizes": {model: rows}}; on_day(record) is called after each day.
+    """
+    start = config.start or timezone.localdate() + timedelta(days=1)
+    if connection.vendor == "sqlite" and not connection.in_atomic_block:  # no fsync per action, like seed_world
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous = OFF")
+
+    sim = _Sim(config, log)
+    log(f"{len(sim.customers)} customers in scope, {len(sim.open)} open orders")
+    timer = QueryTimer()
+    records = []
+    for i in range(config.days):
+        day = start + timedelta(days=i)
+        record = {"date": day.isoformat(), "steps": {}}
+        day_started = time.perf_counter()
+        for name in STEPS:
+            with timer.capture():
+                started = time.perf_counter()
+                outcome = getattr(sim, name)(day)
+                wall_s = time.perf_counter() - started
+            record["steps"][name] = {
+                "wall_ms": round(wall_s * 1000.0, 1),
+                "queries": timer.count,
+                "db_ms": round(timer.seconds * 1000.0, 1),
+                **outcome,
+            }
+        record["wall_ms"] = round((time.perf_counter() - day_started) * 1000.0, 1)
+        record["sizes"] = table_sizes()
+        records.append(record)
+        on_day(record)
+    return records
+
+
+def degradation(records: List[dict], *, window: int = 7) -> Dict[str, dict]:
+    """Per step: mean wall ms and queries over the first and last `window` days, and the ratio."""
+    window = max(1, min(window, len(records) // 2 or 1))
+    first, last = records[:window], records[-window:]
+    out = {}
+    for name in STEPS:
+        def mean(rows, metric):
+            return sum(r["steps"][name][metric] for r in rows) / len(rows)
+
+        early, late = mean(first, "wall_ms"), mean(last, "wall_ms")
+        out[name] = {
+            "first_wall_ms": round(early, 1),
+            "last_wall_ms": round(late, 1),
+            "wall_ratio": round(late / early, 2) if early else None,
+            "first_queries": round(mean(first, "queries"), 1),
+            "last_queries": round(mean(last, "queries"), 1),
+        }
+    return out
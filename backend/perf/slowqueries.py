@@ -0,0 +1,417 @@
+"""Slow-query capture: statements over SLOW_QUERY_MS, aggregated by SQL fingerprint.
+
+An execute wrapper on every connection (installed from PerfConfig.ready() and
+on connection_created) times each statement. One that takes SLOW_QUERY_MS or
+longer is noted with
+
+    origin        "job:<name>" inside a JobRun (jobs/runs.py), "view:<METHOD> <route>"
+                  in a request (SlowQueryMiddleware), "command:<name>" under
+                  manage.py, else "other"
+    stack         the innermost SLOW_QUERY_STACK_DEPTH frames of our own code
+                  ("orders/views.py:_get_service_zone_for_pincode:263") and a
+                  fingerprint of them without line numbers
+    params shape  the parameters' types, never their values: "(str, bool)"
+
+and aggregated by fingerprint: the SQL with literals and placeholders
+replaced and IN / VALUES lists collapsed, per database alias. SlowQuery keeps
+one row per fingerprint with count, total and max time, counts per origin and
+per stack, the latest sample and its EXPLAIN. The plan is taken with the
+sample's parameters, at most once per SLOW_QUERY_EXPLAIN_EVERY_S per
+fingerprint, and flagged full_scan when it reads a whole table (SQLite "SCAN
+t", PostgreSQL "Seq Scan", MySQL type ALL).
+
+Captures are buffered in the process and written before the next statement
+that runs while the default connection is outside transaction.atomic(), and at
+the end of each request. Writing inside the caller's transaction would hold
+the SlowQuery row lock until it commits, and lose the capture if it rolled
+back; writing right after the slow statement would commit while its rows are
+still being read. A write that fails is retried at the next chance, up to
+MAX_ATTEMPTS. The writes run with capture switched off for the thread.
+
+Report: `manage.py slow_queries`, GET /api/admin/slow-queries/ (perf/views.py).
+SLOW_QUERY_ENABLED=False installs nothing.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.utils import timezone
+
+from core.instrumentation import install_execute_wrapper, setting
+from core.metrics import route_label
+from jobs.runs import current_run
+
+from .models import SlowQuery
+from .profiling import _frame_label
+
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_CHARS = 4000
+MAX_ORIGINS = 20  # per fingerprint, most frequent kept
+MAX_STACKS = 10
+MAX_BUFFERED = 500  # fingerprints waiting to be written; new ones are dropped beyond this
+MAX_ATTEMPTS = 3
+EXPLAINABLE = ("select", "with", "update", "delete")
+ORDERINGS = {"total": "-total_ms", "count": "-count", "max": "-max_ms", "mean": "-mean_ms"}
+
+
+# --- fingerprints --------------------------------------------------------------
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\((?:\?|\.\.\.)\)(?:\s*,\s*\((?:\?|\.\.\.)\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL with values replaced by ?, so the same statement for other rows compares equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    sql = _ROWS.sub("(...)", sql)  # multi-row VALUES
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(alias: str, normalized: str) -> str:
+    return hashlib.sha1(f"{alias}\n{normalized}".encode()).hexdigest()[:16]
+
+
+def _type_name(value) -> str:
+    return "null" if value is None else type(value).__name__
+
+
+def params_shape(params, many: bool = False) -> str:
+    """Types of the parameters, runs collapsed: "(int, str x3)"; values are never kept."""
+    if params is None:
+        return ""
+    if many:
+        # executemany may get an iterator; only a list or tuple can be looked at without consuming it
+        if isinstance(params, (list, tuple)) and params:
+            return f"{params_shape(params[0])} x{len(params)} rows"
+        return "many"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {_type_name(value)}" for key, value in params.items()) + "}"
+    runs = []
+    for name in map(_type_name, params):
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return "(" + ", ".join(name if n == 1 else f"{name} x{n}" for name, n in runs) + ")"
+
+
+def _stack(depth: int):
+    """(fingerprint, ["path:function:line", ...] outermost first) of our own code calling the database."""
+    base = str(settings.BASE_DIR)
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < depth:
+        code = frame.f_code
+        filename = code.co_filename
+        # our own code, minus other execute wrappers (core/metrics.py, perf/bench.py, ...)
+        wrapper = "execute" in code.co_varnames[:2] and "context" in code.co_varnames[:6]
+        if filename.startswith(base) and "site-packages" not in filename and filename != __file__ and not wrapper:
+            frames.append((_frame_label(filename, frame.f_code.co_name), frame.f_lineno))
+        frame = frame.f_back
+    frames.reverse()
+    digest = hashlib.sha1("\n".join(label for label, _ in frames).encode()).hexdigest()[:12]
+    return digest, [f"{label}:{line}" for label, line in frames]
+
+
+_request: ContextVar = ContextVar("slow_query_request", default=None)
+
+
+def current_origin() -> str:
+    run = current_run()
+    if run.name:
+        return f"job:{run.name}"
+    request = _request.get()
+    if request is not None:
+        return f"view:{request.method} {route_label(request)}"
+    if len(sys.argv) > 1 and os.path.basename(sys.argv[0]) == "manage.py":
+        return f"command:{sys.argv[1]}"
+    return "other"
+
+
+# --- capture -------------------------------------------------------------------
+
+_local = threading.local()  # .busy: this thread is writing captures
+_lock = threading.Lock()
+_buffer: Dict[str, dict] = {}
+
+
+def _note(alias, sql, params, many, elapsed_ms):
+    normalized = normalize_sql(sql)
+    key = fingerprint(alias, normalized)
+    stack_key, frames = _stack(setting("SLOW_QUERY_STACK_DEPTH", 8))
+    origin = current_origin()
+    now = timezone.now()
+    with _lock:
+        entry = _buffer.get(key)
+        if entry is None:
+            if len(_buffer) >= MAX_BUFFERED:
+                return
+            entry = _buffer[key] = {
+                "fingerprint": key, "alias": alias, "normalized": normalized, "first_seen": now,
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "origins": Counter(), "stacks": {},
+            }
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["origins"][origin] += 1
+        stack = entry["stacks"].setdefault(stack_key, {"frames": frames, "count": 0})
+        stack["count"] += 1
+        entry.update(
+            sql=sql[:MAX_SQL_CHARS], params=None if many else params, many=many,
+            params_shape=params_shape(params, many)[:255], origin=origin[:255], stack=stack_key, last_seen=now,
+        )
+
+
+def _merge(entry: dict, older: dict) -> None:
+    """Fold an earlier, unwritten capture of the same fingerprint into entry."""
+    entry["count"] += older["count"]
+    entry["total_ms"] += older["total_ms"]
+    entry["max_ms"] = max(entry["max_ms"], older["max_ms"])
+    entry["first_seen"] = min(entry["first_seen"], older["first_seen"])
+    entry["origins"].update(older["origins"])
+    for key, stack in older["stacks"].items():
+        entry["stacks"].setdefault(key, {"frames": stack["frames"], "count": 0})["count"] += stack["count"]
+    entry["attempts"] = max(entry.get("attempts", 0), older.get("attempts", 0))
+
+
+def _capture(execute, sql, params, many, context):
+    if getattr(_local, "busy", False):
+        return execute(sql, params, many, context)
+    if _buffer:
+        flush()  # between statements, once the slow one's rows have been read
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        if elapsed_ms >= setting("SLOW_QUERY_MS", 200):
+            _note(context["connection"].alias, sql, params, many, elapsed_ms)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install_execute_wrapper(connection, _capture)
+
+
+def enable() -> None:
+    """Install the wrapper on open and future connections (PerfConfig.ready())."""
+    if not setting("SLOW_QUERY_ENABLED", True):
+        return
+    connection_created.connect(_on_connection_created, dispatch_uid="perf.slowqueries.install")
+    for connection in connections.all(initialized_only=True):
+        install_execute_wrapper(connection, _capture)
+
+
+# --- EXPLAIN and storage -------------------------------------------------------
+
+
+def is_full_scan(vendor: str, columns: List[str], rows: list) -> bool:
+    if vendor == "sqlite":
+        details = [str(row[-1]) for row in rows]
+        return any(d.startswith("SCAN ") and "USING" not in d and "CONSTANT ROW" not in d for d in details)
+    if vendor == "postgresql":
+        return any("Seq Scan" in str(row[0]) for row in rows)
+    if vendor == "mysql" and "type" in columns:
+        index = columns.index("type")
+        return any(row[index] == "ALL" for row in rows)
+    return False
+
+
+def explain(alias: str, sql: str, params) -> tuple:
+    """(plan text, full_scan) for one statement; ("", False) where EXPLAIN is not supported."""
+    connection = connections[alias]
+    if not connection.features.supports_explaining_query_execution:
+        return "", False
+    # a savepoint, so a failing EXPLAIN can't spoil the transaction it runs in (PostgreSQL)
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        columns = [column[0] for column in cursor.description or ()]
+        rows = cursor.fetchall()
+    lines = [" | ".join(columns)] + [" | ".join(str(value) for value in row) for row in rows]
+    return "\n".join(lines), is_full_scan(connection.vendor, columns, rows)
+
+
+def _explain_due(row: SlowQuery, entry: dict, now) -> bool:
+    if not setting("SLOW_QUERY_EXPLAIN", True) or entry["many"]:
+        return False
+    if not entry["sql"].lstrip().lower().startswith(EXPLAINABLE):
+        return False
+    if entry["alias"] != DEFAULT_DB_ALIAS and connections[entry["alias"]].in_atomic_block:
+        return False
+    every_s = setting("SLOW_QUERY_EXPLAIN_EVERY_S", 86400)
+    return row.explained_at is None or (now - row.explained_at).total_seconds() >= every_s
+
+
+def _top(counts: dict, keep: int, key=lambda value: value) -> dict:
+    return dict(sorted(counts.items(), key=lambda item: key(item[1]), reverse=True)[:keep])
+
+
+def _save(entry: dict) -> None:
+    now = timezone.now()
+    with transaction.atomic():
+        row = SlowQuery.objects.select_for_update().filter(fingerprint=entry["fingerprint"]).first()
+        if row is None:
+            row = SlowQuery(
+                fingerprint=entry["fingerprint"], alias=entry["alias"], normalized_sql=entry["normalized"],
+                first_seen=entry["first_seen"],
+            )
+        row.count += entry["count"]
+        row.total_ms += entry["total_ms"]
+        row.max_ms = max(row.max_ms, entry["max_ms"])
+        origins = Counter(row.origins)
+        origins.update(entry["origins"])
+        row.origins = _top(origins, MAX_ORIGINS)
+        stacks = dict(row.stacks)
+        for key, stack in entry["stacks"].items():
+            seen = stacks.get(key, {"count": 0})
+            stacks[key] = {"frames": stack["frames"], "count": seen["count"] + stack["count"]}
+        row.stacks = _top(stacks, MAX_STACKS, key=lambda stack: stack["count"])
+        row.sample_sql = entry["sql"]
+        row.params_shape = entry["params_shape"]
+        row.last_origin = entry["origin"]
+        row.last_stack = entry["stack"]
+        row.last_seen = entry["last_seen"]
+        if _explain_due(row, entry, now):
+            try:
+                row.explain, row.full_scan = explain(entry["alias"], entry["sql"], entry["params"])
+            except DatabaseError as exc:
+                row.explain, row.full_scan = f"EXPLAIN failed: {exc}", False
+            row.explained_at = now
+        row.save()
+
+
+def flush() -> int:
+    """Write buffered captures; returns how many. Waits while the default connection is in a transaction."""
+    if not _buffer or getattr(_local, "busy", False) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return 0
+    with _lock:
+        entries = list(_buffer.values())
+        _buffer.clear()
+    written = 0
+    _local.busy = True
+    try:
+        for i, entry in enumerate(entries):
+            try:
+                try:
+                    _save(entry)
+                except IntegrityError:  # another process inserted the fingerprint first
+                    _save(entry)
+            except DatabaseError:
+                entry["attempts"] = entry.get("attempts", 0) + 1
+                if entry["attempts"] >= MAX_ATTEMPTS:
+                    logger.exception("Could not record slow query %s", entry["fingerprint"])
+                    continue
+                # e.g. SQLite "statements in progress" under an open iterator(): put the rest back
+                with _lock:
+                    for pending in entries[i:]:
+                        newer = _buffer.get(pending["fingerprint"])
+                        if newer is None:
+                            _buffer[pending["fingerprint"]] = pending
+                        else:
+                            _merge(newer, pending)
+                break
+            written += 1
+    finally:
+        _local.busy = False
+    return written
+
+
+def reset() -> int:
+    """Forget buffered captures and delete the stored ones; returns rows deleted."""
+    with _lock:
+        _buffer.clear()
+    return SlowQuery.objects.all().delete()[0]
+
+
+def report(*, order: str = "total", limit: int = 50, origin: Optional[str] = None,
+           full_scan: Optional[bool] = None, fingerprint: Optional[str] = None) -> List[dict]:
+    """Stored fingerprints, worst first by `order` (total, count, max, mean), optionally filtered."""
+    qs = SlowQuery.objects.annotate(
+        mean_ms=ExpressionWrapper(F("total_ms") / F("count"), output_field=FloatField())
+    ).order_by(ORDERINGS[order], "fingerprint")
+    if fingerprint is not None:
+        qs = qs.filter(fingerprint=fingerprint)
+    if full_scan is not None:
+        qs = qs.filter(full_scan=full_scan)
+    rows = []
+    for row in qs.iterator():
+        if origin and not any(origin in name for name in row.origins):
+            continue
+        rows.append({
+            "fingerprint": row.fingerprint,
+            "alias": row.alias,
+            "count": row.count,
+            "total_ms": round(row.total_ms, 1),
+            "mean_ms": round(row.mean_ms, 1),
+            "max_ms": round(row.max_ms, 1),
+            "full_scan": row.full_scan,
+            "normalized_sql": row.normalized_sql,
+            "params_shape": row.params_shape,
+            "origins": row.origins,
+            "stacks": row.stacks,
+            "sample_sql": row.sample_sql,
+            "explain": row.explain,
+            "explained_at": row.explained_at,
+            "first_seen": row.first_seen,
+            "last_seen": row.last_seen,
+        })
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+class SlowQueryMiddleware:
+    """Names the request as the origin of its slow queries and writes captures when it ends."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not setting("SLOW_QUERY_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+            flush()
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
+            if _buffer:
+                await sync_to_async(flush)()
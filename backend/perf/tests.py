@@ -0,0 +1,628 @@
+import json
+import marshal
+import os
+import pstats
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from analytics.services import order_total, revenue_total
+from analytics.views import timeseries_cache
+from branch_management.models import BranchManager, DeliveryStaff
+from jobs.models import JobRun
+from jobs.runs import record_run
+from locations.models import Branch, City, CustomerAddress, ServiceZone
+from orders.models import CustomerSummary, Order, OrderStatusLog, OrderWeight
+from payments.models import Payment, PaymentFine
+from payments.services import ensure_fines_for_all_overdue
+from subscriptions.models import CustomerSubscription, SubscriptionPlan, SubscriptionSkipDay
+
+from .batch import JOBS, bench_scale
+from .bench import compare_results
+from .management.commands.bench_api import ENDPOINTS
+from . import slowqueries
+from .models import ProfileCapture, SlowQuery
+from .profiling import make_token
+from .seed import SeedConfig, seed_world
+from .simulate import STEPS, SimConfig, degradation, simulate_days
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the SQL the hot endpoints and jobs actually run and check the intended index is used.
+
+    Runs on whatever database the tests run on (SQLite locally, MySQL in CI when
+    configured), so dropping or reshaping one of the composite indexes on Order,
+    Payment or SubscriptionSkipDay fails here instead of in production.
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        city = City.objects.create(name="PlanCity", state="PC")
+        self.branch = Branch.objects.create(
+            city=city, branch_name="Main", address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        zone = ServiceZone.objects.create(branch=self.branch, zone_name="Z1", pincodes=["682001"])
+
+        self.customer = self._user("plan@example.com", "9000000101", User.Role.CUSTOMER)
+        self.courier = self._user("plan-courier@example.com", "9000000102", User.Role.DELIVERY_STAFF)
+        self.manager = self._user("plan-manager@example.com", "9000000103", User.Role.BRANCH_MANAGER)
+        staff = DeliveryStaff.objects.create(user=self.courier, branch=self.branch, zone=zone)
+        BranchManager.objects.create(user=self.manager, branch=self.branch)
+
+        address = CustomerAddress.objects.create(
+            user=self.customer, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        self.sub = CustomerSubscription.objects.create(
+            user=self.customer, plan=plan, preferred_pickup_shift="morning",
+            start_date=self.today - timedelta(days=10), end_date=self.today + timedelta(days=20),
+        )
+        for i in range(6):
+            order = Order.objects.create(
+                user=self.customer, branch=self.branch, address=address, delivery_staff=staff,
+                order_type="demand" if i % 2 else "monthly", pickup_shift="morning",
+                pickup_date=self.today - timedelta(days=i),
+            )
+            Payment.objects.create(
+                user=self.customer, order=order, amount=Decimal("50.00"), payment_type="demand",
+                payment_status="pending" if i % 3 else "paid", due_date=self.today - timedelta(days=i),
+            )
+        Payment.objects.create(
+            user=self.customer, subscription=self.sub, amount=plan.monthly_price, payment_type="monthly",
+            payment_status="pending", due_date=self.today - timedelta(days=3),
+        )
+        SubscriptionSkipDay.objects.create(subscription=self.sub, skip_date=self.today - timedelta(days=2))
+
+    def _user(self, email, phone, role):
+        return User.objects.create_user(
+            email=email, password="pass12345", full_name=email.split("@")[0],
+            phone=phone, role=role, is_active=True, is_approved=True,
+        )
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_login(user)
+        return client
+
+    def _capture(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return [q["sql"] for q in ctx.captured_queries]
+
+    def _index_name(self, model, fields):
+        columns = [model._meta.get_field(f).column for f in fields]
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        for name, info in constraints.items():
+            if info["columns"] == columns and (info["index"] or info["unique"]):
+                return name
+        self.fail(f"no index on {model._meta.db_table}({', '.join(columns)})")
+
+    def _explain(self, sql):
+        prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            return "\n".join(" ".join(str(v) for v in row) for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queries, model, fields, equal=None):
+        """Every captured query filtering model on `equal` (default: the leading field) uses the index on `fields`."""
+        index = self._index_name(model, fields)
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        markers = [f"{table}.{qn(model._meta.get_field(f).column)} = " for f in (equal or fields[:1])]
+        matching = [sql for sql in queries if f"FROM {table}" in sql and all(m in sql for m in markers)]
+        self.assertTrue(matching, f"no captured query filters {table} on {', '.join(equal or fields[:1])}")
+        for sql in matching:
+            plan = self._explain(sql)
+            self.assertIn(index, plan, f"{index} not used by:\n{sql}\nplan:\n{plan}")
+
+    def test_customer_orders_use_user_type_index(self):
+        client = self._client(self.customer)
+        queries = self._capture(lambda: client.get("/api/customer/orders/"))
+        self.assertUsesIndex(queries, Order, ["user", "order_type", "pickup_date"], equal=["user", "order_type"])
+
+    def test_delivery_orders_use_staff_pickup_index(self):
+        client = self._client(self.courier)
+        queries = self._capture(lambda: client.get("/api/delivery/orders/"))
+        self.assertUsesIndex(queries, Order, ["delivery_staff", "pickup_date"])
+
+    def test_manager_orders_use_branch_created_index(self):
+        client = self._client(self.manager)
+        queries = self._capture(lambda: client.get("/api/manager/orders/"))
+        self.assertUsesIndex(queries, Order, ["branch", "created_at"])
+
+    def test_customer_payments_use_user_status_index(self):
+        client = self._client(self.customer)
+        queries = self._capture(lambda: client.get("/api/customer/payments/", {"status": "pending"}))
+        self.assertUsesIndex(queries, Payment, ["user", "payment_status"], equal=["user", "payment_status"])
+
+    def test_subscription_view_uses_subscription_payment_index(self):
+        client = self._client(self.customer)
+        queries = self._capture(lambda: client.get("/api/subscriptions/me/"))
+        self.assertUsesIndex(
+            queries, Payment, ["subscription", "payment_type", "payment_status", "due_date"],
+            equal=["subscription", "payment_type", "payment_status"],
+        )
+
+    def test_fine_job_uses_status_due_index(self):
+        queries = self._capture(lambda: ensure_fines_for_all_overdue(today=self.today))
+        self.assertUsesIndex(queries, Payment, ["payment_status", "due_date"])
+
+    def test_skip_day_uses_subscription_date_index(self):
+        client = self._client(self.customer)
+        queries = self._capture(lambda: client.post("/api/subscriptions/skip/", {"date": str(self.today)}, format="json"))
+        self.assertUsesIndex(queries, SubscriptionSkipDay, ["subscription", "skip_date"], equal=["subscription", "skip_date"])
+
+
+class SeedLoadTests(TestCase):
+    def _seed(self, tag, **overrides):
+        config = dict(customers=40, cities=1, branches_per_city=2, zones_per_branch=2, staff_per_zone=1,
+                      months=2, chunk_size=15, seed=3, tag=tag)
+        config.update(overrides)
+        return seed_world(SeedConfig(**config))
+
+    def _history(self, tag):
+        """Per customer number: what was generated, independent of ids."""
+        rows = Order.objects.filter(user__email__endswith=f"@{tag}.test").values_list(
+            "user__email", "order_type", "pickup_date", "status", "orderweight__weight_kg"
+        )
+        return sorted((email.split("@")[0], *rest) for email, *rest in rows)
+
+    def test_builds_a_consistent_world(self):
+        counts = self._seed("w1")
+
+        self.assertEqual(User.objects.filter(role=User.Role.CUSTOMER).count(), 40)
+        self.assertEqual(counts["Order"], Order.objects.count())
+        self.assertGreater(Order.objects.filter(order_type="monthly").count(), 0)
+        self.assertGreater(Order.objects.filter(order_type="demand").count(), 0)
+        self.assertGreater(OrderStatusLog.objects.count(), Order.objects.count())
+        self.assertEqual(counts["PaymentFine"], PaymentFine.objects.count())
+        # every order's branch is the branch of the zone serving the customer's pincode
+        for order in Order.objects.select_related("address")[:50]:
+            self.assertIn(order.address.pincode, sum(
+                ServiceZone.objects.filter(branch_id=order.branch_id).values_list("pincodes", flat=True), []
+            ))
+
+        # derived tables were rebuilt, and ids continue after the seeded rows
+        self.assertEqual(CustomerSummary.objects.count(), 40)
+        self.assertEqual(order_total(), Order.objects.count())
+        paid = Payment.objects.filter(payment_status="paid").aggregate(s=Sum("amount"))["s"]
+        self.assertEqual(revenue_total(), paid)
+        self.assertTrue(User.objects.get(email="customer1@w1.test").check_password("loadtest123"))
+        city = City.objects.create(name="After Seed", state="AS")
+        self.assertGreater(city.id, City.objects.exclude(id=city.id).order_by("-id")[0].id)
+
+    def test_same_seed_same_world(self):
+        self._seed("d1")
+        self._seed("d2")
+        self._seed("d3", seed=4)
+        self.assertEqual(self._history("d1"), self._history("d2"))
+        self.assertNotEqual(self._history("d1"), self._history("d3"))
+
+    def test_command_refuses_to_reseed_a_tag(self):
+        out = StringIO()
+        call_command("seed_load", customers=5, months=1, cities=1, branches_per_city=1, tag="cmd", stdout=out)
+        self.assertIn("Seeded tag 'cmd'", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("seed_load", customers=5, tag="cmd", stdout=StringIO())
+
+
+class BenchApiTests(TestCase):
+    def setUp(self):
+        seed_world(SeedConfig(customers=12, cities=1, branches_per_city=1, zones_per_branch=2, months=1, tag="bench"))
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _bench(self, name, **options):
+        path = os.path.join(self.dir.name, name)
+        call_command("bench_api", tag="bench", iterations=2, warmup=0, output=path, stdout=StringIO(), **options)
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def test_every_endpoint_answers_as_its_role(self):
+        data = self._bench("run.json")
+
+        self.assertEqual(set(data["results"]), {name for name, _, _ in ENDPOINTS})
+        for name, result in data["results"].items():
+            self.assertEqual(result["status"], {"200": 2}, name)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertGreater(data["results"]["customer_orders"]["queries"], 0)
+        self.assertEqual(data["meta"]["users"]["branch_manager"], "manager1@bench.test")
+
+    def test_baseline_comparison_flags_regressions(self):
+        baseline = self._bench("before.json", only=["customer_overview"])
+        baseline["results"]["customer_overview"]["queries"] -= 1
+        with open(os.path.join(self.dir.name, "before.json"), "w", encoding="utf-8") as fh:
+            json.dump(baseline, fh)
+
+        with self.assertRaisesMessage(CommandError, "customer_overview.queries"):
+            self._bench("after.json", only=["customer_overview"], baseline=os.path.join(self.dir.name, "before.json"),
+                        fail_on_regression=True)
+
+    def test_compare_ignores_small_latency_noise(self):
+        rows = compare_results(
+            {"a": {"p50_ms": 2.0, "p95_ms": 10.0, "queries": 3, "status": {"200": 5}}},
+            {"a": {"p50_ms": 2.9, "p95_ms": 15.0, "queries": 3, "status": {"500": 5}}},
+            threshold_pct=20, min_delta_ms=1.0,
+        )
+        flagged = {row["metric"] for row in rows if row["regression"]}
+        self.assertEqual(flagged, {"p95_ms", "status"})
+
+
+class BenchJobsTests(TestCase):
+    def test_measures_every_job_at_a_scale(self):
+        results = bench_scale(30, seed=5)
+
+        self.assertEqual(list(results), [job.name for job in JOBS])
+        overdue = Payment.objects.filter(payment_status="pending", due_date__lt=timezone.localdate()).count()
+        self.assertEqual(results["fines"]["rows"], overdue)
+        self.assertGreater(results["monthly_payments"]["created"], 0)
+        for name, result in results.items():
+            self.assertEqual(result["subscriptions"], 30)
+            self.assertGreater(result["queries"], 0, name)
+            self.assertGreaterEqual(result["wall_ms"], 0)
+        self.assertGreater(results["monthly_orders"]["created"], 0)
+        self.assertEqual(results["monthly_orders_rerun"]["created"], 0)
+
+
+class SimulateDaysTests(TestCase):
+    def setUp(self):
+        seed_world(SeedConfig(customers=30, cities=1, branches_per_city=1, zones_per_branch=2, months=1, seed=4,
+                              tag="sim"))
+        self.start = timezone.localdate() + timedelta(days=1)
+
+    def test_days_advance_orders_and_record_each_step(self):
+        orders, logs = Order.objects.count(), OrderStatusLog.objects.count()
+        records = simulate_days(SimConfig(start=self.start, days=3, seed=2, tag="sim", demand_orders_per_month=15))
+
+        self.assertEqual([r["date"] for r in records],
+                         [(self.start + timedelta(days=i)).isoformat() for i in range(3)])
+        for record in records:
+            self.assertEqual(list(record["steps"]), STEPS)
+            self.assertGreater(record["steps"]["monthly_orders"]["queries"], 0)
+        self.assertEqual(records[-1]["sizes"]["Order"], Order.objects.count())
+        self.assertGreater(Order.objects.count(), orders)
+        self.assertGreater(OrderStatusLog.objects.count(), logs)
+        # monthly orders exist for each simulated day
+        for i in range(3):
+            self.assertTrue(Order.objects.filter(order_type="monthly", pickup_date=self.start + timedelta(days=i)).exists())
+        self.assertEqual(
+            set(JobRun.objects.filter(trigger="simulate").values_list("name", flat=True)),
+            {"monthly_orders", "fines", "monthly_payments"},
+        )
+        self.assertEqual(set(degradation(records)), set(STEPS))
+
+    def test_command_writes_daily_records(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "sim.json")
+        out = StringIO()
+        call_command("simulate_days", start=self.start.isoformat(), days=2, tag="sim", transition=["scheduled=1"],
+                     output=path, stdout=out)
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(data["meta"]["transitions"]["scheduled"], 1.0)
+        self.assertIn("Simulated 2 days", out.getvalue())
+        # every order due for pickup by the first day was picked up
+        self.assertFalse(Order.objects.filter(status="scheduled", pickup_date__lt=self.start).exists())
+        with self.assertRaises(CommandError):
+            call_command("simulate_days", transition=["washing=2"], stdout=StringIO())
+
+
+# Queries per request for the read endpoints (names from bench_api.ENDPOINTS).
+# The count must not depend on the number of rows listed; see QueryBudgetTests.
+QUERY_BUDGETS = {
+    "delivery_orders": 4,
+    "delivery_profile": 4,
+    "customer_overview": 3,
+    "customer_orders": 7,
+    "customer_orders_demand": 7,
+    "customer_payments": 3,
+    "customer_payments_pending": 3,
+    "customer_subscription": 5,
+    "customer_plans": 3,
+    "customer_profile": 2,
+    "customer_addresses": 3,
+    "customer_available_branches": 4,
+    "manager_overview": 6,
+    "manager_orders": 4,
+    "manager_staff": 4,
+    "manager_zones": 4,
+    "manager_subscriptions": 6,
+    "manager_monthly_payments": 4,
+    "manager_approvals": 4,
+    "manager_branch": 3,
+    "admin_overview": 5,
+    "admin_analytics": 4,
+    "admin_timeseries": 6,
+    "admin_payments": 1,
+    "admin_branches": 1,
+    "admin_cities": 1,
+    "admin_users": 1,
+    "admin_approvals": 1,
+    "admin_plans": 3,
+}
+
+
+class QueryBudgetTests(TestCase):
+    """Each read endpoint runs the same number of queries for 1 and for 50 rows, within QUERY_BUDGETS.
+
+    The fixture grows every list an endpoint shows (orders, payments with
+    fines, addresses, plans, branches, staff, zones, subscriptions, users), so
+    a per-row query (o.user.full_name, p.subscription.plan.name, ...) shows up
+    as a count that grows with the rows; the failure lists the repeated SQL.
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.city = City.objects.create(name="BudgetCity", state="BC")
+        self.branch = Branch.objects.create(
+            city=self.city, branch_name="Main", address="Addr",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+        )
+        self.zone = ServiceZone.objects.create(branch=self.branch, zone_name="Z0", pincodes=["682001"])
+        self.customer = self._user("budget@example.com", User.Role.CUSTOMER)
+        self.courier = self._user("budget-courier@example.com", User.Role.DELIVERY_STAFF)
+        self.manager = self._user("budget-manager@example.com", User.Role.BRANCH_MANAGER)
+        self.admin = self._user("budget-admin@example.com", User.Role.SUPER_ADMIN)
+        self.staff = DeliveryStaff.objects.create(user=self.courier, branch=self.branch, zone=self.zone)
+        BranchManager.objects.create(user=self.manager, branch=self.branch)
+        self.address = CustomerAddress.objects.create(
+            user=self.customer, address_label="Home", full_address="Home", pincode="682001",
+            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"), is_default=True,
+        )
+        self.plan = SubscriptionPlan.objects.create(
+            name="Basic", monthly_price=Decimal("199.00"), max_weight_per_month=Decimal("30.00")
+        )
+        self.sub = CustomerSubscription.objects.create(
+            user=self.customer, plan=self.plan, preferred_pickup_shift="morning",
+            start_date=self.today - timedelta(days=100), end_date=self.today + timedelta(days=20),
+        )
+
+    _phone = 9100000000
+
+    def _user(self, email, role, approved=True):
+        QueryBudgetTests._phone += 1
+        return User.objects.create(  # no password: hashing 150 of them would dominate the test
+            email=email, full_name=email.split("@")[0],
+            phone=str(QueryBudgetTests._phone), role=role, is_active=True, is_approved=approved,
+        )
+
+    def _grow(self, start, stop):
+        """Add rows start..stop-1 to every list the endpoints show."""
+        for i in range(start, stop):
+            day = self.today - timedelta(days=i)
+            Order.objects.create(
+                user=self.customer, branch=self.branch, address=self.address, delivery_staff=self.staff,
+                order_type="monthly", pickup_shift="morning", pickup_date=day,
+                status="delivered" if i else "scheduled",
+            )
+            order = Order.objects.create(
+                user=self.customer, branch=self.branch, address=self.address, delivery_staff=self.staff,
+                order_type="demand", pickup_shift="evening", pickup_date=day, status="delivered",
+            )
+            OrderWeight.objects.create(order=order, weight_kg=Decimal("4.50"))
+            OrderStatusLog.objects.create(order=order, status="delivered", changed_by=self.courier)
+            demand = Payment.objects.create(
+                user=self.customer, order=order, amount=Decimal("45.00"), payment_type="demand",
+                payment_status="pending", due_date=day - timedelta(days=1),
+            )
+            PaymentFine.objects.create(payment=demand, fine_amount=Decimal("10.00"), fine_days=i + 1)
+            Payment.objects.create(
+                user=self.customer, subscription=self.sub, amount=self.plan.monthly_price, payment_type="monthly",
+                payment_status="paid" if i else "pending", due_date=day, payment_date=day if i else None,
+            )
+            CustomerAddress.objects.create(
+                user=self.customer, address_label=f"Other {i}", full_address="Else", pincode="682001",
+                latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+            )
+            SubscriptionPlan.objects.create(
+                name=f"Plan {i}", monthly_price=Decimal("99.00"), max_weight_per_month=Decimal("10.00")
+            )
+            city = City.objects.create(name=f"City {i}", state="BC")
+            branch = Branch.objects.create(
+                city=city, branch_name=f"Branch {i}", address="Addr",
+                latitude=Decimal("10.000000"), longitude=Decimal("76.000000"),
+            )
+            ServiceZone.objects.create(branch=branch, zone_name="Z", pincodes=["682001"])
+            zone = ServiceZone.objects.create(branch=self.branch, zone_name=f"Z{i + 1}", pincodes=[str(683000 + i)])
+            courier = self._user(f"budget-courier{i}@example.com", User.Role.DELIVERY_STAFF)
+            DeliveryStaff.objects.create(user=courier, branch=self.branch, zone=zone)
+            applicant = self._user(f"budget-applicant{i}@example.com", User.Role.DELIVERY_STAFF, approved=False)
+            DeliveryStaff.objects.create(user=applicant, branch=self.branch)
+            subscriber = self._user(f"budget-subscriber{i}@example.com", User.Role.CUSTOMER)
+            sub = CustomerSubscription.objects.create(
+                user=subscriber, plan=self.plan, preferred_pickup_shift="evening", branch=self.branch,
+                start_date=self.today - timedelta(days=40), end_date=self.today + timedelta(days=20),
+            )
+            monthly = Payment.objects.create(
+                user=subscriber, subscription=sub, amount=self.plan.monthly_price, payment_type="monthly",
+                payment_status="pending", due_date=self.today - timedelta(days=2),
+            )
+            PaymentFine.objects.create(payment=monthly, fine_amount=Decimal("20.00"), fine_days=2)
+
+    def _queries(self, clients, path):
+        cache.clear()  # dashboard payloads are cached (swr_cached / timeseries_cache)
+        timeseries_cache.clear()
+        clients.get(path)  # once-per-process/day work (e.g. queueing monthly orders) is not per request
+        cache.clear()
+        timeseries_cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = clients.get(path)
+        self.assertLess(response.status_code, 400, f"{path}: {response.status_code}")
+        return [q["sql"] for q in ctx.captured_queries]
+
+    def _run_all(self):
+        clients = {}
+        for role, user in [
+            (User.Role.CUSTOMER, self.customer), (User.Role.DELIVERY_STAFF, self.courier),
+            (User.Role.BRANCH_MANAGER, self.manager), (User.Role.SUPER_ADMIN, self.admin),
+        ]:
+            clients[role] = APIClient()
+            clients[role].force_login(user)
+        counts = {}
+        for name, role, path in ENDPOINTS:
+            counts[name] = self._queries(clients[role], path.format(address_id=self.address.id))
+        return counts
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        self._grow(0, 1)
+        one = self._run_all()
+        self._grow(1, 50)
+        fifty = self._run_all()
+
+        for name, queries in fifty.items():
+            with self.subTest(endpoint=name):
+                repeated = [
+                    f"    {n}x {shape}" for shape, n in Counter(map(slowqueries.normalize_sql, queries)).most_common() if n > 1
+                ]
+                detail = "\n".join([f"{name}: {len(one[name])} queries for 1 row, {len(queries)} for 50"] + repeated)
+                self.assertEqual(len(queries), len(one[name]), detail)
+                self.assertLessEqual(len(queries), QUERY_BUDGETS[name], detail)
+
+    def test_every_endpoint_has_a_budget(self):
+        self.assertEqual(set(QUERY_BUDGETS), {name for name, _, _ in ENDPOINTS})
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(email="root@example.com", phone="9000000001", role=User.Role.SUPER_ADMIN)
+        self.customer = User.objects.create(email="slow@example.com", phone="9000000002", role=User.Role.CUSTOMER)
+        self.admin_client = APIClient()
+        self.admin_client.force_login(self.admin)
+        self.customer_client = APIClient()
+        self.customer_client.force_login(self.customer)
+
+    def test_super_admin_gets_a_cprofile_capture(self):
+        response = self.admin_client.get("/api/subscriptions/plans/", HTTP_X_PROFILE="cprofile")
+        capture = ProfileCapture.objects.get(pk=response["X-Profile-Id"])
+
+        self.assertEqual((capture.route, capture.status_code, capture.requested_by), ("api/subscriptions/plans/", 200, self.admin))
+        self.assertTrue(any("subscriptions_subscriptionplan" in q["sql"] for q in capture.queries))
+        self.assertEqual(capture.query_count, len(capture.queries))
+        with tempfile.NamedTemporaryFile(suffix=".pstats") as fh:
+            fh.write(bytes(capture.pstats))
+            fh.flush()
+            self.assertTrue(pstats.Stats(fh.name).total_calls)
+        self.assertRegex(capture.collapsed.splitlines()[0], r"^\S.* \d+$")
+        self.assertIn("subscriptions/views.py:get", capture.collapsed)
+
+    def test_others_need_a_signed_token(self):
+        response = self.customer_client.get("/api/subscriptions/plans/", HTTP_X_PROFILE="sample")
+        self.assertNotIn("X-Profile-Id", response)
+        response = self.customer_client.get(
+            "/api/subscriptions/plans/", HTTP_X_PROFILE="sample", HTTP_X_PROFILE_TOKEN=make_token() + "x"
+        )
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(ProfileCapture.objects.exists())
+
+        response = self.customer_client.get(
+            "/api/subscriptions/plans/", HTTP_X_PROFILE="sample", HTTP_X_PROFILE_TOKEN=make_token()
+        )
+        capture = ProfileCapture.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual((capture.engine, capture.via_token, capture.pstats), (ProfileCapture.SAMPLE, True, None))
+
+    def test_list_and_download_are_super_admin_only(self):
+        pk = self.admin_client.get("/api/subscriptions/plans/", HTTP_X_PROFILE="1")["X-Profile-Id"]
+
+        self.assertEqual(self.customer_client.get("/api/admin/profiles/").status_code, 403)
+        self.assertEqual(APIClient().get(f"/api/admin/profiles/{pk}.collapsed").status_code, 403)
+
+        listing = self.admin_client.get("/api/admin/profiles/").json()["results"]
+        self.assertEqual([row["id"] for row in listing], [int(pk)])
+        self.assertNotIn("pstats", listing[0])
+        detail = self.admin_client.get(f"/api/admin/profiles/{pk}/").json()
+        self.assertEqual(detail["query_count"], len(detail["queries"]))
+
+        download = self.admin_client.get(f"/api/admin/profiles/{pk}.pstats")
+        self.assertEqual(download["Content-Disposition"], f'attachment; filename="profile-{pk}.pstats"')
+        self.assertTrue(marshal.loads(download.content))
+        self.assertIn(b"subscriptions/views.py:get", self.admin_client.get(f"/api/admin/profiles/{pk}.collapsed").content)
+
+
+@override_settings(SLOW_QUERY_MS=0)  # every statement counts as slow
+class SlowQueryTests(TransactionTestCase):
+    # captures are written outside transaction.atomic(), which TestCase never leaves
+    def setUp(self):
+        slowqueries.reset()
+        self.addCleanup(slowqueries.reset)
+        city = City.objects.create(name="SlowCity", state="SC")
+        self.branch = Branch.objects.create(city=city, branch_name="Main", address="Addr",
+                                            latitude=Decimal("10.000000"), longitude=Decimal("76.000000"))
+
+    def _zone_lookups(self):
+        with record_run("zone_lookup"):
+            list(ServiceZone.objects.filter(zone_name="North"))
+            list(ServiceZone.objects.filter(zone_name="South"))
+
+    def _row(self):
+        User.objects.exists()  # the next statement writes what was captured
+        return SlowQuery.objects.get(normalized_sql__contains='WHERE "locations_servicezone"."zone_name" = ?')
+
+    def test_aggregates_by_fingerprint_with_origin_stack_and_plan(self):
+        self._zone_lookups()
+        row = self._row()
+
+        self.assertEqual(row.count, 2)
+        self.assertEqual(row.origins, {"job:zone_lookup": 2})
+        self.assertEqual(row.params_shape, "(str)")
+        self.assertNotIn("North", row.normalized_sql + row.params_shape)
+        (stack,) = row.stacks.values()
+        self.assertEqual(stack["count"], 2)
+        self.assertTrue(any(frame.startswith("perf/tests.py:_zone_lookups:") for frame in stack["frames"]))
+        self.assertIsNotNone(row.explained_at)
+        self.assertTrue(row.explain)
+        if connection.vendor in ("sqlite", "postgresql", "mysql"):
+            self.assertTrue(row.full_scan, row.explain)  # zone_name has no index
+
+        self.assertEqual(slowqueries.normalize_sql("SELECT a FROM t WHERE id IN (1, 2, 3) AND n = 'x'"),
+                         "SELECT a FROM t WHERE id IN (...) AND n = ?")
+        self.assertEqual(slowqueries.params_shape([1, 2, 3, "a", None]), "(int x3, str, null)")
+
+    def test_waits_for_the_transaction_to_end(self):
+        with transaction.atomic():
+            list(ServiceZone.objects.filter(zone_name="North"))
+            self.assertFalse(SlowQuery.objects.filter(normalized_sql__contains="zone_name").exists())
+        self.assertEqual(self._row().count, 1)
+
+    def test_report_command_and_admin_endpoint(self):
+        self._zone_lookups()
+        row = self._row()
+        admin = User.objects.create(email="root@example.com", phone="9000000001", role=User.Role.SUPER_ADMIN)
+        customer = User.objects.create(email="c@example.com", phone="9000000002", role=User.Role.CUSTOMER)
+
+        out = StringIO()
+        call_command("slow_queries", origin="job:zone_lookup", explain=True, limit=50, stdout=out)
+        self.assertIn(row.fingerprint, out.getvalue())
+        self.assertIn("_zone_lookups", out.getvalue())
+
+        client = APIClient()
+        client.force_login(customer)
+        self.assertEqual(client.get("/api/admin/slow-queries/").status_code, 403)
+        client.force_login(admin)
+        listed = client.get("/api/admin/slow-queries/", {"origin": "job:zone_lookup", "order": "count"}).json()
+        self.assertIn(row.fingerprint, [r["fingerprint"] for r in listed["results"]])  # with the JobRun writes
+        self.assertNotIn("explain", listed["results"][0])
+        detail = client.get(f"/api/admin/slow-queries/{row.fingerprint}/").json()
+        self.assertEqual(detail["explain"], row.explain)
+        self.assertEqual(client.get("/api/admin/slow-queries/?order=worst").status_code, 400)
+        # the admin's own requests are captured too, labelled with their route
+        self.assertTrue(SlowQuery.objects.filter(last_origin__startswith="view:GET api/admin/").exists())
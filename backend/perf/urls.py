@@ -0,0 +1,17 @@
+from django.urls import path, re_path
+from .views import (
+    AdminProfileDetailView,
+    AdminProfileDownloadView,
+    AdminProfilesView,
+    AdminSlowQueriesView,
+    AdminSlowQueryDetailView,
+)
+
+urlpatterns = [
+    path('profiles/', AdminProfilesView.as_view(), name='admin-profiles'),
+    path('profiles/<int:pk>/', AdminProfileDetailView.as_view(), name='admin-profile-detail'),
+    re_path(r'^profiles/(?P<pk>\d+)\.(?P<fmt>pstats|collapsed)$', AdminProfileDownloadView.as_view(),
+            name='admin-profile-download'),
+    path('slow-queries/', AdminSlowQueriesView.as_view(), name='admin-slow-queries'),
+    path('slow-queries/<str:fingerprint>/', AdminSlowQueryDetailView.as_view(), name='admin-slow-query-detail'),
+]
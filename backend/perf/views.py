@@ -0,0 +1,93 @@
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsSuperAdmin
+
+from .models import ProfileCapture
+from .slowqueries import ORDERINGS, report, reset
+
+
+LIST_FIELDS = (
+    "id", "created_at", "engine", "method", "path", "route", "status_code",
+    "duration_ms", "query_count", "db_ms", "requested_by__email", "via_token",
+)
+DOWNLOAD_CONTENT_TYPES = {"pstats": "application/octet-stream", "collapsed": "text/plain; charset=utf-8"}
+SLOW_QUERY_DETAIL_ONLY = ("stacks", "sample_sql", "explain")
+
+
+class _ProfilesView(APIView):
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsSuperAdmin]
+
+
+class AdminProfilesView(_ProfilesView):
+    """GET /api/admin/profiles/?limit=50 -- newest captures first, without the profiles themselves."""
+
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 50)), 500))
+        except ValueError:
+            return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = ProfileCapture.objects.order_by("-created_at", "-id").values(*LIST_FIELDS)[:limit]
+        return Response({"results": list(rows)}, status=status.HTTP_200_OK)
+
+
+class AdminProfileDetailView(_ProfilesView):
+    """GET /api/admin/profiles/<id>/ -- metadata and query log."""
+
+    def get(self, request, pk=None):
+        row = ProfileCapture.objects.filter(pk=pk).values(*LIST_FIELDS, "queries").first()
+        if row is None:
+            return Response({"detail": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(row, status=status.HTTP_200_OK)
+
+
+class AdminProfileDownloadView(_ProfilesView):
+    """GET /api/admin/profiles/<id>.<pstats|collapsed>"""
+
+    def get(self, request, pk=None, fmt=None):
+        row = ProfileCapture.objects.filter(pk=pk).values(fmt).first()
+        if row is None:
+            return Response({"detail": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not row[fmt]:
+            return Response({"detail": f"No {fmt} data for this capture"}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(bytes(row[fmt]) if fmt == "pstats" else row[fmt], content_type=DOWNLOAD_CONTENT_TYPES[fmt])
+        response["Content-Disposition"] = f'attachment; filename="profile-{pk}.{fmt}"'
+        return response
+
+
+class AdminSlowQueriesView(_ProfilesView):
+    """GET /api/admin/slow-queries/?order=total|count|max|mean&limit=50&origin=job:&full_scan=1
+    -- worst fingerprints first (perf/slowqueries.py); DELETE clears them."""
+
+    def get(self, request):
+        order = request.query_params.get("order", "total")
+        if order not in ORDERINGS:
+            return Response({"detail": f"order must be one of {', '.join(ORDERINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 50)), 500))
+        except ValueError:
+            return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        full_scan = request.query_params.get("full_scan")
+        rows = report(
+            order=order, limit=limit, origin=request.query_params.get("origin") or None,
+            full_scan=None if full_scan in (None, "") else full_scan in ("1", "true"),
+        )
+        results = [{k: v for k, v in row.items() if k not in SLOW_QUERY_DETAIL_ONLY} for row in rows]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        return Response({"deleted": reset()}, status=status.HTTP_200_OK)
+
+
+class AdminSlowQueryDetailView(_ProfilesView):
+    """GET /api/admin/slow-queries/<fingerprint>/ -- with stacks, latest sample and EXPLAIN."""
+
+    def get(self, request, fingerprint=None):
+        row = next((r for r in report(limit=1, fingerprint=fingerprint)), None)
+        if row is None:
+            return Response({"detail": "Slow query not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(row, status=status.HTTP_200_OK)
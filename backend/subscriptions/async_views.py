@@ -0,0 +1,11 @@
+"""Async twin of the plans list (see core/async_views.py)."""
+from core.async_views import AsyncSessionView, json_response
+
+from .models import SubscriptionPlan
+from .views import _plan_row
+
+
+class AsyncCustomerPlansListView(AsyncSessionView):
+    async def get(self, request):
+        plans = SubscriptionPlan.objects.all().order_by("monthly_price")
+        return json_response([_plan_row(p) async for p in plans])
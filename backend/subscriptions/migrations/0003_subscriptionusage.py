@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0002_alter_subscriptionplan_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubscriptionUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('total_pickups', models.PositiveIntegerField(default=0)),
+                ('total_weight', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_periods', to='subscriptions.customersubscription')),
+            ],
+            options={
+                'unique_together': {('subscription', 'period_start')},
+            },
+        ),
+    ]
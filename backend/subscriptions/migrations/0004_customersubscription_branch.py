@@ -0,0 +1,40 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_subscription_branch(apps, schema_editor):
+    CustomerSubscription = apps.get_model("subscriptions", "CustomerSubscription")
+    Order = apps.get_model("orders", "Order")
+    CustomerBranchAffinity = apps.get_model("locations", "CustomerBranchAffinity")
+
+    latest_order_branch = {}
+    for uid, bid in Order.objects.order_by("user_id", "id").values_list("user_id", "branch_id"):
+        latest_order_branch[uid] = bid
+    address_branch = {}
+    for uid, bid in CustomerBranchAffinity.objects.filter(via_address=True).order_by("-id").values_list("user_id", "branch_id"):
+        address_branch[uid] = bid
+
+    for sid, user_id in CustomerSubscription.objects.filter(branch__isnull=True).values_list("id", "user_id"):
+        bid = latest_order_branch.get(user_id) or address_branch.get(user_id)
+        if bid:
+            CustomerSubscription.objects.filter(id=sid).update(branch_id=bid)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_branch_affinity'),
+        ('subscriptions', '0003_subscriptionusage'),
+        ('orders', '0002_customersummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customersubscription',
+            name='branch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='locations.branch'),
+        ),
+        migrations.RunPython(backfill_subscription_branch, migrations.RunPython.noop),
+    ]
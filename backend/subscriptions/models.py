@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
 from accounts.models import User
 
 
@@ -25,10 +27,51 @@ class CustomerSubscription(models.Model):
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
 
+    # Branch the subscription is attributed to for reporting (set on create).
+    branch = models.ForeignKey(
+        "locations.Branch", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
     def __str__(self):
         return f"{self.user.full_name} - {self.plan.name}"
 
 
+@receiver(pre_save, sender=CustomerSubscription)
+def _attribute_branch_on_create(sender, instance, **kwargs):
+    if instance._state.adding and instance.branch_id is None:
+        from locations.services import customer_branch_id
+        instance.branch_id = customer_branch_id(instance.user_id)
+
+
+@receiver(post_save, sender=CustomerSubscription)
+def _refresh_summary_on_subscription_save(sender, instance, **kwargs):
+    # Lazy import: orders.models imports this module
+    from orders.services import refresh_customer_summary
+    refresh_customer_summary(instance.user_id)
+
+
+@receiver(post_delete, sender=CustomerSubscription)
+def _refresh_summary_on_subscription_delete(sender, instance, **kwargs):
+    from orders.services import refresh_customer_summary
+    refresh_customer_summary(instance.user_id, create=False)
+
+
+class SubscriptionUsage(models.Model):
+    """Pickups/weight used in one 30-day billing period (see subscriptions/services.py)."""
+    subscription = models.ForeignKey(CustomerSubscription, on_delete=models.CASCADE, related_name="usage_periods")
+    period_start = models.DateField()
+    period_end = models.DateField()
+    total_pickups = models.PositiveIntegerField(default=0)
+    total_weight = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("subscription", "period_start")
+
+    def __str__(self):
+        return f"Usage {self.subscription_id} {self.period_start}..{self.period_end}"
+
+
 class SubscriptionSkipDay(models.Model):
     subscription = models.ForeignKey(CustomerSubscription, on_delete=models.CASCADE)
     skip_date = models.DateField()
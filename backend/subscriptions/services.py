@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import CustomerSubscription, SubscriptionUsage
+
+
+BILLING_PERIOD_DAYS = 30
+
+
+def _local_today(today: Optional[date] = None) -> date:
+    return today or timezone.localdate()
+
+
+def billing_period_for(sub: CustomerSubscription, on_date: date) -> Tuple[date, date]:
+    """Return (start, end) of the rolling 30-day billing period containing on_date.
+
+    Periods end on sub.end_date (extended by +30 on renewal); dates before the
+    current period walk back to the earlier cycle. Without an end_date the period
+    runs from start_date up to on_date.
+    """
+    sub_start = sub.start_date
+    if sub.end_date:
+        end = sub.end_date
+        start = end - timedelta(days=BILLING_PERIOD_DAYS)
+        while on_date < start and (sub_start is None or start > sub_start):
+            end = start
+            start = end - timedelta(days=BILLING_PERIOD_DAYS)
+    else:
+        end = on_date
+        start = sub_start or (on_date - timedelta(days=BILLING_PERIOD_DAYS))
+
+    if sub_start:
+        start = max(start, sub_start)
+    if end < start:
+        start = end
+    return start, end
+
+
+def _usage_from_orders(sub: CustomerSubscription, start: date, end: date):
+    """Source-of-truth aggregate: picked-up (weighed, not cancelled) monthly orders."""
+    from orders.models import Order  # orders.models imports this app
+
+    agg = (
+        Order.objects.filter(
+            user_id=sub.user_id,
+            order_type="monthly",
+            pickup_date__gte=start,
+            pickup_date__lte=end,
+            orderweight__isnull=False,
+        )
+        .exclude(status="cancelled")
+        .aggregate(n=Count("id"), total=Sum("orderweight__weight_kg"))
+    )
+    return agg["n"] or 0, agg["total"] or Decimal("0")
+
+
+def recompute_usage(sub: CustomerSubscription, start: date, end: date) -> SubscriptionUsage:
+    pickups, weight = _usage_from_orders(sub, start, end)
+    usage, _ = SubscriptionUsage.objects.update_or_create(
+        subscription=sub,
+        period_start=start,
+        defaults={"period_end": end, "total_pickups": pickups, "total_weight": weight},
+    )
+    return usage
+
+
+def get_usage(sub: CustomerSubscription, *, today: Optional[date] = None) -> SubscriptionUsage:
+    """Current-period usage row; computed from orders once if missing (backfill)."""
+    start, end = billing_period_for(sub, _local_today(today))
+    usage = SubscriptionUsage.objects.filter(subscription=sub, period_start=start, period_end=end).first()
+    if usage is None:
+        usage = recompute_usage(sub, start, end)
+    return usage
+
+
+def usage_for_subscriptions(subs, *, today: Optional[date] = None) -> Dict[int, SubscriptionUsage]:
+    """Current-period usage per subscription id, for listing many subscriptions.
+
+    Stored rows are matched on (subscription, period_start), so open-ended
+    subscriptions whose period_end moves daily still hit. Subscriptions without
+    a row get an unsaved SubscriptionUsage from one aggregate over their
+    orders; nothing is written (get_usage / the delta updates store rows).
+    """
+    from orders.models import Order  # orders.models imports this app
+
+    today = _local_today(today)
+    periods = {s.id: billing_period_for(s, today) for s in subs}
+    result = {}
+    for u in SubscriptionUsage.objects.filter(
+        subscription_id__in=list(periods),
+        period_start__in={start for start, _ in periods.values()},
+    ):
+        start, end = periods[u.subscription_id]
+        if u.period_start == start:
+            u.period_end = end
+            result[u.subscription_id] = u
+
+    missing = [s for s in subs if s.id not in result]
+    if not missing:
+        return result
+    daily = (
+        Order.objects.filter(
+            user_id__in={s.user_id for s in missing},
+            order_type="monthly",
+            pickup_date__gte=min(periods[s.id][0] for s in missing),
+            pickup_date__lte=max(periods[s.id][1] for s in missing),
+            orderweight__isnull=False,
+        )
+        .exclude(status="cancelled")
+        .values_list("user_id", "pickup_date")
+        .annotate(n=Count("id"), total=Sum("orderweight__weight_kg"))
+        .order_by()
+    )
+    by_user = {}
+    for user_id, day, n, total in daily:
+        by_user.setdefault(user_id, []).append((day, n, total or Decimal("0")))
+    for s in missing:
+        start, end = periods[s.id]
+        days = [(n, total) for day, n, total in by_user.get(s.user_id, ()) if start <= day <= end]
+        result[s.id] = SubscriptionUsage(
+            subscription=s,
+            period_start=start,
+            period_end=end,
+            total_pickups=sum(n for n, _ in days),
+            total_weight=sum((total for _, total in days), Decimal("0")),
+        )
+    return result
+
+
+def _subscription_for_order(order) -> Optional[CustomerSubscription]:
+    return (
+        CustomerSubscription.objects.filter(user_id=order.user_id, is_active=True)
+        .order_by("id")
+        .first()
+    )
+
+
+def _apply_usage_delta(order, *, pickups: int, weight: Decimal) -> None:
+    if getattr(order, "order_type", None) != "monthly":
+        return
+    sub = _subscription_for_order(order)
+    if not sub:
+        return
+    start, end = billing_period_for(sub, order.pickup_date)
+
+    with transaction.atomic():
+        updated = SubscriptionUsage.objects.filter(
+            subscription=sub, period_start=start, period_end=end
+        ).update(
+            total_pickups=F("total_pickups") + pickups,
+            total_weight=F("total_weight") + weight,
+        )
+        if not updated:
+            # No row for this period yet: the write is already visible, so compute it.
+            recompute_usage(sub, start, end)
+
+
+def record_monthly_pickup(order, weight_kg: Decimal, *, previous_weight: Optional[Decimal] = None) -> None:
+    """Call after OrderWeight is stored for a monthly order."""
+    if previous_weight is None:
+        _apply_usage_delta(order, pickups=1, weight=Decimal(weight_kg))
+    else:
+        _apply_usage_delta(order, pickups=0, weight=Decimal(weight_kg) - Decimal(previous_weight))
+
+
+def release_monthly_pickup(order) -> None:
+    """Call after a monthly order is cancelled/skipped; undoes any counted pickup."""
+    from orders.models import OrderWeight
+
+    weight = OrderWeight.objects.filter(order_id=order.id).values_list("weight_kg", flat=True).first()
+    if weight is None:
+        return
+    _apply_usage_delta(order, pickups=-1, weight=-Decimal(weight))
@@ -14,6 +14,7 @@ from locations.models import City, Branch, ServiceZone, CustomerAddress
 from branch_management.models import DeliveryStaff
 from orders.models import Order
 from payments.models import PaymentFine
+from jobs.queue import run_pending
 
 
 class SubscriptionBillingLogicTests(TestCase):
@@ -63,6 +64,31 @@ class SubscriptionBillingLogicTests(TestCase):
 		sub.refresh_from_db()
 		self.assertEqual(sub.end_date, initial_end)
 
+	def test_pay_rejects_bad_ids_and_other_customers_payments(self):
+		from jobs.models import Lease
+
+		today = date.today()
+		sub = CustomerSubscription.objects.create(
+			user=self.user, plan=self.plan, preferred_pickup_shift="morning", is_active=True,
+			start_date=today, end_date=today + timedelta(days=30),
+		)
+		p1 = Payment.objects.create(
+			user=self.user, subscription=sub, amount=self.plan.monthly_price, payment_type="monthly",
+			payment_status="pending", due_date=today + timedelta(days=4),
+		)
+		other = User.objects.create(email="other@example.com", phone="9999999998", role=User.Role.CUSTOMER)
+
+		self.client.force_authenticate(user=other)
+		for url in ("/api/subscriptions/pay/", "/api/customer/payments/pay/"):
+			self.assertEqual(self.client.post(url, {"payment_id": "9" * 120}, format="json").status_code, 400)
+			self.assertEqual(self.client.post(url, {"payment_id": p1.id}, format="json").status_code, 404)
+
+		self.client.force_authenticate(user=self.user)
+		self.assertEqual(self.client.post("/api/subscriptions/pay/", {"payment_id": p1.id}, format="json").status_code, 200)
+		res = self.client.post("/api/customer/payments/pay/", {"payment_id": p1.id}, format="json")
+		self.assertEqual(res.status_code, 404)  # already paid
+		self.assertFalse(Lease.objects.exists())
+
 	def test_renewal_monthly_payment_extends_end_date_by_30_days(self):
 		today = date.today()
 		sub = CustomerSubscription.objects.create(
@@ -193,7 +219,10 @@ class SubscriptionFineAndResumeTests(TestCase):
 		self.assertTrue(pending.get("is_overdue"))
 		self.assertEqual(pending.get("days_overdue"), 2)
 		self.assertEqual(Decimal(str(pending.get("fine_amount"))), Decimal("20"))
-		self.assertTrue(PaymentFine.objects.filter(payment=p).exists())
+		# the fine row is written by the queued job, not by the GET itself
+		self.assertFalse(PaymentFine.objects.filter(payment=p).exists())
+		run_pending()
+		self.assertTrue(PaymentFine.objects.filter(payment=p, fine_days=2).exists())
 
 		# Generation should be suspended due to overdue pending monthly payment
 		from orders.views import _ensure_monthly_orders_for_subscription
@@ -230,5 +259,142 @@ class SubscriptionFineAndResumeTests(TestCase):
 		self.assertEqual(p.payment_status, "paid")
 		self.assertFalse(PaymentFine.objects.filter(payment=p).exists())
 
-		# Should resume service immediately by ensuring today's order exists
+		# Should resume service by queueing today's order with the payment
+		run_pending()
 		self.assertTrue(Order.objects.filter(user=self.user, order_type="monthly", pickup_date=today).exists())
+
+
+class SubscriptionUsageTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = User.objects.create_user(
+			email="usage@example.com",
+			password="pass12345",
+			full_name="Usage Customer",
+			phone="6666666666",
+			role=User.Role.CUSTOMER,
+			is_active=True,
+			is_approved=True,
+		)
+		self.plan = SubscriptionPlan.objects.create(
+			name="Basic",
+			monthly_price=Decimal("199.00"),
+			max_weight_per_month=Decimal("30.00"),
+			description="",
+		)
+		city = City.objects.create(name="UsageCity", state="UC")
+		self.branch = Branch.objects.create(
+			city=city,
+			branch_name="Main",
+			address="Addr",
+			latitude=Decimal("10.000000"),
+			longitude=Decimal("76.000000"),
+			is_active=True,
+		)
+		self.address = CustomerAddress.objects.create(
+			user=self.user,
+			address_label="Home",
+			full_address="Home",
+			pincode="682001",
+			latitude=Decimal("10.000000"),
+			longitude=Decimal("76.000000"),
+		)
+		self.staff_user = User.objects.create_user(
+			email="usage-staff@example.com",
+			password="pass12345",
+			full_name="Staff",
+			phone="5555555555",
+			role=User.Role.DELIVERY_STAFF,
+			is_active=True,
+			is_approved=True,
+		)
+		self.staff = DeliveryStaff.objects.create(user=self.staff_user, branch=self.branch, is_available=True)
+		self.today = timezone.localdate()
+		self.sub = CustomerSubscription.objects.create(
+			user=self.user,
+			plan=self.plan,
+			preferred_pickup_shift="morning",
+			is_active=True,
+			start_date=self.today - timedelta(days=5),
+			end_date=self.today + timedelta(days=25),
+		)
+
+	def _monthly_order(self, pickup_date):
+		return Order.objects.create(
+			user=self.user,
+			branch=self.branch,
+			address=self.address,
+			delivery_staff=self.staff,
+			order_type="monthly",
+			pickup_shift="morning",
+			pickup_date=pickup_date,
+		)
+
+	def test_pickups_and_weight_accumulate_per_billing_period(self):
+		from subscriptions.models import SubscriptionUsage
+
+		self.client.force_authenticate(user=self.staff_user)
+		for days_ago, weight in ((2, "4.50"), (1, "3.00")):
+			order = self._monthly_order(self.today - timedelta(days=days_ago))
+			res = self.client.patch(
+				f"/api/delivery/orders/{order.id}/status/",
+				{"status": "picked_up", "weight_kg": weight},
+				format="json",
+			)
+			self.assertEqual(res.status_code, 200)
+
+		usage = SubscriptionUsage.objects.get(subscription=self.sub)
+		self.assertEqual(usage.period_start, self.sub.start_date)
+		self.assertEqual(usage.total_pickups, 2)
+		self.assertEqual(usage.total_weight, Decimal("7.50"))
+
+		self.client.force_authenticate(user=self.user)
+		res = self.client.get("/api/subscriptions/me/")
+		self.assertEqual(res.data["usage"]["total_pickups"], 2)
+		self.assertEqual(res.data["usage"]["total_weight"], 7.5)
+		self.assertEqual(res.data["usage"]["remaining_weight"], 22.5)
+
+	def test_cancelling_a_weighed_order_releases_its_usage(self):
+		from orders.models import OrderWeight
+		from subscriptions.models import SubscriptionUsage
+		from subscriptions.services import get_usage, release_monthly_pickup
+
+		order = self._monthly_order(self.today)
+		OrderWeight.objects.create(order=order, weight_kg=Decimal("5.00"))
+		self.assertEqual(get_usage(self.sub).total_pickups, 1)
+
+		order.status = "cancelled"
+		order.save(update_fields=["status"])
+		release_monthly_pickup(order)
+
+		usage = SubscriptionUsage.objects.get(subscription=self.sub)
+		self.assertEqual(usage.total_pickups, 0)
+		self.assertEqual(usage.total_weight, Decimal("0"))
+
+	def test_listing_usage_reads_stored_rows_and_computes_missing_ones_without_writing(self):
+		from orders.models import OrderWeight
+		from subscriptions.models import SubscriptionUsage
+		from subscriptions.services import recompute_usage, usage_for_subscriptions
+
+		open_ended = CustomerSubscription.objects.create(
+			user=self.staff_user,
+			plan=self.plan,
+			preferred_pickup_shift="morning",
+			is_active=True,
+			start_date=self.today - timedelta(days=10),
+		)
+		# stored three days ago: period_end has moved since, the row still counts
+		recompute_usage(open_ended, open_ended.start_date, self.today - timedelta(days=3))
+		SubscriptionUsage.objects.filter(subscription=open_ended).update(total_pickups=4, total_weight=Decimal("9.00"))
+		for days_ago, weight in ((1, "2.00"), (2, "3.25")):
+			order = self._monthly_order(self.today - timedelta(days=days_ago))
+			OrderWeight.objects.create(order=order, weight_kg=Decimal(weight))
+		SubscriptionUsage.objects.filter(subscription=self.sub).delete()
+
+		with self.assertNumQueries(2):
+			usages = usage_for_subscriptions([self.sub, open_ended], today=self.today)
+
+		self.assertEqual((usages[open_ended.id].total_pickups, usages[open_ended.id].period_end), (4, self.today))
+		self.assertEqual(usages[self.sub.id].total_pickups, 2)
+		self.assertEqual(usages[self.sub.id].total_weight, Decimal("5.25"))
+		self.assertFalse(SubscriptionUsage.objects.filter(subscription=self.sub).exists())
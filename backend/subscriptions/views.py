@@ -9,7 +9,10 @@ from locations.models import Branch
 from orders.models import Order, OrderWeight, OrderStatusLog  # CHANGED: include OrderStatusLog
 from .models import CustomerSubscription, SubscriptionPlan, SubscriptionSkipDay
 from payments.models import Payment
-from payments.services import ensure_fine_for_payment
+from payments.services import compute_fine_amount
+from payments.tasks import enqueue_fines
+from orders.tasks import enqueue_todays_order
+from .services import get_usage, release_monthly_pickup, usage_for_subscriptions
 from datetime import date, timedelta
 from django.db.models import Sum
 from django.db import transaction
@@ -17,7 +20,8 @@ from django.utils import timezone
 from django.conf import settings  # NEW
 from decimal import Decimal  # NEW
 
-from locations.models import CustomerAddress, ServiceZone  # NEW/ensure present
+from locations.models import CustomerAddress  # NEW/ensure present
+from locations.services import zones_for_pincode
 from branch_management.models import DeliveryStaff         # NEW/ensure present
 from orders.models import Order                            # ensure imported
 
@@ -29,10 +33,7 @@ def _resolve_monthly_order_context_for_user(u):
         return None, None, None
 
     pincode = str(getattr(addr, "pincode", "")).strip()
-    zone = ServiceZone.objects.select_related("branch").filter(
-        pincodes__contains=[pincode],
-        branch__is_active=True,
-    ).first()
+    zone = zones_for_pincode(pincode).select_related("branch").first()
     branch = zone.branch if zone else None
     if not branch:
         return None, None, None
@@ -75,15 +76,25 @@ class ManagerSubscriptionsView(APIView):
         if not branch:
             return Response({"detail": "branch not found"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user_ids = Order.objects.filter(
-            branch=branch,
-            order_type="monthly",
-        ).values_list("user_id", flat=True).distinct()
-
-        subs = CustomerSubscription.objects.select_related("user", "plan").filter(
-            user_id__in=user_ids,
+        # CHANGED: branch subscribers from the customer->branch affinity table
+        subs = list(CustomerSubscription.objects.select_related("user", "plan").filter(
+            user__branch_affinities__branch=branch,
             is_active=True,
-        )
+        ))
+
+        # NEW: per-customer usage for the current billing period, no per-row queries or writes
+        usages = usage_for_subscriptions(subs)
+
+        def _usage(s):
+            u = usages[s.id]
+            remaining = max(s.plan.max_weight_per_month - u.total_weight, Decimal("0"))
+            return {
+                "total_pickups": u.total_pickups,
+                "total_weight": float(u.total_weight),
+                "remaining_weight": float(remaining),
+                "period_start": u.period_start.isoformat(),
+                "period_end": u.period_end.isoformat(),
+            }
 
         plans = SubscriptionPlan.objects.all().order_by("monthly_price")
 
@@ -109,6 +120,7 @@ class ManagerSubscriptionsView(APIView):
                         "preferred_pickup_shift": s.preferred_pickup_shift,
                         "start_date": s.start_date.isoformat() if s.start_date else None,
                         "end_date": s.end_date.isoformat() if s.end_date else None,
+                        "usage": _usage(s),  # NEW
                     }
                     for s in subs
                 ],
@@ -180,6 +192,16 @@ class AdminPlanDetailView(APIView):
         plan.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+def _plan_row(p):
+    return {
+        "id": p.id,
+        "name": p.name,
+        "monthly_price": float(p.monthly_price),
+        "max_weight_per_month": float(p.max_weight_per_month),
+        "description": p.description,
+    }
+
+
 class CustomerPlansListView(APIView):
     """List all available subscription plans for customers."""
     authentication_classes = [CsrfExemptSessionAuthentication]
@@ -187,16 +209,7 @@ class CustomerPlansListView(APIView):
 
     def get(self, request):
         plans = SubscriptionPlan.objects.all().order_by("monthly_price")
-        data = [
-            {
-                "id": p.id,
-                "name": p.name,
-                "monthly_price": float(p.monthly_price),
-                "max_weight_per_month": float(p.max_weight_per_month),
-                "description": p.description,
-            }
-            for p in plans
-        ]
+        data = [_plan_row(p) for p in plans]
         return Response(data, status=status.HTTP_200_OK)
 
 
@@ -259,14 +272,9 @@ class CustomerSubscribeView(APIView):
             due_date=due_date,
         )
 
-        # CHANGED: generate only TODAY's subscription order immediately (avoid tomorrow)
-        try:
-            from orders import views as order_views
-            start = timezone.localdate()
-            end = start
-            order_views._ensure_monthly_orders_for_subscription(subscription, start, end)
-        except Exception:
-            pass
+        # CHANGED: queue only TODAY's subscription order (avoid tomorrow); it is
+        # committed together with the subscription and generated by a worker
+        enqueue_todays_order(subscription)
 
         return Response(
             {
@@ -300,38 +308,17 @@ class CustomerSubscriptionView(APIView):
         period_end = None
 
         if sub:
-            # rolling 30-day window based on end_date; clamp to [start_date, end_date] and today
-            sub_start = sub.start_date
-            sub_end = sub.end_date or today
-
-            period_end = min(sub_end, today)
-
-            # If end_date exists, treat current cycle as last 30 days ending at end_date
-            base_start = (sub_end - timedelta(days=30)) if sub.end_date else sub_start
-            if base_start is None:
-                base_start = today - timedelta(days=30)
-
-            period_start = max(base_start, sub_start) if sub_start else base_start
-            if period_start and period_end and period_end < period_start:
+            # CHANGED: read precomputed usage for the current billing period
+            # (kept current by DeliveryOrderStatusView / skip-day cancellations)
+            usage = get_usage(sub, today=today)
+            total_pickups = usage.total_pickups
+            total_weight = usage.total_weight
+            period_start = usage.period_start
+            period_end = min(usage.period_end, today)
+            if period_end < period_start:
                 # safety for edge cases
                 period_start = period_end
 
-            total_pickups = Order.objects.filter(
-                user=request.user,
-                order_type="monthly",
-                pickup_date__gte=period_start,
-                pickup_date__lte=period_end,
-            ).count()
-
-            # CHANGED: sum weights by pickup_date (not recorded_at date)
-            agg = OrderWeight.objects.filter(
-                order__user=request.user,
-                order__order_type="monthly",
-                order__pickup_date__gte=period_start,
-                order__pickup_date__lte=period_end,
-            ).aggregate(total=Sum("weight_kg"))
-            total_weight = agg["total"] or Decimal("0")
-
         # pending payment unchanged
         pending_payment = None
         if sub:
@@ -361,15 +348,11 @@ class CustomerSubscriptionView(APIView):
                 payment_status="pending",
             ).order_by("due_date", "id").first()
             if payment:
-                fine = None
-                try:
-                    fine = ensure_fine_for_payment(payment, today=today)
-                except Exception:
-                    fine = getattr(payment, "fine", None)
-
+                # CHANGED: fine computed for display; the PaymentFine row is written by a queued job
                 is_overdue = bool(payment.due_date and payment.due_date < today)
                 days_overdue = (today - payment.due_date).days if is_overdue else 0
-                fine_amount = float(getattr(fine, "fine_amount", 0) or 0)
+                fine_amount = float(compute_fine_amount(days_overdue=days_overdue))
+                enqueue_fines([payment], today=today)
                 total_due = float(payment.amount or 0) + fine_amount
 
                 pending_payment = {
@@ -379,7 +362,7 @@ class CustomerSubscriptionView(APIView):
                     "is_overdue": is_overdue,
                     "days_overdue": days_overdue,
                     "fine_amount": fine_amount,
-                    "fine_days": int(getattr(fine, "fine_days", 0) or 0),
+                    "fine_days": days_overdue,
                     "total_due": total_due,
                 }
 
@@ -457,7 +440,16 @@ class CustomerPaySubscriptionView(APIView):
             return Response({"detail": "payment_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            payment = Payment.objects.select_related("subscription", "subscription__plan").get(
+            payment_id = int(payment_id)
+        except (TypeError, ValueError):
+            payment_id = 0
+        if not 0 < payment_id < 2 ** 63:  # a primary key, not any string the client sends
+            return Response({"detail": "payment_id must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # NEW: the row lock serializes a double submit (it would otherwise extend the
+            # subscription twice); the second request then sees the payment paid
+            payment = Payment.objects.select_for_update().get(
                 id=payment_id,
                 user=request.user,
                 payment_status="pending",
@@ -510,13 +502,8 @@ class CustomerPaySubscriptionView(APIView):
                 payment_status="pending",
             ).exclude(id=payment.id).delete()
 
-            # NEW: after payment, resume service by ensuring today's monthly order exists
-            try:
-                from orders import views as order_views
-                today_local = timezone.localdate()
-                order_views._ensure_monthly_orders_for_subscription(sub, today_local, today_local)
-            except Exception:
-                pass
+            # CHANGED: after payment, resume service by queueing today's monthly order
+            enqueue_todays_order(sub)
 
         return Response({"detail": "Payment successful"}, status=status.HTTP_200_OK)
 
@@ -565,6 +552,7 @@ class CustomerSkipDayView(APIView):
             monthly_order.status = "cancelled"
             monthly_order.save(update_fields=["status"])
             OrderStatusLog.objects.create(order=monthly_order, status="cancelled", changed_by=request.user)
+            release_monthly_pickup(monthly_order)
 
         return Response(
             {